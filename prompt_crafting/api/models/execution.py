@@ -1,31 +1,147 @@
 """Pydantic models for prompt execution operations.
 
-Request and response schemas for the /prompts/{id}/execute endpoint.
+Request and response schemas for the /prompts/{id}/execute and
+/prompts/{id}/estimate endpoints.
 """
 
+import os
 from datetime import datetime
 from decimal import Decimal
-from typing import Any, Optional
+from typing import Any, Literal, Optional
 
 from pydantic import BaseModel, Field
 
+_BATCH_MAX_ITEMS: int = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+_COMPARE_MAX_TARGETS: int = int(os.getenv("COMPARE_MAX_TARGETS", "10"))
 
-class ExecutionRequest(BaseModel):
-    """Schema for requesting a prompt execution.
+
+class RouteTarget(BaseModel):
+    """A (provider, model) pair a routed execution may use.
+
+    Attributes:
+        llm_provider: LLM provider name.
+        model_name: Model identifier.
+    """
+
+    llm_provider: str = Field(max_length=50)
+    model_name: str = Field(max_length=100)
+
+
+class RoutingPolicy(BaseModel):
+    """How to choose between the requested model and alternatives.
+
+    Attributes:
+        strategy: "fallback" tries the requested model, then
+            ``fallbacks`` in order; "fastest" tries the requested model
+            and its equivalents (``fallbacks``, or the configured model
+            group) fastest first by live p95/p50 latency.
+        fallbacks: Alternative targets, in preference order.
+    """
+
+    strategy: Literal["fallback", "fastest"] = "fallback"
+    fallbacks: list[RouteTarget] = Field(
+        default_factory=list, max_length=10
+    )
+
+
+class ExecutionOptions(BaseModel):
+    """Model, sampling and scheduling options for an execution.
 
     Attributes:
-        input_data: Dictionary of template variable values.
         llm_provider: LLM provider name (default: anthropic).
         model_name: Model identifier (default: claude-sonnet-4-20250514).
         target_domain: Optional target domain for security prompts.
+        max_tokens: Maximum tokens in the LLM response.
+        temperature: Sampling temperature; 0 makes the call
+            deterministic and eligible for the response cache.
+        use_cache: Force response caching on or off (default: cache
+            only when temperature is 0).
+        routing: Optional policy for failing over to, or picking the
+            fastest of, alternative models.
+        hedge: Send a second request if the call outlives the model's
+            p95 latency (within the server's hedge budget).
+        hedge_target: Model for the hedge request (default: the same
+            model).
+        priority: Scheduling class for the LLM call; defaults to the
+            API key's configured class, or "interactive". A request
+            cannot rank above its API key's class.
+        max_cost_usd: Reject the execution if its worst-case cost
+            (estimated input plus ``max_tokens`` of output) exceeds
+            this; defaults to the server's ``EXECUTION_MAX_COST_USD``.
     """
 
-    input_data: dict[str, Any]
     llm_provider: str = Field(default="anthropic", max_length=50)
     model_name: str = Field(
         default="claude-sonnet-4-20250514", max_length=100
     )
     target_domain: Optional[str] = None
+    max_tokens: int = Field(default=4096, ge=1, le=200000)
+    temperature: float = Field(default=0.7, ge=0.0, le=2.0)
+    use_cache: Optional[bool] = None
+    routing: Optional[RoutingPolicy] = None
+    hedge: bool = False
+    hedge_target: Optional[RouteTarget] = None
+    priority: Optional[Literal["interactive", "batch", "background"]] = None
+    max_cost_usd: Optional[float] = Field(default=None, gt=0)
+
+
+class ExecutionRequest(ExecutionOptions):
+    """Schema for requesting a prompt execution.
+
+    Attributes:
+        input_data: Dictionary of template variable values.
+    """
+
+    input_data: dict[str, Any]
+
+
+class BatchExecutionRequest(ExecutionOptions):
+    """Schema for executing a prompt once per set of inputs.
+
+    The options apply to every item. Items default to the "batch"
+    scheduling class.
+
+    Attributes:
+        inputs: Template variable values, one dictionary per execution.
+        provider_batch: Send every item in one request to the
+            provider's asynchronous batch API: half the price and no
+            interactive quota use, but results can take up to the
+            provider's completion window (24 hours). Routing, hedging
+            and the response cache do not apply.
+    """
+
+    inputs: list[dict[str, Any]] = Field(
+        min_length=1, max_length=_BATCH_MAX_ITEMS
+    )
+    provider_batch: bool = False
+    priority: Optional[Literal["interactive", "batch", "background"]] = (
+        "batch"
+    )
+
+
+class CompareRequest(BaseModel):
+    """Schema for executing a prompt against several models at once.
+
+    Attributes:
+        input_data: Dictionary of template variable values.
+        targets: (provider, model) pairs to run the prompt against.
+        target_domain: Optional target domain for security prompts.
+        max_tokens: Maximum tokens in each LLM response.
+        temperature: Sampling temperature for every model.
+        use_cache: Force response caching on or off (default: cache
+            only when temperature is 0).
+        priority: Scheduling class for the LLM calls.
+    """
+
+    input_data: dict[str, Any]
+    targets: list[RouteTarget] = Field(
+        min_length=1, max_length=_COMPARE_MAX_TARGETS
+    )
+    target_domain: Optional[str] = None
+    max_tokens: int = Field(default=4096, ge=1, le=200000)
+    temperature: float = Field(default=0.7, ge=0.0, le=2.0)
+    use_cache: Optional[bool] = None
+    priority: Optional[Literal["interactive", "batch", "background"]] = None
 
 
 class ExecutionResponse(BaseModel):
@@ -37,10 +153,16 @@ class ExecutionResponse(BaseModel):
         input_data: Template variable values used.
         output_text: LLM response text.
         tokens_used: Total token count.
+        cache_read_tokens: Input tokens read from the provider's prompt
+            cache.
+        cache_write_tokens: Input tokens written to the provider's
+            prompt cache.
         cost_usd: Calculated cost in USD.
         execution_time_ms: Latency in milliseconds.
         llm_provider: Provider name.
-        model_name: Model identifier.
+        model_name: Model identifier that served the request.
+        routing: Routing decision, for routed executions.
+        group_id: Comparison run the execution belongs to, if any.
         created_at: Execution timestamp.
     """
 
@@ -49,10 +171,66 @@ class ExecutionResponse(BaseModel):
     input_data: dict[str, Any]
     output_text: Optional[str] = None
     tokens_used: Optional[int] = None
+    cache_read_tokens: Optional[int] = None
+    cache_write_tokens: Optional[int] = None
     cost_usd: Optional[Decimal] = None
     execution_time_ms: Optional[int] = None
     llm_provider: Optional[str] = None
     model_name: Optional[str] = None
+    routing: Optional[dict[str, Any]] = None
+    group_id: Optional[str] = None
     created_at: datetime
 
     model_config = {"from_attributes": True}
+
+
+class CompareResult(BaseModel):
+    """Schema for one model's outcome in a comparison run.
+
+    Attributes:
+        llm_provider: Provider name.
+        model_name: Model identifier.
+        execution: The persisted execution, if the call succeeded.
+        error: Failure description, if the call failed.
+    """
+
+    llm_provider: str
+    model_name: str
+    execution: Optional[ExecutionResponse] = None
+    error: Optional[str] = None
+
+
+class CompareResponse(BaseModel):
+    """Schema for the results of a comparison run.
+
+    Attributes:
+        group_id: Id shared by the run's persisted executions.
+        results: One result per target, in request order.
+    """
+
+    group_id: str
+    results: list[CompareResult]
+
+
+class EstimateResponse(BaseModel):
+    """Schema for a pre-flight token and cost estimate.
+
+    Attributes:
+        llm_provider: Provider name.
+        model_name: Model identifier.
+        input_tokens: Estimated prompt tokens.
+        max_output_tokens: Requested ``max_tokens``.
+        context_window: Model's context window, or None if unknown.
+        fits_context: Whether the prompt and a full response fit the
+            context window.
+        max_cost_usd: Cost if the response uses all of
+            ``max_output_tokens``.
+    """
+
+    llm_provider: str
+    model_name: str
+    input_tokens: int
+    max_output_tokens: int
+    context_window: Optional[int] = None
+    fits_context: bool
+    max_cost_usd: float
@@ -0,0 +1,64 @@
+"""Pydantic models for prompt-version experiments.
+
+Request and response schemas for running a dataset against several
+versions of a prompt and reading the stored summaries.
+"""
+
+import os
+from datetime import datetime
+from typing import Any, Optional
+
+from pydantic import BaseModel, Field
+
+from prompt_crafting.api.models.execution import ExecutionOptions
+
+_EXPERIMENT_MAX_INPUTS: int = int(os.getenv("EXPERIMENT_MAX_INPUTS", "1000"))
+_EXPERIMENT_MAX_VERSIONS: int = int(os.getenv("EXPERIMENT_MAX_VERSIONS", "5"))
+
+
+class ExperimentRequest(ExecutionOptions):
+    """Schema for running a dataset against several prompt versions.
+
+    The execution options apply to every call. The response cache is
+    off by default so each version's latency and cost are measured.
+
+    Attributes:
+        inputs: Dataset of template variable values.
+        versions: Version numbers of the prompt's name to compare,
+            baseline first (default: the two latest, older first).
+        use_cache: Force response caching on or off (default: off).
+    """
+
+    inputs: list[dict[str, Any]] = Field(
+        min_length=1, max_length=_EXPERIMENT_MAX_INPUTS
+    )
+    versions: Optional[list[int]] = Field(
+        default=None, min_length=2, max_length=_EXPERIMENT_MAX_VERSIONS
+    )
+    use_cache: Optional[bool] = False
+
+
+class ExperimentResponse(BaseModel):
+    """Schema for a stored experiment summary.
+
+    Attributes:
+        id: Unique experiment identifier.
+        prompt_name: Name shared by the compared versions.
+        versions: Compared version numbers, baseline first.
+        baseline_version: Version the deltas are measured against.
+        input_count: Number of input sets in the dataset.
+        results: Per-version statistics (count, mean, stddev, min and
+            max of latency_ms, tokens and cost_usd; failures) with
+            deltas of the means against the baseline.
+        created_at: Timestamp of the run.
+    """
+
+    id: str
+    prompt_name: str
+    versions: list[int]
+    baseline_version: int
+    input_count: int
+    results: Optional[list[dict[str, Any]]] = None
+    created_at: datetime
+
+    model_config = {"from_attributes": True}
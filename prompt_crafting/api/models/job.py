@@ -0,0 +1,57 @@
+"""Pydantic models for batch job operations.
+
+Response schemas for the /jobs endpoints.
+"""
+
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class JobItemResultResponse(BaseModel):
+    """Schema for the outcome of one item of a batch job.
+
+    Attributes:
+        index: Position of the item in the submitted inputs.
+        status: "succeeded" or "failed".
+        execution_id: Id of the persisted execution, if any.
+        output_text: LLM response text.
+        tokens_used: Total token count.
+        cost_usd: Calculated cost in USD.
+        error: Failure description for failed items.
+    """
+
+    index: int
+    status: str
+    execution_id: Optional[str] = None
+    output_text: Optional[str] = None
+    tokens_used: Optional[int] = None
+    cost_usd: Optional[float] = None
+    error: Optional[str] = None
+
+
+class JobResponse(BaseModel):
+    """Schema for a batch job's progress.
+
+    Attributes:
+        id: Unique job identifier.
+        prompt_id: Prompt the job executes.
+        status: "queued", "running" or "completed".
+        total: Number of items.
+        succeeded: Items persisted successfully so far.
+        failed: Items that failed so far.
+        created_at: Submission time.
+        finished_at: Completion time.
+        results: Item results in completion order, when requested.
+    """
+
+    id: str
+    prompt_id: str
+    status: str
+    total: int
+    succeeded: int
+    failed: int
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    results: Optional[list[JobItemResultResponse]] = None
@@ -49,6 +49,7 @@ class PromptResponse(BaseModel):
         version: Version number.
         category: Category string.
         parameters: Parameter schema.
+        complexity: Static cost estimate of the template.
         created_at: Creation timestamp.
         updated_at: Last modification timestamp.
     """
@@ -59,7 +60,21 @@ class PromptResponse(BaseModel):
     version: int
     category: Optional[str] = None
     parameters: Optional[dict[str, Any]] = None
+    complexity: Optional[dict[str, Any]] = None
     created_at: datetime
     updated_at: datetime
 
     model_config = {"from_attributes": True}
+
+
+class BatchRenderRequest(BaseModel):
+    """Schema for rendering one prompt against many variable sets.
+
+    Attributes:
+        inputs: List of template variable dictionaries.
+        use_process_pool: Render in the shared render process pool;
+            worth it for very large or CPU-heavy batches.
+    """
+
+    inputs: list[dict[str, Any]] = Field(..., max_length=10000)
+    use_process_pool: bool = False
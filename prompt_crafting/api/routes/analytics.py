@@ -1,18 +1,19 @@
 """Analytics endpoints for cost, performance, and usage metrics.
 
 Provides aggregated views of execution data for dashboards
-and reporting.
+and reporting, and the stored summaries of prompt-version experiments.
 """
 
 from datetime import datetime, timezone
 from decimal import Decimal
 from typing import Any, Optional
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from prompt_crafting.db.models import Execution, Prompt
+from prompt_crafting.api.models.experiment import ExperimentResponse
+from prompt_crafting.db.models import Execution, Experiment, Prompt
 from prompt_crafting.db.session import get_db
 from prompt_crafting.utils.security import verify_api_key
 
@@ -183,3 +184,67 @@ async def get_usage_analytics(
             for row in rows
         ]
     }
+
+
+@router.get(
+    "/experiments",
+    response_model=list[ExperimentResponse],
+    summary="Prompt-version experiment summaries, newest first",
+)
+async def list_experiments(
+    prompt_name: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_db),
+    _api_key: str = Depends(verify_api_key),
+) -> list[Experiment]:
+    """List stored experiment summaries.
+
+    Args:
+        prompt_name: Optional prompt name to filter by.
+        limit: Maximum number of experiments to return.
+        db: Async database session.
+        _api_key: Validated API key.
+
+    Returns:
+        List of Experiment records, newest first.
+    """
+    stmt = (
+        select(Experiment)
+        .order_by(Experiment.created_at.desc())
+        .limit(limit)
+    )
+    if prompt_name:
+        stmt = stmt.where(Experiment.prompt_name == prompt_name)
+    result = await db.execute(stmt)
+    return list(result.scalars().all())
+
+
+@router.get(
+    "/experiments/{experiment_id}",
+    response_model=ExperimentResponse,
+    summary="One prompt-version experiment summary",
+)
+async def get_experiment(
+    experiment_id: str,
+    db: AsyncSession = Depends(get_db),
+    _api_key: str = Depends(verify_api_key),
+) -> Experiment:
+    """Retrieve an experiment's per-version statistics and deltas.
+
+    Args:
+        experiment_id: The experiment's unique identifier.
+        db: Async database session.
+        _api_key: Validated API key.
+
+    Returns:
+        The matching Experiment record.
+
+    Raises:
+        HTTPException: 404 if experiment not found.
+    """
+    experiment = await db.get(Experiment, experiment_id)
+    if experiment is None:
+        raise HTTPException(
+            status_code=404, detail="Experiment not found"
+        )
+    return experiment
@@ -1,24 +1,95 @@
 """Endpoints for executing prompts against LLM providers.
 
-Handles template rendering, scope validation, LLM API calls,
-result persistence, and per-execution structured logging.
+Handles template rendering (off the event loop, under a CPU and output
+budget, with statically heavy templates routed to the process pool),
+scope validation, offline token, context-window and cost estimates
+checked before any spend, LLM API calls (buffered, streamed, fanned out to
+several models, queued as a batch job, or run over a dataset for
+several prompt versions), result persistence, and per-execution
+structured logging.
 """
 
+import asyncio
+import json
+import math
+import os
 import time
+import uuid
+from collections.abc import AsyncIterator
+from pathlib import Path
+from typing import Any, Optional
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.background import BackgroundTask
 
 from prompt_crafting.api.models.execution import (
+    BatchExecutionRequest,
+    CompareRequest,
+    CompareResponse,
+    EstimateResponse,
+    ExecutionOptions,
     ExecutionRequest,
     ExecutionResponse,
 )
-from prompt_crafting.api.services.llm_client import LLMClient
-from prompt_crafting.api.services.prompt_engine import render_template
+from prompt_crafting.api.models.experiment import (
+    ExperimentRequest,
+    ExperimentResponse,
+)
+from prompt_crafting.api.models.job import JobResponse
+from prompt_crafting.api.services.budget_tracker import (
+    BudgetExceeded,
+    BudgetReservation,
+    budget_tracker,
+)
+from prompt_crafting.api.services.concurrency_limiter import (
+    ConcurrencyLimitExceeded,
+)
+from prompt_crafting.api.services.experiment_stats import VersionStats
+from prompt_crafting.api.services.job_queue import (
+    Job,
+    JobItemResult,
+    TaskRunner,
+    job_queue,
+)
+from prompt_crafting.api.services.llm_client import (
+    LLMBatchResult,
+    LLMClient,
+    LLMResponse,
+    budget_cost,
+    estimate_call,
+    is_priced,
+)
+from prompt_crafting.api.services.llm_router import (
+    RoutingDecision,
+    generate_routed,
+    order_candidates,
+)
+from prompt_crafting.api.services.priority_scheduler import (
+    PRIORITIES,
+    llm_scheduler,
+)
+from prompt_crafting.api.services.prompt_engine import (
+    CompiledTemplate,
+    missing_variables,
+    strip_cache_break,
+)
+from prompt_crafting.api.services.provider_health import CircuitOpenError
+from prompt_crafting.api.services.providers import BATCHING, get_provider
+from prompt_crafting.api.services.rate_limiter import QuotaExceeded
+from prompt_crafting.api.services.render_executor import render_executor
+from prompt_crafting.api.services.response_cache import (
+    build_response_cache,
+)
+from prompt_crafting.api.services.template_analysis import check_complexity
+from prompt_crafting.api.services.template_registry import (
+    template_registry,
+)
 from prompt_crafting.api.services.validator import is_target_authorized
-from prompt_crafting.db.models import AuditLog, Execution, Prompt
-from prompt_crafting.db.session import get_db
+from prompt_crafting.db.models import AuditLog, Execution, Experiment, Prompt
+from prompt_crafting.db.session import async_session_factory, get_db
 from prompt_crafting.utils.logging import (
     create_execution_log_dir,
     logger,
@@ -27,11 +98,28 @@ from prompt_crafting.utils.logging import (
     write_request_log,
     write_response_log,
 )
-from prompt_crafting.utils.security import verify_api_key
+from prompt_crafting.utils.security import (
+    get_api_key_priority,
+    verify_api_key,
+)
 
 router = APIRouter(prefix="/prompts", tags=["executions"])
 
-_llm_client = LLMClient()
+_llm_client = LLMClient(cache=build_response_cache())
+
+_EXPERIMENT_CONCURRENCY: int = int(
+    os.getenv("EXPERIMENT_CONCURRENCY", "16")
+)
+_EXPERIMENT_INSERT_BATCH: int = int(
+    os.getenv("EXPERIMENT_INSERT_BATCH", "50")
+)
+# Server-wide worst-case cost cap per execution; 0 disables it.
+_EXECUTION_MAX_COST_USD: float = float(
+    os.getenv("EXECUTION_MAX_COST_USD", "0")
+)
+
+# An (ORM model, column values) pair for a bulk insert.
+Row = tuple[type, dict[str, Any]]
 
 
 @router.post(
@@ -43,22 +131,1218 @@ async def execute_prompt(
     prompt_id: str,
     body: ExecutionRequest,
     db: AsyncSession = Depends(get_db),
-    _api_key: str = Depends(verify_api_key),
+    api_key: str = Depends(verify_api_key),
 ) -> Execution:
     """Render a Jinja2 template, call the LLM, and persist the result.
 
     Validates target_domain against AUTHORIZED_TARGETS if provided.
-    Creates structured log files per execution.
+    Creates structured log files per execution. The rendered prompt's
+    estimated tokens are checked against the model's context window
+    and the cost cap, and its worst-case cost is reserved from the API
+    key's budget, before the call. The LLM call waits for a slot from
+    the priority scheduler in the request's class.
 
     Args:
         prompt_id: UUID of the prompt to execute.
         body: Execution request data with input variables.
         db: Async database session.
-        _api_key: Validated API key.
+        api_key: Validated API key; selects the default priority and
+            the budget the call spends.
 
     Returns:
         The persisted Execution record.
 
+    Raises:
+        HTTPException: 404 if prompt not found, 400 if scope violation
+            or template error, 422 if required template variables are
+            missing from input_data and the prompt's parameters or the
+            worst-case cost exceeds the cap, 413 if the prompt and
+            max_tokens overflow the context window, 429 if the API key's
+            budget or a configured provider quota has no capacity, 503
+            if the model's circuit breaker is open or the provider's
+            concurrency queue is full or timed out, 502 if the LLM call
+            fails.
+    """
+    prompt, rendered, log_dir = await _prepare_execution(
+        prompt_id, body, db
+    )
+    _check_preflight(body, rendered)
+
+    # Call LLM.
+    start_ms = time.monotonic()
+    try:
+        llm_response, routing = await _generate(
+            body, rendered, _priority(body, api_key), api_key
+        )
+    except BudgetExceeded as exc:
+        raise HTTPException(
+            status_code=429,
+            detail=str(exc),
+            headers={"Retry-After": str(math.ceil(exc.retry_after_s))},
+        )
+    except CircuitOpenError as exc:
+        raise HTTPException(
+            status_code=503,
+            detail=str(exc),
+            headers={"Retry-After": str(math.ceil(exc.retry_after_s))},
+        )
+    except ConcurrencyLimitExceeded as exc:
+        raise HTTPException(
+            status_code=503, detail=str(exc), headers={"Retry-After": "1"}
+        )
+    except QuotaExceeded as exc:
+        raise HTTPException(
+            status_code=429,
+            detail=str(exc),
+            headers={"Retry-After": str(math.ceil(exc.retry_after_s))},
+        )
+    except Exception as exc:
+        logger.error("LLM call failed: %s", exc)
+        raise HTTPException(
+            status_code=502, detail=f"LLM call failed: {exc}"
+        )
+    elapsed_ms = int((time.monotonic() - start_ms) * 1000)
+
+    return await _persist_execution(
+        db, prompt, body, llm_response, elapsed_ms, log_dir, routing
+    )
+
+
+@router.post(
+    "/{prompt_id}/execute:stream",
+    summary="Execute a prompt and stream tokens as they arrive (NDJSON)",
+)
+async def execute_prompt_stream(
+    prompt_id: str,
+    body: ExecutionRequest,
+    db: AsyncSession = Depends(get_db),
+    api_key: str = Depends(verify_api_key),
+) -> StreamingResponse:
+    """Render a prompt and stream the LLM's output to the caller.
+
+    Each NDJSON line is ``{"type": "delta", "text": ...}`` while tokens
+    arrive. When the stream ends the Execution row is persisted with
+    the final usage and a ``{"type": "done", "execution": {...}}`` line
+    is sent; a failure mid-stream sends ``{"type": "error", ...}``.
+    Validation errors are returned as regular HTTP errors before the
+    stream starts. A routing policy picks the model to stream from, but
+    there is no failover once the stream has started. The budget is
+    reserved before the response is returned and settled when the
+    stream ends; a background task releases it if the stream body
+    never runs.
+
+    Args:
+        prompt_id: UUID of the prompt to execute.
+        body: Execution request data with input variables.
+        db: Async database session.
+        api_key: Validated API key; selects the default priority.
+
+    Returns:
+        Streaming NDJSON response.
+
+    Raises:
+        HTTPException: Same pre-flight errors as ``execute_prompt``.
+    """
+    prompt, rendered, log_dir = await _prepare_execution(
+        prompt_id, body, db
+    )
+    _check_preflight(body, rendered)
+    provider, model = body.llm_provider, body.model_name
+    decision: Optional[RoutingDecision] = None
+    if body.routing is not None:
+        order = order_candidates(
+            _llm_client,
+            (provider, model),
+            _fallbacks(body),
+            body.routing.strategy,
+        )
+        provider, model = order[0]
+        decision = RoutingDecision(
+            strategy=body.routing.strategy,
+            requested=f"{body.llm_provider}/{body.model_name}",
+            order=[f"{p}/{m}" for p, m in order],
+            served_by=f"{provider}/{model}",
+        )
+
+    priority = _priority(body, api_key)
+    try:
+        reservation = _reserve_budget(
+            body.model_copy(
+                update={
+                    "llm_provider": provider,
+                    "model_name": model,
+                    "hedge": False,
+                }
+            ),
+            rendered,
+            api_key,
+        )
+    except BudgetExceeded as exc:
+        raise HTTPException(
+            status_code=429,
+            detail=str(exc),
+            headers={"Retry-After": str(math.ceil(exc.retry_after_s))},
+        )
+
+    settled = False
+
+    def _settle(llm_response: Optional[LLMResponse]) -> None:
+        nonlocal settled
+        if not settled:
+            settled = True
+            _settle_budget(reservation, llm_response)
+
+    async def _events() -> AsyncIterator[str]:
+        start_ms = time.monotonic()
+        llm_response = None
+        try:
+            async with llm_scheduler.slot(priority):
+                async for chunk in _llm_client.generate_stream(
+                    prompt=rendered,
+                    provider=provider,
+                    model=model,
+                    max_tokens=body.max_tokens,
+                    temperature=body.temperature,
+                ):
+                    if chunk.text:
+                        yield _ndjson(
+                            {"type": "delta", "text": chunk.text}
+                        )
+                    if chunk.response is not None:
+                        llm_response = chunk.response
+        except Exception as exc:
+            logger.error("LLM stream failed: %s", exc)
+            yield _ndjson(
+                {"type": "error", "detail": f"LLM call failed: {exc}"}
+            )
+            return
+        finally:
+            _settle(llm_response)
+        if llm_response is None:
+            yield _ndjson(
+                {"type": "error", "detail": "LLM stream ended early"}
+            )
+            return
+        elapsed_ms = int((time.monotonic() - start_ms) * 1000)
+
+        execution = await _persist_execution(
+            db,
+            prompt,
+            body,
+            llm_response,
+            elapsed_ms,
+            log_dir,
+            decision.to_dict() if decision is not None else None,
+        )
+        yield _ndjson(
+            {
+                "type": "done",
+                "execution": ExecutionResponse.model_validate(
+                    execution
+                ).model_dump(mode="json"),
+            }
+        )
+
+    return StreamingResponse(
+        _events(),
+        media_type="application/x-ndjson",
+        background=BackgroundTask(_settle, None),
+    )
+
+
+@router.post(
+    "/{prompt_id}/estimate",
+    response_model=EstimateResponse,
+    summary="Estimate an execution's tokens and cost without running it",
+)
+async def estimate_prompt(
+    prompt_id: str,
+    body: ExecutionRequest,
+    db: AsyncSession = Depends(get_db),
+    _api_key: str = Depends(verify_api_key),
+) -> EstimateResponse:
+    """Render a prompt and estimate its tokens and worst-case cost.
+
+    Tokens are counted offline, so no LLM call is made and nothing is
+    persisted or logged.
+
+    Args:
+        prompt_id: UUID of the prompt to estimate.
+        body: Execution request data with input variables.
+        db: Async database session.
+        _api_key: Validated API key.
+
+    Returns:
+        The estimate for the requested model.
+
+    Raises:
+        HTTPException: 404 if prompt not found, 400 if scope violation
+            or template error, 422 if required variables are missing.
+    """
+    prompt, compiled = await _load_template(
+        prompt_id, body.target_domain, db
+    )
+    defaults = prompt.parameters or {}
+    missing = missing_variables(compiled, body.input_data, defaults)
+    if missing:
+        raise HTTPException(
+            status_code=422,
+            detail=(
+                "Missing required template variables: "
+                + ", ".join(missing)
+            ),
+        )
+    try:
+        rendered = await render_executor.render(
+            compiled,
+            body.input_data,
+            defaults=defaults,
+            heavy=compiled.complexity.heavy,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    estimate = estimate_call(
+        rendered, body.llm_provider, body.model_name, body.max_tokens
+    )
+    return EstimateResponse(
+        llm_provider=estimate.provider,
+        model_name=estimate.model,
+        input_tokens=estimate.input_tokens,
+        max_output_tokens=estimate.max_output_tokens,
+        context_window=estimate.context_window,
+        fits_context=estimate.fits_context,
+        max_cost_usd=estimate.max_cost_usd,
+    )
+
+
+@router.post(
+    "/{prompt_id}/execute:compare",
+    response_model=CompareResponse,
+    summary="Execute a prompt against several models side by side",
+)
+async def execute_prompt_compare(
+    prompt_id: str,
+    body: CompareRequest,
+    db: AsyncSession = Depends(get_db),
+    api_key: str = Depends(verify_api_key),
+) -> dict[str, Any]:
+    """Render a prompt once and run it against every target model.
+
+    The calls run concurrently. Each successful call is persisted as
+    its own Execution, and all of them share the run's ``group_id``.
+    Failed calls are reported in their result instead of failing the
+    request. Each model's response and metrics logs go in its own
+    subdirectory of the run's log directory.
+
+    Args:
+        prompt_id: UUID of the prompt to execute.
+        body: Input variables, target models and shared options.
+        db: Async database session.
+        api_key: Validated API key; selects the default priority.
+
+    Returns:
+        The group id and one result per distinct target, in request
+        order.
+
+    Raises:
+        HTTPException: Same pre-flight errors as ``execute_prompt``
+            (the context and cost checks apply to every target, before
+            any call is made), and 502 if every model's call fails.
+    """
+    targets = list(
+        dict.fromkeys((t.llm_provider, t.model_name) for t in body.targets)
+    )
+    base = ExecutionRequest(**body.model_dump(exclude={"targets"}))
+    prompt, rendered, log_dir = await _prepare_execution(
+        prompt_id,
+        base,
+        db,
+        extra_log={"targets": [f"{p}/{m}" for p, m in targets]},
+    )
+    priority = _priority(base, api_key)
+    items = [
+        base.model_copy(update={"llm_provider": p, "model_name": m})
+        for p, m in targets
+    ]
+    for item in items:
+        _check_preflight(item, rendered)
+
+    async def run(item: ExecutionRequest) -> tuple[LLMResponse, int]:
+        start_ms = time.monotonic()
+        llm_response, _ = await _generate(
+            item, rendered, priority, api_key
+        )
+        return llm_response, int((time.monotonic() - start_ms) * 1000)
+
+    outcomes = await asyncio.gather(
+        *(run(item) for item in items), return_exceptions=True
+    )
+    if all(isinstance(outcome, BaseException) for outcome in outcomes):
+        detail = "; ".join(
+            f"{item.llm_provider}/{item.model_name}: {outcome}"
+            for item, outcome in zip(items, outcomes)
+        )
+        logger.error("All compared LLM calls failed: %s", detail)
+        raise HTTPException(
+            status_code=502, detail=f"LLM calls failed: {detail}"
+        )
+
+    group_id = str(uuid.uuid4())
+    results: list[dict[str, Any]] = []
+    for index, (item, outcome) in enumerate(zip(items, outcomes)):
+        result: dict[str, Any] = {
+            "llm_provider": item.llm_provider,
+            "model_name": item.model_name,
+        }
+        if isinstance(outcome, BaseException):
+            logger.error(
+                "LLM call to %s/%s failed: %s",
+                item.llm_provider,
+                item.model_name,
+                outcome,
+            )
+            result["error"] = f"LLM call failed: {outcome}"
+        else:
+            llm_response, elapsed_ms = outcome
+            target_dir = log_dir / f"{index:02d}_{item.llm_provider}"
+            target_dir.mkdir(exist_ok=True)
+            execution = await _persist_execution(
+                db,
+                prompt,
+                item,
+                llm_response,
+                elapsed_ms,
+                target_dir,
+                group_id=group_id,
+            )
+            result["execution"] = ExecutionResponse.model_validate(
+                execution
+            )
+        results.append(result)
+    return {"group_id": group_id, "results": results}
+
+
+@router.post(
+    "/{prompt_id}/execute:batch",
+    response_model=JobResponse,
+    status_code=202,
+    summary="Execute a prompt once per input set as a background job",
+)
+async def execute_prompt_batch(
+    prompt_id: str,
+    body: BatchExecutionRequest,
+    db: AsyncSession = Depends(get_db),
+    api_key: str = Depends(verify_api_key),
+) -> dict[str, Any]:
+    """Queue one execution per input set and return the job at once.
+
+    The prompt is fetched, scope-checked and compiled once, and every
+    input set is checked for missing variables before anything is
+    queued. Items then render and call the LLM on the job worker pool
+    (in the "batch" scheduling class unless the request says otherwise)
+    and their Execution rows are inserted in bulk; an item that fails
+    the context or cost check fails without a call. With
+    ``provider_batch`` every item is instead rendered and checked up
+    front and sent in one request to the provider's batch API, which
+    the job polls in the background. The job writes one log directory
+    with the request and, when it finishes, its totals. Poll or stream
+    the job with ``GET /jobs/{id}``.
+
+    Args:
+        prompt_id: UUID of the prompt to execute.
+        body: Input sets and the options shared by every execution.
+        db: Async database session.
+        api_key: Validated API key; selects the default priority.
+
+    Returns:
+        The queued job's progress.
+
+    Raises:
+        HTTPException: 404 if prompt not found, 400 if scope violation
+            or template error, or for a provider batch the provider has
+            no batch API or a routing policy is given, 422 if an input
+            set is missing required template variables, 413 or 422 if a
+            provider batch item fails the context or cost check, 429 if
+            the API key's budget cannot cover a provider batch.
+    """
+    prompt, compiled = await _load_template(
+        prompt_id, body.target_domain, db
+    )
+    defaults = prompt.parameters or {}
+    for index, input_data in enumerate(body.inputs):
+        missing = missing_variables(compiled, input_data, defaults)
+        if missing:
+            raise HTTPException(
+                status_code=422,
+                detail=(
+                    f"Input {index}: missing required template "
+                    "variables: " + ", ".join(missing)
+                ),
+            )
+    run = (
+        await _provider_batch(prompt, compiled, body, api_key)
+        if body.provider_batch
+        else None
+    )
+
+    options = body.model_dump(exclude={"inputs"})
+    priority = _priority(body, api_key)
+
+    async def process(
+        index: int, input_data: dict[str, Any]
+    ) -> tuple[JobItemResult, list[Row]]:
+        item = ExecutionRequest(**options, input_data=input_data)
+        rendered = await render_executor.render(
+            compiled,
+            input_data,
+            defaults=defaults,
+            heavy=compiled.complexity.heavy,
+        )
+        _check_preflight(item, rendered)
+        start_ms = time.monotonic()
+        llm_response, routing = await _generate(
+            item, rendered, priority, api_key
+        )
+        elapsed_ms = int((time.monotonic() - start_ms) * 1000)
+        execution_id, rows = _execution_rows(
+            prompt,
+            input_data,
+            llm_response,
+            elapsed_ms,
+            target_domain=body.target_domain,
+            routing=routing,
+        )
+        result = JobItemResult(
+            index=index, status="succeeded", execution_id=execution_id
+        )
+        return result, rows
+
+    log_dir = create_execution_log_dir()
+
+    async def on_complete(job: Job) -> None:
+        ids = [r.execution_id for r in job.results if r.execution_id]
+        tokens_used, cost_usd = 0, 0
+        size = job_queue.insert_batch
+        async with async_session_factory() as session:
+            for start in range(0, len(ids), size):
+                end = start + size
+                chunk_tokens, chunk_cost = (
+                    await session.execute(
+                        select(
+                            func.coalesce(func.sum(Execution.tokens_used), 0),
+                            func.coalesce(func.sum(Execution.cost_usd), 0),
+                        ).where(Execution.id.in_(ids[start:end]))
+                    )
+                ).one()
+                tokens_used += chunk_tokens
+                cost_usd += chunk_cost
+        totals = {
+            "job_id": job.id,
+            "items": job.total,
+            "succeeded": job.succeeded,
+            "failed": job.failed,
+            "tokens_used": int(tokens_used),
+            "cost_usd": float(cost_usd),
+        }
+        write_metrics_log(log_dir, totals)
+        logger.info(
+            "Job %s completed: %d succeeded, %d failed, $%.6f",
+            job.id,
+            job.succeeded,
+            job.failed,
+            totals["cost_usd"],
+        )
+
+    if run is not None:
+        job = job_queue.submit_task(
+            prompt.id, len(body.inputs), run, _write_rows, on_complete
+        )
+    else:
+        job = job_queue.submit(
+            prompt.id, body.inputs, process, _write_rows, on_complete
+        )
+    write_request_log(
+        log_dir,
+        {
+            "prompt_id": str(prompt_id),
+            "job_id": job.id,
+            "inputs": len(body.inputs),
+            "llm_provider": body.llm_provider,
+            "model_name": body.model_name,
+            "target_domain": body.target_domain,
+            "priority": priority,
+            "routing": options["routing"],
+            "provider_batch": body.provider_batch,
+        },
+    )
+    return job.summary()
+
+
+async def _provider_batch(
+    prompt: Prompt,
+    compiled: CompiledTemplate,
+    body: BatchExecutionRequest,
+    api_key: str,
+) -> TaskRunner:
+    """Prepare a batch job that runs on the provider's batch API.
+
+    Every input is rendered now, and the whole batch's worst-case cost
+    at the batch discount is reserved from the API key's budget and
+    settled with the actual cost when the batch ends. The batch's
+    tokens do not count against the key's per-minute token limit.
+
+    Args:
+        prompt: The prompt to execute.
+        compiled: The prompt's compiled template.
+        body: Input sets and the options shared by every execution.
+        api_key: Validated API key whose budget the batch spends.
+
+    Returns:
+        Coroutine function that submits the batch, waits for it to end
+        and returns each item's result and rows.
+
+    Raises:
+        HTTPException: 400 if the provider has no batch API, a routing
+            policy is given or a template fails to render, 413 or 422
+            if an item fails the context or cost check, 429 if the API
+            key's budget cannot cover the batch.
+    """
+    try:
+        adapter = get_provider(body.llm_provider)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if BATCHING not in adapter.capabilities:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Provider {body.llm_provider} has no batch API",
+        )
+    if body.routing is not None:
+        raise HTTPException(
+            status_code=400,
+            detail="Routing policies do not apply to provider batches",
+        )
+    defaults = prompt.parameters or {}
+    try:
+        rendered = await asyncio.gather(
+            *(
+                render_executor.render(
+                    compiled,
+                    input_data,
+                    defaults=defaults,
+                    heavy=compiled.complexity.heavy,
+                )
+                for input_data in body.inputs
+            )
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    for index, text in enumerate(rendered):
+        try:
+            _check_preflight(body, text)
+        except HTTPException as exc:
+            exc.detail = f"Input {index}: {exc.detail}"
+            raise
+    worst_case = sum(
+        budget_cost(
+            body.llm_provider,
+            body.model_name,
+            estimate_call(
+                text, body.llm_provider, body.model_name, body.max_tokens
+            ).input_tokens,
+            body.max_tokens,
+            batch=True,
+        )
+        for text in rendered
+    )
+    try:
+        reservation = budget_tracker.reserve(
+            api_key, worst_case, 0, per_minute=False
+        )
+    except BudgetExceeded as exc:
+        raise HTTPException(
+            status_code=429,
+            detail=str(exc),
+            headers={"Retry-After": str(math.ceil(exc.retry_after_s))},
+        )
+
+    async def run() -> list[tuple[JobItemResult, list[Row]]]:
+        start_ms = time.monotonic()
+        results: list[LLMBatchResult] = []
+        try:
+            results = await _llm_client.generate_batch(
+                rendered,
+                provider=body.llm_provider,
+                model=body.model_name,
+                max_tokens=body.max_tokens,
+                temperature=body.temperature,
+            )
+        finally:
+            responses = [r.response for r in results if r.response]
+            budget_tracker.settle(
+                reservation,
+                sum(_budget_charge(response) for response in responses),
+                sum(response.total_tokens for response in responses),
+            )
+        elapsed_ms = int((time.monotonic() - start_ms) * 1000)
+        outcomes: list[tuple[JobItemResult, list[Row]]] = []
+        for index, (input_data, result) in enumerate(
+            zip(body.inputs, results)
+        ):
+            if result.response is None:
+                outcomes.append(
+                    (
+                        JobItemResult(
+                            index=index, status="failed", error=result.error
+                        ),
+                        [],
+                    )
+                )
+                continue
+            execution_id, rows = _execution_rows(
+                prompt,
+                input_data,
+                result.response,
+                elapsed_ms,
+                target_domain=body.target_domain,
+            )
+            outcomes.append(
+                (
+                    JobItemResult(
+                        index=index,
+                        status="succeeded",
+                        execution_id=execution_id,
+                    ),
+                    rows,
+                )
+            )
+        return outcomes
+
+    return run
+
+
+@router.post(
+    "/{prompt_id}/experiments",
+    response_model=ExperimentResponse,
+    status_code=201,
+    summary="Run a dataset against several versions of a prompt",
+)
+async def run_prompt_experiment(
+    prompt_id: str,
+    body: ExperimentRequest,
+    db: AsyncSession = Depends(get_db),
+    api_key: str = Depends(verify_api_key),
+) -> Experiment:
+    """Execute every input against each version and compare them.
+
+    Versions are looked up by the prompt's name. Calls run concurrently
+    (``EXPERIMENT_CONCURRENCY`` at a time), interleaving the versions
+    for each input so they see the same provider conditions. Each
+    result is folded into running per-version statistics as it
+    arrives, and its Execution row is bulk-inserted in batches, so
+    outputs are not held in memory. A call that fails the context or
+    cost check counts as a failure and is not sent. The summary, with
+    deltas against the first (baseline) version, is stored for
+    ``/analytics``.
+
+    Args:
+        prompt_id: UUID of any version of the prompt.
+        body: Dataset, versions and the options shared by every call.
+        db: Async database session.
+        api_key: Validated API key; selects the default priority.
+
+    Returns:
+        The persisted Experiment with its summary.
+
+    Raises:
+        HTTPException: 404 if the prompt or a requested version is not
+            found, 400 if scope violation or template error, 422 if
+            fewer than two versions exist or an input is missing
+            required variables for some version.
+    """
+    prompt, _ = await _load_template(prompt_id, body.target_domain, db)
+    result = await db.execute(
+        select(Prompt).where(Prompt.name == prompt.name)
+    )
+    by_version = {p.version: p for p in result.scalars().all()}
+    versions = list(dict.fromkeys(body.versions or sorted(by_version)[-2:]))
+    if len(versions) < 2:
+        raise HTTPException(
+            status_code=422,
+            detail="An experiment needs at least two prompt versions",
+        )
+    unknown = [str(v) for v in versions if v not in by_version]
+    if unknown:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Prompt versions not found: {', '.join(unknown)}",
+        )
+    compiled = {v: _compiled(by_version[v]) for v in versions}
+    for version in versions:
+        defaults = by_version[version].parameters or {}
+        for index, input_data in enumerate(body.inputs):
+            missing = missing_variables(
+                compiled[version], input_data, defaults
+            )
+            if missing:
+                raise HTTPException(
+                    status_code=422,
+                    detail=(
+                        f"Version {version}, input {index}: missing "
+                        "required template variables: "
+                        + ", ".join(missing)
+                    ),
+                )
+
+    experiment = Experiment(
+        prompt_name=prompt.name,
+        versions=versions,
+        baseline_version=versions[0],
+        input_count=len(body.inputs),
+    )
+    db.add(experiment)
+    await db.flush()
+    log_dir = create_execution_log_dir()
+    write_request_log(
+        log_dir,
+        {
+            "experiment_id": experiment.id,
+            "prompt_name": prompt.name,
+            "versions": versions,
+            "inputs": len(body.inputs),
+            "llm_provider": body.llm_provider,
+            "model_name": body.model_name,
+        },
+    )
+
+    options = body.model_dump(exclude={"inputs", "versions"})
+    priority = _priority(body, api_key)
+    stats = {v: VersionStats(v, by_version[v].id) for v in versions}
+    work = (
+        (index, version)
+        for index in range(len(body.inputs))
+        for version in versions
+    )
+    pending: list[Row] = []
+    insert_lock = asyncio.Lock()
+
+    async def flush() -> None:
+        async with insert_lock:
+            rows = pending[:]
+            pending.clear()
+            await _insert_rows(db, rows)
+
+    async def worker() -> None:
+        # Workers share one generator, so each call runs exactly once.
+        for index, version in work:
+            version_prompt = by_version[version]
+            input_data = body.inputs[index]
+            try:
+                rendered = await render_executor.render(
+                    compiled[version],
+                    input_data,
+                    defaults=version_prompt.parameters or {},
+                    heavy=compiled[version].complexity.heavy,
+                )
+                item = ExecutionRequest(**options, input_data=input_data)
+                _check_preflight(item, rendered)
+                start_ms = time.monotonic()
+                llm_response, routing = await _generate(
+                    item, rendered, priority, api_key
+                )
+            except Exception as exc:
+                logger.warning(
+                    "Experiment %s version %d input %d failed: %s",
+                    experiment.id,
+                    version,
+                    index,
+                    exc,
+                )
+                stats[version].failures += 1
+                continue
+            elapsed_ms = int((time.monotonic() - start_ms) * 1000)
+            stats[version].add(
+                elapsed_ms,
+                llm_response.total_tokens,
+                float(llm_response.cost_usd),
+            )
+            _, rows = _execution_rows(
+                version_prompt,
+                input_data,
+                llm_response,
+                elapsed_ms,
+                target_domain=body.target_domain,
+                routing=routing,
+                experiment_id=experiment.id,
+            )
+            pending.extend(rows)
+            if len(pending) >= _EXPERIMENT_INSERT_BATCH:
+                await flush()
+
+    calls = len(body.inputs) * len(versions)
+    await asyncio.gather(
+        *(worker() for _ in range(min(_EXPERIMENT_CONCURRENCY, calls)))
+    )
+    await flush()
+
+    baseline = stats[versions[0]]
+    experiment.results = [
+        s.to_dict(None if s is baseline else baseline)
+        for s in stats.values()
+    ]
+    await db.flush()
+    await db.refresh(experiment)
+    write_metrics_log(log_dir, {"results": experiment.results})
+    logger.info(
+        "Experiment %s completed: %s v%s over %d inputs",
+        experiment.id,
+        prompt.name,
+        ", v".join(map(str, versions)),
+        len(body.inputs),
+    )
+    return experiment
+
+
+def _execution_rows(
+    prompt: Prompt,
+    input_data: dict[str, Any],
+    llm_response: LLMResponse,
+    elapsed_ms: int,
+    target_domain: Optional[str] = None,
+    **columns: Any,
+) -> tuple[str, list[Row]]:
+    """Build the rows that record one execution for a bulk insert.
+
+    Security-category prompts also get an audit log row, as in
+    ``_persist_execution``.
+
+    Args:
+        prompt: The executed prompt.
+        input_data: Template variable values used.
+        llm_response: Final LLM response with usage and cost.
+        elapsed_ms: LLM call latency in milliseconds.
+        target_domain: Target domain for the audit log entry.
+        **columns: Additional Execution column values.
+
+    Returns:
+        Tuple of the new execution id and its (ORM model, column
+        values) rows.
+    """
+    execution_id = str(uuid.uuid4())
+    rows: list[Row] = [
+        (
+            Execution,
+            {
+                "id": execution_id,
+                "prompt_id": prompt.id,
+                "input_data": input_data,
+                "output_text": llm_response.text,
+                "tokens_used": llm_response.total_tokens,
+                "cache_read_tokens": llm_response.cache_read_tokens,
+                "cache_write_tokens": llm_response.cache_write_tokens,
+                "cost_usd": llm_response.cost_usd,
+                "execution_time_ms": elapsed_ms,
+                "llm_provider": llm_response.provider,
+                "model_name": llm_response.model,
+                **columns,
+            },
+        )
+    ]
+    if prompt.category and prompt.category.lower() == "security":
+        rows.append(
+            (
+                AuditLog,
+                {
+                    "execution_id": execution_id,
+                    "action": "prompt_execution",
+                    "target": target_domain or "N/A",
+                    "result_summary": llm_response.text[:500],
+                    "risk_level": "medium",
+                },
+            )
+        )
+    return execution_id, rows
+
+
+async def _insert_rows(db: AsyncSession, rows: list[Row]) -> None:
+    """Bulk-insert rows, executions before the audit logs citing them.
+
+    Args:
+        db: Async database session.
+        rows: (ORM model, column values) pairs.
+    """
+    for model in (Execution, AuditLog):
+        values = [v for row_model, v in rows if row_model is model]
+        if values:
+            await db.execute(insert(model), values)
+
+
+async def _write_rows(rows: list[Row]) -> None:
+    """Bulk-insert a batch job's rows in their own transaction.
+
+    Args:
+        rows: (ORM model, column values) pairs.
+    """
+    async with async_session_factory() as session:
+        await _insert_rows(session, rows)
+        await session.commit()
+
+
+def _priority(body: ExecutionOptions, api_key: str) -> str:
+    """Resolve the scheduling class for a request.
+
+    The request's ``priority`` wins, but it cannot rank above the class
+    configured for its API key; without either, "interactive" is used.
+
+    Args:
+        body: Execution request data.
+        api_key: Validated API key.
+
+    Returns:
+        One of PRIORITIES.
+    """
+    ceiling = get_api_key_priority(api_key)
+    if ceiling not in PRIORITIES:
+        ceiling = None
+    priority = body.priority or ceiling or PRIORITIES[0]
+    if ceiling and PRIORITIES.index(priority) < PRIORITIES.index(ceiling):
+        priority = ceiling
+    return priority
+
+
+async def _generate(
+    body: ExecutionRequest, rendered: str, priority: str, api_key: str
+) -> tuple[LLMResponse, Optional[dict[str, Any]]]:
+    """Call the LLM, applying the request's routing policy if any.
+
+    The call's worst-case cost and tokens are first reserved against
+    the API key's budget and settled with the actual usage afterwards.
+    It then waits for a scheduler slot in its priority class.
+
+    Args:
+        body: Execution request data.
+        rendered: The rendered prompt text.
+        priority: Scheduling class.
+        api_key: Validated API key whose budget the call spends.
+
+    Returns:
+        Tuple of the response and the routing decision (None for a
+        request without a routing policy).
+
+    Raises:
+        BudgetExceeded: If the call could take the key over budget.
+    """
+    options: dict[str, Any] = {
+        "max_tokens": body.max_tokens,
+        "temperature": body.temperature,
+        "use_cache": body.use_cache,
+        "hedge": body.hedge,
+        "hedge_target": (
+            (body.hedge_target.llm_provider, body.hedge_target.model_name)
+            if body.hedge_target is not None
+            else None
+        ),
+    }
+    reservation = _reserve_budget(body, rendered, api_key)
+    llm_response: Optional[LLMResponse] = None
+    try:
+        async with llm_scheduler.slot(priority):
+            if body.routing is None:
+                llm_response = await _llm_client.generate(
+                    prompt=rendered,
+                    provider=body.llm_provider,
+                    model=body.model_name,
+                    **options,
+                )
+                return llm_response, None
+            llm_response, decision = await generate_routed(
+                _llm_client,
+                rendered,
+                (body.llm_provider, body.model_name),
+                _fallbacks(body),
+                body.routing.strategy,
+                **options,
+            )
+        return llm_response, decision.to_dict()
+    finally:
+        _settle_budget(reservation, llm_response)
+
+
+def _reserve_budget(
+    body: ExecutionOptions, rendered: str, api_key: str
+) -> BudgetReservation:
+    """Reserve a call's worst-case cost and tokens from its key's budget.
+
+    With a routing policy the reserved cost is that of the most
+    expensive candidate. With hedging, the hedge target's worst case
+    is reserved as well, since a cancelled hedge loser is still billed.
+    Models without a listed price are reserved at their provider's
+    highest listed rates (see ``budget_cost``).
+
+    Args:
+        body: Execution options naming the model and ``max_tokens``.
+        rendered: The rendered prompt text.
+        api_key: Validated API key.
+
+    Returns:
+        The reservation to settle once the call ends.
+
+    Raises:
+        BudgetExceeded: If the call could take the key over budget.
+    """
+    estimate = estimate_call(
+        rendered, body.llm_provider, body.model_name, body.max_tokens
+    )
+    targets = [(body.llm_provider, body.model_name)]
+    if body.routing is not None:
+        targets = order_candidates(
+            _llm_client, targets[0], _fallbacks(body), body.routing.strategy
+        )
+    cost = max(
+        budget_cost(provider, model, estimate.input_tokens, body.max_tokens)
+        for provider, model in targets
+    )
+    tokens = estimate.input_tokens + estimate.max_output_tokens
+    if body.hedge:
+        hedge_provider, hedge_model = body.llm_provider, body.model_name
+        if body.hedge_target is not None:
+            hedge_provider = body.hedge_target.llm_provider
+            hedge_model = body.hedge_target.model_name
+        cost += budget_cost(
+            hedge_provider, hedge_model, estimate.input_tokens, body.max_tokens
+        )
+        tokens *= 2
+    return budget_tracker.reserve(api_key, cost, tokens)
+
+
+def _settle_budget(
+    reservation: BudgetReservation, llm_response: Optional[LLMResponse]
+) -> None:
+    """Settle a budget reservation with a call's actual usage.
+
+    Args:
+        reservation: Reservation from ``_reserve_budget``.
+        llm_response: The call's response, or None if it failed.
+    """
+    if llm_response is None:
+        budget_tracker.settle(reservation, 0.0, 0)
+    else:
+        budget_tracker.settle(
+            reservation,
+            _budget_charge(llm_response),
+            llm_response.total_tokens + llm_response.hedge_tokens,
+        )
+
+
+def _budget_charge(llm_response: LLMResponse) -> float:
+    """Cost of a response to charge against its API key's budget.
+
+    Responses from models without a listed price report a cost of 0,
+    so they are charged at the conservative ``budget_cost`` instead.
+    A hedged call is also charged for its cancelled losing request.
+    """
+    if (
+        llm_response.cached
+        or llm_response.coalesced
+        or is_priced(llm_response.provider, llm_response.model)
+    ):
+        cost = llm_response.cost_usd
+    else:
+        cost = budget_cost(
+            llm_response.provider,
+            llm_response.model,
+            llm_response.total_tokens - llm_response.output_tokens,
+            llm_response.output_tokens,
+            batch=llm_response.batched,
+        )
+    return cost + llm_response.hedge_cost_usd
+
+
+def _check_preflight(body: ExecutionOptions, rendered: str) -> None:
+    """Reject an execution that cannot fit or would cost too much.
+
+    Args:
+        body: Execution options naming the model and ``max_tokens``.
+        rendered: The rendered prompt text.
+
+    Models without a listed price are held to the cap at the same
+    fallback rates their budget is charged at (see ``budget_cost``).
+
+    Raises:
+        HTTPException: 413 if the estimated prompt plus ``max_tokens``
+            overflow the model's context window, 422 if the worst-case
+            cost exceeds the request's or the server's cost cap.
+    """
+    estimate = estimate_call(
+        rendered, body.llm_provider, body.model_name, body.max_tokens
+    )
+    if not estimate.fits_context:
+        raise HTTPException(
+            status_code=413,
+            detail=(
+                f"Prompt needs about {estimate.input_tokens} tokens plus "
+                f"max_tokens {estimate.max_output_tokens}, over the "
+                f"{estimate.context_window}-token context window of "
+                f"{estimate.provider}/{estimate.model}"
+            ),
+        )
+    cap = body.max_cost_usd or _EXECUTION_MAX_COST_USD
+    if not cap:
+        return
+    max_cost = estimate.max_cost_usd
+    if not is_priced(body.llm_provider, body.model_name):
+        max_cost = budget_cost(
+            body.llm_provider,
+            body.model_name,
+            estimate.input_tokens,
+            estimate.max_output_tokens,
+        )
+    if max_cost > cap:
+        raise HTTPException(
+            status_code=422,
+            detail=(
+                f"Worst-case cost ${max_cost:.4f} exceeds "
+                f"the ${cap:.4f} cap"
+            ),
+        )
+
+
+def _fallbacks(body: ExecutionRequest) -> list[tuple[str, str]]:
+    """Return the routing policy's fallbacks as (provider, model)."""
+    if body.routing is None:
+        return []
+    return [
+        (target.llm_provider, target.model_name)
+        for target in body.routing.fallbacks
+    ]
+
+
+def _ndjson(data: dict[str, Any]) -> str:
+    """Encode one NDJSON line.
+
+    Args:
+        data: JSON-serializable dictionary.
+
+    Returns:
+        The JSON text followed by a newline.
+    """
+    return json.dumps(data) + "\n"
+
+
+async def _load_template(
+    prompt_id: str,
+    target_domain: Optional[str],
+    db: AsyncSession,
+) -> tuple[Prompt, CompiledTemplate]:
+    """Fetch a prompt, check the target scope and compile its template.
+
+    Args:
+        prompt_id: UUID of the prompt to execute.
+        target_domain: Optional target domain for security prompts.
+        db: Async database session.
+
+    Returns:
+        Tuple of the prompt and its compiled template.
+
     Raises:
         HTTPException: 404 if prompt not found, 400 if scope violation
             or template error.
@@ -72,16 +1356,81 @@ async def execute_prompt(
         raise HTTPException(status_code=404, detail="Prompt not found")
 
     # Scope validation for security prompts.
-    if body.target_domain:
-        if not is_target_authorized(body.target_domain):
+    if target_domain:
+        if not is_target_authorized(target_domain):
             raise HTTPException(
                 status_code=400,
                 detail=(
-                    f"Target domain '{body.target_domain}' is not in "
+                    f"Target domain '{target_domain}' is not in "
                     "AUTHORIZED_TARGETS"
                 ),
             )
 
+    # Compile before any logging, rendering or LLM spend.
+    return prompt, _compiled(prompt)
+
+
+def _compiled(prompt: Prompt) -> CompiledTemplate:
+    """Return a prompt's compiled template from the registry.
+
+    Args:
+        prompt: The prompt to execute.
+
+    Returns:
+        The compiled template.
+
+    Raises:
+        HTTPException: 400 if the template fails validation or exceeds
+            the complexity limits.
+    """
+    try:
+        compiled = template_registry.get(prompt.id, prompt.template)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    complexity_errors = check_complexity(compiled.complexity)
+    if complexity_errors:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Template too complex: {'; '.join(complexity_errors)}",
+        )
+    return compiled
+
+
+async def _prepare_execution(
+    prompt_id: str,
+    body: ExecutionRequest,
+    db: AsyncSession,
+    extra_log: Optional[dict[str, Any]] = None,
+) -> tuple[Prompt, str, Path]:
+    """Run the pre-flight checks and render the prompt.
+
+    Args:
+        prompt_id: UUID of the prompt to execute.
+        body: Execution request data with input variables.
+        db: Async database session.
+        extra_log: Additional fields for the request log.
+
+    Returns:
+        Tuple of the prompt, the rendered text and the log directory.
+
+    Raises:
+        HTTPException: 404 if prompt not found, 400 if scope violation
+            or template error, 422 if required variables are missing.
+    """
+    prompt, compiled = await _load_template(
+        prompt_id, body.target_domain, db
+    )
+    defaults = prompt.parameters or {}
+    missing = missing_variables(compiled, body.input_data, defaults)
+    if missing:
+        raise HTTPException(
+            status_code=422,
+            detail=(
+                "Missing required template variables: "
+                + ", ".join(missing)
+            ),
+        )
+
     # Create log directory.
     log_dir = create_execution_log_dir()
     write_request_log(
@@ -92,35 +1441,57 @@ async def execute_prompt(
             "llm_provider": body.llm_provider,
             "model_name": body.model_name,
             "target_domain": body.target_domain,
+            "routing": (
+                body.routing.model_dump()
+                if body.routing is not None
+                else None
+            ),
+            **(extra_log or {}),
         },
     )
 
     # Render template.
     try:
-        defaults = prompt.parameters or {}
-        rendered = render_template(
-            prompt.template, body.input_data, defaults=defaults
+        rendered = await render_executor.render(
+            compiled,
+            body.input_data,
+            defaults=defaults,
+            heavy=compiled.complexity.heavy,
         )
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc))
 
-    write_rendered_prompt(log_dir, rendered)
+    write_rendered_prompt(log_dir, strip_cache_break(rendered))
+    return prompt, rendered, log_dir
 
-    # Call LLM.
-    start_ms = time.monotonic()
-    try:
-        llm_response = await _llm_client.generate(
-            prompt=rendered,
-            provider=body.llm_provider,
-            model=body.model_name,
-        )
-    except Exception as exc:
-        logger.error("LLM call failed: %s", exc)
-        raise HTTPException(
-            status_code=502, detail=f"LLM call failed: {exc}"
-        )
-    elapsed_ms = int((time.monotonic() - start_ms) * 1000)
 
+async def _persist_execution(
+    db: AsyncSession,
+    prompt: Prompt,
+    body: ExecutionRequest,
+    llm_response: LLMResponse,
+    elapsed_ms: int,
+    log_dir: Path,
+    routing: Optional[dict[str, Any]] = None,
+    group_id: Optional[str] = None,
+) -> Execution:
+    """Log the LLM response and persist the Execution row.
+
+    Security-category prompts also get an audit log entry.
+
+    Args:
+        db: Async database session.
+        prompt: The executed prompt.
+        body: Execution request data.
+        llm_response: Final LLM response with usage and cost.
+        elapsed_ms: LLM call latency in milliseconds.
+        log_dir: Per-execution log directory.
+        routing: Routing decision for routed executions.
+        group_id: Comparison run the execution belongs to.
+
+    Returns:
+        The persisted Execution record.
+    """
     write_response_log(
         log_dir,
         {
@@ -129,19 +1500,24 @@ async def execute_prompt(
             "cost_usd": llm_response.cost_usd,
             "provider": llm_response.provider,
             "model": llm_response.model,
+            "routing": routing,
         },
     )
 
     # Persist execution.
     execution = Execution(
-        prompt_id=prompt_id,
+        prompt_id=prompt.id,
         input_data=body.input_data,
         output_text=llm_response.text,
         tokens_used=llm_response.total_tokens,
+        cache_read_tokens=llm_response.cache_read_tokens,
+        cache_write_tokens=llm_response.cache_write_tokens,
         cost_usd=llm_response.cost_usd,
         execution_time_ms=elapsed_ms,
         llm_provider=llm_response.provider,
         model_name=llm_response.model,
+        routing=routing,
+        group_id=group_id,
     )
     db.add(execution)
     await db.flush()
@@ -163,8 +1539,13 @@ async def execute_prompt(
         {
             "execution_id": str(execution.id),
             "tokens_used": llm_response.total_tokens,
+            "cache_read_tokens": llm_response.cache_read_tokens,
+            "cache_write_tokens": llm_response.cache_write_tokens,
             "cost_usd": float(llm_response.cost_usd),
             "execution_time_ms": elapsed_ms,
+            "cache_hit": llm_response.cached,
+            "coalesced": llm_response.coalesced,
+            "hedged": llm_response.hedged,
         },
     )
 
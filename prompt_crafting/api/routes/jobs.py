@@ -0,0 +1,128 @@
+"""Endpoints for following asynchronous batch jobs.
+
+Jobs are created by ``POST /prompts/{id}/execute:batch`` and kept in
+process memory, so they are only visible on the instance that ran them
+and are lost on restart; their executions are persisted as usual. The
+job keeps only each item's status, execution id and error; outputs,
+token counts and costs are read from the persisted executions.
+"""
+
+import json
+from collections.abc import AsyncIterator
+from typing import Any, Union
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from prompt_crafting.api.models.job import JobResponse
+from prompt_crafting.api.services.job_queue import (
+    Job,
+    JobItemResult,
+    job_queue,
+)
+from prompt_crafting.db.models import Execution
+from prompt_crafting.db.session import async_session_factory, get_db
+from prompt_crafting.utils.security import verify_api_key
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+@router.get(
+    "/{job_id}",
+    response_model=JobResponse,
+    summary="Batch job progress and results",
+)
+async def get_job(
+    job_id: str,
+    results: bool = Query(True, description="Include item results"),
+    stream: bool = Query(False, description="Stream results as NDJSON"),
+    db: AsyncSession = Depends(get_db),
+    _api_key: str = Depends(verify_api_key),
+) -> Union[dict[str, Any], StreamingResponse]:
+    """Report a job's progress, or stream its results as they land.
+
+    With ``stream=true`` each NDJSON line is ``{"type": "result",
+    "result": {...}}`` for every item result (those already persisted
+    first), followed by ``{"type": "done", "job": {...}}`` once the job
+    has finished.
+
+    Args:
+        job_id: Job identifier returned by the batch endpoint.
+        results: Whether to include item results in the response.
+        stream: Whether to stream results until the job finishes.
+        db: Async database session.
+        _api_key: Validated API key.
+
+    Returns:
+        The job's progress, or a streaming NDJSON response.
+
+    Raises:
+        HTTPException: 404 if the job is unknown or has been evicted.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if stream:
+        return StreamingResponse(
+            _events(job), media_type="application/x-ndjson"
+        )
+    data = job.summary()
+    if results:
+        data["results"] = await _with_outputs(db, job.results)
+    return data
+
+
+async def _with_outputs(
+    db: AsyncSession, results: list[JobItemResult]
+) -> list[dict[str, Any]]:
+    """Add each result's output, tokens and cost from its execution.
+
+    Args:
+        db: Async database session.
+        results: Item results to complete.
+
+    Returns:
+        Result dictionaries, in the given order.
+    """
+    ids = [result.execution_id for result in results if result.execution_id]
+    executions = {}
+    size = job_queue.insert_batch
+    for start in range(0, len(ids), size):
+        end = start + size
+        rows = await db.scalars(
+            select(Execution).where(Execution.id.in_(ids[start:end]))
+        )
+        executions.update((execution.id, execution) for execution in rows)
+    data = []
+    for result in results:
+        item = result.to_dict()
+        execution = executions.get(result.execution_id)
+        if execution is not None:
+            item["output_text"] = execution.output_text
+            item["tokens_used"] = execution.tokens_used
+            item["cost_usd"] = (
+                float(execution.cost_usd)
+                if execution.cost_usd is not None
+                else None
+            )
+        data.append(item)
+    return data
+
+
+async def _events(job: Job) -> AsyncIterator[str]:
+    """Encode a job's results and final progress as NDJSON lines.
+
+    Each persisted batch of results is completed in its own short
+    session, so a long-running stream does not hold a connection.
+    """
+    async for batch in job.follow():
+        async with async_session_factory() as session:
+            items = await _with_outputs(session, batch)
+        for item in items:
+            yield json.dumps({"type": "result", "result": item})
+            yield "\n"
+    summary = JobResponse.model_validate(job.summary())
+    yield json.dumps({"type": "done", "job": summary.model_dump(mode="json")})
+    yield "\n"
@@ -1,20 +1,38 @@
 """CRUD endpoints for prompt templates.
 
 Supports creating, reading, updating (with version auto-increment),
-deleting, and filtering prompts by category.
+deleting, and filtering prompts by category. Templates are validated,
+compiled and checked against static complexity limits when a version
+is written, so errors surface on write.
+Also provides batch rendering of a prompt against many inputs.
 """
 
+import json
+from collections.abc import AsyncIterator
+from dataclasses import asdict
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from prompt_crafting.api.models.prompt import (
+    BatchRenderRequest,
     PromptCreate,
     PromptResponse,
     PromptUpdate,
 )
+from prompt_crafting.api.services.prompt_engine import (
+    CompiledTemplate,
+    compile_template,
+    strip_cache_break,
+)
+from prompt_crafting.api.services.render_executor import render_executor
+from prompt_crafting.api.services.template_analysis import check_complexity
+from prompt_crafting.api.services.template_registry import (
+    template_registry,
+)
 from prompt_crafting.db.models import Prompt
 from prompt_crafting.db.session import get_db
 from prompt_crafting.utils.security import verify_api_key
@@ -42,17 +60,24 @@ async def create_prompt(
 
     Returns:
         The newly created Prompt record.
+
+    Raises:
+        HTTPException: 400 if the template fails validation or exceeds
+            the complexity limits.
     """
+    compiled = _compile_or_400(body.template)
     prompt = Prompt(
         name=body.name,
         template=body.template,
         version=1,
         category=body.category,
         parameters=body.parameters,
+        complexity=asdict(compiled.complexity),
     )
     db.add(prompt)
     await db.flush()
     await db.refresh(prompt)
+    template_registry.register(prompt.id, prompt.template)
     return prompt
 
 
@@ -141,7 +166,9 @@ async def update_prompt(
         The newly created Prompt version.
 
     Raises:
-        HTTPException: 404 if the original prompt not found.
+        HTTPException: 404 if the original prompt not found, 400 if
+            the new template fails validation or exceeds the
+            complexity limits.
     """
     result = await db.execute(
         select(Prompt).where(Prompt.id == prompt_id)
@@ -158,9 +185,12 @@ async def update_prompt(
     )
     max_version = max_version_result.scalar() or 0
 
+    template = body.template or existing.template
+    compiled = _compile_or_400(template)
+
     new_prompt = Prompt(
         name=existing.name,
-        template=body.template or existing.template,
+        template=template,
         version=max_version + 1,
         category=(
             body.category
@@ -172,10 +202,12 @@ async def update_prompt(
             if body.parameters is not None
             else existing.parameters
         ),
+        complexity=asdict(compiled.complexity),
     )
     db.add(new_prompt)
     await db.flush()
     await db.refresh(new_prompt)
+    template_registry.register(new_prompt.id, new_prompt.template)
     return new_prompt
 
 
@@ -206,3 +238,90 @@ async def delete_prompt(
     if prompt is None:
         raise HTTPException(status_code=404, detail="Prompt not found")
     await db.delete(prompt)
+    template_registry.discard(prompt_id)
+
+
+@router.post(
+    "/{prompt_id}/render:batch",
+    summary="Render a prompt against many input sets (NDJSON)",
+)
+async def render_prompt_batch(
+    prompt_id: str,
+    body: BatchRenderRequest,
+    db: AsyncSession = Depends(get_db),
+    _api_key: str = Depends(verify_api_key),
+) -> StreamingResponse:
+    """Render a prompt once per input set and stream the results.
+
+    The template is compiled and validated once. Each output line is a
+    JSON object with the input ``index`` and either ``rendered`` or
+    ``error``. Rendering runs on the shared render executor under the
+    same CPU and output budget as single renders, in its process pool
+    for heavy templates or when ``use_process_pool`` is set; renders
+    still queued when the client disconnects are cancelled.
+
+    Args:
+        prompt_id: The prompt's unique identifier.
+        body: Input sets and execution options.
+        db: Async database session.
+        _api_key: Validated API key.
+
+    Returns:
+        Streaming NDJSON response.
+
+    Raises:
+        HTTPException: 404 if prompt not found, 400 if the template
+            fails validation or exceeds the complexity limits.
+    """
+    result = await db.execute(
+        select(Prompt).where(Prompt.id == prompt_id)
+    )
+    prompt = result.scalar_one_or_none()
+    if prompt is None:
+        raise HTTPException(status_code=404, detail="Prompt not found")
+    compiled = _compile_or_400(prompt.template)
+
+    rendered = render_executor.render_many(
+        compiled,
+        body.inputs,
+        defaults=prompt.parameters or {},
+        heavy=body.use_process_pool or compiled.complexity.heavy,
+    )
+
+    async def _ndjson() -> AsyncIterator[str]:
+        index = 0
+        async for item in rendered:
+            if isinstance(item, Exception):
+                line = {"index": index, "error": str(item)}
+            else:
+                line = {"index": index, "rendered": strip_cache_break(item)}
+            yield json.dumps(line) + "\n"
+            index += 1
+
+    return StreamingResponse(_ndjson(), media_type="application/x-ndjson")
+
+
+def _compile_or_400(template: str) -> CompiledTemplate:
+    """Validate, compile and complexity-check a template.
+
+    Args:
+        template: Raw Jinja2 template string.
+
+    Returns:
+        The compiled template.
+
+    Raises:
+        HTTPException: 400 if the template fails validation or exceeds
+            the complexity limits.
+    """
+    try:
+        compiled = compile_template(template)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    errors = check_complexity(compiled.complexity)
+    if errors:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Template too complex: {'; '.join(errors)}",
+        )
+    return compiled
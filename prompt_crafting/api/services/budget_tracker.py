@@ -0,0 +1,435 @@
+"""Per-API-key spend budgets.
+
+Budgets are configured per API key, with ``"*"`` as the default for
+keys without their own entry, as USD per UTC day and month and tokens
+per minute, e.g.::
+
+    API_KEY_BUDGETS='{"etl-key": {"usd_per_day": 20, "usd_per_month": 300,
+                                  "tokens_per_minute": 50000},
+                      "*": {"usd_per_month": 100}}'
+
+Before a call its worst-case cost and tokens are reserved against the
+key's counters; after the response the reservation is settled with
+the actual cost and usage. Both steps are synchronous, so they are
+atomic on the event loop. Counters live in memory and are flushed as
+deltas to the ``api_key_spend`` table every ``BUDGET_FLUSH_INTERVAL_S``
+seconds, so checks never wait for the database; on startup the current
+day's and month's totals are loaded back. Keys are stored as a SHA-256
+digest, never in clear.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from prompt_crafting.api.services.rate_limiter import TokenBucket
+from prompt_crafting.db.models import ApiKeySpend
+from prompt_crafting.utils.logging import logger
+
+_API_KEY_BUDGETS: dict[str, dict[str, float]] = json.loads(
+    os.getenv("API_KEY_BUDGETS", "") or "{}"
+)
+_BUDGET_FLUSH_INTERVAL_S: float = float(
+    os.getenv("BUDGET_FLUSH_INTERVAL_S", "10")
+)
+
+DAY = "day"
+MONTH = "month"
+
+# USD limit name per budget period.
+_USD_LIMITS: dict[str, str] = {DAY: "usd_per_day", MONTH: "usd_per_month"}
+
+
+def key_id(api_key: str) -> str:
+    """Return the digest under which an API key's spend is stored.
+
+    Args:
+        api_key: The API key.
+
+    Returns:
+        Hex SHA-256 digest of the key.
+    """
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+
+def _period_start(period: str, now: datetime) -> str:
+    """Label the UTC day ("2026-10-17") or month ("2026-10")."""
+    return now.strftime("%Y-%m-%d" if period == DAY else "%Y-%m")
+
+
+def _seconds_to_next(period: str, now: datetime) -> float:
+    """Seconds until the current UTC day or month ends."""
+    if period == DAY:
+        end = (now + timedelta(days=1)).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+    else:
+        first = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        end = (first + timedelta(days=32)).replace(day=1)
+    return (end - now).total_seconds()
+
+
+class BudgetExceeded(Exception):
+    """Raised when a call would exceed its API key's budget.
+
+    Attributes:
+        limit: Name of the exceeded limit (e.g. "usd_per_day").
+        retry_after_s: Seconds until the limit resets or refills.
+    """
+
+    def __init__(self, limit: str, detail: str, retry_after_s: float) -> None:
+        self.limit = limit
+        self.retry_after_s = retry_after_s
+        super().__init__(
+            f"API key budget exceeded: {limit} {detail}; "
+            f"retry in {retry_after_s:.0f}s"
+        )
+
+
+@dataclass
+class _Spend:
+    """Spend of one key in one period.
+
+    Attributes:
+        usd: Settled cost, persisted or not.
+        tokens: Settled tokens, persisted or not.
+        reserved_usd: Worst-case cost of calls in flight.
+        unflushed_usd: Cost not yet written to the database.
+        unflushed_tokens: Tokens not yet written to the database.
+    """
+
+    usd: float = 0.0
+    tokens: int = 0
+    reserved_usd: float = 0.0
+    unflushed_usd: float = 0.0
+    unflushed_tokens: int = 0
+
+
+# Counter key: (key digest, period, period start).
+_SpendKey = tuple[str, str, str]
+
+
+@dataclass
+class BudgetReservation:
+    """Budget taken for one call, to be settled afterwards.
+
+    Attributes:
+        key_id: Digest of the API key.
+        cost_usd: Worst-case cost reserved in each period.
+        tokens: Tokens reserved from the per-minute bucket.
+        periods: Counter keys the cost was reserved in.
+        bucket: Per-minute token bucket, if the key has one.
+    """
+
+    key_id: str
+    cost_usd: float
+    tokens: int
+    periods: list[_SpendKey] = field(default_factory=list)
+    bucket: Optional[TokenBucket] = field(default=None, repr=False)
+
+
+class BudgetTracker:
+    """In-memory spend counters per API key, flushed to the database.
+
+    Args:
+        budgets: Mapping of API key (or ``"*"``) to limits
+            ``usd_per_day``, ``usd_per_month`` and
+            ``tokens_per_minute`` (any may be omitted).
+        flush_interval_s: Seconds between background flushes.
+        clock: Monotonic time source for the token buckets.
+        now: Wall-clock source for budget periods (UTC).
+    """
+
+    def __init__(
+        self,
+        budgets: Optional[dict[str, dict[str, float]]] = None,
+        flush_interval_s: float = _BUDGET_FLUSH_INTERVAL_S,
+        clock: Callable[[], float] = time.monotonic,
+        now: Callable[[], datetime] = lambda: datetime.now(timezone.utc),
+    ) -> None:
+        self._budgets = {
+            (key if key == "*" else key_id(key)): limits
+            for key, limits in (
+                _API_KEY_BUDGETS if budgets is None else budgets
+            ).items()
+        }
+        self._flush_interval_s = flush_interval_s
+        self._clock = clock
+        self._now = now
+        self._spend: dict[_SpendKey, _Spend] = {}
+        self._buckets: dict[str, TokenBucket] = {}
+        self._task: Optional[asyncio.Task[None]] = None
+        self.rejected = 0
+
+    def _limits(self, digest: str) -> dict[str, float]:
+        """A key's limits, falling back to the ``"*"`` entry."""
+        return self._budgets.get(digest, self._budgets.get("*", {}))
+
+    def _counter(self, digest: str, period: str, now: datetime) -> _SpendKey:
+        """Return the key of a current-period counter, creating it."""
+        spend_key = (digest, period, _period_start(period, now))
+        self._spend.setdefault(spend_key, _Spend())
+        return spend_key
+
+    def reserve(
+        self,
+        api_key: str,
+        cost_usd: float,
+        tokens: int,
+        per_minute: bool = True,
+    ) -> BudgetReservation:
+        """Reserve a call's worst-case cost and tokens.
+
+        Args:
+            api_key: The caller's API key.
+            cost_usd: Worst-case cost of the call.
+            tokens: Worst-case tokens (input plus ``max_tokens``).
+            per_minute: Whether the tokens count against the key's
+                ``tokens_per_minute`` limit (False for provider batches,
+                which do not use interactive capacity).
+
+        Returns:
+            The reservation to pass to ``settle``.
+
+        Raises:
+            BudgetExceeded: If the call could take the key over a
+                limit.
+        """
+        digest = key_id(api_key)
+        limits = self._limits(digest)
+        now = self._now()
+        periods = [self._counter(digest, p, now) for p in (DAY, MONTH)]
+
+        for spend_key in periods:
+            period = spend_key[1]
+            limit = limits.get(_USD_LIMITS[period])
+            spend = self._spend[spend_key]
+            committed = spend.usd + spend.reserved_usd
+            if limit and committed + cost_usd > limit:
+                self.rejected += 1
+                raise BudgetExceeded(
+                    _USD_LIMITS[period],
+                    f"${committed:.4f} of ${limit:.2f} committed, "
+                    f"call may cost ${cost_usd:.4f}",
+                    _seconds_to_next(period, now),
+                )
+
+        bucket = None
+        tokens_per_minute = limits.get("tokens_per_minute")
+        if tokens_per_minute and per_minute:
+            bucket = self._buckets.get(digest)
+            if bucket is None or bucket.capacity != tokens_per_minute:
+                bucket = TokenBucket(tokens_per_minute, self._clock)
+                self._buckets[digest] = bucket
+            wait = bucket.wait_time(tokens)
+            if wait > 0:
+                self.rejected += 1
+                raise BudgetExceeded(
+                    "tokens_per_minute",
+                    f"{tokens_per_minute:.0f}, call may use {tokens}",
+                    wait,
+                )
+            bucket.take(tokens)
+
+        for spend_key in periods:
+            self._spend[spend_key].reserved_usd += cost_usd
+        return BudgetReservation(
+            key_id=digest,
+            cost_usd=cost_usd,
+            tokens=tokens,
+            periods=periods,
+            bucket=bucket,
+        )
+
+    def settle(
+        self,
+        reservation: BudgetReservation,
+        cost_usd: float,
+        tokens: int,
+    ) -> None:
+        """Replace a reservation with the call's actual cost and usage.
+
+        Args:
+            reservation: Reservation returned by ``reserve``.
+            cost_usd: Actual cost, or 0 if the call failed.
+            tokens: Actual tokens, or 0 if the call failed.
+        """
+        for spend_key in reservation.periods:
+            spend = self._spend.setdefault(spend_key, _Spend())
+            spend.reserved_usd = max(
+                0.0, spend.reserved_usd - reservation.cost_usd
+            )
+            spend.usd += cost_usd
+            spend.tokens += tokens
+            spend.unflushed_usd += cost_usd
+            spend.unflushed_tokens += tokens
+        if reservation.bucket is not None:
+            reservation.bucket.settle(reservation.tokens, tokens)
+
+    async def load(self, session: AsyncSession) -> int:
+        """Load the current day's and month's totals from the database.
+
+        Args:
+            session: Database session.
+
+        Returns:
+            Number of counters loaded.
+        """
+        now = self._now()
+        result = await session.execute(
+            select(ApiKeySpend).where(
+                (
+                    (ApiKeySpend.period == DAY)
+                    & (ApiKeySpend.period_start == _period_start(DAY, now))
+                )
+                | (
+                    (ApiKeySpend.period == MONTH)
+                    & (ApiKeySpend.period_start == _period_start(MONTH, now))
+                )
+            )
+        )
+        rows = result.scalars().all()
+        for row in rows:
+            spend = self._spend.setdefault(
+                (row.key_id, row.period, row.period_start), _Spend()
+            )
+            spend.usd += float(row.cost_usd or 0)
+            spend.tokens += row.tokens or 0
+        return len(rows)
+
+    async def flush(self, session: AsyncSession) -> int:
+        """Add unflushed spend to the database in one transaction.
+
+        Counters of past periods are dropped once written. If the
+        write fails the deltas are kept for the next flush.
+
+        Args:
+            session: Database session.
+
+        Returns:
+            Number of counters written.
+        """
+        pending = {
+            spend_key: (spend.unflushed_usd, spend.unflushed_tokens)
+            for spend_key, spend in self._spend.items()
+            if spend.unflushed_usd or spend.unflushed_tokens
+        }
+        for spend_key in pending:
+            self._spend[spend_key].unflushed_usd = 0.0
+            self._spend[spend_key].unflushed_tokens = 0
+        try:
+            for (digest, period, start), (usd, tokens) in pending.items():
+                result = await session.execute(
+                    update(ApiKeySpend)
+                    .where(
+                        ApiKeySpend.key_id == digest,
+                        ApiKeySpend.period == period,
+                        ApiKeySpend.period_start == start,
+                    )
+                    .values(
+                        cost_usd=ApiKeySpend.cost_usd + usd,
+                        tokens=ApiKeySpend.tokens + tokens,
+                        updated_at=datetime.now(timezone.utc),
+                    )
+                )
+                if not result.rowcount:
+                    session.add(
+                        ApiKeySpend(
+                            key_id=digest,
+                            period=period,
+                            period_start=start,
+                            cost_usd=usd,
+                            tokens=tokens,
+                        )
+                    )
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            for spend_key, (usd, tokens) in pending.items():
+                spend = self._spend.setdefault(spend_key, _Spend())
+                spend.unflushed_usd += usd
+                spend.unflushed_tokens += tokens
+            raise
+        self._evict()
+        return len(pending)
+
+    def _evict(self) -> None:
+        """Drop flushed, idle counters of past periods."""
+        now = self._now()
+        for spend_key in list(self._spend):
+            _, period, start = spend_key
+            spend = self._spend[spend_key]
+            if (
+                start != _period_start(period, now)
+                and not spend.reserved_usd
+                and not spend.unflushed_usd
+                and not spend.unflushed_tokens
+            ):
+                del self._spend[spend_key]
+
+    def start(self, session_factory: async_sessionmaker) -> None:
+        """Start flushing in the background every flush interval.
+
+        Args:
+            session_factory: Factory for the sessions flushes use.
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop(session_factory))
+
+    async def _flush_loop(self, session_factory: async_sessionmaker) -> None:
+        """Flush periodically until cancelled."""
+        while True:
+            await asyncio.sleep(self._flush_interval_s)
+            try:
+                async with session_factory() as session:
+                    await self.flush(session)
+            except Exception as exc:
+                logger.error("Budget flush failed: %s", exc)
+
+    async def shutdown(self, session_factory: async_sessionmaker) -> None:
+        """Stop the background flush and write what is left.
+
+        Args:
+            session_factory: Factory for the final flush's session.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            async with session_factory() as session:
+                await self.flush(session)
+        except Exception as exc:
+            logger.error("Final budget flush failed: %s", exc)
+
+    def stats(self) -> dict[str, Any]:
+        """Return rejections and current-period spend per budgeted key.
+
+        Returns:
+            Dictionary with the rejection count and, per key digest
+            prefix, spend against each configured limit.
+        """
+        now = self._now()
+        keys: dict[str, dict[str, Any]] = {}
+        for (digest, period, start), spend in sorted(self._spend.items()):
+            limit = self._limits(digest).get(_USD_LIMITS[period])
+            if not limit or start != _period_start(period, now):
+                continue
+            keys.setdefault(digest[:12], {})[_USD_LIMITS[period]] = {
+                "spent": round(spend.usd, 6),
+                "reserved": round(spend.reserved_usd, 6),
+                "limit": limit,
+            }
+        return {"rejected": self.rejected, "keys": keys}
+
+
+budget_tracker = BudgetTracker()
@@ -0,0 +1,283 @@
+"""Adaptive per-provider concurrency limits for LLM calls.
+
+Each provider gets an AIMD limiter: the number of concurrent requests
+grows by about one per limit's worth of healthy responses, and is cut
+multiplicatively when the provider signals overload: a 429, a 5xx or a
+timeout. Latency alone never cuts the limit, since LLM latency grows
+with output length and a stream holds its slot until it ends; the
+average latency of buffered calls only spaces out consecutive cuts.
+Requests over the limit wait in a FIFO queue, bounded in size and
+waiting time.
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from typing import Any, Optional
+
+import httpx
+
+_LIMIT_INITIAL: int = int(os.getenv("LLM_LIMIT_INITIAL", "10"))
+_LIMIT_MIN: int = int(os.getenv("LLM_LIMIT_MIN", "1"))
+_LIMIT_MAX: int = int(os.getenv("LLM_LIMIT_MAX", "100"))
+_LIMIT_BACKOFF: float = float(os.getenv("LLM_LIMIT_BACKOFF", "0.7"))
+_LIMIT_QUEUE_SIZE: int = int(os.getenv("LLM_LIMIT_QUEUE_SIZE", "100"))
+_LIMIT_QUEUE_TIMEOUT_S: float = float(
+    os.getenv("LLM_LIMIT_QUEUE_TIMEOUT_S", "10")
+)
+
+# Weight of each sample in the long-run latency average.
+_LATENCY_EWMA_ALPHA = 0.05
+
+
+class ConcurrencyLimitExceeded(Exception):
+    """Raised when a request cannot get a concurrency slot in time.
+
+    Attributes:
+        provider: LLM provider name.
+        reason: "queue_full" or "queue_timeout".
+    """
+
+    def __init__(self, provider: str, reason: str) -> None:
+        self.provider = provider
+        self.reason = reason
+        super().__init__(
+            f"Too many concurrent requests to {provider} ({reason})"
+        )
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit with a bounded FIFO wait queue.
+
+    Args:
+        name: Provider name, used in errors.
+        initial: Starting limit.
+        min_limit: Lowest limit.
+        max_limit: Highest limit.
+        backoff: Factor applied to the limit on overload.
+        queue_size: Maximum number of waiting requests.
+        queue_timeout_s: Maximum seconds a request waits for a slot.
+        clock: Monotonic time source (injectable for tests).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial: int = _LIMIT_INITIAL,
+        min_limit: int = _LIMIT_MIN,
+        max_limit: int = _LIMIT_MAX,
+        backoff: float = _LIMIT_BACKOFF,
+        queue_size: int = _LIMIT_QUEUE_SIZE,
+        queue_timeout_s: float = _LIMIT_QUEUE_TIMEOUT_S,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self._min_limit = max(1, min_limit)
+        self._max_limit = max(self._min_limit, max_limit)
+        self._limit = float(
+            min(max(initial, self._min_limit), self._max_limit)
+        )
+        self._backoff = backoff
+        self._queue_size = queue_size
+        self._queue_timeout_s = queue_timeout_s
+        self._clock = clock
+        self._waiters: deque[asyncio.Future[None]] = deque()
+        self._in_flight = 0
+        self._avg_latency_ms: Optional[float] = None
+        self._last_decrease = float("-inf")
+        self.rejected = 0
+        self.timeouts = 0
+
+    @property
+    def limit(self) -> int:
+        """Current concurrency limit."""
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        """Requests currently holding a slot."""
+        return self._in_flight
+
+    @property
+    def queued(self) -> int:
+        """Requests waiting for a slot."""
+        return sum(not waiter.done() for waiter in self._waiters)
+
+    async def acquire(self) -> None:
+        """Take a slot, waiting in the queue if the limit is reached.
+
+        Raises:
+            ConcurrencyLimitExceeded: If the queue is full or the wait
+                exceeds the queue timeout.
+        """
+        if self._in_flight < self.limit and not self.queued:
+            self._in_flight += 1
+            return
+        if self.queued >= self._queue_size:
+            self.rejected += 1
+            raise ConcurrencyLimitExceeded(self.name, "queue_full")
+
+        waiter: asyncio.Future[None] = (
+            asyncio.get_running_loop().create_future()
+        )
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(
+                asyncio.shield(waiter), self._queue_timeout_s
+            )
+        except BaseException as exc:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was granted as the wait ended; hand it on.
+                self._release_slot()
+            else:
+                waiter.cancel()
+            if isinstance(exc, asyncio.TimeoutError):
+                self.timeouts += 1
+                raise ConcurrencyLimitExceeded(
+                    self.name, "queue_timeout"
+                ) from None
+            raise
+
+    def release(
+        self,
+        completed: bool = False,
+        overloaded: bool = False,
+        latency_ms: Optional[float] = None,
+    ) -> None:
+        """Return a slot and adapt the limit to the call's outcome.
+
+        Calls that neither completed nor signalled overload (e.g. a 4xx
+        or a cancelled request) only free the slot.
+
+        Args:
+            completed: Whether the call succeeded; grows the limit
+                while it is fully used.
+            overloaded: Whether the provider answered 429 or 5xx or the
+                call timed out; cuts the limit.
+            latency_ms: Round trip of a completed buffered call, added
+                to the average that spaces out cuts.
+        """
+        if overloaded:
+            self._decrease()
+        elif completed and self._in_flight >= self.limit:
+            # Only grow when the limit is actually being used.
+            self._limit = min(self._max_limit, self._limit + 1 / self._limit)
+        if latency_ms is not None:
+            average = self._avg_latency_ms
+            self._avg_latency_ms = (
+                latency_ms
+                if average is None
+                else average + _LATENCY_EWMA_ALPHA * (latency_ms - average)
+            )
+        self._release_slot()
+
+    def _decrease(self) -> None:
+        """Cut the limit, at most once per average round trip."""
+        now = self._clock()
+        cooldown_s = (self._avg_latency_ms or 0.0) / 1000
+        if now - self._last_decrease < cooldown_s:
+            return
+        self._last_decrease = now
+        self._limit = max(self._min_limit, self._limit * self._backoff)
+
+    def _release_slot(self) -> None:
+        """Free a slot and grant freed slots to waiters in order."""
+        self._in_flight -= 1
+        while self._waiters and self._in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            waiter.set_result(None)
+            self._in_flight += 1
+
+    def stats(self) -> dict[str, Any]:
+        """Return the limiter's current state and counters.
+
+        Returns:
+            Dictionary with limit, in-flight and queued counts, average
+            latency, and rejection/timeout counters.
+        """
+        return {
+            "limit": self.limit,
+            "in_flight": self._in_flight,
+            "queued": self.queued,
+            "avg_latency_ms": (
+                round(self._avg_latency_ms, 1)
+                if self._avg_latency_ms is not None
+                else None
+            ),
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+        }
+
+
+class ConcurrencyLimiters:
+    """Adaptive limiters keyed by provider.
+
+    Args:
+        limiter_options: Keyword arguments for each AdaptiveLimiter.
+    """
+
+    def __init__(self, **limiter_options: Any) -> None:
+        self._limiter_options = limiter_options
+        self._limiters: dict[str, AdaptiveLimiter] = {}
+
+    def get(self, provider: str) -> AdaptiveLimiter:
+        """Return the limiter for a provider, creating it on first use."""
+        limiter = self._limiters.get(provider)
+        if limiter is None:
+            limiter = self._limiters[provider] = AdaptiveLimiter(
+                provider, **self._limiter_options
+            )
+        return limiter
+
+    @asynccontextmanager
+    async def slot(
+        self, provider: str, stream: bool = False
+    ) -> AsyncIterator[None]:
+        """Hold a provider slot for the duration of one request.
+
+        A successful request can grow the limit; a 429, 5xx or timeout
+        shrinks it, and requests that fail otherwise or are abandoned
+        just free the slot.
+
+        Args:
+            provider: LLM provider name.
+            stream: Whether the slot is held for a whole stream, whose
+                duration is not recorded as latency.
+
+        Yields:
+            Control to the request.
+
+        Raises:
+            ConcurrencyLimitExceeded: If no slot is available in time.
+        """
+        limiter = self.get(provider)
+        await limiter.acquire()
+        start = time.monotonic()
+        try:
+            yield
+        except httpx.HTTPStatusError as exc:
+            status = exc.response.status_code
+            limiter.release(overloaded=status == 429 or status >= 500)
+            raise
+        except httpx.TimeoutException:
+            limiter.release(overloaded=True)
+            raise
+        except BaseException:
+            limiter.release()
+            raise
+        limiter.release(
+            completed=True,
+            latency_ms=(None if stream else (time.monotonic() - start) * 1000),
+        )
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """Return statistics for every provider's limiter."""
+        return {
+            provider: limiter.stats()
+            for provider, limiter in sorted(self._limiters.items())
+        }
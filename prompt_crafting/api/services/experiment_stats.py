@@ -0,0 +1,122 @@
+"""Streaming aggregation of prompt-version experiment results.
+
+Each execution's latency, tokens and cost are folded into running
+statistics (Welford's algorithm) as soon as it completes, so an
+experiment's summary needs constant memory however large its dataset.
+"""
+
+import math
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+_METRICS = ("latency_ms", "tokens", "cost_usd")
+
+
+class RunningStats:
+    """Count, mean, variance, minimum and maximum of a stream of values.
+
+    Uses Welford's online algorithm, which is numerically stable and
+    keeps no samples.
+    """
+
+    __slots__ = ("count", "mean", "_m2", "min", "max")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def add(self, value: float) -> None:
+        """Fold one value into the statistics."""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    @property
+    def stddev(self) -> float:
+        """Sample standard deviation (0 for fewer than two values)."""
+        if self.count < 2:
+            return 0.0
+        return math.sqrt(self._m2 / (self.count - 1))
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return the statistics as a JSON-serializable dictionary."""
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "stddev": self.stddev,
+            "min": self.min,
+            "max": self.max,
+        }
+
+
+@dataclass
+class VersionStats:
+    """Running results for one prompt version in an experiment.
+
+    Attributes:
+        version: Prompt version number.
+        prompt_id: Id of that version's prompt row.
+        failures: Executions that failed.
+        metrics: Running statistics per metric name.
+    """
+
+    version: int
+    prompt_id: str
+    failures: int = 0
+    metrics: dict[str, RunningStats] = field(
+        default_factory=lambda: {name: RunningStats() for name in _METRICS}
+    )
+
+    def add(self, latency_ms: float, tokens: int, cost_usd: float) -> None:
+        """Fold one successful execution into the statistics."""
+        self.metrics["latency_ms"].add(latency_ms)
+        self.metrics["tokens"].add(tokens)
+        self.metrics["cost_usd"].add(cost_usd)
+
+    def to_dict(
+        self, baseline: Optional["VersionStats"] = None
+    ) -> dict[str, Any]:
+        """Summarize the version, with deltas against a baseline.
+
+        Args:
+            baseline: Version to compare mean values against; deltas
+                are omitted when None.
+
+        Returns:
+            Dictionary with per-metric statistics and, given a
+            baseline, the absolute and relative difference of means.
+        """
+        summary: dict[str, Any] = {
+            "version": self.version,
+            "prompt_id": self.prompt_id,
+            "executions": self.metrics["latency_ms"].count,
+            "failures": self.failures,
+            **{name: stats.to_dict() for name, stats in self.metrics.items()},
+        }
+        if baseline is not None:
+            summary["delta"] = {
+                name: _delta(stats, baseline.metrics[name])
+                for name, stats in self.metrics.items()
+            }
+        return summary
+
+
+def _delta(stats: RunningStats, baseline: RunningStats) -> dict[str, Any]:
+    """Difference of two means, absolute and relative to the baseline."""
+    if not stats.count or not baseline.count:
+        return {"mean": None, "pct": None}
+    difference = stats.mean - baseline.mean
+    return {
+        "mean": difference,
+        "pct": (
+            round(difference / baseline.mean * 100, 2)
+            if baseline.mean
+            else None
+        ),
+    }
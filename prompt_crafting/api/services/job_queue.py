@@ -0,0 +1,432 @@
+"""In-process queue for asynchronous batch jobs.
+
+A job is a list of items processed by a shared pool of asyncio workers
+(``JOB_WORKERS`` at a time across all jobs). Each item's outcome is
+buffered and persisted in bulk, every ``JOB_INSERT_BATCH`` items or
+``JOB_FLUSH_INTERVAL_S`` seconds (checked by a timer, so a stalled job
+still flushes), whichever comes first; results become visible to
+readers only once they are persisted. Only each item's status,
+execution id and error are kept in memory; outputs are read back from
+the persisted executions. A job can instead run
+as one background task that produces every item's outcome at once
+(e.g. a provider batch). Jobs live in memory, so they do not survive a
+restart; the most recent ``JOB_RETENTION`` finished jobs are kept for
+polling.
+"""
+
+import asyncio
+import os
+import uuid
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from prompt_crafting.utils.logging import logger
+
+_JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "8"))
+_JOB_INSERT_BATCH: int = int(os.getenv("JOB_INSERT_BATCH", "50"))
+_JOB_FLUSH_INTERVAL_S: float = float(os.getenv("JOB_FLUSH_INTERVAL_S", "1"))
+_JOB_RETENTION: int = int(os.getenv("JOB_RETENTION", "1000"))
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+
+
+@dataclass
+class JobItemResult:
+    """Outcome of one item of a job.
+
+    The LLM output is not kept here; it is persisted with the
+    execution.
+
+    Attributes:
+        index: Position of the item in the submitted list.
+        status: "succeeded" or "failed".
+        execution_id: Id of the persisted Execution row, if any.
+        error: Failure description for failed items.
+    """
+
+    index: int
+    status: str
+    execution_id: Optional[str] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return the result as a JSON-serializable dictionary."""
+        return asdict(self)
+
+
+# Processes one item; returns its result and the rows to persist.
+ItemProcessor = Callable[[int, Any], Awaitable[tuple[JobItemResult, list]]]
+# Persists a batch of rows in one transaction.
+RowWriter = Callable[[list], Awaitable[None]]
+# Produces every item's result and rows, in item order.
+TaskRunner = Callable[[], Awaitable[list[tuple[JobItemResult, list]]]]
+
+
+@dataclass
+class Job:
+    """A batch of items and its progress.
+
+    Attributes:
+        id: Unique job identifier.
+        prompt_id: Prompt the job executes.
+        total: Number of items.
+        status: "queued", "running" or "completed".
+        results: Persisted item results, in completion order.
+        created_at: Submission time.
+        finished_at: Completion time.
+    """
+
+    id: str
+    prompt_id: str
+    total: int
+    write: RowWriter = field(repr=False)
+    process: Optional[ItemProcessor] = field(default=None, repr=False)
+    on_complete: Optional[Callable[["Job"], Awaitable[None]]] = field(
+        default=None, repr=False
+    )
+    status: str = QUEUED
+    results: list[JobItemResult] = field(default_factory=list)
+    created_at: datetime = field(
+        default_factory=lambda: datetime.now(timezone.utc)
+    )
+    finished_at: Optional[datetime] = None
+    _pending: list[tuple[JobItemResult, list]] = field(
+        default_factory=list, repr=False
+    )
+    _processed: int = field(default=0, repr=False)
+    _flush_lock: asyncio.Lock = field(default_factory=asyncio.Lock, repr=False)
+    _changed: asyncio.Condition = field(
+        default_factory=asyncio.Condition, repr=False
+    )
+
+    @property
+    def succeeded(self) -> int:
+        """Persisted items that succeeded."""
+        return sum(r.status == "succeeded" for r in self.results)
+
+    @property
+    def failed(self) -> int:
+        """Persisted items that failed."""
+        return sum(r.status == "failed" for r in self.results)
+
+    @property
+    def done(self) -> bool:
+        """Whether every item has been processed and persisted."""
+        return self.status == COMPLETED
+
+    def summary(self) -> dict[str, Any]:
+        """Return the job's progress without item results."""
+        return {
+            "id": self.id,
+            "prompt_id": self.prompt_id,
+            "status": self.status,
+            "total": self.total,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+    async def follow(self) -> AsyncIterator[list[JobItemResult]]:
+        """Yield item results as they are persisted, until the job ends.
+
+        Results persisted before the call are yielded first.
+
+        Yields:
+            Batches of newly persisted results; each result once.
+        """
+        sent = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(
+                    lambda: len(self.results) > sent or self.done
+                )
+                batch = self.results[sent:]
+                finished = self.done
+            if batch:
+                yield batch
+            sent += len(batch)
+            if finished and sent == len(self.results):
+                return
+
+
+class JobQueue:
+    """Bounded asyncio worker pool running queued job items.
+
+    Args:
+        workers: Items processed concurrently across all jobs.
+        insert_batch: Results buffered before a bulk write.
+        flush_interval_s: Longest a result waits to be written.
+        retention: Finished jobs kept in memory for polling.
+    """
+
+    def __init__(
+        self,
+        workers: int = _JOB_WORKERS,
+        insert_batch: int = _JOB_INSERT_BATCH,
+        flush_interval_s: float = _JOB_FLUSH_INTERVAL_S,
+        retention: int = _JOB_RETENTION,
+    ) -> None:
+        self._workers = max(1, workers)
+        self._insert_batch = max(1, insert_batch)
+        self._flush_interval_s = flush_interval_s
+        self._retention = retention
+        self._queue: Optional[asyncio.Queue[tuple[Job, int, Any]]] = None
+        self._tasks: list[asyncio.Task[None]] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._runs: set[asyncio.Task[None]] = set()
+
+    @property
+    def insert_batch(self) -> int:
+        """Rows per bulk write; also a bound for per-job id lookups."""
+        return self._insert_batch
+
+    def submit(
+        self,
+        prompt_id: str,
+        items: list[Any],
+        process: ItemProcessor,
+        write: RowWriter,
+        on_complete: Optional[Callable[[Job], Awaitable[None]]] = None,
+    ) -> Job:
+        """Queue a job's items for the worker pool.
+
+        Args:
+            prompt_id: Prompt the job executes.
+            items: Items to process, in order.
+            process: Coroutine function run once per item with its
+                index and value.
+            write: Coroutine function persisting a list of rows.
+            on_complete: Optional coroutine function run once when the
+                job finishes.
+
+        Returns:
+            The queued job.
+
+        Raises:
+            ValueError: If ``items`` is empty.
+        """
+        if not items:
+            raise ValueError("A job needs at least one item")
+        job = Job(
+            id=str(uuid.uuid4()),
+            prompt_id=prompt_id,
+            total=len(items),
+            process=process,
+            write=write,
+            on_complete=on_complete,
+        )
+        self._jobs[job.id] = job
+        self._evict()
+        queue = self._ensure_workers()
+        for index, item in enumerate(items):
+            queue.put_nowait((job, index, item))
+        return job
+
+    def submit_task(
+        self,
+        prompt_id: str,
+        total: int,
+        run: TaskRunner,
+        write: RowWriter,
+        on_complete: Optional[Callable[[Job], Awaitable[None]]] = None,
+    ) -> Job:
+        """Run a job as one background task instead of per item.
+
+        The task does not use the worker pool. Its outcomes are written
+        in batches of ``insert_batch`` when it returns; if it raises,
+        every item is reported as failed.
+
+        Args:
+            prompt_id: Prompt the job executes.
+            total: Number of items.
+            run: Coroutine function returning one outcome per item.
+            write: Coroutine function persisting a list of rows.
+            on_complete: Optional coroutine function run once when the
+                job finishes.
+
+        Returns:
+            The running job.
+
+        Raises:
+            ValueError: If ``total`` is not positive.
+        """
+        if total < 1:
+            raise ValueError("A job needs at least one item")
+        job = Job(
+            id=str(uuid.uuid4()),
+            prompt_id=prompt_id,
+            total=total,
+            write=write,
+            on_complete=on_complete,
+        )
+        self._jobs[job.id] = job
+        self._evict()
+        task = asyncio.create_task(self._run_task(job, run))
+        self._runs.add(task)
+        task.add_done_callback(self._runs.discard)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Return a job by id, or None if unknown or evicted."""
+        return self._jobs.get(job_id)
+
+    def _evict(self) -> None:
+        """Drop the oldest finished jobs beyond the retention limit."""
+        finished = [job for job in self._jobs.values() if job.done]
+        for job in finished[: max(0, len(finished) - self._retention)]:
+            del self._jobs[job.id]
+
+    def _ensure_workers(self) -> asyncio.Queue[tuple[Job, int, Any]]:
+        """Start the worker pool and flush timer on first use."""
+        loop = asyncio.get_running_loop()
+        if self._queue is None or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._tasks = [
+                asyncio.create_task(self._worker())
+                for _ in range(self._workers)
+            ]
+            self._tasks.append(asyncio.create_task(self._flush_timer()))
+        return self._queue
+
+    async def _flush_timer(self) -> None:
+        """Flush every job's buffered results each flush interval."""
+        while True:
+            await asyncio.sleep(self._flush_interval_s)
+            for job in list(self._jobs.values()):
+                if job._pending:
+                    try:
+                        await self._flush(job)
+                    except Exception as exc:
+                        logger.error("Job %s flush failed: %s", job.id, exc)
+
+    async def _worker(self) -> None:
+        """Process queued items until cancelled."""
+        assert self._queue is not None
+        while True:
+            job, index, item = await self._queue.get()
+            try:
+                await self._run_item(job, index, item)
+            except Exception as exc:
+                logger.error("Job %s item %d crashed: %s", job.id, index, exc)
+            finally:
+                self._queue.task_done()
+
+    async def _run_task(self, job: Job, run: TaskRunner) -> None:
+        """Run a task job and write its outcomes in batches."""
+        job.status = RUNNING
+        try:
+            outcomes = await run()
+        except Exception as exc:
+            logger.error("Job %s failed: %s", job.id, exc)
+            outcomes = [
+                (JobItemResult(index=i, status="failed", error=str(exc)), [])
+                for i in range(job.total)
+            ]
+        for start in range(0, len(outcomes), self._insert_batch):
+            end = start + self._insert_batch
+            job._pending.extend(outcomes[start:end])
+            await self._flush(job)
+        await self._finish(job)
+
+    async def _run_item(self, job: Job, index: int, item: Any) -> None:
+        """Process one item and buffer its outcome for writing."""
+        job.status = RUNNING
+        assert job.process is not None
+        try:
+            outcome = await job.process(index, item)
+        except Exception as exc:
+            outcome = (
+                JobItemResult(index=index, status="failed", error=str(exc)),
+                [],
+            )
+        job._pending.append(outcome)
+        job._processed += 1
+        last = job._processed == job.total
+        if last or len(job._pending) >= self._insert_batch:
+            await self._flush(job)
+        if last:
+            await self._finish(job)
+
+    async def _flush(self, job: Job) -> None:
+        """Write a job's buffered rows in bulk and publish the results.
+
+        If the write fails, the buffered items are reported as failed.
+        """
+        async with job._flush_lock:
+            pending, job._pending = job._pending, []
+            if not pending:
+                return
+            rows = [row for _, item_rows in pending for row in item_rows]
+            results = [result for result, _ in pending]
+            if rows:
+                try:
+                    await job.write(rows)
+                except Exception as exc:
+                    logger.error("Job %s write failed: %s", job.id, exc)
+                    results = [
+                        JobItemResult(
+                            index=result.index,
+                            status="failed",
+                            error=f"Failed to save result: {exc}",
+                        )
+                        for result in results
+                    ]
+            async with job._changed:
+                job.results.extend(results)
+                job._changed.notify_all()
+
+    async def _finish(self, job: Job) -> None:
+        """Mark a job completed and run its completion hook."""
+        if job.on_complete is not None:
+            try:
+                await job.on_complete(job)
+            except Exception as exc:
+                logger.error("Job %s completion hook failed: %s", job.id, exc)
+        async with job._changed:
+            job.status = COMPLETED
+            job.finished_at = datetime.now(timezone.utc)
+            job._changed.notify_all()
+
+    async def join(self) -> None:
+        """Wait until every queued item and task job has finished."""
+        if self._queue is not None:
+            await self._queue.join()
+        await asyncio.gather(*self._runs, return_exceptions=True)
+
+    async def shutdown(self) -> None:
+        """Cancel the workers and tasks; unfinished jobs are abandoned."""
+        tasks = [*self._tasks, *self._runs]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        self._loop = None
+
+    def stats(self) -> dict[str, Any]:
+        """Return worker pool and job counters.
+
+        Returns:
+            Dictionary with worker count, queued items and job counts
+            by status.
+        """
+        statuses = [job.status for job in self._jobs.values()]
+        return {
+            "workers": self._workers if self._tasks else 0,
+            "queued_items": self._queue.qsize() if self._queue else 0,
+            "jobs": {
+                status: statuses.count(status)
+                for status in (QUEUED, RUNNING, COMPLETED)
+            },
+        }
+
+
+job_queue = JobQueue()
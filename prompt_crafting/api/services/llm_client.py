@@ -1,15 +1,64 @@
 """Unified async LLM API client supporting Claude and GPT providers.
 
 Uses httpx.AsyncClient with connection pooling, retry logic, and
-per-provider token counting and cost calculation.
+per-provider token counting and cost calculation. Responses can also
+be streamed token by token from both providers' SSE endpoints.
+Deterministic (temperature 0) calls are served from an optional
+response cache, and identical concurrent calls share one request.
+Each (provider, model) has a circuit breaker so calls fail fast while
+a provider is degraded, and slow calls can be hedged with a second
+request once they pass the model's p95 latency. Concurrent requests
+per provider are bounded by an adaptive (AIMD) limiter, and configured
+RPM/TPM quotas are enforced before a request is sent. A prompt prefix
+marked with a cache break is sent to Anthropic with ``cache_control``,
+and prompt-cache reads and writes are counted and priced. Requests are
+built and parsed by the provider adapters in ``providers``. Bulk work
+can instead go to a provider's asynchronous batch API, which is billed
+at half price and bypasses the interactive quotas and limiters.
 """
 
+import asyncio
+import email.utils
+import hashlib
+import json
 import os
-from dataclasses import dataclass
+import random
+import re
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable, Mapping
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass, replace
+from datetime import datetime, timezone
 from typing import Any, Optional
 
 import httpx
 
+from prompt_crafting.api.services.concurrency_limiter import (
+    ConcurrencyLimiters,
+    ConcurrencyLimitExceeded,
+)
+from prompt_crafting.api.services.prompt_engine import strip_cache_break
+from prompt_crafting.api.services.provider_health import ProviderHealth
+from prompt_crafting.api.services.providers import (
+    BATCHING,
+    STREAMING,
+    BatchRequest,
+    BatchResult,
+    ProviderAdapter,
+    UnsupportedOperation,
+    Usage,
+    get_provider,
+    registered_providers,
+)
+from prompt_crafting.api.services.rate_limiter import RateLimiter
+from prompt_crafting.api.services.response_cache import ResponseCache
+from prompt_crafting.api.services.token_estimator import (
+    TokenEstimate,
+    context_window,
+    count_tokens,
+)
+from prompt_crafting.utils.logging import logger
+
 # Cost per 1K tokens by provider/model (input, output).
 _COST_TABLE: dict[str, dict[str, tuple[float, float]]] = {
     "anthropic": {
@@ -25,7 +74,63 @@ _COST_TABLE: dict[str, dict[str, tuple[float, float]]] = {
 }
 
 _DEFAULT_TIMEOUT: float = float(os.getenv("LLM_TIMEOUT", "30"))
-_MAX_RETRIES: int = 3
+_MAX_CONNECTIONS: int = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+_MAX_KEEPALIVE: int = int(os.getenv("LLM_MAX_KEEPALIVE", "50"))
+_KEEPALIVE_EXPIRY_S: float = float(os.getenv("LLM_KEEPALIVE_EXPIRY_S", "60"))
+_MAX_RETRIES: int = int(os.getenv("LLM_RETRY_MAX_ATTEMPTS", "3"))
+_RETRY_BASE_DELAY_S: float = float(os.getenv("LLM_RETRY_BASE_DELAY_S", "0.5"))
+_RETRY_MAX_DELAY_S: float = float(os.getenv("LLM_RETRY_MAX_DELAY_S", "20"))
+_RETRY_DEADLINE_S: float = float(os.getenv("LLM_RETRY_DEADLINE_S", "60"))
+_HEDGE_BUDGET_RATIO: float = float(
+    os.getenv("LLM_HEDGE_BUDGET_RATIO", "0.05")
+)
+_HEDGE_MAX_BURST: float = float(os.getenv("LLM_HEDGE_MAX_BURST", "10"))
+_HEDGE_MIN_SAMPLES: int = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+_BATCH_POLL_INTERVAL_S: float = float(
+    os.getenv("LLM_BATCH_POLL_INTERVAL_S", "30")
+)
+_BATCH_MAX_WAIT_S: float = float(os.getenv("LLM_BATCH_MAX_WAIT_S", "86400"))
+
+# Prompt-cache pricing as multiples of the input rate: (read, write).
+_CACHE_RATE_MULTIPLIERS: dict[str, tuple[float, float]] = {
+    "anthropic": (0.1, 1.25),
+    "openai": (0.5, 1.0),
+}
+
+# Batch API pricing as a multiple of the interactive rates.
+_BATCH_RATE_MULTIPLIER = 0.5
+
+# (remaining, reset) header pairs reported by the providers; a reset
+# hint is used when its limit is exhausted.
+_RATE_LIMIT_HEADERS: tuple[tuple[str, str], ...] = (
+    (
+        "anthropic-ratelimit-requests-remaining",
+        "anthropic-ratelimit-requests-reset",
+    ),
+    (
+        "anthropic-ratelimit-tokens-remaining",
+        "anthropic-ratelimit-tokens-reset",
+    ),
+    (
+        "anthropic-ratelimit-input-tokens-remaining",
+        "anthropic-ratelimit-input-tokens-reset",
+    ),
+    (
+        "anthropic-ratelimit-output-tokens-remaining",
+        "anthropic-ratelimit-output-tokens-reset",
+    ),
+    ("x-ratelimit-remaining-requests", "x-ratelimit-reset-requests"),
+    ("x-ratelimit-remaining-tokens", "x-ratelimit-reset-tokens"),
+)
+
+# OpenAI reset durations, e.g. "1s", "6m0s", "20ms".
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS: dict[str, float] = {
+    "h": 3600.0,
+    "m": 60.0,
+    "s": 1.0,
+    "ms": 0.001,
+}
 
 
 @dataclass
@@ -34,12 +139,31 @@ class LLMResponse:
 
     Attributes:
         text: Generated response text.
-        input_tokens: Number of input/prompt tokens.
+        input_tokens: Number of input/prompt tokens, excluding tokens
+            read from or written to the provider's prompt cache.
         output_tokens: Number of output/completion tokens.
-        total_tokens: Sum of input and output tokens.
+        total_tokens: Sum of input, cache read, cache write and output
+            tokens.
         cost_usd: Estimated cost in USD.
         provider: LLM provider name.
         model: Model identifier used.
+        cache_read_tokens: Input tokens read from the provider's prompt
+            cache.
+        cache_write_tokens: Input tokens written to the provider's
+            prompt cache.
+        cached: True if served from the response cache (no API call,
+            so ``cost_usd`` is 0).
+        coalesced: True if this caller shared another caller's
+            in-flight request (``cost_usd`` is 0, the cost is counted
+            once on the caller that made the request).
+        hedged: True if the response came from a hedge request that
+            beat the original one.
+        batched: True if the response came from a provider batch
+            (priced at the batch discount).
+        hedge_cost_usd: Worst-case cost of the losing request of a
+            hedged call. It is cancelled without reporting usage, so
+            it is priced as if it used all of ``max_tokens``.
+        hedge_tokens: Worst-case tokens of the losing request.
     """
 
     text: str
@@ -49,6 +173,41 @@ class LLMResponse:
     cost_usd: float
     provider: str
     model: str
+    cache_read_tokens: int = 0
+    cache_write_tokens: int = 0
+    cached: bool = False
+    coalesced: bool = False
+    hedged: bool = False
+    batched: bool = False
+    hedge_cost_usd: float = 0.0
+    hedge_tokens: int = 0
+
+
+@dataclass
+class LLMStreamChunk:
+    """Incremental piece of a streamed LLM response.
+
+    Attributes:
+        text: Text generated since the previous chunk.
+        response: Final response with full text, usage and cost; set
+            only on the last chunk of the stream.
+    """
+
+    text: str
+    response: Optional[LLMResponse] = None
+
+
+@dataclass
+class LLMBatchResult:
+    """Outcome of one prompt sent through a provider's batch API.
+
+    Attributes:
+        response: The prompt's response, or None if it failed.
+        error: Failure description for failed prompts.
+    """
+
+    response: Optional[LLMResponse] = None
+    error: Optional[str] = None
 
 
 def calculate_cost(
@@ -56,14 +215,24 @@ def calculate_cost(
     model: str,
     input_tokens: int,
     output_tokens: int,
+    cache_read_tokens: int = 0,
+    cache_write_tokens: int = 0,
+    batch: bool = False,
 ) -> float:
     """Calculate the cost in USD for a given token usage.
 
+    Prompt-cache reads and writes are priced as multiples of the input
+    rate (Anthropic: 0.1x read, 1.25x write; OpenAI: 0.5x read). Batch
+    API usage costs half the interactive price.
+
     Args:
         provider: LLM provider name.
         model: Model identifier.
-        input_tokens: Number of input tokens.
+        input_tokens: Number of uncached input tokens.
         output_tokens: Number of output tokens.
+        cache_read_tokens: Input tokens read from the prompt cache.
+        cache_write_tokens: Input tokens written to the prompt cache.
+        batch: Whether the usage was billed through the batch API.
 
     Returns:
         Estimated cost in USD.
@@ -73,34 +242,432 @@ def calculate_cost(
     if cost_pair is None:
         return 0.0
     input_rate, output_rate = cost_pair
-    return (input_tokens / 1000 * input_rate) + (
+    read_rate, write_rate = _CACHE_RATE_MULTIPLIERS.get(provider, (1, 1))
+    billed_input = (
+        input_tokens
+        + cache_read_tokens * read_rate
+        + cache_write_tokens * write_rate
+    )
+    cost = (billed_input / 1000 * input_rate) + (
         output_tokens / 1000 * output_rate
     )
+    return cost * _BATCH_RATE_MULTIPLIER if batch else cost
+
+
+def is_priced(provider: str, model: str) -> bool:
+    """Return whether a model has a listed price."""
+    return model in _COST_TABLE.get(provider, {})
+
+
+def budget_cost(
+    provider: str,
+    model: str,
+    input_tokens: int,
+    output_tokens: int,
+    batch: bool = False,
+) -> float:
+    """Cost to charge against a spend budget for a given token usage.
+
+    Unlike ``calculate_cost``, a model missing from the price table is
+    not free: it is charged at its provider's highest listed rates, or
+    the highest rates of any provider if its provider has none listed,
+    so calls to unpriced models cannot slip past a USD budget. Cache
+    discounts are ignored.
+
+    Args:
+        provider: LLM provider name.
+        model: Model identifier.
+        input_tokens: Number of input tokens, cached ones included.
+        output_tokens: Number of output tokens.
+        batch: Whether the usage is billed through the batch API.
+
+    Returns:
+        Cost in USD.
+    """
+    if is_priced(provider, model):
+        return calculate_cost(
+            provider, model, input_tokens, output_tokens, batch=batch
+        )
+    rates = list(_COST_TABLE.get(provider, {}).values()) or [
+        pair for models in _COST_TABLE.values() for pair in models.values()
+    ]
+    cost = (
+        input_tokens / 1000 * max(rate for rate, _ in rates)
+        + output_tokens / 1000 * max(rate for _, rate in rates)
+    )
+    return cost * _BATCH_RATE_MULTIPLIER if batch else cost
+
+
+def estimate_call(
+    prompt: str,
+    provider: str,
+    model: str,
+    max_tokens: int,
+) -> TokenEstimate:
+    """Estimate a call's tokens and worst-case cost without sending it.
+
+    Args:
+        prompt: The rendered prompt text.
+        provider: LLM provider name.
+        model: Model identifier.
+        max_tokens: Maximum tokens in the response.
+
+    Returns:
+        The estimate, priced as if the response used all of
+        ``max_tokens`` and no prompt-cache discount applied.
+    """
+    input_tokens = count_tokens(strip_cache_break(prompt), provider)
+    return TokenEstimate(
+        provider=provider,
+        model=model,
+        input_tokens=input_tokens,
+        max_output_tokens=max_tokens,
+        context_window=context_window(provider, model),
+        max_cost_usd=calculate_cost(
+            provider, model, input_tokens, max_tokens
+        ),
+    )
+
+
+def _build_response(
+    provider: str,
+    model: str,
+    text: str,
+    input_tokens: int,
+    output_tokens: int,
+    cache_read_tokens: int = 0,
+    cache_write_tokens: int = 0,
+    batch: bool = False,
+) -> LLMResponse:
+    """Assemble a response, totalling tokens and pricing the usage."""
+    return LLMResponse(
+        text=text,
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        total_tokens=(
+            input_tokens
+            + cache_read_tokens
+            + cache_write_tokens
+            + output_tokens
+        ),
+        cost_usd=calculate_cost(
+            provider,
+            model,
+            input_tokens,
+            output_tokens,
+            cache_read_tokens,
+            cache_write_tokens,
+            batch,
+        ),
+        provider=provider,
+        model=model,
+        cache_read_tokens=cache_read_tokens,
+        cache_write_tokens=cache_write_tokens,
+        batched=batch,
+    )
+
+
+@dataclass
+class RetryPolicy:
+    """Retry behaviour for buffered provider calls.
+
+    Only throttling (429), server errors (5xx) and transport errors are
+    retried. The wait before each retry is the provider's hint
+    (``Retry-After`` or an exhausted rate-limit reset header) when one
+    is given, otherwise decorrelated jitter. ``deadline_s`` bounds the
+    whole call, attempts and waits included.
+
+    Attributes:
+        max_attempts: Maximum number of attempts, including the first.
+        base_delay_s: Minimum wait between attempts.
+        max_delay_s: Maximum jittered wait between attempts.
+        deadline_s: Overall time budget for the call.
+    """
+
+    max_attempts: int = _MAX_RETRIES
+    base_delay_s: float = _RETRY_BASE_DELAY_S
+    max_delay_s: float = _RETRY_MAX_DELAY_S
+    deadline_s: float = _RETRY_DEADLINE_S
+
+    def next_delay(
+        self,
+        previous_s: float,
+        response: Optional[httpx.Response] = None,
+    ) -> float:
+        """Compute the wait before the next attempt.
+
+        Args:
+            previous_s: The previous wait (``base_delay_s`` initially).
+            response: The failed response, if any, for server hints.
+
+        Returns:
+            Seconds to wait.
+        """
+        hint = (
+            retry_after_seconds(response.headers)
+            if response is not None
+            else None
+        )
+        if hint is not None:
+            # A little jitter keeps clients told the same reset time
+            # from retrying in lockstep.
+            return hint + random.uniform(0, self.base_delay_s)
+        return min(
+            self.max_delay_s,
+            random.uniform(self.base_delay_s, max(previous_s, 0) * 3),
+        )
+
+
+@dataclass
+class HedgePolicy:
+    """Limits for hedged requests.
+
+    Every hedge-enabled call earns ``budget_ratio`` hedge credits (up to
+    ``max_burst``) and each hedge spends one, so hedges can add at most
+    about ``budget_ratio`` extra provider requests, and cost, per call.
+
+    Attributes:
+        budget_ratio: Hedge credits earned per hedge-enabled call.
+        max_burst: Maximum credits that can be saved up.
+        min_samples: Successful calls in the model's window before its
+            p95 is trusted as a hedge delay.
+    """
+
+    budget_ratio: float = _HEDGE_BUDGET_RATIO
+    max_burst: float = _HEDGE_MAX_BURST
+    min_samples: int = _HEDGE_MIN_SAMPLES
+
+
+def is_retryable(exc: Exception) -> bool:
+    """Return whether a failed provider call may succeed if retried.
+
+    Args:
+        exc: Exception raised by the call.
+
+    Returns:
+        True for 429, 5xx and transport errors.
+    """
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(exc, httpx.TransportError)
+
+
+def _charge_loser(
+    response: LLMResponse,
+    prompt: str,
+    provider: str,
+    model: str,
+    max_tokens: int,
+) -> LLMResponse:
+    """Add a cancelled hedge request's worst case to the winner.
+
+    Args:
+        response: The winning response.
+        prompt: The prompt both requests sent.
+        provider: Provider of the cancelled request.
+        model: Model of the cancelled request.
+        max_tokens: Maximum tokens in the response.
+
+    Returns:
+        The response with ``hedge_cost_usd`` and ``hedge_tokens`` set.
+    """
+    input_tokens = count_tokens(strip_cache_break(prompt), provider)
+    return replace(
+        response,
+        hedge_cost_usd=response.hedge_cost_usd
+        + budget_cost(provider, model, input_tokens, max_tokens),
+        hedge_tokens=response.hedge_tokens + input_tokens + max_tokens,
+    )
+
+
+def _parse_duration(value: str) -> Optional[float]:
+    """Parse a delay given as seconds, a Go duration or a timestamp."""
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if parts and "".join(n + u for n, u in parts) == value:
+        return sum(float(n) * _DURATION_UNITS[u] for n, u in parts)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        try:
+            when = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def retry_after_seconds(headers: Mapping[str, str]) -> Optional[float]:
+    """Extract the server's requested wait from response headers.
+
+    ``Retry-After`` (seconds or HTTP date) takes precedence. Otherwise
+    the longest reset time among exhausted Anthropic/OpenAI rate limits
+    is used.
+
+    Args:
+        headers: Response headers.
+
+    Returns:
+        Seconds to wait, or None if the server gave no hint.
+    """
+    retry_after = headers.get("retry-after")
+    if retry_after is not None:
+        delay = _parse_duration(retry_after)
+        if delay is not None:
+            return delay
+    resets = []
+    for remaining_header, reset_header in _RATE_LIMIT_HEADERS:
+        reset = headers.get(reset_header)
+        if reset is None or headers.get(remaining_header) != "0":
+            continue
+        delay = _parse_duration(reset)
+        if delay is not None:
+            resets.append(delay)
+    return max(resets) if resets else None
+
+
+def response_cache_key(
+    provider: str,
+    model: str,
+    prompt: str,
+    max_tokens: int,
+) -> str:
+    """Build the response cache key for a request.
+
+    Args:
+        provider: LLM provider name.
+        model: Model identifier.
+        prompt: Rendered prompt text.
+        max_tokens: Maximum tokens in the response.
+
+    Returns:
+        Hex SHA-256 digest of the request parameters.
+    """
+    raw = json.dumps([provider, model, prompt, max_tokens])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _flight_key(
+    provider: str,
+    model: str,
+    prompt: str,
+    max_tokens: int,
+    temperature: float,
+) -> str:
+    """Build the key identifying identical in-flight requests."""
+    raw = json.dumps([provider, model, prompt, max_tokens, temperature])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
 
 
 class LLMClient:
     """Unified async client for LLM API calls.
 
-    Supports Anthropic Claude (primary) and OpenAI GPT (secondary)
-    with retry logic and connection pooling.
+    Supports every provider registered in ``providers`` (Anthropic
+    Claude and OpenAI GPT by default, plus a local mock when enabled)
+    with retry logic
+    and connection pooling. Adapters with a local transport are
+    mounted when the client is created.
 
     Args:
         timeout: Request timeout in seconds.
+        transport: Optional httpx transport, e.g. ``httpx.MockTransport``
+            in tests.
+        cache: Optional response cache for deterministic calls.
+        retry_policy: Retry behaviour for buffered calls.
+        health: Per-model statistics and circuit breakers.
+        hedge_policy: Limits for hedged requests.
+        limiters: Per-provider adaptive concurrency limiters.
+        rate_limiter: RPM/TPM quota buckets.
     """
 
-    def __init__(self, timeout: Optional[float] = None) -> None:
+    def __init__(
+        self,
+        timeout: Optional[float] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        cache: Optional[ResponseCache] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        health: Optional[ProviderHealth] = None,
+        hedge_policy: Optional[HedgePolicy] = None,
+        limiters: Optional[ConcurrencyLimiters] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+    ) -> None:
         self._timeout = timeout or _DEFAULT_TIMEOUT
+        self._cache = cache
+        self._retry_policy = retry_policy or RetryPolicy()
+        self.health = health or ProviderHealth()
+        self._inflight: dict[str, asyncio.Task[LLMResponse]] = {}
+        self._coalesced = 0
+        self._hedge_policy = hedge_policy or HedgePolicy()
+        self._hedge_credits = 0.0
+        self._hedges_fired = 0
+        self._hedges_won = 0
+        self._hedges_skipped = 0
+        self._batches_pending = 0
+        self._batches_ended = 0
+        self.limiters = limiters or ConcurrencyLimiters()
+        self.rate_limiter = rate_limiter or RateLimiter()
+        mounts: dict[str, httpx.AsyncBaseTransport] = {}
+        for adapter in registered_providers().values():
+            mounted = adapter.transport()
+            if mounted is not None:
+                mounts[adapter.base_url] = mounted
         self._client = httpx.AsyncClient(
             timeout=httpx.Timeout(self._timeout),
             limits=httpx.Limits(
-                max_connections=20, max_keepalive_connections=5
+                max_connections=_MAX_CONNECTIONS,
+                max_keepalive_connections=_MAX_KEEPALIVE,
+                keepalive_expiry=_KEEPALIVE_EXPIRY_S,
             ),
+            transport=transport,
+            mounts=mounts,
         )
 
     async def close(self) -> None:
         """Close the underlying HTTP client."""
         await self._client.aclose()
 
+    def stats(self) -> dict[str, Any]:
+        """Return client statistics for the metrics endpoint.
+
+        Returns:
+            Dictionary with the number of in-flight and coalesced
+            requests, hedging counters, pending and ended provider
+            batches, registered providers and their
+            capabilities, per-provider concurrency limits
+            with in-flight and queued counts, quota buckets, and
+            response cache statistics (None when no cache is
+            configured).
+        """
+        return {
+            "in_flight": len(self._inflight),
+            "coalesced": self._coalesced,
+            "hedging": {
+                "fired": self._hedges_fired,
+                "won": self._hedges_won,
+                "skipped_budget": self._hedges_skipped,
+                "credits": round(self._hedge_credits, 3),
+            },
+            "batches": {
+                "pending": self._batches_pending,
+                "ended": self._batches_ended,
+            },
+            "providers": {
+                name: sorted(adapter.capabilities)
+                for name, adapter in registered_providers().items()
+            },
+            "concurrency": self.limiters.stats(),
+            "quotas": self.rate_limiter.stats(),
+            "response_cache": (
+                self._cache.stats() if self._cache is not None else None
+            ),
+        }
+
     async def generate(
         self,
         prompt: str,
@@ -108,17 +675,32 @@ class LLMClient:
         model: str = "claude-sonnet-4-20250514",
         max_tokens: int = 4096,
         temperature: float = 0.7,
+        use_cache: Optional[bool] = None,
+        hedge: bool = False,
+        hedge_target: Optional[tuple[str, str]] = None,
     ) -> LLMResponse:
         """Send a prompt to an LLM and return the structured response.
 
-        Retries up to 3 times with exponential backoff on transient errors.
+        Throttling, server and transport errors are retried according to
+        the client's RetryPolicy. When a cache is configured,
+        deterministic calls (temperature 0, or ``use_cache=True``) are
+        answered from it when possible, and successful responses are
+        stored for later calls. Concurrent calls with identical
+        arguments share a single provider request. With ``hedge``, a
+        call still running after the model's p95 latency gets a second
+        request, within the HedgePolicy budget; the first success wins.
 
         Args:
             prompt: The rendered prompt text to send.
-            provider: LLM provider ("anthropic" or "openai").
+            provider: Registered LLM provider name.
             model: Specific model identifier.
             max_tokens: Maximum tokens in the response.
             temperature: Sampling temperature.
+            use_cache: Force caching on or off; defaults to caching
+                only when ``temperature`` is 0.
+            hedge: Allow a hedge request for a slow call.
+            hedge_target: (provider, model) for the hedge request;
+                defaults to the same model.
 
         Returns:
             LLMResponse with text, token counts, and cost.
@@ -127,124 +709,579 @@ class LLMClient:
             httpx.HTTPStatusError: On non-retryable HTTP errors.
             ValueError: If the provider is unsupported.
         """
-        if provider == "anthropic":
-            return await self._call_anthropic(
-                prompt, model, max_tokens, temperature
+        if use_cache is None:
+            use_cache = temperature == 0
+
+        def call() -> Awaitable[LLMResponse]:
+            if hedge:
+                return self._hedged(
+                    prompt,
+                    provider,
+                    model,
+                    max_tokens,
+                    temperature,
+                    hedge_target or (provider, model),
+                )
+            return self._generate(
+                prompt, provider, model, max_tokens, temperature
+            )
+
+        flight = _flight_key(
+            provider, model, prompt, max_tokens, temperature
+        )
+        if self._cache is None or not use_cache:
+            return await self._single_flight(flight, call)
+
+        key = response_cache_key(provider, model, prompt, max_tokens)
+        hit = await self._cache.get(key)
+        if hit is not None:
+            return LLMResponse(
+                **{
+                    **hit,
+                    "cost_usd": 0.0,
+                    "hedge_cost_usd": 0.0,
+                    "hedge_tokens": 0,
+                    "cached": True,
+                }
+            )
+        response = await self._single_flight(flight, call)
+        if not response.coalesced:
+            await self._cache.set(key, asdict(response))
+        return response
+
+    async def _single_flight(
+        self,
+        key: str,
+        call: Callable[[], Awaitable[LLMResponse]],
+    ) -> LLMResponse:
+        """Make a provider call, joining an identical one in flight.
+
+        The first caller starts the request as a task; callers arriving
+        before it finishes await the same task. The task is shielded so
+        a cancelled caller does not cancel it for the others.
+
+        Args:
+            key: Key identifying identical requests.
+            call: Starts the provider call when none is in flight.
+
+        Returns:
+            LLMResponse; marked ``coalesced`` for joining callers.
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            self._coalesced += 1
+            response = await asyncio.shield(task)
+            return replace(
+                response,
+                cost_usd=0.0,
+                hedge_cost_usd=0.0,
+                hedge_tokens=0,
+                coalesced=True,
             )
-        elif provider == "openai":
-            return await self._call_openai(
-                prompt, model, max_tokens, temperature
+
+        task = asyncio.ensure_future(call())
+        self._inflight[key] = task
+        task.add_done_callback(
+            lambda done: self._finish_flight(key, done)
+        )
+        return await asyncio.shield(task)
+
+    def _finish_flight(
+        self, key: str, task: "asyncio.Task[LLMResponse]"
+    ) -> None:
+        """Drop a finished request from the in-flight table.
+
+        The exception is retrieved here so a failure nobody awaited any
+        more (all callers cancelled) is not reported as unhandled.
+        """
+        self._inflight.pop(key, None)
+        if not task.cancelled():
+            task.exception()
+
+    async def _hedged(
+        self,
+        prompt: str,
+        provider: str,
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        hedge_target: tuple[str, str],
+    ) -> LLMResponse:
+        """Make a call, hedging it if it outlives the model's p95.
+
+        No hedge is sent until the model has ``min_samples`` successful
+        calls in its window, or when the hedge budget is spent. Once a
+        hedge is sent, the first successful response wins and the
+        other request is cancelled; if one fails, the other is awaited.
+        The provider still bills a cancelled request, so its worst-case
+        cost and tokens are reported on the winning response.
+
+        Args:
+            prompt: The rendered prompt text to send.
+            provider: LLM provider name.
+            model: Specific model identifier.
+            max_tokens: Maximum tokens in the response.
+            temperature: Sampling temperature.
+            hedge_target: (provider, model) for the hedge request.
+
+        Returns:
+            The winning LLMResponse, marked ``hedged`` if the hedge won
+            and carrying the cost of a cancelled loser.
+        """
+        policy = self._hedge_policy
+        self._hedge_credits = min(
+            policy.max_burst, self._hedge_credits + policy.budget_ratio
+        )
+        stats = self.health.stats(provider, model)
+        p95_ms = stats.latency_percentile(0.95)
+        if p95_ms is None or stats.successes < policy.min_samples:
+            return await self._generate(
+                prompt, provider, model, max_tokens, temperature
             )
-        else:
-            raise ValueError(f"Unsupported LLM provider: {provider}")
 
-    async def _call_anthropic(
+        primary = asyncio.ensure_future(
+            self._generate(prompt, provider, model, max_tokens, temperature)
+        )
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=p95_ms / 1000)
+            if done:
+                return primary.result()
+            if self._hedge_credits < 1:
+                self._hedges_skipped += 1
+                return await primary
+
+            self._hedge_credits -= 1
+            self._hedges_fired += 1
+            hedge = asyncio.ensure_future(
+                self._generate(
+                    prompt, *hedge_target, max_tokens, temperature
+                )
+            )
+            tasks.add(hedge)
+            targets = {primary: (provider, model), hedge: hedge_target}
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is not None:
+                        continue
+                    response = task.result()
+                    for loser in pending:
+                        response = _charge_loser(
+                            response, prompt, *targets[loser], max_tokens
+                        )
+                    if task is hedge:
+                        self._hedges_won += 1
+                        return replace(response, hedged=True)
+                    return response
+            return primary.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _generate(
         self,
         prompt: str,
+        provider: str,
         model: str,
         max_tokens: int,
         temperature: float,
     ) -> LLMResponse:
-        """Call the Anthropic Messages API.
+        """Dispatch an uncached call to the provider's API.
+
+        The call first reserves capacity from the configured quotas
+        (estimated prompt tokens plus ``max_tokens``), reconciled with
+        the reported usage afterwards.
 
         Args:
-            prompt: The prompt text.
-            model: Anthropic model identifier.
-            max_tokens: Maximum response tokens.
+            prompt: The rendered prompt text to send.
+            provider: Registered LLM provider name.
+            model: Specific model identifier.
+            max_tokens: Maximum tokens in the response.
             temperature: Sampling temperature.
 
         Returns:
-            LLMResponse from the Anthropic API.
+            LLMResponse with text, token counts, and cost.
+
+        Raises:
+            CircuitOpenError: If the model's circuit is open.
+            QuotaExceeded: If the quota has no capacity in time.
+            ValueError: If the provider is unsupported.
         """
-        api_key = os.getenv("ANTHROPIC_API_KEY", "")
-        url = "https://api.anthropic.com/v1/messages"
-        headers = {
-            "x-api-key": api_key,
-            "anthropic-version": "2023-06-01",
-            "content-type": "application/json",
-        }
-        payload: dict[str, Any] = {
-            "model": model,
-            "max_tokens": max_tokens,
-            "temperature": temperature,
-            "messages": [{"role": "user", "content": prompt}],
-        }
-        data = await self._request_with_retry(url, headers, payload)
-        text = data.get("content", [{}])[0].get("text", "")
-        usage = data.get("usage", {})
-        input_tokens = usage.get("input_tokens", 0)
-        output_tokens = usage.get("output_tokens", 0)
-        cost = calculate_cost(
-            "anthropic", model, input_tokens, output_tokens
+        adapter = get_provider(provider)
+        reservation = await self.rate_limiter.reserve(
+            provider, model, count_tokens(prompt, provider) + max_tokens
+        )
+        used = 0
+        try:
+            async with self._tracked(provider, model):
+                response = await self._call(
+                    adapter, prompt, model, max_tokens, temperature
+                )
+            used = response.total_tokens
+            return response
+        except asyncio.CancelledError:
+            # The provider counts an abandoned request (e.g. a losing
+            # hedge) against its quota, so keep the whole reservation.
+            used = reservation.tokens
+            raise
+        finally:
+            self.rate_limiter.reconcile(reservation, used)
+
+    @asynccontextmanager
+    async def _tracked(
+        self, provider: str, model: str
+    ) -> AsyncIterator[None]:
+        """Guard a provider call with its circuit breaker.
+
+        Admits the call (or fails fast), then records its latency and
+        outcome. Throttling, server and transport errors count as
+        failures; other HTTP errors mean the provider answered and
+        count as successes. Calls abandoned by the caller or rejected
+        by the local concurrency limiter are released without an
+        outcome.
+
+        Args:
+            provider: LLM provider name.
+            model: Model identifier.
+
+        Yields:
+            Control to the call.
+
+        Raises:
+            CircuitOpenError: If the model's circuit is open.
+        """
+        self.health.acquire(provider, model)
+        start = time.monotonic()
+
+        def record(ok: bool) -> None:
+            latency_ms = (time.monotonic() - start) * 1000
+            self.health.record(provider, model, latency_ms, ok)
+
+        try:
+            yield
+        except httpx.HTTPError as exc:
+            record(not is_retryable(exc))
+            raise
+        except ConcurrencyLimitExceeded:
+            # Rejected locally; says nothing about the provider.
+            self.health.release(provider, model)
+            raise
+        except Exception:
+            record(False)
+            raise
+        except BaseException:
+            self.health.release(provider, model)
+            raise
+        record(True)
+
+    async def generate_stream(
+        self,
+        prompt: str,
+        provider: str = "anthropic",
+        model: str = "claude-sonnet-4-20250514",
+        max_tokens: int = 4096,
+        temperature: float = 0.7,
+    ) -> AsyncIterator[LLMStreamChunk]:
+        """Stream a prompt's response from an LLM as it is generated.
+
+        Streams are not retried, since text may already have been
+        forwarded to the caller when an error occurs.
+
+        Args:
+            prompt: The rendered prompt text to send.
+            provider: Registered LLM provider name.
+            model: Specific model identifier.
+            max_tokens: Maximum tokens in the response.
+            temperature: Sampling temperature.
+
+        Yields:
+            Text chunks; the last chunk carries the final LLMResponse.
+
+        Raises:
+            CircuitOpenError: If the model's circuit is open.
+            QuotaExceeded: If the quota has no capacity in time.
+            httpx.HTTPStatusError: If the provider rejects the request.
+            ValueError: If the provider is unsupported.
+            UnsupportedOperation: If the provider cannot stream.
+        """
+        adapter = get_provider(provider)
+        if STREAMING not in adapter.capabilities:
+            raise UnsupportedOperation(f"Provider {provider} cannot stream")
+        stream = self._stream(
+            adapter, prompt, model, max_tokens, temperature
         )
-        return LLMResponse(
-            text=text,
-            input_tokens=input_tokens,
-            output_tokens=output_tokens,
-            total_tokens=input_tokens + output_tokens,
-            cost_usd=cost,
-            provider="anthropic",
-            model=model,
+        reservation = await self.rate_limiter.reserve(
+            provider, model, count_tokens(prompt, provider) + max_tokens
+        )
+        used = 0
+        try:
+            async with self._tracked(provider, model):
+                async for chunk in stream:
+                    if chunk.response is not None:
+                        used = chunk.response.total_tokens
+                    yield chunk
+        finally:
+            self.rate_limiter.reconcile(reservation, used)
+
+    async def generate_batch(
+        self,
+        prompts: list[str],
+        provider: str = "anthropic",
+        model: str = "claude-sonnet-4-20250514",
+        max_tokens: int = 4096,
+        temperature: float = 0.7,
+        poll_interval_s: float = _BATCH_POLL_INTERVAL_S,
+        max_wait_s: float = _BATCH_MAX_WAIT_S,
+    ) -> list[LLMBatchResult]:
+        """Run prompts through a provider's asynchronous batch API.
+
+        The prompts are submitted as one batch, which is polled every
+        ``poll_interval_s`` until it ends; transient polling errors are
+        logged and polling continues. Batched responses cost half the
+        interactive price and skip the interactive path entirely: no
+        quotas, concurrency limits, circuit breakers, response cache,
+        coalescing or hedging.
+
+        Args:
+            prompts: Rendered prompt texts.
+            provider: Registered LLM provider name.
+            model: Model identifier for every prompt.
+            max_tokens: Maximum tokens in each response.
+            temperature: Sampling temperature.
+            poll_interval_s: Wait between status checks.
+            max_wait_s: Longest to wait for the batch to end.
+
+        Returns:
+            One result per prompt, in order.
+
+        Raises:
+            ValueError: If the provider is unsupported.
+            UnsupportedOperation: If the provider has no batch API.
+            TimeoutError: If the batch has not ended in ``max_wait_s``.
+            httpx.HTTPError: If the provider rejects the batch, or
+                polling fails with a non-retryable error.
+        """
+        adapter = get_provider(provider)
+        if BATCHING not in adapter.capabilities:
+            raise UnsupportedOperation(
+                f"Provider {provider} has no batch API"
+            )
+        requests = [
+            BatchRequest(str(index), prompt, model, max_tokens, temperature)
+            for index, prompt in enumerate(prompts)
+        ]
+        batch_id = await adapter.submit_batch(self._client, requests)
+        logger.info(
+            "Submitted %s batch %s with %d requests",
+            provider,
+            batch_id,
+            len(requests),
+        )
+        self._batches_pending += 1
+        try:
+            results = await self._poll_batch(
+                adapter, batch_id, poll_interval_s, max_wait_s
+            )
+        finally:
+            self._batches_pending -= 1
+        self._batches_ended += 1
+
+        by_id = {result.custom_id: result for result in results}
+        outcomes = []
+        for request in requests:
+            result = by_id.get(request.custom_id)
+            if result is None:
+                outcomes.append(
+                    LLMBatchResult(error=f"No result in batch {batch_id}")
+                )
+            elif result.text is None:
+                outcomes.append(LLMBatchResult(error=result.error))
+            else:
+                outcomes.append(
+                    LLMBatchResult(
+                        response=_build_response(
+                            adapter.name,
+                            model,
+                            result.text,
+                            batch=True,
+                            **result.usage,
+                        )
+                    )
+                )
+        return outcomes
+
+    async def _poll_batch(
+        self,
+        adapter: ProviderAdapter,
+        batch_id: str,
+        interval_s: float,
+        max_wait_s: float,
+    ) -> list[BatchResult]:
+        """Poll a provider batch until it ends.
+
+        Args:
+            adapter: The provider's adapter.
+            batch_id: Provider batch id.
+            interval_s: Wait between status checks.
+            max_wait_s: Longest to wait for the batch to end.
+
+        Returns:
+            The batch's results.
+
+        Raises:
+            TimeoutError: If the batch has not ended in ``max_wait_s``.
+            httpx.HTTPError: On a non-retryable polling error.
+        """
+        deadline = time.monotonic() + max_wait_s
+        while True:
+            try:
+                results = await adapter.fetch_batch(self._client, batch_id)
+            except httpx.HTTPError as exc:
+                if not is_retryable(exc):
+                    raise
+                logger.warning("Polling batch %s failed: %s", batch_id, exc)
+                results = None
+            if results is not None:
+                return results
+            if time.monotonic() + interval_s > deadline:
+                raise TimeoutError(
+                    f"Batch {batch_id} did not end within {max_wait_s:g}s"
+                )
+            await asyncio.sleep(interval_s)
+
+    async def _stream(
+        self,
+        adapter: ProviderAdapter,
+        prompt: str,
+        model: str,
+        max_tokens: int,
+        temperature: float,
+    ) -> AsyncIterator[LLMStreamChunk]:
+        """Stream a response from a provider's API.
+
+        Args:
+            adapter: The provider's adapter.
+            prompt: The prompt text.
+            model: Model identifier.
+            max_tokens: Maximum response tokens.
+            temperature: Sampling temperature.
+
+        Yields:
+            Text chunks followed by a final chunk with the response.
+        """
+        parts: list[str] = []
+        usage: Usage = {"input_tokens": 0, "output_tokens": 0}
+        async for event in self._iter_sse(
+            adapter.name,
+            adapter.url,
+            adapter.headers,
+            adapter.payload(
+                prompt, model, max_tokens, temperature, stream=True
+            ),
+        ):
+            text = adapter.parse_event(event, usage)
+            if text:
+                parts.append(text)
+                yield LLMStreamChunk(text=text)
+        yield LLMStreamChunk(
+            text="",
+            response=_build_response(
+                adapter.name, model, "".join(parts), **usage
+            ),
         )
 
-    async def _call_openai(
+    async def _iter_sse(
         self,
+        provider: str,
+        url: str,
+        headers: dict[str, str],
+        payload: dict[str, Any],
+    ) -> AsyncIterator[dict[str, Any]]:
+        """POST a request and yield the JSON data of each SSE event.
+
+        The stream holds a provider concurrency slot until it ends.
+
+        Args:
+            provider: LLM provider name.
+            url: API endpoint URL.
+            headers: HTTP headers.
+            payload: JSON request body.
+
+        Yields:
+            Parsed ``data:`` payloads, stopping at ``[DONE]``.
+
+        Raises:
+            ConcurrencyLimitExceeded: If no provider slot is available.
+            httpx.HTTPStatusError: If the provider rejects the request.
+        """
+        async with self.limiters.slot(
+            provider, stream=True
+        ), self._client.stream(
+            "POST", url, headers=headers, json=payload
+        ) as response:
+            if response.is_error:
+                await response.aread()
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                if data:
+                    yield json.loads(data)
+
+    async def _call(
+        self,
+        adapter: ProviderAdapter,
         prompt: str,
         model: str,
         max_tokens: int,
         temperature: float,
     ) -> LLMResponse:
-        """Call the OpenAI Chat Completions API.
+        """Call a provider's API and parse its response.
 
         Args:
+            adapter: The provider's adapter.
             prompt: The prompt text.
-            model: OpenAI model identifier.
+            model: Model identifier.
             max_tokens: Maximum response tokens.
             temperature: Sampling temperature.
 
         Returns:
-            LLMResponse from the OpenAI API.
+            LLMResponse from the provider.
         """
-        api_key = os.getenv("OPENAI_API_KEY", "")
-        url = "https://api.openai.com/v1/chat/completions"
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json",
-        }
-        payload: dict[str, Any] = {
-            "model": model,
-            "max_tokens": max_tokens,
-            "temperature": temperature,
-            "messages": [{"role": "user", "content": prompt}],
-        }
-        data = await self._request_with_retry(url, headers, payload)
-        choices = data.get("choices", [{}])
-        text = choices[0].get("message", {}).get("content", "")
-        usage = data.get("usage", {})
-        input_tokens = usage.get("prompt_tokens", 0)
-        output_tokens = usage.get("completion_tokens", 0)
-        cost = calculate_cost(
-            "openai", model, input_tokens, output_tokens
-        )
-        return LLMResponse(
-            text=text,
-            input_tokens=input_tokens,
-            output_tokens=output_tokens,
-            total_tokens=input_tokens + output_tokens,
-            cost_usd=cost,
-            provider="openai",
-            model=model,
+        data = await self._request_with_retry(
+            adapter.name,
+            adapter.url,
+            adapter.headers,
+            adapter.payload(prompt, model, max_tokens, temperature),
         )
+        text, usage = adapter.parse(data)
+        return _build_response(adapter.name, model, text, **usage)
 
     async def _request_with_retry(
         self,
+        provider: str,
         url: str,
         headers: dict[str, str],
         payload: dict[str, Any],
     ) -> dict[str, Any]:
-        """Send a POST request with exponential backoff retries.
+        """Send a POST request, retrying transient failures.
+
+        Client errors (4xx other than 429) fail immediately. Each
+        attempt's timeout is capped by the time left before the
+        policy's deadline, and a retry whose wait would overrun the
+        deadline is not attempted. Each attempt holds a provider
+        concurrency slot; waits between attempts do not.
 
         Args:
+            provider: LLM provider name.
             url: API endpoint URL.
             headers: HTTP headers.
             payload: JSON request body.
@@ -253,21 +1290,37 @@ class LLMClient:
             Parsed JSON response dictionary.
 
         Raises:
-            httpx.HTTPStatusError: After exhausting all retries.
+            ConcurrencyLimitExceeded: If no provider slot is available.
+            httpx.HTTPStatusError: On a non-retryable status, or the
+                last retryable one once attempts or time run out.
+            httpx.TransportError: Likewise for connection failures.
         """
-        import asyncio
-
-        last_exc: Optional[Exception] = None
-        for attempt in range(_MAX_RETRIES):
+        policy = self._retry_policy
+        deadline = time.monotonic() + policy.deadline_s
+        delay = policy.base_delay_s
+        attempt = 1
+        while True:
+            remaining = deadline - time.monotonic()
             try:
-                response = await self._client.post(
-                    url, headers=headers, json=payload
-                )
-                response.raise_for_status()
+                async with self.limiters.slot(provider):
+                    response = await self._client.post(
+                        url,
+                        headers=headers,
+                        json=payload,
+                        timeout=min(self._timeout, max(remaining, 0.001)),
+                    )
+                    response.raise_for_status()
                 return response.json()
             except (httpx.HTTPStatusError, httpx.TransportError) as exc:
-                last_exc = exc
-                if attempt < _MAX_RETRIES - 1:
-                    wait = 2 ** (attempt + 1)
-                    await asyncio.sleep(wait)
-        raise last_exc  # type: ignore[misc]
+                if not is_retryable(exc) or attempt >= policy.max_attempts:
+                    raise
+                failed = (
+                    exc.response
+                    if isinstance(exc, httpx.HTTPStatusError)
+                    else None
+                )
+                delay = policy.next_delay(delay, failed)
+                if time.monotonic() + delay >= deadline:
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
@@ -0,0 +1,205 @@
+"""Latency-aware routing of LLM calls across providers and models.
+
+A routing policy turns one execution into an ordered list of candidate
+(provider, model) targets and tries them in turn, failing over when a
+target times out, returns a throttling or server error, has an open
+circuit, has no free concurrency slot, or is out of quota. Two
+strategies are supported:
+
+    - ``fallback``: the requested model first, then the listed
+      fallbacks in order.
+    - ``fastest``: the requested model and its equivalents (the listed
+      fallbacks, or its group in ``LLM_MODEL_GROUPS``) ordered by the
+      live p95/p50 latency the client has measured. Models with open
+      circuits go last; unmeasured models go first so they get sampled.
+"""
+
+import json
+import os
+from dataclasses import asdict, dataclass, field
+from typing import Any, Optional
+
+import httpx
+
+from prompt_crafting.api.services.concurrency_limiter import (
+    ConcurrencyLimitExceeded,
+)
+from prompt_crafting.api.services.llm_client import (
+    LLMClient,
+    LLMResponse,
+    is_retryable,
+)
+from prompt_crafting.api.services.provider_health import (
+    OPEN,
+    CircuitOpenError,
+)
+from prompt_crafting.api.services.rate_limiter import QuotaExceeded
+
+_DEFAULT_MODEL_GROUPS: list[list[str]] = [
+    ["anthropic/claude-sonnet-4-20250514", "openai/gpt-4o"],
+    ["anthropic/claude-opus-4-20250514", "openai/gpt-4-turbo"],
+]
+
+# Groups of interchangeable "provider/model" targets for ``fastest``.
+_MODEL_GROUPS: list[list[str]] = json.loads(
+    os.getenv("LLM_MODEL_GROUPS", "") or json.dumps(_DEFAULT_MODEL_GROUPS)
+)
+
+STRATEGIES = ("fallback", "fastest")
+
+Target = tuple[str, str]
+
+
+@dataclass
+class RoutingDecision:
+    """How a routed execution chose and reached its model.
+
+    Attributes:
+        strategy: Routing strategy used.
+        requested: The "provider/model" the caller asked for.
+        order: Candidate targets in the order they were to be tried.
+        attempts: Failed attempts as ``{"target", "error"}`` entries.
+        served_by: The "provider/model" that produced the response.
+    """
+
+    strategy: str
+    requested: str
+    order: list[str]
+    attempts: list[dict[str, str]] = field(default_factory=list)
+    served_by: Optional[str] = None
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return the decision as a JSON-serializable dictionary."""
+        return asdict(self)
+
+
+def _name(target: Target) -> str:
+    """Format a target as "provider/model"."""
+    return f"{target[0]}/{target[1]}"
+
+
+def _parse(name: str) -> Target:
+    """Split a "provider/model" string into a target."""
+    provider, _, model = name.partition("/")
+    return provider, model
+
+
+def equivalent_models(target: Target) -> list[Target]:
+    """Return the other members of a target's model group.
+
+    Args:
+        target: (provider, model) pair.
+
+    Returns:
+        Equivalent targets, excluding ``target`` itself.
+    """
+    name = _name(target)
+    for group in _MODEL_GROUPS:
+        if name in group:
+            return [_parse(other) for other in group if other != name]
+    return []
+
+
+def order_candidates(
+    client: LLMClient,
+    primary: Target,
+    fallbacks: list[Target],
+    strategy: str,
+) -> list[Target]:
+    """Order the targets to try for a routed call.
+
+    Args:
+        client: Client whose health statistics drive ``fastest``.
+        primary: The requested (provider, model).
+        fallbacks: Caller-supplied alternatives, in preference order.
+        strategy: ``"fallback"`` or ``"fastest"``.
+
+    Returns:
+        De-duplicated targets in the order they should be tried.
+
+    Raises:
+        ValueError: If the strategy is unknown.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unsupported routing strategy: {strategy}")
+    alternatives = fallbacks
+    if strategy == "fastest" and not alternatives:
+        alternatives = equivalent_models(primary)
+    candidates = list(dict.fromkeys([primary, *alternatives]))
+    if strategy == "fallback":
+        return candidates
+
+    def rank(target: Target) -> tuple[int, float, float]:
+        stats = client.health.stats(*target)
+        if client.health.breaker(*target).state == OPEN:
+            return (2, 0.0, 0.0)
+        p95 = stats.latency_percentile(0.95)
+        p50 = stats.latency_percentile(0.5)
+        if p95 is None or p50 is None:
+            return (0, 0.0, 0.0)
+        return (1, p95, p50)
+
+    # sorted() is stable, so ties keep the caller's preference order.
+    return sorted(candidates, key=rank)
+
+
+async def generate_routed(
+    client: LLMClient,
+    prompt: str,
+    primary: Target,
+    fallbacks: list[Target],
+    strategy: str,
+    **generate_options: Any,
+) -> tuple[LLMResponse, RoutingDecision]:
+    """Generate a response, failing over between candidate targets.
+
+    A candidate is skipped on an open circuit, a full concurrency
+    queue, an exhausted quota, throttling, 5xx and transport errors
+    (timeouts included).
+    Other errors, such as a 400 for a bad request, are raised at once.
+
+    Args:
+        client: LLM client.
+        prompt: The rendered prompt text to send.
+        primary: The requested (provider, model).
+        fallbacks: Caller-supplied alternatives.
+        strategy: ``"fallback"`` or ``"fastest"``.
+        **generate_options: Passed through to ``LLMClient.generate``.
+
+    Returns:
+        The response and the routing decision.
+
+    Raises:
+        Exception: The last candidate's error if every candidate fails.
+    """
+    order = order_candidates(client, primary, fallbacks, strategy)
+    decision = RoutingDecision(
+        strategy=strategy,
+        requested=_name(primary),
+        order=[_name(target) for target in order],
+    )
+    last_exc: Optional[Exception] = None
+    for provider, model in order:
+        try:
+            response = await client.generate(
+                prompt, provider=provider, model=model, **generate_options
+            )
+        except (
+            CircuitOpenError,
+            ConcurrencyLimitExceeded,
+            QuotaExceeded,
+            httpx.HTTPError,
+        ) as exc:
+            if isinstance(exc, httpx.HTTPError) and not is_retryable(exc):
+                raise
+            decision.attempts.append(
+                {
+                    "target": _name((provider, model)),
+                    "error": str(exc) or type(exc).__name__,
+                }
+            )
+            last_exc = exc
+            continue
+        decision.served_by = _name((response.provider, response.model))
+        return response, decision
+    raise last_exc  # type: ignore[misc]
@@ -0,0 +1,195 @@
+"""Priority scheduling of LLM calls.
+
+Calls are admitted through a fixed number of slots. When all slots are
+busy, waiting calls are dispatched by start-time fair queueing over
+three classes (interactive, batch, background) weighted by
+``LLM_PRIORITY_WEIGHTS``, so interactive traffic gets most of the
+capacity under load without shutting the other classes out. A waiting
+call's tag also improves the longer it waits (``LLM_PRIORITY_AGING_S``
+seconds of waiting are worth one background request), which bounds
+starvation.
+"""
+
+import asyncio
+import json
+import os
+import time
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+PRIORITIES: tuple[str, ...] = ("interactive", "batch", "background")
+
+_DEFAULT_WEIGHTS: dict[str, float] = {
+    "interactive": 8.0,
+    "batch": 2.0,
+    "background": 1.0,
+}
+_PRIORITY_WEIGHTS: dict[str, float] = {
+    **_DEFAULT_WEIGHTS,
+    **json.loads(os.getenv("LLM_PRIORITY_WEIGHTS", "") or "{}"),
+}
+_SCHEDULER_CONCURRENCY: int = int(os.getenv("LLM_SCHEDULER_CONCURRENCY", "32"))
+_PRIORITY_AGING_S: float = float(os.getenv("LLM_PRIORITY_AGING_S", "10"))
+
+
+@dataclass
+class _Waiter:
+    """A call waiting for a slot."""
+
+    priority: str
+    start_tag: float
+    enqueued_at: float
+    future: "asyncio.Future[None]" = field(repr=False)
+
+
+@dataclass
+class _ClassStats:
+    """Counters for one priority class."""
+
+    dispatched: int = 0
+    total_wait_s: float = 0.0
+    max_wait_s: float = 0.0
+
+
+class PriorityScheduler:
+    """Weighted fair admission of calls by priority class.
+
+    Args:
+        max_concurrent: Calls allowed to run at once.
+        weights: Relative share of capacity per class under load.
+        aging_s: Seconds of waiting worth one background request's
+            share; lower values protect low classes sooner.
+        clock: Monotonic time source (injectable for tests).
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = _SCHEDULER_CONCURRENCY,
+        weights: Optional[dict[str, float]] = None,
+        aging_s: float = _PRIORITY_AGING_S,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._max_concurrent = max(1, max_concurrent)
+        self._weights = weights or _PRIORITY_WEIGHTS
+        self._aging_s = aging_s
+        self._clock = clock
+        self._running = 0
+        self._virtual_time = 0.0
+        self._last_finish: dict[str, float] = {p: 0.0 for p in PRIORITIES}
+        self._waiters: list[_Waiter] = []
+        self._stats: dict[str, _ClassStats] = {
+            p: _ClassStats() for p in PRIORITIES
+        }
+
+    def _tag(self, priority: str) -> float:
+        """Assign a start tag and advance the class's finish tag."""
+        start = max(self._virtual_time, self._last_finish[priority])
+        self._last_finish[priority] = start + 1 / self._weights[priority]
+        return start
+
+    async def acquire(self, priority: str) -> None:
+        """Wait for a slot according to the call's priority.
+
+        Args:
+            priority: One of PRIORITIES.
+
+        Raises:
+            ValueError: If the priority is unknown.
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+        now = self._clock()
+        if self._running < self._max_concurrent and not self._waiters:
+            self._running += 1
+            self._virtual_time = self._tag(priority)
+            self._record(priority, 0.0)
+            return
+
+        waiter = _Waiter(
+            priority=priority,
+            start_tag=self._tag(priority),
+            enqueued_at=now,
+            future=asyncio.get_running_loop().create_future(),
+        )
+        self._waiters.append(waiter)
+        try:
+            await asyncio.shield(waiter.future)
+        except BaseException:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            elif waiter.future.done() and not waiter.future.cancelled():
+                # Granted as the caller went away; pass the slot on.
+                self.release()
+            raise
+
+    def release(self) -> None:
+        """Free a slot and dispatch the most deserving waiters."""
+        self._running -= 1
+        while self._waiters and self._running < self._max_concurrent:
+            now = self._clock()
+            waiter = min(
+                self._waiters,
+                key=lambda w: (
+                    w.start_tag - (now - w.enqueued_at) / self._aging_s
+                ),
+            )
+            self._waiters.remove(waiter)
+            self._running += 1
+            self._virtual_time = max(self._virtual_time, waiter.start_tag)
+            self._record(waiter.priority, now - waiter.enqueued_at)
+            waiter.future.set_result(None)
+
+    def _record(self, priority: str, wait_s: float) -> None:
+        """Update a class's dispatch counters."""
+        stats = self._stats[priority]
+        stats.dispatched += 1
+        stats.total_wait_s += wait_s
+        stats.max_wait_s = max(stats.max_wait_s, wait_s)
+
+    @asynccontextmanager
+    async def slot(self, priority: str) -> AsyncIterator[None]:
+        """Hold a slot for the duration of a call.
+
+        Args:
+            priority: One of PRIORITIES.
+
+        Yields:
+            Control to the call.
+        """
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict[str, Any]:
+        """Return slot usage and per-class queue and wait statistics.
+
+        Returns:
+            Dictionary with running count, capacity and per-class
+            queued/dispatched counts and average/maximum waits.
+        """
+        return {
+            "running": self._running,
+            "max_concurrent": self._max_concurrent,
+            "classes": {
+                priority: {
+                    "queued": sum(
+                        w.priority == priority for w in self._waiters
+                    ),
+                    "dispatched": stats.dispatched,
+                    "avg_wait_ms": (
+                        round(stats.total_wait_s / stats.dispatched * 1000, 1)
+                        if stats.dispatched
+                        else 0.0
+                    ),
+                    "max_wait_ms": round(stats.max_wait_s * 1000, 1),
+                }
+                for priority, stats in self._stats.items()
+            },
+        }
+
+
+llm_scheduler = PriorityScheduler()
@@ -2,13 +2,52 @@
 
 Provides safe template rendering with validation against dangerous
 patterns and default parameter injection for missing optional variables.
+Validated templates are compiled once and kept in a bounded LRU cache
+keyed by a content hash of the template source.
+
+Forbidden patterns are detected in a single pass, either over the raw
+template text (default) or over identifiers in the parsed Jinja2 AST.
+``render_many`` renders one template against many variable sets in the
+calling thread; ``render_executor`` spreads renders over its thread and
+process pools.
+
+The sandbox is a ``BudgetedSandboxedEnvironment``: while a render has a
+budget, function calls, attribute lookups, every ``{% for %}`` loop
+(compiled templates iterate through ``_BUDGETED_ITER_FILTER``) and
+sequence multiplication check the CPU deadline and output cap, so a
+runaway template is stopped even if it produces no output.
+
+Prompts sent to an LLM can mark the end of a cacheable prefix with
+``{% cache_break %}``. Without a marker, a leading block of literal
+text of at least ``PROMPT_CACHE_MIN_CHARS`` is marked automatically.
+The marker is stripped from every ``{{ ... }}`` output, so variable
+values cannot move the cache boundary. ``render_compiled`` keeps the
+marker in its output for the LLM client (see ``split_cache_prefix``);
+``render_template`` and ``render_many`` return plain text.
 """
 
+import hashlib
+import os
 import re
-from typing import Any, Optional
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator, Sequence
+from dataclasses import dataclass
+from threading import Lock
+from typing import Any, Optional, Union, overload
 
-from jinja2 import TemplateSyntaxError
-from jinja2.sandbox import SandboxedEnvironment
+from jinja2 import Template, TemplateSyntaxError, nodes
+from jinja2.ext import Extension
+from jinja2.parser import Parser
+from jinja2.runtime import Context
+from jinja2.sandbox import SandboxedEnvironment, safe_range
+
+from prompt_crafting.api.services.template_analysis import (
+    TemplateComplexity,
+    analyze_template,
+    find_required_variables,
+)
 
 # Patterns that indicate unsafe template content.
 _FORBIDDEN_PATTERNS: list[re.Pattern[str]] = [
@@ -18,32 +57,714 @@ _FORBIDDEN_PATTERNS: list[re.Pattern[str]] = [
     re.compile(r"__\w+__"),
 ]
 
-_sandbox_env = SandboxedEnvironment(
+# All forbidden patterns folded into one expression so the template is
+# scanned once. Group ``p<i>`` corresponds to ``_FORBIDDEN_PATTERNS[i]``
+# and must be kept in sync with it. The leading lookahead lets the regex
+# engine skip positions that cannot start any pattern, and the patterns
+# cannot overlap (the keyword patterns need word boundaries that never
+# occur inside a dunder), so non-overlapping matches find every
+# distinct pattern.
+_FORBIDDEN_SCANNER: re.Pattern[str] = re.compile(
+    r"(?=[ie_])"
+    r"(?:\b(?:(?P<p0>import)|(?P<p1>exec)|(?P<p2>eval))\b"
+    r"|(?P<p3>__\w+__))"
+)
+
+# AST nodes that pull in other templates; flagged as ``import``.
+_IMPORT_NODES = (nodes.Import, nodes.FromImport, nodes.Include, nodes.Extends)
+
+_SCAN_MODES = ("text", "ast")
+
+_TEMPLATE_SCAN_MODE: str = os.getenv("TEMPLATE_SCAN_MODE", "text")
+
+_TEMPLATE_CACHE_SIZE: int = int(os.getenv("TEMPLATE_CACHE_SIZE", "512"))
+
+# Items between deadline checks when iterating a budgeted ``range`` or
+# ``{% for %}`` loop; every loop also checks before its first item.
+_RANGE_CHECK_INTERVAL: int = 1024
+
+# Filter wrapped around every ``{% for %}`` iterable at compile time.
+_BUDGETED_ITER_FILTER = "_budgeted_iter"
+
+# Shortest leading literal block marked as a cacheable prefix when a
+# template has no ``{% cache_break %}`` (about 1024 tokens, the minimum
+# Anthropic caches); 0 disables automatic marking.
+_PROMPT_CACHE_MIN_CHARS: int = int(
+    os.getenv("PROMPT_CACHE_MIN_CHARS", "4096")
+)
+
+# Private-use character marking the end of a cacheable prompt prefix.
+CACHE_BREAK = "\ue000"
+
+
+class RenderBudgetExceeded(ValueError):
+    """Raised when a render exceeds its CPU time or output size budget."""
+
+
+# Budget of the render running on the current thread, if any.
+_render_budget = threading.local()
+
+
+def _check_deadline() -> None:
+    """Raise if the current thread's render is past its CPU deadline.
+
+    Raises:
+        RenderBudgetExceeded: If the deadline has passed.
+    """
+    deadline: Optional[float] = getattr(_render_budget, "deadline", None)
+    if deadline is not None and time.thread_time() > deadline:
+        raise RenderBudgetExceeded(
+            f"Render exceeded CPU budget of {_render_budget.cpu_budget_s}s"
+        )
+
+
+def _deadline_checked(iterable: Iterable[Any]) -> Iterator[Any]:
+    """Iterate, checking the render deadline every few items."""
+    for count, value in enumerate(iterable):
+        if count % _RANGE_CHECK_INTERVAL == 0:
+            _check_deadline()
+        yield value
+
+
+def _budgeted_iter(iterable: Iterable[Any]) -> Iterable[Any]:
+    """Loop iterable that honours the active render budget."""
+    if getattr(_render_budget, "deadline", None) is None:
+        return iterable
+    return _deadline_checked(iterable)
+
+
+class _BudgetedRange(Sequence[int]):
+    """``range`` replacement that checks the render deadline as it runs."""
+
+    def __init__(self, rng: range) -> None:
+        self._range = rng
+
+    def __len__(self) -> int:
+        return len(self._range)
+
+    @overload
+    def __getitem__(self, index: int) -> int: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> Sequence[int]: ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        return self._range[index]
+
+    def __iter__(self) -> Iterator[int]:
+        return _deadline_checked(self._range)
+
+    def __repr__(self) -> str:
+        return repr(self._range)
+
+
+def _budgeted_range(*args: int) -> Sequence[int]:
+    """Sandbox-safe ``range`` that honours the active render budget."""
+    rng = safe_range(*args)
+    if getattr(_render_budget, "deadline", None) is None:
+        return rng
+    return _BudgetedRange(rng)
+
+
+class BudgetedSandboxedEnvironment(SandboxedEnvironment):
+    """Sandbox that enforces the active render's CPU and size budget.
+
+    Budgets are set per thread by ``render_compiled``; outside a
+    budgeted render the environment behaves like its parent.
+    """
+
+    intercepted_binops = frozenset(["*", "**"])
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.globals["range"] = _budgeted_range
+        self.filters[_BUDGETED_ITER_FILTER] = _budgeted_iter
+
+    def call(
+        __self,
+        __context: Context,
+        __obj: Any,
+        *args: Any,
+        **kwargs: Any,
+    ) -> Any:
+        """Call a function after checking the render deadline."""
+        _check_deadline()
+        return super().call(__context, __obj, *args, **kwargs)
+
+    def getattr(self, obj: Any, attribute: str) -> Any:
+        """Look up an attribute after checking the render deadline."""
+        _check_deadline()
+        return super().getattr(obj, attribute)
+
+    def getitem(self, obj: Any, argument: Any) -> Any:
+        """Subscript an object after checking the render deadline."""
+        _check_deadline()
+        return super().getitem(obj, argument)
+
+    def call_binop(
+        self, context: Context, operator: str, left: Any, right: Any
+    ) -> Any:
+        """Apply ``*``/``**`` unless the result would blow the budget."""
+        max_output: Optional[int] = getattr(
+            _render_budget, "max_output_chars", None
+        )
+        if max_output is not None and isinstance(right, int):
+            if (
+                operator == "*"
+                and isinstance(left, (str, list, tuple))
+                and len(left) * right > max_output
+            ):
+                raise RenderBudgetExceeded(
+                    f"Repeated sequence exceeds {max_output} characters"
+                )
+            if (
+                operator == "**"
+                and isinstance(left, int)
+                and abs(left) > 1
+                and left.bit_length() * right > max_output * 4
+            ):
+                raise RenderBudgetExceeded(
+                    f"Power result exceeds {max_output} characters"
+                )
+        return super().call_binop(context, operator, left, right)
+
+
+class CacheBreakExtension(Extension):
+    """``{% cache_break %}`` tag marking the end of a cacheable prefix.
+
+    The tag renders as ``CACHE_BREAK``.
+    """
+
+    tags = {"cache_break"}
+
+    def parse(self, parser: Parser) -> nodes.Node:
+        lineno = next(parser.stream).lineno
+        return nodes.Output([nodes.TemplateData(CACHE_BREAK)], lineno=lineno)
+
+
+def _strip_output_marker(value: Any) -> Any:
+    """Remove cache break markers from an expression's output value.
+
+    Only the ``{% cache_break %}`` tag may place the marker, so a
+    variable containing it cannot shift the cacheable prefix.
+    """
+    if isinstance(value, str):
+        return value.replace(CACHE_BREAK, "")
+    return value
+
+
+_sandbox_env = BudgetedSandboxedEnvironment(
     autoescape=True,
     keep_trailing_newline=True,
+    extensions=[CacheBreakExtension],
+    finalize=_strip_output_marker,
 )
 
 
-def validate_template(template: str) -> list[str]:
-    """Check a Jinja2 template for forbidden patterns and syntax errors.
+@dataclass
+class CompiledTemplate:
+    """A validated, compiled template ready for rendering.
+
+    Attributes:
+        source: Raw Jinja2 template string.
+        source_hash: SHA-256 hex digest of the template source.
+        template: Compiled Jinja2 template object.
+        complexity: Static cost estimate of the template.
+        required_variables: Variables a render must be given; see
+            ``missing_variables``.
+        static_prefix: Literal text every render starts with.
+    """
+
+    source: str
+    source_hash: str
+    template: Template
+    complexity: TemplateComplexity
+    required_variables: frozenset[str]
+    static_prefix: str = ""
+
+
+class TemplateCache:
+    """Bounded LRU cache of validated, compiled templates.
+
+    Entries are keyed by the SHA-256 digest of the template source, so
+    identical templates (including different prompt versions with the
+    same content) share one compiled object. Invalid templates are
+    never cached.
+
+    Args:
+        max_size: Maximum number of compiled templates to retain.
+    """
+
+    def __init__(self, max_size: int = _TEMPLATE_CACHE_SIZE) -> None:
+        self._max_size = max(1, max_size)
+        self._entries: OrderedDict[str, CompiledTemplate] = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, template: str) -> CompiledTemplate:
+        """Return the compiled template, compiling it on a cache miss.
+
+        Args:
+            template: Raw Jinja2 template string.
+
+        Returns:
+            The cached or newly compiled template.
+
+        Raises:
+            ValueError: If the template fails validation.
+        """
+        key = template_hash(template)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        entry = _compile(template, key)
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def lookup(self, key: str) -> Optional[CompiledTemplate]:
+        """Return a cached template by source hash, without compiling.
+
+        Args:
+            key: SHA-256 hex digest from ``template_hash``.
+
+        Returns:
+            The cached template, or None if it is not (or no longer)
+            cached.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return entry
+
+    def clear(self) -> None:
+        """Drop all cached templates and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> dict[str, int]:
+        """Return cache size and hit/miss/eviction counters.
+
+        Returns:
+            Dictionary of cache statistics.
+        """
+        return {
+            "size": len(self._entries),
+            "max_size": self._max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+_template_cache = TemplateCache()
+
+
+def template_hash(template: str) -> str:
+    """Compute the cache key for a template source.
 
     Args:
         template: Raw Jinja2 template string.
 
     Returns:
-        A list of validation error messages. Empty list means valid.
+        SHA-256 hex digest of the UTF-8 encoded template.
     """
-    errors: list[str] = []
-    for pattern in _FORBIDDEN_PATTERNS:
-        if pattern.search(template):
-            errors.append(
-                f"Forbidden pattern detected: '{pattern.pattern}'"
-            )
+    return hashlib.sha256(template.encode("utf-8")).hexdigest()
+
+
+def find_forbidden_patterns(text: str) -> list[str]:
+    """Find every distinct forbidden pattern in one pass over ``text``.
+
+    Args:
+        text: String to scan (template source or an identifier).
+
+    Returns:
+        Source strings of the matched patterns, in declaration order.
+    """
+    found: set[int] = set()
+    for match in _FORBIDDEN_SCANNER.finditer(text):
+        found.add(int(match.lastgroup[1:]))  # type: ignore[index]
+        if len(found) == len(_FORBIDDEN_PATTERNS):
+            break
+    return [_FORBIDDEN_PATTERNS[i].pattern for i in sorted(found)]
+
+
+def find_forbidden_nodes(ast: nodes.Template) -> list[str]:
+    """Find forbidden patterns among expressions in a parsed template.
+
+    Names, attribute names (including namespace assignments), filter
+    and test names, keyword arguments, macro and block names and string
+    constants inside expressions are checked; literal template text
+    such as "import the data" is not. Import, include and extends tags
+    count as ``import``.
+
+    Args:
+        ast: Template AST returned by ``SandboxedEnvironment.parse``.
+
+    Returns:
+        Source strings of the matched patterns, in declaration order.
+    """
+    identifiers: list[str] = []
+    for node in ast.find_all(
+        (
+            nodes.Name,
+            nodes.Getattr,
+            nodes.NSRef,
+            nodes.Filter,
+            nodes.Test,
+            nodes.Keyword,
+            nodes.Macro,
+            nodes.Block,
+            nodes.Const,
+            *_IMPORT_NODES,
+        )
+    ):
+        if isinstance(node, _IMPORT_NODES):
+            identifiers.append("import")
+        elif isinstance(node, nodes.NSRef):
+            identifiers.extend((node.name, node.attr))
+        elif isinstance(node, nodes.Getattr):
+            identifiers.append(node.attr)
+        elif isinstance(node, nodes.Keyword):
+            identifiers.append(node.key)
+        elif isinstance(node, nodes.Const):
+            if isinstance(node.value, str):
+                identifiers.append(node.value)
+        else:
+            identifiers.append(node.name)
+    return find_forbidden_patterns("\n".join(identifiers))
+
+
+def _check_template(
+    template: str, mode: Optional[str] = None
+) -> tuple[Optional[nodes.Template], list[str]]:
+    """Scan and parse a template, collecting validation errors.
+
+    Args:
+        template: Raw Jinja2 template string.
+        mode: ``"text"`` to scan the raw source or ``"ast"`` to scan
+            identifiers in the parsed template. Defaults to the
+            ``TEMPLATE_SCAN_MODE`` setting.
+
+    Returns:
+        Tuple of the parsed AST (None on syntax error) and the list of
+        validation error messages.
+
+    Raises:
+        ValueError: If ``mode`` is not a known scan mode.
+    """
+    mode = mode or _TEMPLATE_SCAN_MODE
+    if mode not in _SCAN_MODES:
+        raise ValueError(f"Unknown template scan mode: {mode}")
+
+    patterns: list[str] = []
+    if mode == "text":
+        patterns = find_forbidden_patterns(template)
+    errors = [
+        f"Forbidden pattern detected: '{pattern}'" for pattern in patterns
+    ]
     try:
-        _sandbox_env.parse(template)
+        ast = _sandbox_env.parse(template)
     except TemplateSyntaxError as exc:
         errors.append(f"Template syntax error: {exc}")
-    return errors
+        return None, errors
+    if mode == "ast":
+        errors = [
+            f"Forbidden pattern detected: '{pattern}'"
+            for pattern in find_forbidden_nodes(ast)
+        ]
+    return ast, errors
+
+
+def validate_template(template: str, mode: Optional[str] = None) -> list[str]:
+    """Check a Jinja2 template for forbidden patterns and syntax errors.
+
+    Args:
+        template: Raw Jinja2 template string.
+        mode: ``"text"`` or ``"ast"``; see ``find_forbidden_patterns``
+            and ``find_forbidden_nodes``. Defaults to the
+            ``TEMPLATE_SCAN_MODE`` setting.
+
+    Returns:
+        A list of validation error messages. Empty list means valid.
+    """
+    return _check_template(template, mode)[1]
+
+
+def _compile(template: str, source_hash: str) -> CompiledTemplate:
+    """Validate and compile a template without touching the cache.
+
+    The template is tokenized and parsed once; the resulting AST is
+    analysed, then instrumented for render budgets (see
+    ``_budget_loops``) and reused for code generation.
+
+    Args:
+        template: Raw Jinja2 template string.
+        source_hash: Precomputed content hash of the template.
+
+    Returns:
+        The compiled template.
+
+    Raises:
+        ValueError: If the template fails validation.
+    """
+    ast, errors = _check_template(template)
+    if errors or ast is None:
+        raise ValueError(
+            f"Template validation failed: {'; '.join(errors)}"
+        )
+    complexity = analyze_template(ast, _sandbox_env.globals)
+    required_variables = find_required_variables(ast, _sandbox_env.globals)
+    static_prefix = _static_prefix(ast)
+    code = _sandbox_env.compile(_budget_loops(ast))
+    return CompiledTemplate(
+        source=template,
+        source_hash=source_hash,
+        template=_sandbox_env.template_class.from_code(
+            _sandbox_env, code, _sandbox_env.make_globals(None)
+        ),
+        complexity=complexity,
+        required_variables=required_variables,
+        static_prefix=static_prefix,
+    )
+
+
+def _budget_loops(ast: nodes.Template) -> nodes.Template:
+    """Route every ``{% for %}`` iterable through the budget check.
+
+    Loops over context values (which ``range`` does not cover) then
+    check the render deadline too, so nested loops that produce no
+    output cannot run past the CPU budget.
+
+    Args:
+        ast: Parsed template; modified in place.
+
+    Returns:
+        The same AST.
+    """
+    for loop in list(ast.find_all(nodes.For)):
+        loop.iter = nodes.Filter(
+            loop.iter, _BUDGETED_ITER_FILTER, [], [], None, None
+        ).set_lineno(loop.lineno)
+    return ast
+
+
+def _static_prefix(ast: nodes.Template) -> str:
+    """Return the literal text at the start of a template's output.
+
+    Args:
+        ast: Parsed template.
+
+    Returns:
+        Concatenated leading template data, up to the first tag or
+        expression.
+    """
+    parts: list[str] = []
+    for node in ast.body:
+        if not isinstance(node, nodes.Output):
+            break
+        for child in node.nodes:
+            if not isinstance(child, nodes.TemplateData):
+                return "".join(parts)
+            parts.append(child.data)
+    return "".join(parts)
+
+
+def split_cache_prefix(text: str) -> tuple[str, str]:
+    """Split rendered prompt text at its last cache break.
+
+    Args:
+        text: Output of ``render_compiled``.
+
+    Returns:
+        Tuple of the cacheable prefix (empty if there is no break) and
+        the rest, both without markers.
+    """
+    index = text.rfind(CACHE_BREAK)
+    if index < 0:
+        return "", text
+    return strip_cache_break(text[:index]), text[index + 1:]
+
+
+def strip_cache_break(text: str) -> str:
+    """Remove cache break markers from rendered text.
+
+    Args:
+        text: Rendered text.
+
+    Returns:
+        The text without markers.
+    """
+    return text.replace(CACHE_BREAK, "")
+
+
+def compile_template(template: str) -> CompiledTemplate:
+    """Return a validated, compiled template from the shared cache.
+
+    Args:
+        template: Raw Jinja2 template string.
+
+    Returns:
+        The compiled template.
+
+    Raises:
+        ValueError: If the template contains forbidden patterns or
+            syntax errors.
+    """
+    return _template_cache.get(template)
+
+
+def cached_template(source_hash: str) -> Optional[CompiledTemplate]:
+    """Return a template from the shared cache by its source hash.
+
+    Args:
+        source_hash: SHA-256 hex digest from ``template_hash``.
+
+    Returns:
+        The compiled template, or None if it has been evicted.
+    """
+    return _template_cache.lookup(source_hash)
+
+
+def template_cache_stats() -> dict[str, int]:
+    """Return statistics for the shared compiled-template cache.
+
+    Returns:
+        Dictionary of cache statistics.
+    """
+    return _template_cache.stats()
+
+
+def missing_variables(
+    compiled: CompiledTemplate,
+    variables: dict[str, Any],
+    defaults: Optional[dict[str, Any]] = None,
+) -> list[str]:
+    """List required template variables absent from the inputs.
+
+    Uses the set precomputed at compile time, so the check costs a few
+    set lookups and no rendering.
+
+    Args:
+        compiled: Template returned by ``compile_template``.
+        variables: Dictionary of variable values to inject.
+        defaults: Optional default values for missing variables.
+
+    Returns:
+        Sorted names of the missing variables.
+    """
+    provided = set(variables)
+    if defaults:
+        provided.update(defaults)
+    return sorted(compiled.required_variables - provided)
+
+
+def render_compiled(
+    compiled: CompiledTemplate,
+    variables: dict[str, Any],
+    defaults: Optional[dict[str, Any]] = None,
+    cpu_budget_s: Optional[float] = None,
+    max_output_chars: Optional[int] = None,
+) -> str:
+    """Render an already validated and compiled template.
+
+    When a budget is given the template is rendered incrementally and
+    the budget is checked after every output chunk and by the budgeted
+    sandbox during evaluation, so a runaway loop is stopped part-way
+    instead of running to completion.
+
+    The output is meant for an LLM: it keeps ``{% cache_break %}``
+    markers and, for a template without one, marks a long enough
+    static prefix (see ``split_cache_prefix``).
+
+    Args:
+        compiled: Template returned by ``compile_template``.
+        variables: Dictionary of variable values to inject.
+        defaults: Optional default values for missing variables.
+        cpu_budget_s: Maximum CPU seconds the calling thread may spend.
+        max_output_chars: Maximum length of the rendered output.
+
+    Returns:
+        The rendered template string.
+
+    Raises:
+        RenderBudgetExceeded: If a budget is exceeded.
+    """
+    merged: dict[str, Any] = {}
+    if defaults:
+        merged.update(defaults)
+    merged.update(variables)
+
+    if cpu_budget_s is None and max_output_chars is None:
+        return _mark_static_prefix(
+            compiled, compiled.template.render(**merged)
+        )
+
+    _render_budget.cpu_budget_s = cpu_budget_s
+    _render_budget.deadline = (
+        time.thread_time() + cpu_budget_s
+        if cpu_budget_s is not None
+        else None
+    )
+    _render_budget.max_output_chars = max_output_chars
+    try:
+        chunks: list[str] = []
+        size = 0
+        for chunk in compiled.template.generate(**merged):
+            chunks.append(chunk)
+            size += len(chunk)
+            if max_output_chars is not None and size > max_output_chars:
+                raise RenderBudgetExceeded(
+                    f"Rendered output exceeds {max_output_chars} characters"
+                )
+            _check_deadline()
+    finally:
+        _render_budget.deadline = None
+        _render_budget.max_output_chars = None
+    return _mark_static_prefix(compiled, "".join(chunks))
+
+
+def _mark_static_prefix(compiled: CompiledTemplate, rendered: str) -> str:
+    """Insert a cache break after a long static prefix, if unmarked.
+
+    Args:
+        compiled: The rendered template.
+        rendered: Its output.
+
+    Returns:
+        The output, with a marker after the static prefix if the
+        template has no explicit cache break and the prefix is at
+        least ``PROMPT_CACHE_MIN_CHARS`` long.
+    """
+    prefix = compiled.static_prefix
+    if (
+        not _PROMPT_CACHE_MIN_CHARS
+        or len(prefix) < _PROMPT_CACHE_MIN_CHARS
+        or CACHE_BREAK in rendered
+        or not rendered.startswith(prefix)
+    ):
+        return rendered
+    return prefix + CACHE_BREAK + rendered[len(prefix):]
 
 
 def render_template(
@@ -54,6 +775,8 @@ def render_template(
     """Render a Jinja2 template safely using SandboxedEnvironment.
 
     Missing optional variables are filled from ``defaults`` if provided.
+    The template is validated and compiled only on the first call;
+    later calls with the same source reuse the cached compiled template.
 
     Args:
         template: Jinja2 template string.
@@ -64,19 +787,55 @@ def render_template(
         The rendered template string.
 
     Raises:
-        ValueError: If the template contains forbidden patterns.
-        jinja2.TemplateSyntaxError: If the template has syntax errors.
+        ValueError: If the template contains forbidden patterns or
+            syntax errors.
     """
-    errors = validate_template(template)
-    if errors:
-        raise ValueError(
-            f"Template validation failed: {'; '.join(errors)}"
-        )
+    return strip_cache_break(
+        render_compiled(compile_template(template), variables, defaults)
+    )
 
-    merged: dict[str, Any] = {}
-    if defaults:
-        merged.update(defaults)
-    merged.update(variables)
 
-    jinja_template = _sandbox_env.from_string(template)
-    return jinja_template.render(**merged)
+def render_many(
+    template: str,
+    variables_iter: Iterable[dict[str, Any]],
+    defaults: Optional[dict[str, Any]] = None,
+    return_exceptions: bool = False,
+    cpu_budget_s: Optional[float] = None,
+    max_output_chars: Optional[int] = None,
+) -> Iterator[Union[str, Exception]]:
+    """Render one template against many variable sets.
+
+    The template is validated and compiled once up front, so an invalid
+    template fails before any output is produced. Results are yielded
+    in input order.
+
+    Args:
+        template: Jinja2 template string.
+        variables_iter: Iterable of variable dictionaries.
+        defaults: Optional default values for missing variables.
+        return_exceptions: Yield a failing row's exception instead of
+            raising it and stopping the batch.
+        cpu_budget_s: Maximum CPU seconds per row.
+        max_output_chars: Maximum length of each rendered row.
+
+    Yields:
+        Rendered strings (or exceptions, see ``return_exceptions``).
+
+    Raises:
+        ValueError: If the template contains forbidden patterns or
+            syntax errors.
+    """
+    compiled = compile_template(template)
+    budget = {
+        "cpu_budget_s": cpu_budget_s,
+        "max_output_chars": max_output_chars,
+    }
+    for variables in variables_iter:
+        try:
+            yield strip_cache_break(
+                render_compiled(compiled, variables, defaults, **budget)
+            )
+        except Exception as exc:
+            if not return_exceptions:
+                raise
+            yield exc
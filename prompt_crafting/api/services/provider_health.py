@@ -0,0 +1,343 @@
+"""Per-provider health tracking and circuit breaking for LLM calls.
+
+Each (provider, model) pair keeps a rolling window of recent call
+outcomes and latencies, and a circuit breaker. When the error rate in
+the window crosses a threshold, or (optionally) the p95 latency of its
+successful calls does, the circuit opens and calls fail fast instead
+of waiting on timeouts; after a cool-down a limited number of
+half-open probe calls decide whether to close it again. Only the
+``LLM_HEALTH_MAX_MODELS`` most recently used pairs are tracked, since
+model names come from requests.
+"""
+
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from collections.abc import Callable
+from typing import Any, Optional
+
+_BREAKER_WINDOW: int = int(os.getenv("LLM_BREAKER_WINDOW", "50"))
+_BREAKER_MIN_CALLS: int = int(os.getenv("LLM_BREAKER_MIN_CALLS", "10"))
+_BREAKER_ERROR_RATE: float = float(os.getenv("LLM_BREAKER_ERROR_RATE", "0.5"))
+_BREAKER_OPEN_S: float = float(os.getenv("LLM_BREAKER_OPEN_S", "30"))
+_BREAKER_HALF_OPEN_PROBES: int = int(
+    os.getenv("LLM_BREAKER_HALF_OPEN_PROBES", "1")
+)
+_BREAKER_P95_MS: float = float(os.getenv("LLM_BREAKER_P95_MS", "0"))
+_HEALTH_MAX_MODELS: int = int(os.getenv("LLM_HEALTH_MAX_MODELS", "256"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because its circuit is open.
+
+    Attributes:
+        provider: LLM provider name.
+        model: Model identifier.
+        retry_after_s: Seconds until the circuit admits a probe.
+    """
+
+    def __init__(
+        self, provider: str, model: str, retry_after_s: float
+    ) -> None:
+        self.provider = provider
+        self.model = model
+        self.retry_after_s = retry_after_s
+        super().__init__(
+            f"Circuit open for {provider}/{model}; "
+            f"retry in {retry_after_s:.0f}s"
+        )
+
+
+def _percentile(ordered: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[rank - 1]
+
+
+class ProviderStats:
+    """Rolling window of call outcomes and latencies.
+
+    Args:
+        window: Number of most recent calls kept.
+    """
+
+    def __init__(self, window: int = _BREAKER_WINDOW) -> None:
+        self._calls: deque[tuple[float, bool]] = deque(maxlen=window)
+        self.total_calls = 0
+        self.total_errors = 0
+
+    def record(self, latency_ms: float, ok: bool) -> None:
+        """Record the outcome of one call.
+
+        Args:
+            latency_ms: Call latency in milliseconds.
+            ok: Whether the call succeeded.
+        """
+        self._calls.append((latency_ms, ok))
+        self.total_calls += 1
+        if not ok:
+            self.total_errors += 1
+
+    def reset(self) -> None:
+        """Forget the window (lifetime totals are kept)."""
+        self._calls.clear()
+
+    @property
+    def count(self) -> int:
+        """Number of calls in the window."""
+        return len(self._calls)
+
+    @property
+    def successes(self) -> int:
+        """Number of successful calls in the window."""
+        return sum(ok for _, ok in self._calls)
+
+    @property
+    def error_rate(self) -> float:
+        """Fraction of failed calls in the window."""
+        if not self._calls:
+            return 0.0
+        return sum(not ok for _, ok in self._calls) / len(self._calls)
+
+    def latency_percentile(self, fraction: float) -> Optional[float]:
+        """Latency percentile of successful calls in the window.
+
+        Args:
+            fraction: Percentile as a fraction, e.g. 0.95.
+
+        Returns:
+            Latency in milliseconds, or None without successful calls.
+        """
+        ordered = sorted(ms for ms, ok in self._calls if ok)
+        if not ordered:
+            return None
+        return _percentile(ordered, fraction)
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return the window statistics.
+
+        Returns:
+            Dictionary with call counts, error rate and p50/p95 latency.
+        """
+        return {
+            "window_calls": self.count,
+            "error_rate": round(self.error_rate, 4),
+            "p50_ms": self.latency_percentile(0.5),
+            "p95_ms": self.latency_percentile(0.95),
+            "total_calls": self.total_calls,
+            "total_errors": self.total_errors,
+        }
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker driven by a ProviderStats window.
+
+    Args:
+        stats: Rolling statistics the breaker evaluates.
+        min_calls: Calls required in the window before it can open.
+        error_rate: Error rate at or above which it opens.
+        p95_ms: p95 latency of successful calls at or above which it
+            opens; 0 disables the latency check. A probe slower than
+            this counts as failed.
+        open_s: Seconds to stay open before admitting probes.
+        half_open_probes: Concurrent probe calls allowed when half-open.
+        clock: Monotonic time source (injectable for tests).
+    """
+
+    def __init__(
+        self,
+        stats: ProviderStats,
+        min_calls: int = _BREAKER_MIN_CALLS,
+        error_rate: float = _BREAKER_ERROR_RATE,
+        p95_ms: float = _BREAKER_P95_MS,
+        open_s: float = _BREAKER_OPEN_S,
+        half_open_probes: int = _BREAKER_HALF_OPEN_PROBES,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._stats = stats
+        self._min_calls = min_calls
+        self._error_rate = error_rate
+        self._p95_ms = p95_ms
+        self._open_s = open_s
+        self._half_open_probes = max(1, half_open_probes)
+        self._clock = clock
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        """Current state, moving from open to half-open when due."""
+        if (
+            self._state == OPEN
+            and self._clock() - self._opened_at >= self._open_s
+        ):
+            self._state = HALF_OPEN
+            self._probes = 0
+        return self._state
+
+    def retry_after(self) -> float:
+        """Seconds until an open circuit admits a probe."""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self._open_s - (self._clock() - self._opened_at))
+
+    def allow(self) -> bool:
+        """Admit a call, taking a probe slot when half-open.
+
+        Returns:
+            False if the call must be rejected.
+        """
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and self._probes < self._half_open_probes:
+            self._probes += 1
+            return True
+        return False
+
+    def release(self) -> None:
+        """Return an admitted call's probe slot without an outcome.
+
+        Used for calls abandoned by the caller (e.g. cancelled), which
+        say nothing about the provider's health.
+        """
+        if self._state == HALF_OPEN:
+            self._probes = max(0, self._probes - 1)
+
+    def record(self, latency_ms: float, ok: bool) -> None:
+        """Record an admitted call's outcome and update the state.
+
+        Args:
+            latency_ms: Call latency in milliseconds.
+            ok: Whether the call succeeded.
+        """
+        if self._state == HALF_OPEN:
+            self._probes = max(0, self._probes - 1)
+            if ok and not (self._p95_ms and latency_ms >= self._p95_ms):
+                self._state = CLOSED
+                self._stats.reset()
+            else:
+                self._trip()
+            self._stats.record(latency_ms, ok)
+            return
+        self._stats.record(latency_ms, ok)
+        if (
+            self._state == CLOSED
+            and self._stats.count >= self._min_calls
+            and (
+                self._stats.error_rate >= self._error_rate or self._too_slow()
+            )
+        ):
+            self._trip()
+
+    def _too_slow(self) -> bool:
+        """Whether the window's p95 latency is over the threshold."""
+        if not self._p95_ms:
+            return False
+        p95_ms = self._stats.latency_percentile(0.95)
+        return p95_ms is not None and p95_ms >= self._p95_ms
+
+    def _trip(self) -> None:
+        """Open the circuit."""
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self.times_opened += 1
+
+
+class ProviderHealth:
+    """Stats and circuit breakers keyed by (provider, model).
+
+    Args:
+        max_entries: Most (provider, model) pairs tracked; the least
+            recently used pair is forgotten beyond this.
+        clock: Monotonic time source passed to every breaker.
+        breaker_options: Keyword arguments for each CircuitBreaker.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = _HEALTH_MAX_MODELS,
+        clock: Callable[[], float] = time.monotonic,
+        **breaker_options: Any,
+    ) -> None:
+        self._max_entries = max(1, max_entries)
+        self._clock = clock
+        self._breaker_options = breaker_options
+        self._entries: OrderedDict[
+            tuple[str, str], tuple[ProviderStats, CircuitBreaker]
+        ] = OrderedDict()
+        self.evictions = 0
+
+    def _entry(
+        self, provider: str, model: str
+    ) -> tuple[ProviderStats, CircuitBreaker]:
+        key = (provider, model)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry
+        stats = ProviderStats()
+        breaker = CircuitBreaker(
+            stats, clock=self._clock, **self._breaker_options
+        )
+        entry = self._entries[key] = (stats, breaker)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return entry
+
+    def stats(self, provider: str, model: str) -> ProviderStats:
+        """Return the rolling statistics for a model."""
+        return self._entry(provider, model)[0]
+
+    def breaker(self, provider: str, model: str) -> CircuitBreaker:
+        """Return the circuit breaker for a model."""
+        return self._entry(provider, model)[1]
+
+    def acquire(self, provider: str, model: str) -> None:
+        """Admit a call or fail fast.
+
+        Args:
+            provider: LLM provider name.
+            model: Model identifier.
+
+        Raises:
+            CircuitOpenError: If the model's circuit rejects the call.
+        """
+        breaker = self.breaker(provider, model)
+        if not breaker.allow():
+            raise CircuitOpenError(provider, model, breaker.retry_after())
+
+    def record(
+        self, provider: str, model: str, latency_ms: float, ok: bool
+    ) -> None:
+        """Record the outcome of an admitted call."""
+        self.breaker(provider, model).record(latency_ms, ok)
+
+    def release(self, provider: str, model: str) -> None:
+        """Release an admitted call that ended without an outcome."""
+        self.breaker(provider, model).release()
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        """Return state and statistics for every tracked model.
+
+        Returns:
+            Dictionary keyed by ``"provider/model"``.
+        """
+        return {
+            f"{provider}/{model}": {
+                "state": breaker.state,
+                "times_opened": breaker.times_opened,
+                **stats.snapshot(),
+            }
+            for (provider, model), (stats, breaker) in sorted(
+                self._entries.items()
+            )
+        }
@@ -0,0 +1,759 @@
+"""Provider adapters for the LLM client.
+
+An adapter knows one provider's API: its endpoint, authentication
+headers, request payload and response format. The endpoint URL and
+headers (API key included) are built once when the adapter is
+created, so a call only builds its payload. Adapters declare what they
+support (``streaming``, ``batching``, ``caching``) and are looked up by
+provider name in a registry, so adding a provider means registering an
+adapter rather than editing the client. Adapters with ``batching``
+also submit requests to, and collect results from, the provider's
+asynchronous batch API.
+
+Bundled adapters:
+
+    - ``anthropic``: Anthropic Messages API, with prompt caching of a
+      prefix marked by a cache break, and the Message Batches API.
+    - ``openai``: OpenAI Chat Completions API and the Batch API.
+    - ``mock``: a local stand-in answering in-process with no network,
+      for load tests of the full client pipeline. It is only registered
+      when ``LLM_ENABLE_MOCK=true``, so production deployments cannot
+      store free fake executions. Its latency is set by
+      ``LLM_MOCK_LATENCY_MS``; its batches end once that much time has
+      passed.
+
+Adapters return plain text and usage dictionaries, so they stay
+independent of the client module.
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from typing import Any, Optional, Union
+
+import httpx
+
+from prompt_crafting.api.services.prompt_engine import (
+    split_cache_prefix,
+    strip_cache_break,
+)
+from prompt_crafting.api.services.token_estimator import count_tokens
+
+_ANTHROPIC_BASE_URL: str = os.getenv(
+    "LLM_ANTHROPIC_BASE_URL", "https://api.anthropic.com"
+)
+_OPENAI_BASE_URL: str = os.getenv(
+    "LLM_OPENAI_BASE_URL", "https://api.openai.com"
+)
+_ENABLE_MOCK: bool = os.getenv("LLM_ENABLE_MOCK", "false").lower() == "true"
+_MOCK_LATENCY_MS: float = float(os.getenv("LLM_MOCK_LATENCY_MS", "0"))
+
+STREAMING = "streaming"
+BATCHING = "batching"
+CACHING = "caching"
+
+# Token counts by ``LLMResponse`` field name.
+Usage = dict[str, int]
+
+# OpenAI batch statuses after which no more results will appear.
+_OPENAI_BATCH_ENDED = frozenset(
+    {"completed", "failed", "expired", "cancelled"}
+)
+
+
+class UnsupportedOperation(ValueError):
+    """Raised when an adapter is asked for a feature it does not have."""
+
+
+@dataclass
+class BatchRequest:
+    """One request in a provider batch.
+
+    Attributes:
+        custom_id: Identifier matching the request to its result.
+        prompt: Rendered prompt, possibly with a cache break.
+        model: Model identifier.
+        max_tokens: Maximum response tokens.
+        temperature: Sampling temperature.
+    """
+
+    custom_id: str
+    prompt: str
+    model: str
+    max_tokens: int
+    temperature: float
+
+
+@dataclass
+class BatchResult:
+    """Outcome of one request in an ended provider batch.
+
+    Attributes:
+        custom_id: Identifier of the request.
+        text: Response text, or None if the request failed.
+        usage: Token usage of a successful request.
+        error: Failure description for failed requests.
+    """
+
+    custom_id: str
+    text: Optional[str] = None
+    usage: Usage = field(default_factory=dict)
+    error: Optional[str] = None
+
+
+class ProviderAdapter(ABC):
+    """Request building and response parsing for one LLM API.
+
+    Subclasses set ``name``, ``capabilities`` and ``path`` and implement
+    the abstract ``payload``, ``parse`` and ``parse_event`` hooks.
+    Adapters with the ``batching`` capability also override
+    ``submit_batch`` and ``fetch_batch``.
+
+    Attributes:
+        name: Provider name used in requests and the registry.
+        capabilities: Features the provider supports.
+        url: Full endpoint URL.
+        headers: Prebuilt HTTP headers, including authentication.
+    """
+
+    name: str = ""
+    capabilities: frozenset[str] = frozenset()
+    path: str = ""
+
+    def __init__(self, base_url: str, headers: dict[str, str]) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.url = self.base_url + self.path
+        self.headers = headers
+
+    @abstractmethod
+    def payload(
+        self,
+        prompt: str,
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        stream: bool = False,
+    ) -> dict[str, Any]:
+        """Build the JSON request body for one call.
+
+        Args:
+            prompt: Rendered prompt, possibly with a cache break.
+            model: Model identifier.
+            max_tokens: Maximum response tokens.
+            temperature: Sampling temperature.
+            stream: Request a server-sent event stream.
+
+        Returns:
+            The request body.
+        """
+
+    @abstractmethod
+    def parse(self, data: Mapping[str, Any]) -> tuple[str, Usage]:
+        """Extract the text and usage from a buffered response.
+
+        Args:
+            data: Parsed JSON response.
+
+        Returns:
+            Tuple of the response text and its usage.
+        """
+
+    @abstractmethod
+    def parse_event(self, event: Mapping[str, Any], usage: Usage) -> str:
+        """Handle one streamed event.
+
+        Args:
+            event: Parsed ``data:`` payload of a server-sent event.
+            usage: Usage so far, updated in place.
+
+        Returns:
+            Text generated by the event (empty if none).
+
+        Raises:
+            httpx.HTTPError: If the event reports a stream error.
+        """
+
+    async def submit_batch(
+        self, client: httpx.AsyncClient, requests: list[BatchRequest]
+    ) -> str:
+        """Submit requests to the provider's batch API.
+
+        Only adapters with the ``batching`` capability implement this.
+
+        Args:
+            client: HTTP client to send with.
+            requests: Requests to run as one batch.
+
+        Returns:
+            The provider's batch id.
+
+        Raises:
+            httpx.HTTPStatusError: If the provider rejects the batch.
+            UnsupportedOperation: If the adapter has no batch API.
+        """
+        raise UnsupportedOperation(f"Provider {self.name} has no batch API")
+
+    async def fetch_batch(
+        self, client: httpx.AsyncClient, batch_id: str
+    ) -> Optional[list[BatchResult]]:
+        """Check a batch and download its results once it has ended.
+
+        Args:
+            client: HTTP client to send with.
+            batch_id: Id returned by ``submit_batch``.
+
+        Returns:
+            Results for the requests that have one, or None while the
+            batch is still processing.
+
+        Raises:
+            httpx.HTTPError: If the status or results cannot be read,
+                or the whole batch failed.
+            UnsupportedOperation: If the adapter has no batch API.
+        """
+        raise UnsupportedOperation(f"Provider {self.name} has no batch API")
+
+    def transport(self) -> Optional[httpx.AsyncBaseTransport]:
+        """Return a transport to mount for ``base_url``, if any.
+
+        Returns:
+            None for adapters that talk to a real server.
+        """
+        return None
+
+    async def _get(
+        self, client: httpx.AsyncClient, url: str
+    ) -> httpx.Response:
+        """GET a URL with the adapter's headers, raising on errors."""
+        response = await client.get(url, headers=self.headers)
+        response.raise_for_status()
+        return response
+
+
+class AnthropicAdapter(ProviderAdapter):
+    """Anthropic Messages API.
+
+    A prompt prefix marked with a cache break is sent as its own
+    content block with ``cache_control``.
+
+    Args:
+        api_key: Anthropic API key (default: ``ANTHROPIC_API_KEY``).
+        base_url: API base URL (default: ``LLM_ANTHROPIC_BASE_URL``).
+    """
+
+    name = "anthropic"
+    capabilities = frozenset({STREAMING, BATCHING, CACHING})
+    path = "/v1/messages"
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: str = _ANTHROPIC_BASE_URL,
+    ) -> None:
+        if api_key is None:
+            api_key = os.getenv("ANTHROPIC_API_KEY", "")
+        super().__init__(
+            base_url,
+            {
+                "x-api-key": api_key,
+                "anthropic-version": "2023-06-01",
+                "content-type": "application/json",
+            },
+        )
+
+    def payload(
+        self,
+        prompt: str,
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        stream: bool = False,
+    ) -> dict[str, Any]:
+        payload: dict[str, Any] = {
+            "model": model,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "messages": [
+                {"role": "user", "content": _anthropic_content(prompt)}
+            ],
+        }
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    def parse(self, data: Mapping[str, Any]) -> tuple[str, Usage]:
+        text = data.get("content", [{}])[0].get("text", "")
+        return text, _anthropic_usage(data.get("usage", {}))
+
+    def parse_event(self, event: Mapping[str, Any], usage: Usage) -> str:
+        event_type = event.get("type")
+        if event_type == "message_start":
+            usage.update(
+                _anthropic_usage(event.get("message", {}).get("usage", {}))
+            )
+        elif event_type == "content_block_delta":
+            return event.get("delta", {}).get("text", "")
+        elif event_type == "message_delta":
+            usage["output_tokens"] = event.get("usage", {}).get(
+                "output_tokens", usage.get("output_tokens", 0)
+            )
+        elif event_type == "error":
+            raise httpx.HTTPError(
+                event.get("error", {}).get("message", "stream error")
+            )
+        return ""
+
+    async def submit_batch(
+        self, client: httpx.AsyncClient, requests: list[BatchRequest]
+    ) -> str:
+        response = await client.post(
+            self.base_url + "/v1/messages/batches",
+            headers=self.headers,
+            json={
+                "requests": [
+                    {
+                        "custom_id": request.custom_id,
+                        "params": self.payload(
+                            request.prompt,
+                            request.model,
+                            request.max_tokens,
+                            request.temperature,
+                        ),
+                    }
+                    for request in requests
+                ]
+            },
+        )
+        response.raise_for_status()
+        return response.json()["id"]
+
+    async def fetch_batch(
+        self, client: httpx.AsyncClient, batch_id: str
+    ) -> Optional[list[BatchResult]]:
+        response = await self._get(
+            client, f"{self.base_url}/v1/messages/batches/{batch_id}"
+        )
+        batch = response.json()
+        if batch.get("processing_status") != "ended":
+            return None
+        response = await self._get(client, batch["results_url"])
+        results = []
+        for line in _jsonl(response.text):
+            result = line.get("result") or {}
+            if result.get("type") == "succeeded":
+                text, usage = self.parse(result.get("message") or {})
+                results.append(BatchResult(line["custom_id"], text, usage))
+                continue
+            error = (result.get("error") or {}).get("error") or {}
+            results.append(
+                BatchResult(
+                    line["custom_id"],
+                    error=error.get("message")
+                    or f"Request {result.get('type', 'failed')}",
+                )
+            )
+        return results
+
+
+class OpenAIAdapter(ProviderAdapter):
+    """OpenAI Chat Completions API.
+
+    OpenAI caches prompt prefixes automatically, so cache breaks are
+    stripped and cached tokens are read from the usage.
+
+    Args:
+        api_key: OpenAI API key (default: ``OPENAI_API_KEY``).
+        base_url: API base URL (default: ``LLM_OPENAI_BASE_URL``).
+    """
+
+    name = "openai"
+    capabilities = frozenset({STREAMING, BATCHING, CACHING})
+    path = "/v1/chat/completions"
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: str = _OPENAI_BASE_URL,
+    ) -> None:
+        if api_key is None:
+            api_key = os.getenv("OPENAI_API_KEY", "")
+        super().__init__(
+            base_url,
+            {
+                "Authorization": f"Bearer {api_key}",
+                "Content-Type": "application/json",
+            },
+        )
+
+    def payload(
+        self,
+        prompt: str,
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        stream: bool = False,
+    ) -> dict[str, Any]:
+        payload: dict[str, Any] = {
+            "model": model,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "messages": [
+                {"role": "user", "content": strip_cache_break(prompt)}
+            ],
+        }
+        if stream:
+            payload["stream"] = True
+            payload["stream_options"] = {"include_usage": True}
+        return payload
+
+    def parse(self, data: Mapping[str, Any]) -> tuple[str, Usage]:
+        choices = data.get("choices", [{}])
+        text = choices[0].get("message", {}).get("content", "")
+        return text, _openai_usage(data.get("usage", {}))
+
+    def parse_event(self, event: Mapping[str, Any], usage: Usage) -> str:
+        if event.get("usage"):
+            usage.update(_openai_usage(event["usage"]))
+        return "".join(
+            (choice.get("delta") or {}).get("content") or ""
+            for choice in event.get("choices") or []
+        )
+
+    async def submit_batch(
+        self, client: httpx.AsyncClient, requests: list[BatchRequest]
+    ) -> str:
+        lines = [
+            json.dumps(
+                {
+                    "custom_id": request.custom_id,
+                    "method": "POST",
+                    "url": self.path,
+                    "body": self.payload(
+                        request.prompt,
+                        request.model,
+                        request.max_tokens,
+                        request.temperature,
+                    ),
+                }
+            )
+            for request in requests
+        ]
+        upload = await client.post(
+            self.base_url + "/v1/files",
+            headers={"Authorization": self.headers["Authorization"]},
+            data={"purpose": "batch"},
+            files={
+                "file": (
+                    "batch.jsonl",
+                    "\n".join(lines).encode("utf-8"),
+                    "application/jsonl",
+                )
+            },
+        )
+        upload.raise_for_status()
+        response = await client.post(
+            self.base_url + "/v1/batches",
+            headers=self.headers,
+            json={
+                "input_file_id": upload.json()["id"],
+                "endpoint": self.path,
+                "completion_window": "24h",
+            },
+        )
+        response.raise_for_status()
+        return response.json()["id"]
+
+    async def fetch_batch(
+        self, client: httpx.AsyncClient, batch_id: str
+    ) -> Optional[list[BatchResult]]:
+        response = await self._get(
+            client, f"{self.base_url}/v1/batches/{batch_id}"
+        )
+        batch = response.json()
+        status = batch.get("status")
+        if status not in _OPENAI_BATCH_ENDED:
+            return None
+        if status == "failed":
+            errors = (batch.get("errors") or {}).get("data") or [{}]
+            raise httpx.HTTPError(
+                errors[0].get("message") or f"Batch {batch_id} failed"
+            )
+        results = []
+        for file_key in ("output_file_id", "error_file_id"):
+            file_id = batch.get(file_key)
+            if not file_id:
+                continue
+            response = await self._get(
+                client, f"{self.base_url}/v1/files/{file_id}/content"
+            )
+            for line in _jsonl(response.text):
+                reply = line.get("response") or {}
+                body = reply.get("body") or {}
+                if reply.get("status_code") == 200:
+                    text, usage = self.parse(body)
+                    results.append(BatchResult(line["custom_id"], text, usage))
+                    continue
+                error = line.get("error") or body.get("error") or {}
+                results.append(
+                    BatchResult(
+                        line["custom_id"],
+                        error=error.get("message") or "Request failed",
+                    )
+                )
+        return results
+
+
+class MockAdapter(ProviderAdapter):
+    """Local stand-in provider answering without network access.
+
+    Requests go through the client's full pipeline (quotas, limiters,
+    circuit breakers, retries) to an in-process transport that waits
+    ``latency_ms`` and answers with a short deterministic text. Usage
+    is estimated with the local token estimator, and the mock has no
+    price, so calls cost nothing. Batches are answered the same way and
+    end ``latency_ms`` after they are submitted.
+
+    Args:
+        latency_ms: Simulated response time per call.
+    """
+
+    name = "mock"
+    capabilities = frozenset({STREAMING, BATCHING})
+    path = "/v1/complete"
+
+    def __init__(self, latency_ms: float = _MOCK_LATENCY_MS) -> None:
+        super().__init__(
+            "http://mock-llm.local", {"content-type": "application/json"}
+        )
+        self.latency_ms = latency_ms
+        self._batch_ids = itertools.count(1)
+        # Batch id -> (submission time, results).
+        self._batches: dict[str, tuple[float, list[dict[str, Any]]]] = {}
+
+    def payload(
+        self,
+        prompt: str,
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        stream: bool = False,
+    ) -> dict[str, Any]:
+        return {
+            "model": model,
+            "prompt": strip_cache_break(prompt),
+            "max_tokens": max_tokens,
+            "stream": stream,
+        }
+
+    def parse(self, data: Mapping[str, Any]) -> tuple[str, Usage]:
+        return data.get("text", ""), dict(data.get("usage", {}))
+
+    def parse_event(self, event: Mapping[str, Any], usage: Usage) -> str:
+        usage.update(event.get("usage") or {})
+        return event.get("text", "")
+
+    async def submit_batch(
+        self, client: httpx.AsyncClient, requests: list[BatchRequest]
+    ) -> str:
+        response = await client.post(
+            self.base_url + "/v1/batches",
+            headers=self.headers,
+            json={
+                "requests": [
+                    {
+                        "custom_id": request.custom_id,
+                        **self.payload(
+                            request.prompt,
+                            request.model,
+                            request.max_tokens,
+                            request.temperature,
+                        ),
+                    }
+                    for request in requests
+                ]
+            },
+        )
+        response.raise_for_status()
+        return response.json()["id"]
+
+    async def fetch_batch(
+        self, client: httpx.AsyncClient, batch_id: str
+    ) -> Optional[list[BatchResult]]:
+        response = await self._get(
+            client, f"{self.base_url}/v1/batches/{batch_id}"
+        )
+        batch = response.json()
+        if batch["status"] != "ended":
+            return None
+        return [
+            BatchResult(result["custom_id"], result["text"], result["usage"])
+            for result in batch["results"]
+        ]
+
+    def transport(self) -> httpx.AsyncBaseTransport:
+        return httpx.MockTransport(self._handle)
+
+    def _answer(self, body: Mapping[str, Any]) -> tuple[list[str], Usage]:
+        """Return the words and usage answering one request body."""
+        input_tokens = count_tokens(body["prompt"], self.name)
+        words = [f"token{i}" for i in range(min(body["max_tokens"], 16))]
+        return words, {
+            "input_tokens": input_tokens,
+            "output_tokens": len(words),
+        }
+
+    async def _handle(self, request: httpx.Request) -> httpx.Response:
+        """Answer one request after the simulated latency."""
+        if request.url.path.startswith("/v1/batches"):
+            return self._handle_batch(request)
+        body = json.loads(request.content)
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        words, usage = self._answer(body)
+        if not body.get("stream"):
+            return httpx.Response(
+                200, json={"text": " ".join(words), "usage": usage}
+            )
+        events = [{"text": f"{word} "} for word in words]
+        events.append({"usage": usage})
+        stream = "".join(f"data: {json.dumps(e)}\n\n" for e in events)
+        return httpx.Response(
+            200,
+            content=stream + "data: [DONE]\n\n",
+            headers={"content-type": "text/event-stream"},
+        )
+
+    def _handle_batch(self, request: httpx.Request) -> httpx.Response:
+        """Create a batch, or report one and its results once ended."""
+        if request.method == "POST":
+            batch_id = f"batch-{next(self._batch_ids)}"
+            results = []
+            for body in json.loads(request.content)["requests"]:
+                words, usage = self._answer(body)
+                results.append(
+                    {
+                        "custom_id": body["custom_id"],
+                        "text": " ".join(words),
+                        "usage": usage,
+                    }
+                )
+            self._batches[batch_id] = (time.monotonic(), results)
+            return httpx.Response(
+                200, json={"id": batch_id, "status": "in_progress"}
+            )
+        batch_id = request.url.path.rsplit("/", 1)[-1]
+        if batch_id not in self._batches:
+            return httpx.Response(404, json={"error": "unknown batch"})
+        submitted, results = self._batches[batch_id]
+        if time.monotonic() - submitted < self.latency_ms / 1000:
+            return httpx.Response(
+                200, json={"id": batch_id, "status": "in_progress"}
+            )
+        del self._batches[batch_id]
+        return httpx.Response(
+            200,
+            json={"id": batch_id, "status": "ended", "results": results},
+        )
+
+
+def _anthropic_content(prompt: str) -> Union[str, list[dict[str, Any]]]:
+    """Build Anthropic message content, caching a marked prefix.
+
+    Args:
+        prompt: Rendered prompt, possibly with a cache break marker.
+
+    Returns:
+        The plain prompt, or text blocks whose first block (the prefix)
+        carries ``cache_control``.
+    """
+    prefix, rest = split_cache_prefix(prompt)
+    if not prefix:
+        return rest
+    blocks: list[dict[str, Any]] = [
+        {
+            "type": "text",
+            "text": prefix,
+            "cache_control": {"type": "ephemeral"},
+        }
+    ]
+    if rest:
+        blocks.append({"type": "text", "text": rest})
+    return blocks
+
+
+def _anthropic_usage(usage: Mapping[str, Any]) -> Usage:
+    """Map Anthropic usage fields to ``LLMResponse`` token fields."""
+    return {
+        "input_tokens": usage.get("input_tokens", 0),
+        "output_tokens": usage.get("output_tokens", 0),
+        "cache_read_tokens": usage.get("cache_read_input_tokens") or 0,
+        "cache_write_tokens": (usage.get("cache_creation_input_tokens") or 0),
+    }
+
+
+def _jsonl(text: str) -> list[dict[str, Any]]:
+    """Parse newline-delimited JSON, skipping blank lines."""
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def _openai_usage(usage: Mapping[str, Any]) -> Usage:
+    """Map OpenAI usage fields to ``LLMResponse`` token fields.
+
+    OpenAI counts cached tokens inside ``prompt_tokens``.
+    """
+    details = usage.get("prompt_tokens_details") or {}
+    cached = details.get("cached_tokens") or 0
+    return {
+        "input_tokens": usage.get("prompt_tokens", 0) - cached,
+        "output_tokens": usage.get("completion_tokens", 0),
+        "cache_read_tokens": cached,
+    }
+
+
+_providers: dict[str, ProviderAdapter] = {}
+
+
+def register_provider(adapter: ProviderAdapter) -> None:
+    """Add or replace the adapter for ``adapter.name``.
+
+    Clients mount an adapter's local transport when they are created,
+    so register mock-style adapters before creating the client.
+
+    Args:
+        adapter: The adapter to register.
+    """
+    _providers[adapter.name] = adapter
+
+
+def get_provider(name: str) -> ProviderAdapter:
+    """Return the adapter registered for a provider.
+
+    Args:
+        name: Provider name.
+
+    Returns:
+        The provider's adapter.
+
+    Raises:
+        ValueError: If no adapter is registered under ``name``.
+    """
+    adapter = _providers.get(name)
+    if adapter is None:
+        raise ValueError(f"Unsupported LLM provider: {name}")
+    return adapter
+
+
+def registered_providers() -> dict[str, ProviderAdapter]:
+    """Return the registered adapters by provider name."""
+    return dict(_providers)
+
+
+register_provider(AnthropicAdapter())
+register_provider(OpenAIAdapter())
+if _ENABLE_MOCK:
+    register_provider(MockAdapter())
@@ -0,0 +1,249 @@
+"""Client-side token-bucket rate limiting matched to provider quotas.
+
+Quotas are configured per provider or per ``provider/model`` as
+requests per minute (``rpm``) and tokens per minute (``tpm``), e.g.::
+
+    LLM_QUOTAS='{"anthropic": {"rpm": 50},
+                 "anthropic/claude-sonnet-4-20250514": {"tpm": 40000}}'
+
+Before a call, one request and an estimate of its tokens (prompt
+estimate plus ``max_tokens``) are reserved from every matching bucket;
+after the response the token reservation is reconciled against the
+actual usage. A caller waits for capacity up to ``LLM_QUOTA_MAX_WAIT_S``
+and otherwise gets QuotaExceeded instead of provoking a provider 429.
+"""
+
+import asyncio
+import json
+import os
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+_LLM_QUOTAS: dict[str, dict[str, float]] = json.loads(
+    os.getenv("LLM_QUOTAS", "") or "{}"
+)
+_QUOTA_MAX_WAIT_S: float = float(os.getenv("LLM_QUOTA_MAX_WAIT_S", "2"))
+
+
+class QuotaExceeded(Exception):
+    """Raised when a call would exceed a configured quota.
+
+    Attributes:
+        provider: LLM provider name.
+        model: Model identifier.
+        retry_after_s: Seconds until the quota has capacity again.
+    """
+
+    def __init__(
+        self, provider: str, model: str, retry_after_s: float
+    ) -> None:
+        self.provider = provider
+        self.model = model
+        self.retry_after_s = retry_after_s
+        super().__init__(
+            f"Rate limit quota exceeded for {provider}/{model}; "
+            f"retry in {retry_after_s:.1f}s"
+        )
+
+
+class TokenBucket:
+    """Bucket refilled continuously at ``per_minute / 60`` per second.
+
+    Args:
+        per_minute: Refill rate, which is also the capacity.
+        clock: Monotonic time source (injectable for tests).
+    """
+
+    def __init__(
+        self,
+        per_minute: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.capacity = float(per_minute)
+        self._rate_per_s = per_minute / 60
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+
+    @property
+    def available(self) -> float:
+        """Tokens currently in the bucket."""
+        now = self._clock()
+        self._tokens = min(
+            self.capacity,
+            self._tokens + (now - self._updated) * self._rate_per_s,
+        )
+        self._updated = now
+        return self._tokens
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` (capped at capacity) is available."""
+        missing = min(amount, self.capacity) - self.available
+        return max(0.0, missing / self._rate_per_s)
+
+    def take(self, amount: float) -> None:
+        """Remove ``amount`` (capped at capacity) from the bucket."""
+        self._tokens = self.available - min(amount, self.capacity)
+
+    def give(self, amount: float) -> None:
+        """Return unused tokens to the bucket."""
+        self._tokens = min(self.capacity, self.available + amount)
+
+    def settle(self, reserved: float, actual: float) -> None:
+        """Correct an earlier ``take(reserved)`` to the actual usage.
+
+        Both amounts are capped at capacity, as ``take`` caps them, so
+        only what was actually debited is refunded.
+
+        Args:
+            reserved: Amount passed to ``take``.
+            actual: Amount actually used.
+        """
+        difference = min(reserved, self.capacity) - min(actual, self.capacity)
+        if difference >= 0:
+            self.give(difference)
+        else:
+            self.take(-difference)
+
+
+@dataclass
+class Reservation:
+    """Capacity taken for one call, to be reconciled afterwards.
+
+    Attributes:
+        tokens: Tokens reserved from the TPM buckets.
+        token_buckets: Buckets the tokens were taken from.
+    """
+
+    tokens: int
+    token_buckets: list[TokenBucket] = field(default_factory=list)
+
+
+def _wait_time(buckets: dict[str, TokenBucket], tokens: int) -> float:
+    """Seconds until one request and ``tokens`` fit in a bucket set."""
+    waits = [0.0]
+    if "rpm" in buckets:
+        waits.append(buckets["rpm"].wait_time(1))
+    if "tpm" in buckets:
+        waits.append(buckets["tpm"].wait_time(tokens))
+    return max(waits)
+
+
+class RateLimiter:
+    """RPM/TPM token buckets per provider and per provider/model.
+
+    Args:
+        quotas: Mapping of ``"provider"`` or ``"provider/model"`` to
+            ``{"rpm": ..., "tpm": ...}`` (either may be omitted).
+        max_wait_s: Longest a caller waits for capacity.
+        clock: Monotonic time source (injectable for tests).
+    """
+
+    def __init__(
+        self,
+        quotas: Optional[dict[str, dict[str, float]]] = None,
+        max_wait_s: float = _QUOTA_MAX_WAIT_S,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._max_wait_s = max_wait_s
+        self._clock = clock
+        self._buckets: dict[str, dict[str, TokenBucket]] = {
+            key: {
+                kind: TokenBucket(limit, clock)
+                for kind, limit in quota.items()
+                if kind in ("rpm", "tpm") and limit
+            }
+            for key, quota in (
+                _LLM_QUOTAS if quotas is None else quotas
+            ).items()
+        }
+        self.waits = 0
+        self.rejected = 0
+
+    def _matching(
+        self, provider: str, model: str
+    ) -> list[dict[str, TokenBucket]]:
+        """Bucket sets applying to a call, provider-wide first."""
+        return [
+            self._buckets[key]
+            for key in (provider, f"{provider}/{model}")
+            if key in self._buckets
+        ]
+
+    async def reserve(
+        self, provider: str, model: str, tokens: int
+    ) -> Reservation:
+        """Reserve one request and ``tokens`` tokens for a call.
+
+        Args:
+            provider: LLM provider name.
+            model: Model identifier.
+            tokens: Estimated total tokens (input plus max output).
+
+        Returns:
+            The reservation to pass to ``reconcile``.
+
+        Raises:
+            QuotaExceeded: If capacity will not be available within the
+                maximum wait.
+        """
+        matching = self._matching(provider, model)
+        if not matching:
+            return Reservation(tokens=0)
+        deadline = self._clock() + self._max_wait_s
+        while True:
+            wait = max(_wait_time(buckets, tokens) for buckets in matching)
+            if wait <= 0:
+                break
+            if self._clock() + wait > deadline:
+                self.rejected += 1
+                raise QuotaExceeded(provider, model, wait)
+            self.waits += 1
+            await asyncio.sleep(wait)
+
+        token_buckets = []
+        for buckets in matching:
+            if "rpm" in buckets:
+                buckets["rpm"].take(1)
+            if "tpm" in buckets:
+                buckets["tpm"].take(tokens)
+                token_buckets.append(buckets["tpm"])
+        return Reservation(tokens=tokens, token_buckets=token_buckets)
+
+    def reconcile(self, reservation: Reservation, actual_tokens: int) -> None:
+        """Correct a token reservation with the call's actual usage.
+
+        Over-estimates are refunded; under-estimates are charged, so
+        the buckets track what the provider actually counted (up to
+        each bucket's capacity).
+
+        Args:
+            reservation: Reservation returned by ``reserve``.
+            actual_tokens: Tokens the provider reported, or 0 if the
+                call failed before using any.
+        """
+        for bucket in reservation.token_buckets:
+            bucket.settle(reservation.tokens, actual_tokens)
+
+    def stats(self) -> dict[str, Any]:
+        """Return per-quota capacity and wait/reject counters.
+
+        Returns:
+            Dictionary with available capacity per configured key.
+        """
+        return {
+            "waits": self.waits,
+            "rejected": self.rejected,
+            "buckets": {
+                key: {
+                    kind: {
+                        "available": round(bucket.available, 1),
+                        "per_minute": bucket.capacity,
+                    }
+                    for kind, bucket in buckets.items()
+                }
+                for key, buckets in sorted(self._buckets.items())
+            },
+        }
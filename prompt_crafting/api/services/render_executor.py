@@ -0,0 +1,253 @@
+"""Executor that keeps template rendering off the event loop.
+
+Renders run in a thread pool, or in a process pool for templates
+flagged heavy, under a per-render CPU time budget and output size cap.
+Batches of renders share the same pools and budgets. Queue depth and
+render timings are tracked for the metrics endpoint.
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Iterable
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from functools import partial
+from typing import Any, Optional, Union
+
+from prompt_crafting.api.services.prompt_engine import (
+    CompiledTemplate,
+    compile_template,
+    render_compiled,
+)
+
+_RENDER_THREADS: int = int(os.getenv("RENDER_THREADS", "4"))
+_RENDER_PROCESSES: int = int(os.getenv("RENDER_PROCESSES", "2"))
+_RENDER_CPU_BUDGET_S: float = float(os.getenv("RENDER_CPU_BUDGET_S", "2"))
+_RENDER_MAX_OUTPUT_CHARS: int = int(
+    os.getenv("RENDER_MAX_OUTPUT_CHARS", "1000000")
+)
+
+
+def _render_source(
+    template: str,
+    variables: dict[str, Any],
+    defaults: Optional[dict[str, Any]],
+    cpu_budget_s: float,
+    max_output_chars: int,
+) -> str:
+    """Compile (cached per process) and render a template source.
+
+    Used as the process-pool entry point, since compiled templates
+    cannot be pickled.
+    """
+    return render_compiled(
+        compile_template(template),
+        variables,
+        defaults,
+        cpu_budget_s=cpu_budget_s,
+        max_output_chars=max_output_chars,
+    )
+
+
+class RenderExecutor:
+    """Bounded thread/process pools for rendering templates.
+
+    Each pool admits at most its worker count of renders at a time; the
+    rest wait in an asyncio queue so queue depth can be observed.
+
+    Args:
+        max_threads: Thread pool size for regular templates.
+        max_processes: Process pool size for heavy templates.
+        cpu_budget_s: CPU seconds allowed per render.
+        max_output_chars: Maximum rendered output length.
+    """
+
+    def __init__(
+        self,
+        max_threads: int = _RENDER_THREADS,
+        max_processes: int = _RENDER_PROCESSES,
+        cpu_budget_s: float = _RENDER_CPU_BUDGET_S,
+        max_output_chars: int = _RENDER_MAX_OUTPUT_CHARS,
+    ) -> None:
+        self._max_threads = max_threads
+        self._max_processes = max_processes
+        self.cpu_budget_s = cpu_budget_s
+        self.max_output_chars = max_output_chars
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._slots: dict[bool, asyncio.Semaphore] = {}
+        self._queued = 0
+        self._running = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_render_ms = 0.0
+        self.max_render_ms = 0.0
+
+    def _pool(self, heavy: bool) -> Executor:
+        """Return the pool for the given class, creating it lazily."""
+        if heavy:
+            if self._processes is None:
+                self._processes = ProcessPoolExecutor(self._max_processes)
+            return self._processes
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(
+                self._max_threads, thread_name_prefix="render"
+            )
+        return self._threads
+
+    def _slot(self, heavy: bool) -> asyncio.Semaphore:
+        """Return the admission semaphore for the given pool."""
+        if heavy not in self._slots:
+            size = self._max_processes if heavy else self._max_threads
+            self._slots[heavy] = asyncio.Semaphore(size)
+        return self._slots[heavy]
+
+    async def render(
+        self,
+        compiled: CompiledTemplate,
+        variables: dict[str, Any],
+        defaults: Optional[dict[str, Any]] = None,
+        heavy: bool = False,
+    ) -> str:
+        """Render a compiled template in a worker pool.
+
+        Args:
+            compiled: Template returned by ``compile_template``.
+            variables: Dictionary of variable values to inject.
+            defaults: Optional default values for missing variables.
+            heavy: Render in the process pool instead of a thread.
+
+        Returns:
+            The rendered template string.
+
+        Raises:
+            RenderBudgetExceeded: If the CPU or output budget is hit.
+        """
+        if heavy:
+            call = partial(
+                _render_source,
+                compiled.source,
+                variables,
+                defaults,
+                self.cpu_budget_s,
+                self.max_output_chars,
+            )
+        else:
+            call = partial(
+                render_compiled,
+                compiled,
+                variables,
+                defaults,
+                cpu_budget_s=self.cpu_budget_s,
+                max_output_chars=self.max_output_chars,
+            )
+
+        loop = asyncio.get_running_loop()
+        admitted = False
+        self._queued += 1
+        try:
+            async with self._slot(heavy):
+                self._queued -= 1
+                admitted = True
+                self._running += 1
+                start = time.monotonic()
+                try:
+                    result = await loop.run_in_executor(
+                        self._pool(heavy), call
+                    )
+                except Exception:
+                    self.failed += 1
+                    raise
+                finally:
+                    self._running -= 1
+                    elapsed_ms = (time.monotonic() - start) * 1000
+                    self.total_render_ms += elapsed_ms
+                    self.max_render_ms = max(self.max_render_ms, elapsed_ms)
+        finally:
+            if not admitted:
+                self._queued -= 1
+        self.completed += 1
+        return result
+
+    async def render_many(
+        self,
+        compiled: CompiledTemplate,
+        variables_iter: Iterable[dict[str, Any]],
+        defaults: Optional[dict[str, Any]] = None,
+        heavy: bool = False,
+    ) -> AsyncIterator[Union[str, Exception]]:
+        """Render one template against many variable sets, in order.
+
+        Renders are submitted to the shared pool at most twice its size
+        ahead of the consumer, so one batch cannot fill the queue, and
+        each is held to the executor's budgets. Renders not yet
+        consumed are cancelled when the iteration stops early (for
+        example when a streaming client disconnects).
+
+        Args:
+            compiled: Template returned by ``compile_template``.
+            variables_iter: Iterable of variable dictionaries.
+            defaults: Optional default values for missing variables.
+            heavy: Render in the process pool instead of threads.
+
+        Yields:
+            Each rendered string, or the exception its render raised.
+        """
+        window = 2 * (self._max_processes if heavy else self._max_threads)
+        pending: deque[asyncio.Task[str]] = deque()
+        variables = iter(variables_iter)
+        try:
+            while True:
+                for item in variables:
+                    pending.append(
+                        asyncio.create_task(
+                            self.render(compiled, item, defaults, heavy)
+                        )
+                    )
+                    if len(pending) >= window:
+                        break
+                if not pending:
+                    return
+                try:
+                    result: Union[str, Exception] = await pending.popleft()
+                except Exception as exc:
+                    result = exc
+                yield result
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> dict[str, Any]:
+        """Return queue depth and render timing metrics.
+
+        Returns:
+            Dictionary of executor statistics.
+        """
+        finished = self.completed + self.failed
+        return {
+            "queue_depth": self._queued,
+            "in_flight": self._running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_render_ms": (
+                self.total_render_ms / finished if finished else 0.0
+            ),
+            "max_render_ms": self.max_render_ms,
+        }
+
+    def shutdown(self) -> None:
+        """Shut down the worker pools without waiting for queued work."""
+        if self._threads is not None:
+            self._threads.shutdown(wait=False, cancel_futures=True)
+            self._threads = None
+        if self._processes is not None:
+            self._processes.shutdown(wait=False, cancel_futures=True)
+            self._processes = None
+
+
+render_executor = RenderExecutor()
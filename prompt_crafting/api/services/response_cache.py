@@ -0,0 +1,277 @@
+"""Pluggable response cache for deterministic LLM executions.
+
+Provides an in-memory LRU tier with TTL, a persistent SQLite tier that
+survives restarts, and a tiered cache combining both. Values are the
+plain-dict form of an LLM response so the cache stays independent of
+the client module.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Optional
+
+_LLM_CACHE_SIZE: int = int(os.getenv("LLM_CACHE_SIZE", "1024"))
+_LLM_CACHE_TTL_S: float = float(os.getenv("LLM_CACHE_TTL_S", "86400"))
+_LLM_CACHE_PATH: str = os.getenv("LLM_CACHE_PATH", "")
+_LLM_CACHE_DISK_SIZE: int = int(os.getenv("LLM_CACHE_DISK_SIZE", "100000"))
+
+
+class ResponseCache(ABC):
+    """Interface for LLM response caches.
+
+    Subclasses implement the abstract ``get`` and ``set``; the base
+    class keeps the hit/miss/eviction counters.
+    """
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[dict[str, Any]]:
+        """Return the cached value for ``key`` or None.
+
+        Args:
+            key: Cache key.
+
+        Returns:
+            The cached response dictionary, or None on a miss.
+        """
+
+    @abstractmethod
+    async def set(self, key: str, value: dict[str, Any]) -> None:
+        """Store a value under ``key``.
+
+        Args:
+            key: Cache key.
+            value: Response dictionary to cache.
+        """
+
+    def _count(self, value: Optional[dict[str, Any]]) -> None:
+        """Record a lookup result in the counters."""
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+    def stats(self) -> dict[str, Any]:
+        """Return hit/miss/eviction counters.
+
+        Returns:
+            Dictionary of cache statistics.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class MemoryResponseCache(ResponseCache):
+    """In-process LRU cache with a per-entry time to live.
+
+    Args:
+        max_entries: Maximum number of cached responses.
+        ttl_s: Seconds an entry stays valid.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = _LLM_CACHE_SIZE,
+        ttl_s: float = _LLM_CACHE_TTL_S,
+    ) -> None:
+        super().__init__()
+        self._max_entries = max(1, max_entries)
+        self._ttl_s = ttl_s
+        self._entries: OrderedDict[str, tuple[float, dict[str, Any]]] = (
+            OrderedDict()
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, key: str) -> Optional[dict[str, Any]]:
+        """Return a live entry and mark it most recently used."""
+        value: Optional[dict[str, Any]] = None
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, cached = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                value = cached
+            else:
+                del self._entries[key]
+        self._count(value)
+        return value
+
+    async def set(self, key: str, value: dict[str, Any]) -> None:
+        """Store an entry, evicting the least recently used if full."""
+        self._entries[key] = (time.monotonic() + self._ttl_s, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict[str, Any]:
+        """Return counters plus current and maximum size."""
+        return {
+            **super().stats(),
+            "size": len(self._entries),
+            "max_size": self._max_entries,
+        }
+
+
+class SQLiteResponseCache(ResponseCache):
+    """Persistent cache stored in a local SQLite database.
+
+    Blocking SQLite calls run in a worker thread. When the table grows
+    past ``max_entries`` the least recently used rows are deleted.
+
+    Args:
+        path: Database file path.
+        max_entries: Maximum number of cached responses.
+        ttl_s: Seconds an entry stays valid.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = _LLM_CACHE_DISK_SIZE,
+        ttl_s: float = _LLM_CACHE_TTL_S,
+    ) -> None:
+        super().__init__()
+        self._max_entries = max(1, max_entries)
+        self._ttl_s = ttl_s
+        self._lock = Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_response_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed "
+                "ON llm_response_cache (accessed_at)"
+            )
+
+    def _get(self, key: str) -> Optional[dict[str, Any]]:
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM llm_response_cache "
+                "WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._conn.execute(
+                    "DELETE FROM llm_response_cache WHERE key = ?", (key,)
+                )
+                return None
+            self._conn.execute(
+                "UPDATE llm_response_cache SET accessed_at = ? "
+                "WHERE key = ?",
+                (now, key),
+            )
+        value: dict[str, Any] = json.loads(row[0])
+        return value
+
+    def _set(self, key: str, value: dict[str, Any]) -> int:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_response_cache "
+                "(key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + self._ttl_s, now),
+            )
+            (count,) = self._conn.execute(
+                "SELECT COUNT(*) FROM llm_response_cache"
+            ).fetchone()
+            excess = count - self._max_entries
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM llm_response_cache WHERE key IN ("
+                    "SELECT key FROM llm_response_cache "
+                    "ORDER BY accessed_at LIMIT ?)",
+                    (excess,),
+                )
+                return int(excess)
+        return 0
+
+    async def get(self, key: str) -> Optional[dict[str, Any]]:
+        """Return a live entry from disk."""
+        value = await asyncio.to_thread(self._get, key)
+        self._count(value)
+        return value
+
+    async def set(self, key: str, value: dict[str, Any]) -> None:
+        """Store an entry on disk, evicting old rows if over size."""
+        self.evictions += await asyncio.to_thread(self._set, key, value)
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+class TieredResponseCache(ResponseCache):
+    """Memory cache in front of a persistent cache.
+
+    Disk hits are promoted into memory; writes go to both tiers.
+
+    Args:
+        memory: Fast in-process tier.
+        disk: Persistent tier.
+    """
+
+    def __init__(self, memory: ResponseCache, disk: ResponseCache) -> None:
+        super().__init__()
+        self.memory = memory
+        self.disk = disk
+
+    async def get(self, key: str) -> Optional[dict[str, Any]]:
+        """Look up memory first, then disk."""
+        value = await self.memory.get(key)
+        if value is None:
+            value = await self.disk.get(key)
+            if value is not None:
+                await self.memory.set(key, value)
+        self._count(value)
+        return value
+
+    async def set(self, key: str, value: dict[str, Any]) -> None:
+        """Write through to both tiers."""
+        await self.memory.set(key, value)
+        await self.disk.set(key, value)
+
+    def stats(self) -> dict[str, Any]:
+        """Return overall counters plus per-tier statistics."""
+        return {
+            **super().stats(),
+            "memory": self.memory.stats(),
+            "disk": self.disk.stats(),
+        }
+
+
+def build_response_cache() -> ResponseCache:
+    """Build the cache configured by environment variables.
+
+    Uses memory only, unless ``LLM_CACHE_PATH`` is set, in which case a
+    SQLite tier at that path backs the memory tier.
+
+    Returns:
+        The configured response cache.
+    """
+    memory = MemoryResponseCache()
+    if not _LLM_CACHE_PATH:
+        return memory
+    return TieredResponseCache(memory, SQLiteResponseCache(_LLM_CACHE_PATH))
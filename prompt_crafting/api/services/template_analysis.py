@@ -0,0 +1,417 @@
+"""Static complexity analysis of parsed Jinja2 templates.
+
+Walks the template AST to estimate loop nesting, iteration counts and
+output size, detect recursive macros and collect referenced variables.
+Loops over context values have no static length, so their counts are
+only a lower bound; nesting such loops marks a template heavy instead,
+and the render budget in ``prompt_engine`` is what actually stops it.
+The result is stored with each prompt version so that expensive
+templates can be rejected on write and routed to the process pool on
+execution, before any rendering happens. The set of variables a render
+must be given is derived here too.
+"""
+
+import os
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from typing import Optional
+
+from jinja2 import meta, nodes
+
+# Assumed size of an iterable whose length is not known statically.
+# The real size is set by the request, so this is a lower bound.
+_DEFAULT_LOOP_ITERATIONS: int = 10
+
+# Assumed rendered length of a single ``{{ expression }}``.
+_DEFAULT_EXPR_CHARS: int = 20
+
+# Filters and tests that make a missing variable harmless.
+_OPTIONAL_FILTERS = frozenset(["default", "d"])
+_OPTIONAL_TESTS = frozenset(["defined", "undefined", "none"])
+
+_TEMPLATE_MAX_LOOP_DEPTH: int = int(os.getenv("TEMPLATE_MAX_LOOP_DEPTH", "4"))
+_TEMPLATE_MAX_ESTIMATED_OUTPUT: int = int(
+    os.getenv("TEMPLATE_MAX_ESTIMATED_OUTPUT", "1000000")
+)
+_TEMPLATE_HEAVY_ITERATIONS: int = int(
+    os.getenv("TEMPLATE_HEAVY_ITERATIONS", "10000")
+)
+_TEMPLATE_HEAVY_OUTPUT: int = int(os.getenv("TEMPLATE_HEAVY_OUTPUT", "100000"))
+_TEMPLATE_HEAVY_UNBOUNDED_DEPTH: int = int(
+    os.getenv("TEMPLATE_HEAVY_UNBOUNDED_DEPTH", "2")
+)
+
+
+@dataclass
+class TemplateComplexity:
+    """Static cost estimate for a template.
+
+    Attributes:
+        max_loop_depth: Deepest nesting of ``for`` loops.
+        unbounded_loop_depth: Deepest nesting of ``for`` loops over
+            iterables whose length is not known statically.
+        estimated_iterations: Estimated total loop body executions;
+            a lower bound when ``unbounded_loop_depth`` is non-zero.
+        estimated_output_chars: Estimated rendered output length.
+        recursive_macros: Names of macros that call themselves,
+            directly or through other macros.
+        variables: Sorted names of variables the template reads from
+            its context.
+        heavy: Whether the template should render in the process pool.
+    """
+
+    max_loop_depth: int = 0
+    unbounded_loop_depth: int = 0
+    estimated_iterations: int = 0
+    estimated_output_chars: int = 0
+    recursive_macros: list[str] = field(default_factory=list)
+    variables: list[str] = field(default_factory=list)
+    heavy: bool = False
+
+
+def _loop_size(iter_node: nodes.Node) -> Optional[int]:
+    """Count the items a ``for`` loop iterates over, if known statically.
+
+    Args:
+        iter_node: The loop's iterable expression.
+
+    Returns:
+        Exact count for ``range`` with constant arguments and literal
+        sequences, otherwise None.
+    """
+    if (
+        isinstance(iter_node, nodes.Call)
+        and isinstance(iter_node.node, nodes.Name)
+        and iter_node.node.name == "range"
+        and not iter_node.kwargs
+        and 1 <= len(iter_node.args) <= 3
+        and all(
+            isinstance(arg, nodes.Const) and isinstance(arg.value, int)
+            for arg in iter_node.args
+        )
+    ):
+        args = [arg.value for arg in iter_node.args]  # type: ignore
+        try:
+            return len(range(*args))
+        except ValueError:
+            return 0
+    if isinstance(iter_node, (nodes.List, nodes.Tuple, nodes.Dict)):
+        return len(iter_node.items)
+    if isinstance(iter_node, nodes.Const):
+        try:
+            return len(iter_node.value)
+        except TypeError:
+            return None
+    return None
+
+
+def _called_macro(
+    node: nodes.Node, macros: dict[str, nodes.Macro]
+) -> Optional[str]:
+    """Return the macro name invoked by a call node, if any."""
+    call = node.call if isinstance(node, nodes.CallBlock) else node
+    if (
+        isinstance(call, nodes.Call)
+        and isinstance(call.node, nodes.Name)
+        and call.node.name in macros
+    ):
+        return call.node.name
+    return None
+
+
+def _find_recursive_macros(macros: dict[str, nodes.Macro]) -> list[str]:
+    """Find macros that are part of a call cycle.
+
+    Args:
+        macros: Macro definitions by name.
+
+    Returns:
+        Sorted names of recursive macros.
+    """
+    graph: dict[str, set[str]] = {}
+    for name, macro in macros.items():
+        callees: set[str] = set()
+        for node in macro.find_all((nodes.Call, nodes.CallBlock)):
+            callee = _called_macro(node, macros)
+            if callee is not None:
+                callees.add(callee)
+        graph[name] = callees
+
+    recursive: set[str] = set()
+    for start in graph:
+        stack = list(graph[start])
+        seen: set[str] = set()
+        while stack:
+            name = stack.pop()
+            if name == start:
+                recursive.add(start)
+                break
+            if name in seen:
+                continue
+            seen.add(name)
+            stack.extend(graph.get(name, ()))
+    return sorted(recursive)
+
+
+class _Estimator:
+    """Accumulates loop and output estimates over a statement tree."""
+
+    def __init__(self, macros: dict[str, nodes.Macro]) -> None:
+        self.macros = macros
+        self.max_depth = 0
+        self.unbounded_depth = 0
+        self.iterations = 0
+        self.output = 0
+
+    def walk(
+        self,
+        body: Iterable[nodes.Node],
+        multiplier: int,
+        depth: int,
+        active: frozenset[str],
+        unbounded: int = 0,
+    ) -> None:
+        """Walk statements executed ``multiplier`` times at ``depth``.
+
+        Args:
+            body: Statements to walk.
+            multiplier: Times these statements run per render.
+            depth: Current loop nesting depth.
+            active: Macros currently being expanded (cycle guard).
+            unbounded: Enclosing loops over iterables of unknown size.
+        """
+        for node in body:
+            if isinstance(node, nodes.Macro):
+                continue
+            if isinstance(node, nodes.For):
+                size = _loop_size(node.iter)
+                inner = unbounded
+                if size is None:
+                    size = _DEFAULT_LOOP_ITERATIONS
+                    inner += 1
+                self.max_depth = max(self.max_depth, depth + 1)
+                self.unbounded_depth = max(self.unbounded_depth, inner)
+                self.iterations += multiplier * size
+                self.walk(
+                    node.body, multiplier * size, depth + 1, active, inner
+                )
+                self.walk(node.else_, multiplier, depth, active, unbounded)
+                continue
+            if isinstance(node, nodes.Output):
+                for child in node.nodes:
+                    if isinstance(child, nodes.TemplateData):
+                        self.output += multiplier * len(child.data)
+                    else:
+                        self.output += multiplier * _DEFAULT_EXPR_CHARS
+                        self._expand_calls(
+                            child, multiplier, depth, active, unbounded
+                        )
+                continue
+            if isinstance(node, nodes.CallBlock):
+                self._expand_calls(node, multiplier, depth, active, unbounded)
+                self.walk(node.body, multiplier, depth, active, unbounded)
+                continue
+            self.walk(
+                (
+                    child
+                    for child in node.iter_child_nodes()
+                    if isinstance(child, nodes.Stmt)
+                ),
+                multiplier,
+                depth,
+                active,
+                unbounded,
+            )
+
+    def _expand_calls(
+        self,
+        node: nodes.Node,
+        multiplier: int,
+        depth: int,
+        active: frozenset[str],
+        unbounded: int,
+    ) -> None:
+        """Account for the bodies of macros called from ``node``."""
+        candidates = [node] if isinstance(node, nodes.CallBlock) else []
+        candidates.extend(node.find_all(nodes.Call))
+        for call in candidates:
+            name = _called_macro(call, self.macros)
+            if name is None or name in active:
+                continue
+            self.walk(
+                self.macros[name].body,
+                multiplier,
+                depth,
+                active | {name},
+                unbounded,
+            )
+
+
+def analyze_template(
+    ast: nodes.Template, known_globals: Iterable[str] = ()
+) -> TemplateComplexity:
+    """Estimate the rendering cost of a parsed template.
+
+    Args:
+        ast: Template AST returned by ``Environment.parse``.
+        known_globals: Environment globals (e.g. ``range``) to exclude
+            from the referenced variables.
+
+    Returns:
+        The template's complexity estimate.
+    """
+    macros = {macro.name: macro for macro in ast.find_all(nodes.Macro)}
+    estimator = _Estimator(macros)
+    estimator.walk(ast.body, 1, 0, frozenset())
+
+    variables = meta.find_undeclared_variables(ast) - set(known_globals)
+    heavy = (
+        estimator.iterations > _TEMPLATE_HEAVY_ITERATIONS
+        or estimator.output > _TEMPLATE_HEAVY_OUTPUT
+        or estimator.unbounded_depth >= _TEMPLATE_HEAVY_UNBOUNDED_DEPTH
+    )
+    return TemplateComplexity(
+        max_loop_depth=estimator.max_depth,
+        unbounded_loop_depth=estimator.unbounded_depth,
+        estimated_iterations=estimator.iterations,
+        estimated_output_chars=estimator.output,
+        recursive_macros=_find_recursive_macros(macros),
+        variables=sorted(variables),
+        heavy=heavy,
+    )
+
+
+def find_required_variables(
+    ast: nodes.Template, known_globals: Iterable[str] = ()
+) -> frozenset[str]:
+    """Find context variables a render must be given.
+
+    Starts from ``jinja2.meta.find_undeclared_variables`` and drops
+    environment globals and variables the template guards itself. A
+    variable is guarded when every use of it is passed through
+    ``|default``, tested with ``is defined``, used as the condition of
+    an ``if`` (an undefined variable is false there), or sits inside a
+    branch that only runs when that condition holds.
+
+    Args:
+        ast: Template AST returned by ``Environment.parse``.
+        known_globals: Environment globals (e.g. ``range``).
+
+    Returns:
+        Names of the required variables.
+    """
+    undeclared = meta.find_undeclared_variables(ast)
+    return frozenset(
+        (undeclared - set(known_globals)) & _unguarded_names(ast, frozenset())
+    )
+
+
+def _unguarded_names(node: nodes.Node, guarded: frozenset[str]) -> set[str]:
+    """Names read somewhere an undefined value would break the render.
+
+    Args:
+        node: Subtree to scan.
+        guarded: Names known to be defined at ``node``.
+
+    Returns:
+        Names used outside the guards listed in ``find_required_variables``.
+    """
+    if isinstance(node, nodes.Name):
+        if node.ctx == "load" and node.name not in guarded:
+            return {node.name}
+        return set()
+    if isinstance(node, (nodes.If, nodes.CondExpr)):
+        inner = guarded | _guard_names(node.test)
+        names = _unguarded_in_condition(node.test, guarded)
+        if isinstance(node, nodes.CondExpr):
+            names |= _unguarded_names(node.expr1, inner)
+            if node.expr2 is not None:
+                names |= _unguarded_names(node.expr2, guarded)
+            return names
+        for child in node.body:
+            names |= _unguarded_names(child, inner)
+        for child in [*node.elif_, *node.else_]:
+            names |= _unguarded_names(child, guarded)
+        return names
+    skip: Optional[nodes.Node] = None
+    if isinstance(node, (nodes.Filter, nodes.Test)):
+        optional = (
+            _OPTIONAL_FILTERS
+            if isinstance(node, nodes.Filter)
+            else _OPTIONAL_TESTS
+        )
+        if node.name in optional and isinstance(node.node, nodes.Name):
+            skip = node.node
+    names: set[str] = set()
+    for child in node.iter_child_nodes():
+        if child is not skip:
+            names |= _unguarded_names(child, guarded)
+    return names
+
+
+def _unguarded_in_condition(
+    expr: nodes.Expr, guarded: frozenset[str]
+) -> set[str]:
+    """Like ``_unguarded_names`` for an expression used as a condition.
+
+    Bare names combined with ``not``, ``and`` and ``or`` are only tested
+    for truth; comparisons and other operations on an undefined
+    variable fail. The right side of ``and`` is guarded by the left.
+    """
+    if isinstance(expr, nodes.Name):
+        return set()
+    if isinstance(expr, nodes.Not):
+        return _unguarded_in_condition(expr.node, guarded)
+    if isinstance(expr, (nodes.And, nodes.Or)):
+        right_guarded = guarded
+        if isinstance(expr, nodes.And):
+            right_guarded = guarded | _guard_names(expr.left)
+        left = _unguarded_in_condition(expr.left, guarded)
+        return left | _unguarded_in_condition(expr.right, right_guarded)
+    return _unguarded_names(expr, guarded)
+
+
+def _guard_names(expr: nodes.Expr) -> set[str]:
+    """Names that must be defined for a condition to hold.
+
+    Covers ``x`` and ``x is defined``, alone or joined with ``and``.
+    """
+    if isinstance(expr, nodes.Name):
+        return {expr.name}
+    if (
+        isinstance(expr, nodes.Test)
+        and expr.name == "defined"
+        and isinstance(expr.node, nodes.Name)
+    ):
+        return {expr.node.name}
+    if isinstance(expr, nodes.And):
+        return _guard_names(expr.left) | _guard_names(expr.right)
+    return set()
+
+
+def check_complexity(complexity: TemplateComplexity) -> list[str]:
+    """Check a complexity estimate against the configured limits.
+
+    Args:
+        complexity: Result of ``analyze_template``.
+
+    Returns:
+        A list of error messages. Empty list means acceptable.
+    """
+    errors: list[str] = []
+    if complexity.max_loop_depth > _TEMPLATE_MAX_LOOP_DEPTH:
+        errors.append(
+            f"Loop nesting depth {complexity.max_loop_depth} exceeds "
+            f"limit of {_TEMPLATE_MAX_LOOP_DEPTH}"
+        )
+    if complexity.estimated_output_chars > _TEMPLATE_MAX_ESTIMATED_OUTPUT:
+        errors.append(
+            f"Estimated output of {complexity.estimated_output_chars} "
+            f"characters exceeds limit of {_TEMPLATE_MAX_ESTIMATED_OUTPUT}"
+        )
+    if complexity.recursive_macros:
+        errors.append(
+            "Recursive macros are not allowed: "
+            + ", ".join(complexity.recursive_macros)
+        )
+    return errors
@@ -0,0 +1,143 @@
+"""In-process registry of compiled templates for stored prompts.
+
+Prompt versions are immutable (updates insert a new row), so a
+template's source hash can be bound to a prompt id for the lifetime of
+the process. The registry is warmed at application startup from the
+latest version of every prompt and updated eagerly whenever a version
+is written. Compiled templates themselves live only in the bounded
+template cache; a prompt whose template was evicted is recompiled on
+its next use.
+"""
+
+from threading import Lock
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from prompt_crafting.api.services.prompt_engine import (
+    CompiledTemplate,
+    cached_template,
+    compile_template,
+)
+from prompt_crafting.db.models import Prompt
+from prompt_crafting.utils.logging import logger
+
+
+class TemplateRegistry:
+    """Map of prompt id to the source hash of its validated template.
+
+    Compiled objects are looked up in the shared template cache by
+    hash, so a prompt registered here and an ad-hoc render of the same
+    source share one compiled template, and the cache's size limit
+    bounds how many compiled templates are kept.
+    """
+
+    def __init__(self) -> None:
+        self._entries: dict[str, str] = {}
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, prompt_id: object) -> bool:
+        return prompt_id in self._entries
+
+    def register(self, prompt_id: str, template: str) -> CompiledTemplate:
+        """Compile a prompt version and bind it to its id.
+
+        Args:
+            prompt_id: The prompt version's unique identifier.
+            template: Raw Jinja2 template string.
+
+        Returns:
+            The compiled template.
+
+        Raises:
+            ValueError: If the template fails validation.
+        """
+        compiled = compile_template(template)
+        with self._lock:
+            self._entries[prompt_id] = compiled.source_hash
+        return compiled
+
+    def get(self, prompt_id: str, template: str) -> CompiledTemplate:
+        """Return the compiled template for a prompt version.
+
+        Falls back to compiling (and registering) the template when the
+        prompt was not warmed, e.g. it was written by another worker,
+        or its compiled template has been evicted from the cache.
+
+        Args:
+            prompt_id: The prompt version's unique identifier.
+            template: Raw Jinja2 template string stored for the prompt.
+
+        Returns:
+            The compiled template.
+
+        Raises:
+            ValueError: If the template fails validation.
+        """
+        source_hash = self._entries.get(prompt_id)
+        if source_hash is not None:
+            compiled = cached_template(source_hash)
+            if compiled is not None:
+                return compiled
+        return self.register(prompt_id, template)
+
+    def discard(self, prompt_id: str) -> None:
+        """Remove a prompt from the registry if present.
+
+        Args:
+            prompt_id: The prompt version's unique identifier.
+        """
+        with self._lock:
+            self._entries.pop(prompt_id, None)
+
+    def clear(self) -> None:
+        """Remove all registered prompts."""
+        with self._lock:
+            self._entries.clear()
+
+
+template_registry = TemplateRegistry()
+
+
+async def warm_template_registry(db: AsyncSession) -> int:
+    """Compile the latest version of every stored prompt.
+
+    Templates that fail validation are logged and skipped so that one
+    legacy prompt cannot block application startup.
+
+    Args:
+        db: Async database session.
+
+    Returns:
+        Number of prompts compiled into the registry.
+    """
+    latest = (
+        select(
+            Prompt.name,
+            func.max(Prompt.version).label("max_version"),
+        )
+        .group_by(Prompt.name)
+        .subquery()
+    )
+    result = await db.execute(
+        select(Prompt.id, Prompt.template).join(
+            latest,
+            (Prompt.name == latest.c.name)
+            & (Prompt.version == latest.c.max_version),
+        )
+    )
+
+    compiled = 0
+    for prompt_id, template in result.all():
+        try:
+            template_registry.register(str(prompt_id), template)
+        except ValueError as exc:
+            logger.warning(
+                "Skipping prompt %s during warm-up: %s", prompt_id, exc
+            )
+            continue
+        compiled += 1
+    return compiled
@@ -0,0 +1,141 @@
+"""Offline token counting for pre-flight checks.
+
+Token counts are estimated locally, without a network call, so a
+request's input size, context-window fit and worst-case cost can be
+checked before it is sent. Each provider can have its own tokenizer
+(see ``register_tokenizer``); the default is a heuristic of about
+four characters per token, which tracks BPE tokenizers on English
+text and code closely enough for limits and estimates. Setting
+``TOKENIZER=tiktoken`` uses the ``cl100k_base`` encoding when the
+optional ``tiktoken`` package and its encoding file are available.
+"""
+
+import math
+import os
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Optional
+
+from prompt_crafting.utils.logging import logger
+
+_TOKENIZER: str = os.getenv("TOKENIZER", "heuristic")
+
+# Average characters per token of BPE tokenizers on English text.
+_CHARS_PER_TOKEN = 4
+
+# Context window (input plus output tokens) by provider/model.
+_CONTEXT_WINDOWS: dict[str, dict[str, int]] = {
+    "anthropic": {
+        "claude-sonnet-4-20250514": 200000,
+        "claude-opus-4-20250514": 200000,
+        "claude-haiku-35-20241022": 200000,
+    },
+    "openai": {
+        "gpt-4": 8192,
+        "gpt-4-turbo": 128000,
+        "gpt-4o": 128000,
+    },
+}
+
+# Counts the tokens in a text.
+Tokenizer = Callable[[str], int]
+
+
+def heuristic_tokens(text: str) -> int:
+    """Estimate tokens as one per ``_CHARS_PER_TOKEN`` characters.
+
+    Args:
+        text: Text to count.
+
+    Returns:
+        Estimated token count.
+    """
+    if text.isspace():
+        return 0
+    return math.ceil(len(text) / _CHARS_PER_TOKEN)
+
+
+def _tiktoken_tokenizer() -> Optional[Tokenizer]:
+    """Return a tiktoken counter, or None if it cannot be loaded."""
+    try:
+        import tiktoken
+
+        encoding = tiktoken.get_encoding("cl100k_base")
+    except Exception as exc:
+        logger.warning("tiktoken unavailable, using heuristic: %s", exc)
+        return None
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+_default_tokenizer: Tokenizer = (
+    _TOKENIZER == "tiktoken" and _tiktoken_tokenizer()
+) or heuristic_tokens
+_tokenizers: dict[str, Tokenizer] = {}
+
+
+def register_tokenizer(provider: str, tokenizer: Tokenizer) -> None:
+    """Use a custom tokenizer for one provider's models.
+
+    Args:
+        provider: LLM provider name.
+        tokenizer: Function returning the token count of a text.
+    """
+    _tokenizers[provider] = tokenizer
+
+
+def count_tokens(text: str, provider: Optional[str] = None) -> int:
+    """Estimate the number of tokens in a text.
+
+    Args:
+        text: Text to count.
+        provider: LLM provider whose tokenizer to use, if registered.
+
+    Returns:
+        Estimated token count.
+    """
+    tokenizer = _tokenizers.get(provider or "", _default_tokenizer)
+    return tokenizer(text)
+
+
+def context_window(provider: str, model: str) -> Optional[int]:
+    """Return a model's context window in tokens, if known.
+
+    Args:
+        provider: LLM provider name.
+        model: Model identifier.
+
+    Returns:
+        Maximum input plus output tokens, or None for unknown models.
+    """
+    return _CONTEXT_WINDOWS.get(provider, {}).get(model)
+
+
+@dataclass
+class TokenEstimate:
+    """Pre-flight estimate for one LLM call.
+
+    Attributes:
+        provider: LLM provider name.
+        model: Model identifier.
+        input_tokens: Estimated prompt tokens.
+        max_output_tokens: Requested ``max_tokens``.
+        context_window: Model's context window, or None if unknown.
+        max_cost_usd: Cost if the response uses all of
+            ``max_output_tokens``.
+    """
+
+    provider: str
+    model: str
+    input_tokens: int
+    max_output_tokens: int
+    context_window: Optional[int]
+    max_cost_usd: float
+
+    @property
+    def fits_context(self) -> bool:
+        """Whether the prompt and a full response fit the window."""
+        return (
+            self.context_window is None
+            or self.input_tokens + self.max_output_tokens
+            <= self.context_window
+        )
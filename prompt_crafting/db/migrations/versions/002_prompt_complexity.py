@@ -0,0 +1,28 @@
+"""Add prompts.complexity for static template cost estimates.
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import JSONB
+
+# Revision identifiers, used by Alembic.
+revision: str = "002"
+down_revision: Union[str, None] = "001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add the nullable complexity column to prompts."""
+    op.add_column("prompts", sa.Column("complexity", JSONB, nullable=True))
+
+
+def downgrade() -> None:
+    """Drop the complexity column from prompts."""
+    op.drop_column("prompts", "complexity")
@@ -0,0 +1,28 @@
+"""Add executions.routing for routed execution decisions.
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import JSONB
+
+# Revision identifiers, used by Alembic.
+revision: str = "003"
+down_revision: Union[str, None] = "002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add the nullable routing column to executions."""
+    op.add_column("executions", sa.Column("routing", JSONB, nullable=True))
+
+
+def downgrade() -> None:
+    """Drop the routing column from executions."""
+    op.drop_column("executions", "routing")
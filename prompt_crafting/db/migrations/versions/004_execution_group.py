@@ -0,0 +1,33 @@
+"""Add executions.group_id for multi-model comparison runs.
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import UUID
+
+# Revision identifiers, used by Alembic.
+revision: str = "004"
+down_revision: Union[str, None] = "003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add the nullable, indexed group_id column to executions."""
+    op.add_column(
+        "executions",
+        sa.Column("group_id", UUID(as_uuid=True), nullable=True),
+    )
+    op.create_index("idx_executions_group_id", "executions", ["group_id"])
+
+
+def downgrade() -> None:
+    """Drop the group_id column and its index from executions."""
+    op.drop_index("idx_executions_group_id", table_name="executions")
+    op.drop_column("executions", "group_id")
@@ -0,0 +1,64 @@
+"""Add experiments table and executions.experiment_id.
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+
+# Revision identifiers, used by Alembic.
+revision: str = "005"
+down_revision: Union[str, None] = "004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create experiments and link executions to them."""
+    op.create_table(
+        "experiments",
+        sa.Column(
+            "id",
+            UUID(as_uuid=True),
+            primary_key=True,
+            server_default=sa.text("gen_random_uuid()"),
+        ),
+        sa.Column("prompt_name", sa.String(255), nullable=False),
+        sa.Column("versions", JSONB, nullable=False),
+        sa.Column("baseline_version", sa.Integer, nullable=False),
+        sa.Column("input_count", sa.Integer, nullable=False),
+        sa.Column("results", JSONB, nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("NOW()"),
+        ),
+    )
+    op.create_index(
+        "idx_experiments_prompt_name", "experiments", ["prompt_name"]
+    )
+    op.add_column(
+        "executions",
+        sa.Column(
+            "experiment_id",
+            UUID(as_uuid=True),
+            sa.ForeignKey("experiments.id"),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        "idx_executions_experiment_id", "executions", ["experiment_id"]
+    )
+
+
+def downgrade() -> None:
+    """Drop executions.experiment_id and the experiments table."""
+    op.drop_index("idx_executions_experiment_id", table_name="executions")
+    op.drop_column("executions", "experiment_id")
+    op.drop_index("idx_experiments_prompt_name", table_name="experiments")
+    op.drop_table("experiments")
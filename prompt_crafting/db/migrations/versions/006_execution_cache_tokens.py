@@ -0,0 +1,35 @@
+"""Add prompt-cache token counts to executions.
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# Revision identifiers, used by Alembic.
+revision: str = "006"
+down_revision: Union[str, None] = "005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add the nullable cache read/write token columns to executions."""
+    op.add_column(
+        "executions",
+        sa.Column("cache_read_tokens", sa.Integer, nullable=True),
+    )
+    op.add_column(
+        "executions",
+        sa.Column("cache_write_tokens", sa.Integer, nullable=True),
+    )
+
+
+def downgrade() -> None:
+    """Drop the cache token columns from executions."""
+    op.drop_column("executions", "cache_write_tokens")
+    op.drop_column("executions", "cache_read_tokens")
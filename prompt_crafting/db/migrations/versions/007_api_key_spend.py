@@ -0,0 +1,57 @@
+"""Add api_key_spend table for per-API-key budgets.
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-17
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import UUID
+
+# Revision identifiers, used by Alembic.
+revision: str = "007"
+down_revision: Union[str, None] = "006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create api_key_spend."""
+    op.create_table(
+        "api_key_spend",
+        sa.Column(
+            "id",
+            UUID(as_uuid=True),
+            primary_key=True,
+            server_default=sa.text("gen_random_uuid()"),
+        ),
+        sa.Column("key_id", sa.String(64), nullable=False),
+        sa.Column("period", sa.String(10), nullable=False),
+        sa.Column("period_start", sa.String(10), nullable=False),
+        sa.Column(
+            "cost_usd",
+            sa.Numeric(12, 6),
+            nullable=False,
+            server_default="0",
+        ),
+        sa.Column("tokens", sa.BigInteger, nullable=False, server_default="0"),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("NOW()"),
+        ),
+        sa.UniqueConstraint(
+            "key_id",
+            "period",
+            "period_start",
+            name="uq_api_key_spend_period",
+        ),
+    )
+
+
+def downgrade() -> None:
+    """Drop api_key_spend."""
+    op.drop_table("api_key_spend")
@@ -4,6 +4,8 @@ Tables:
     - prompts: Versioned prompt templates with Jinja2 content.
     - executions: LLM execution results linked to prompts.
     - audit_logs: Security audit trail linked to executions.
+    - experiments: Prompt-version comparisons and their summaries.
+    - api_key_spend: Spend per API key per budget period.
 
 Note:
     ORM uses dialect-agnostic types (JSON, String for UUIDs) so tests
@@ -55,6 +57,8 @@ class Prompt(Base):
         version: Auto-incremented version number.
         category: Optional category for filtering.
         parameters: JSON schema describing template variables.
+        complexity: Static cost estimate of the template (loop depth,
+            estimated output, recursive macros, variables).
         created_at: Timestamp of creation.
         updated_at: Timestamp of last modification.
     """
@@ -67,6 +71,7 @@ class Prompt(Base):
     version = Column(Integer, nullable=False)
     category = Column(String(100), nullable=True)
     parameters = Column(JSON, nullable=True)
+    complexity = Column(JSON, nullable=True)
     created_at = Column(
         DateTime(timezone=True),
         default=lambda: datetime.now(timezone.utc),
@@ -96,10 +101,20 @@ class Execution(Base):
         input_data: JSON of template variable values.
         output_text: Raw LLM response text.
         tokens_used: Total token count for the call.
+        cache_read_tokens: Input tokens read from the provider's prompt
+            cache.
+        cache_write_tokens: Input tokens written to the provider's
+            prompt cache.
         cost_usd: Calculated cost in USD.
         execution_time_ms: Wall-clock latency in milliseconds.
         llm_provider: Provider name (e.g. "anthropic", "openai").
-        model_name: Specific model identifier.
+        model_name: Model identifier that served the request.
+        routing: JSON routing decision (strategy, candidate order,
+            failed attempts, serving model) for routed executions.
+        group_id: Shared id of the executions of one multi-model
+            comparison run.
+        experiment_id: Foreign key to the prompt-version experiment
+            that ran this execution, if any.
         created_at: Timestamp of execution.
     """
 
@@ -112,10 +127,17 @@ class Execution(Base):
     input_data = Column(JSON, nullable=False)
     output_text = Column(Text, nullable=True)
     tokens_used = Column(Integer, nullable=True)
+    cache_read_tokens = Column(Integer, nullable=True)
+    cache_write_tokens = Column(Integer, nullable=True)
     cost_usd = Column(Numeric(10, 6), nullable=True)
     execution_time_ms = Column(Integer, nullable=True)
     llm_provider = Column(String(50), nullable=True)
     model_name = Column(String(100), nullable=True)
+    routing = Column(JSON, nullable=True)
+    group_id = Column(String(36), nullable=True)
+    experiment_id = Column(
+        String(36), ForeignKey("experiments.id"), nullable=True
+    )
     created_at = Column(
         DateTime(timezone=True),
         default=lambda: datetime.now(timezone.utc),
@@ -129,6 +151,8 @@ class Execution(Base):
     __table_args__ = (
         Index("idx_executions_prompt_id", "prompt_id"),
         Index("idx_executions_created_at", "created_at"),
+        Index("idx_executions_group_id", "group_id"),
+        Index("idx_executions_experiment_id", "experiment_id"),
     )
 
 
@@ -167,3 +191,71 @@ class AuditLog(Base):
     __table_args__ = (
         Index("idx_audit_logs_execution_id", "execution_id"),
     )
+
+
+class Experiment(Base):
+    """Comparison of prompt versions over one dataset of inputs.
+
+    Attributes:
+        id: Unique identifier (UUID stored as string).
+        prompt_name: Name shared by the compared prompt versions.
+        versions: Compared version numbers, baseline first.
+        baseline_version: Version the deltas are measured against.
+        input_count: Number of input sets in the dataset.
+        results: Per-version latency, token and cost statistics and
+            deltas against the baseline.
+        created_at: Timestamp of the run.
+    """
+
+    __tablename__ = "experiments"
+
+    id = Column(String(36), primary_key=True, default=_new_uuid)
+    prompt_name = Column(String(255), nullable=False)
+    versions = Column(JSON, nullable=False)
+    baseline_version = Column(Integer, nullable=False)
+    input_count = Column(Integer, nullable=False)
+    results = Column(JSON, nullable=True)
+    created_at = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+    )
+
+    __table_args__ = (
+        Index("idx_experiments_prompt_name", "prompt_name"),
+    )
+
+
+class ApiKeySpend(Base):
+    """Cost and tokens spent by one API key in one budget period.
+
+    Attributes:
+        id: Unique identifier (UUID stored as string).
+        key_id: SHA-256 hex digest of the API key.
+        period: "day" or "month" (UTC).
+        period_start: Period label, "YYYY-MM-DD" or "YYYY-MM".
+        cost_usd: Total cost in USD.
+        tokens: Total tokens.
+        updated_at: Timestamp of the last flush into the row.
+    """
+
+    __tablename__ = "api_key_spend"
+
+    id = Column(String(36), primary_key=True, default=_new_uuid)
+    key_id = Column(String(64), nullable=False)
+    period = Column(String(10), nullable=False)
+    period_start = Column(String(10), nullable=False)
+    cost_usd = Column(Numeric(12, 6), nullable=False, default=0)
+    tokens = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+    )
+
+    __table_args__ = (
+        UniqueConstraint(
+            "key_id",
+            "period",
+            "period_start",
+            name="uq_api_key_spend_period",
+        ),
+    )
@@ -1,13 +1,71 @@
 """FastAPI application entrypoint.
 
 Configures the app, registers routers, and sets up middleware
-for the prompt crafting backend.
+for the prompt crafting backend. On startup the latest version of
+every stored prompt is precompiled into the template registry and the
+current API key spend is loaded for budget checks.
 """
 
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from prompt_crafting.api.routes import analytics, executions, prompts, security
+from prompt_crafting.api.routes import (
+    analytics,
+    executions,
+    jobs,
+    prompts,
+    security,
+)
+from prompt_crafting.api.services.budget_tracker import budget_tracker
+from prompt_crafting.api.services.job_queue import job_queue
+from prompt_crafting.api.services.priority_scheduler import llm_scheduler
+from prompt_crafting.api.services.prompt_engine import template_cache_stats
+from prompt_crafting.api.services.render_executor import render_executor
+from prompt_crafting.api.services.template_registry import (
+    warm_template_registry,
+)
+from prompt_crafting.db.session import async_session_factory
+from prompt_crafting.utils.logging import logger
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    """Run startup warm-up and shut down worker pools on exit.
+
+    A failed warm-up (e.g. database not reachable yet) is logged and
+    does not prevent startup; templates then compile on first use, and
+    budgets count spend from zero. Budget counters are flushed in the
+    background and once more at shutdown. Batch jobs still running at
+    shutdown are abandoned.
+
+    Args:
+        _app: The FastAPI application instance.
+
+    Yields:
+        Control to the running application.
+    """
+    try:
+        async with async_session_factory() as session:
+            count = await warm_template_registry(session)
+        logger.info("Precompiled %d prompt templates", count)
+    except Exception as exc:
+        logger.warning("Template warm-up failed: %s", exc)
+    try:
+        async with async_session_factory() as session:
+            count = await budget_tracker.load(session)
+        logger.info("Loaded %d API key spend counters", count)
+    except Exception as exc:
+        logger.warning("Budget load failed: %s", exc)
+    budget_tracker.start(async_session_factory)
+    yield
+    await job_queue.shutdown()
+    await budget_tracker.shutdown(async_session_factory)
+    render_executor.shutdown()
+
 
 app = FastAPI(
     title="Prompt Crafting API",
@@ -18,6 +76,7 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
 # CORS configuration for frontend.
@@ -32,15 +91,41 @@ app.add_middleware(
 # Register route modules.
 app.include_router(prompts.router, prefix="/api/v1")
 app.include_router(executions.router, prefix="/api/v1")
+app.include_router(jobs.router, prefix="/api/v1")
 app.include_router(analytics.router, prefix="/api/v1")
 app.include_router(security.router, prefix="/api/v1")
 
 
 @app.get("/health", tags=["system"])
-async def health_check() -> dict[str, str]:
+async def health_check() -> dict[str, Any]:
     """Health check endpoint.
 
+    Status is "degraded" while any provider circuit is open.
+
+    Returns:
+        Dictionary with status indicator and per-model circuit breaker
+        state and statistics.
+    """
+    providers = executions._llm_client.health.snapshot()
+    degraded = any(p["state"] == "open" for p in providers.values())
+    return {
+        "status": "degraded" if degraded else "ok",
+        "providers": providers,
+    }
+
+
+@app.get("/metrics", tags=["system"])
+async def metrics() -> dict[str, Any]:
+    """In-process performance metrics.
+
     Returns:
-        Dictionary with status indicator.
+        Dictionary of statistics per component.
     """
-    return {"status": "ok"}
+    return {
+        "template_cache": template_cache_stats(),
+        "render_executor": render_executor.stats(),
+        "llm_client": executions._llm_client.stats(),
+        "llm_scheduler": llm_scheduler.stats(),
+        "jobs": job_queue.stats(),
+        "budgets": budget_tracker.stats(),
+    }
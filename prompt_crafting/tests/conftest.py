@@ -104,6 +104,8 @@ def mock_llm_client() -> MagicMock:
             cost_usd=0.001,
             provider="anthropic",
             model="claude-sonnet-4-20250514",
+            cache_read_tokens=0,
+            cache_write_tokens=0,
         )
     )
     return mock
@@ -0,0 +1,323 @@
+"""Tests for per-API-key spend budgets.
+
+Covers reservations against daily, monthly and per-minute limits,
+settlement, period rollover, flushing to and loading from the
+database, the conservative pricing of unlisted models, and the 429
+mapping on /execute.
+"""
+
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from prompt_crafting.api.models.execution import ExecutionRequest
+from prompt_crafting.api.routes.executions import (
+    _reserve_budget,
+    execute_prompt_stream,
+)
+from prompt_crafting.api.services.budget_tracker import (
+    BudgetExceeded,
+    BudgetTracker,
+    key_id,
+)
+from prompt_crafting.api.services.llm_client import (
+    LLMResponse,
+    budget_cost,
+    calculate_cost,
+)
+from prompt_crafting.db.models import ApiKeySpend
+
+
+class _Clock:
+    """Manually advanced monotonic and wall clocks."""
+
+    def __init__(self) -> None:
+        self.monotonic = 0.0
+        self.wall = datetime(2026, 10, 17, 12, 0, tzinfo=timezone.utc)
+
+    def __call__(self) -> float:
+        return self.monotonic
+
+    def now(self) -> datetime:
+        return self.wall
+
+
+def _tracker(budgets: dict, clock: _Clock) -> BudgetTracker:
+    return BudgetTracker(budgets, clock=clock, now=clock.now)
+
+
+class TestReservations:
+    """Tests for checking and debiting budgets in memory."""
+
+    def test_daily_limit_rejects_until_midnight(self) -> None:
+        """A call that could pass the daily limit is rejected."""
+        clock = _Clock()
+        tracker = _tracker({"k": {"usd_per_day": 1.0}}, clock)
+        reservation = tracker.reserve("k", 0.6, 100)
+        tracker.settle(reservation, 0.5, 80)
+
+        with pytest.raises(BudgetExceeded) as info:
+            tracker.reserve("k", 0.6, 100)
+        assert info.value.limit == "usd_per_day"
+        assert info.value.retry_after_s == 12 * 3600
+        assert tracker.rejected == 1
+        tracker.reserve("k", 0.4, 100)
+
+    def test_in_flight_reservations_count(self) -> None:
+        """Concurrent calls cannot together overshoot the limit."""
+        tracker = _tracker({"k": {"usd_per_month": 1.0}}, _Clock())
+        tracker.reserve("k", 0.6, 1)
+        with pytest.raises(BudgetExceeded, match="usd_per_month"):
+            tracker.reserve("k", 0.6, 1)
+
+    def test_failed_call_releases_reservation(self) -> None:
+        """Settling with zero usage frees the reserved budget."""
+        tracker = _tracker({"k": {"usd_per_day": 1.0}}, _Clock())
+        reservation = tracker.reserve("k", 0.9, 1)
+        tracker.settle(reservation, 0.0, 0)
+        tracker.reserve("k", 0.9, 1)
+
+    def test_default_budget_applies_per_key(self) -> None:
+        """Keys without an entry get their own "*" budget."""
+        tracker = _tracker({"*": {"usd_per_day": 1.0}}, _Clock())
+        tracker.settle(tracker.reserve("a", 0.8, 1), 0.8, 1)
+        tracker.reserve("b", 0.8, 1)
+        with pytest.raises(BudgetExceeded):
+            tracker.reserve("a", 0.8, 1)
+
+    def test_unbudgeted_key_unlimited(self) -> None:
+        """Without a matching entry nothing is rejected."""
+        tracker = _tracker({"other": {"usd_per_day": 0.01}}, _Clock())
+        tracker.reserve("k", 100.0, 10**6)
+
+    def test_new_day_resets_daily_spend(self) -> None:
+        """Spend rolls over at the UTC day boundary."""
+        clock = _Clock()
+        tracker = _tracker({"k": {"usd_per_day": 1.0}}, clock)
+        tracker.settle(tracker.reserve("k", 0.9, 1), 0.9, 1)
+        clock.wall = datetime(2026, 10, 18, 0, 1, tzinfo=timezone.utc)
+        tracker.reserve("k", 0.9, 1)
+
+    def test_tokens_per_minute(self) -> None:
+        """Tokens are limited per minute and refill over time."""
+        clock = _Clock()
+        tracker = _tracker({"k": {"tokens_per_minute": 600}}, clock)
+        reservation = tracker.reserve("k", 0.0, 500)
+        tracker.settle(reservation, 0.0, 400)
+        with pytest.raises(BudgetExceeded) as info:
+            tracker.reserve("k", 0.0, 300)
+        assert info.value.limit == "tokens_per_minute"
+        assert info.value.retry_after_s == pytest.approx(10)
+        clock.monotonic += 10
+        tracker.reserve("k", 0.0, 300)
+
+    def test_stats_hide_raw_keys(self) -> None:
+        """Stats report spend by key digest, not by key."""
+        tracker = _tracker({"secret": {"usd_per_day": 2.0}}, _Clock())
+        tracker.settle(tracker.reserve("secret", 0.5, 1), 0.25, 1)
+        stats = tracker.stats()
+        assert "secret" not in str(stats)
+        assert stats["keys"][key_id("secret")[:12]]["usd_per_day"] == {
+            "spent": 0.25,
+            "reserved": 0.0,
+            "limit": 2.0,
+        }
+
+
+class TestPersistence:
+    """Tests for flushing counters to and loading them from the DB."""
+
+    @pytest.mark.asyncio
+    async def test_flush_adds_deltas_and_load_restores(
+        self, db_session: AsyncSession
+    ) -> None:
+        """Flushes accumulate into one row per key and period."""
+        clock = _Clock()
+        tracker = _tracker({}, clock)
+        tracker.settle(tracker.reserve("k", 1.0, 1), 0.25, 100)
+        assert await tracker.flush(db_session) == 2
+        tracker.settle(tracker.reserve("k", 1.0, 1), 0.5, 50)
+        assert await tracker.flush(db_session) == 2
+        assert await tracker.flush(db_session) == 0
+
+        rows = (await db_session.execute(select(ApiKeySpend))).scalars()
+        by_period = {row.period: row for row in rows}
+        assert set(by_period) == {"day", "month"}
+        assert by_period["day"].key_id == key_id("k")
+        assert by_period["day"].period_start == "2026-10-17"
+        assert by_period["month"].period_start == "2026-10"
+        assert float(by_period["month"].cost_usd) == pytest.approx(0.75)
+        assert by_period["month"].tokens == 150
+
+        restored = _tracker({"k": {"usd_per_month": 1.0}}, clock)
+        assert await restored.load(db_session) == 2
+        with pytest.raises(BudgetExceeded):
+            restored.reserve("k", 0.3, 1)
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_keeps_deltas(self) -> None:
+        """Spend that failed to write is retried on the next flush."""
+        tracker = _tracker({}, _Clock())
+        tracker.settle(tracker.reserve("k", 1.0, 1), 0.25, 10)
+        session = MagicMock()
+        session.execute = AsyncMock(side_effect=RuntimeError("db down"))
+        session.rollback = AsyncMock()
+        with pytest.raises(RuntimeError):
+            await tracker.flush(session)
+
+        session.execute = AsyncMock(return_value=MagicMock(rowcount=1))
+        session.commit = AsyncMock()
+        assert await tracker.flush(session) == 2
+
+
+class TestBudgetCost:
+    """Tests for charging unlisted models against budgets."""
+
+    def test_listed_model_uses_its_price(self) -> None:
+        """A listed model is charged its own rates."""
+        assert budget_cost("openai", "gpt-4o", 1000, 1000) == (
+            calculate_cost("openai", "gpt-4o", 1000, 1000)
+        )
+
+    def test_unlisted_model_charged_provider_maximum(self) -> None:
+        """An unlisted model is charged the provider's highest rates."""
+        # gpt-4 has the highest OpenAI rates: $0.03 in, $0.06 out.
+        cost = budget_cost("openai", "gpt-4o-mini", 1000, 1000)
+        assert cost == pytest.approx(0.09)
+        assert calculate_cost("openai", "gpt-4o-mini", 1000, 1000) == 0
+
+    def test_unlisted_provider_charged_overall_maximum(self) -> None:
+        """A provider with no prices is charged the highest of any."""
+        # claude-opus-4 has the highest output rate: $0.075.
+        cost = budget_cost("custom", "model", 0, 1000)
+        assert cost == pytest.approx(0.075)
+
+
+async def _create_budgeted_prompt(client: AsyncClient) -> str:
+    """Create a prompt and return its id."""
+    response = await client.post(
+        "/api/v1/prompts",
+        json={"name": "budgeted", "template": "Hi {{ name }}"},
+    )
+    return response.json()["id"]
+
+
+@pytest.mark.asyncio
+@patch("prompt_crafting.api.routes.executions._llm_client")
+async def test_unpriced_model_cannot_exceed_budget(
+    mock_client: MagicMock,
+    client: AsyncClient,
+) -> None:
+    """Calls to unlisted models are reserved and settled at a price."""
+    mock_client.generate = AsyncMock(
+        return_value=LLMResponse(
+            text="long answer",
+            input_tokens=3,
+            output_tokens=1000,
+            total_tokens=1003,
+            cost_usd=0.0,
+            provider="openai",
+            model="gpt-4o-mini",
+            cache_read_tokens=0,
+            cache_write_tokens=0,
+        )
+    )
+    prompt_id = await _create_budgeted_prompt(client)
+    url = f"/api/v1/prompts/{prompt_id}/execute"
+    body = {"input_data": {"name": "World"}, "model_name": "gpt-4o-mini"}
+
+    with patch(
+        "prompt_crafting.api.routes.executions.budget_tracker",
+        BudgetTracker({"*": {"usd_per_day": 0.05}}),
+    ):
+        response = await client.post(
+            url, json={**body, "llm_provider": "openai", "max_tokens": 1000}
+        )
+        assert response.status_code == 429
+
+        response = await client.post(
+            url, json={**body, "llm_provider": "openai", "max_tokens": 100}
+        )
+        assert response.status_code == 200
+        response = await client.post(
+            url, json={**body, "llm_provider": "openai", "max_tokens": 100}
+        )
+        assert response.status_code == 429
+    assert mock_client.generate.await_count == 1
+
+
+@pytest.mark.asyncio
+@patch("prompt_crafting.api.routes.executions._llm_client")
+async def test_execute_rejects_over_budget(
+    mock_client: MagicMock,
+    client: AsyncClient,
+) -> None:
+    """/execute returns 429 with Retry-After once a key is over budget."""
+    mock_client.generate = AsyncMock()
+    prompt_id = await _create_budgeted_prompt(client)
+
+    with patch(
+        "prompt_crafting.api.routes.executions.budget_tracker",
+        BudgetTracker({"*": {"usd_per_day": 0.001}}),
+    ):
+        response = await client.post(
+            f"/api/v1/prompts/{prompt_id}/execute",
+            json={"input_data": {"name": "World"}, "max_tokens": 1000},
+        )
+    assert response.status_code == 429
+    assert "usd_per_day" in response.json()["detail"]
+    assert int(response.headers["Retry-After"]) > 0
+    mock_client.generate.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_unstarted_stream_releases_reservation(
+    client: AsyncClient, db_session: AsyncSession
+) -> None:
+    """A stream whose body never runs does not keep its reservation."""
+    prompt_id = await _create_budgeted_prompt(client)
+    tracker = BudgetTracker({"*": {"usd_per_day": 1.0}})
+
+    with patch(
+        "prompt_crafting.api.routes.executions.budget_tracker", tracker
+    ):
+        response = await execute_prompt_stream(
+            prompt_id,
+            ExecutionRequest(input_data={"name": "World"}, max_tokens=100),
+            db_session,
+            "test-key",
+        )
+        (limits,) = tracker.stats()["keys"].values()
+        assert limits["usd_per_day"]["reserved"] > 0
+
+        await response.background()
+        await response.background()
+    (limits,) = tracker.stats()["keys"].values()
+    assert limits["usd_per_day"]["reserved"] == 0
+    assert limits["usd_per_day"]["spent"] == 0
+
+
+def test_hedged_call_reserves_both_requests() -> None:
+    """A hedge reserves the hedge target's worst case on top."""
+    tracker = BudgetTracker({"*": {"usd_per_day": 10.0}})
+    body = ExecutionRequest(
+        input_data={},
+        max_tokens=1000,
+        hedge=True,
+        hedge_target={"llm_provider": "openai", "model_name": "gpt-4o"},
+    )
+    with patch(
+        "prompt_crafting.api.routes.executions.budget_tracker", tracker
+    ):
+        reservation = _reserve_budget(body, "Hi World", "test-key")
+    input_tokens = reservation.tokens // 2 - 1000
+    assert reservation.cost_usd == pytest.approx(
+        budget_cost(
+            "anthropic", "claude-sonnet-4-20250514", input_tokens, 1000
+        )
+        + budget_cost("openai", "gpt-4o", input_tokens, 1000)
+    )
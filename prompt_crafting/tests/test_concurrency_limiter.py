@@ -0,0 +1,169 @@
+"""Tests for the adaptive per-provider concurrency limiter.
+
+Covers queueing and queue limits, AIMD limit changes on overload
+signals, and the limiter inside the LLM client.
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from prompt_crafting.api.services.concurrency_limiter import (
+    AdaptiveLimiter,
+    ConcurrencyLimiters,
+    ConcurrencyLimitExceeded,
+)
+from prompt_crafting.api.services.llm_client import LLMClient, RetryPolicy
+
+
+class TestAdaptiveLimiter:
+    """Tests for slot accounting and limit adaptation."""
+
+    @pytest.mark.asyncio
+    async def test_waiters_get_freed_slots_in_order(self) -> None:
+        """Requests over the limit queue and proceed FIFO."""
+        limiter = AdaptiveLimiter("p", initial=1, max_limit=1)
+        await limiter.acquire()
+        order: list[int] = []
+
+        async def waiter(index: int) -> None:
+            await limiter.acquire()
+            order.append(index)
+            limiter.release()
+
+        tasks = [asyncio.create_task(waiter(i)) for i in range(3)]
+        await asyncio.sleep(0)
+        assert limiter.queued == 3
+        limiter.release()
+        await asyncio.gather(*tasks)
+        assert order == [0, 1, 2]
+        assert limiter.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_queue_full_rejects(self) -> None:
+        """A full queue rejects new requests immediately."""
+        limiter = AdaptiveLimiter("p", initial=1, queue_size=1)
+        await limiter.acquire()
+        pending = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(ConcurrencyLimitExceeded, match="queue_full"):
+            await limiter.acquire()
+        assert limiter.rejected == 1
+        limiter.release()
+        await pending
+
+    @pytest.mark.asyncio
+    async def test_queue_timeout(self) -> None:
+        """A request waiting past the queue timeout gives up."""
+        limiter = AdaptiveLimiter("p", initial=1, queue_timeout_s=0.01)
+        await limiter.acquire()
+        with pytest.raises(ConcurrencyLimitExceeded, match="timeout"):
+            await limiter.acquire()
+        assert limiter.timeouts == 1
+        assert limiter.queued == 0
+        limiter.release()
+        assert limiter.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_additive_increase_when_saturated(self) -> None:
+        """Healthy responses at the limit raise it by about one."""
+        limiter = AdaptiveLimiter("p", initial=2, max_limit=10)
+        for _ in range(2):
+            await limiter.acquire()
+        for _ in range(3):
+            limiter.release(completed=True, latency_ms=100)
+            await limiter.acquire()
+        assert limiter.limit == 3
+
+    def test_overload_cuts_limit(self) -> None:
+        """Overload multiplies the limit by the backoff factor."""
+        limiter = AdaptiveLimiter("p", initial=10, backoff=0.5)
+        limiter._in_flight = 1
+        limiter.release(overloaded=True)
+        assert limiter.limit == 5
+
+    def test_slow_responses_do_not_cut_limit(self) -> None:
+        """Long generations are not mistaken for overload."""
+        limiter = AdaptiveLimiter("p", initial=10, backoff=0.5)
+        limiter._in_flight = 3
+        for latency_ms in (100, 5000, 60000):
+            limiter.release(completed=True, latency_ms=latency_ms)
+        assert limiter.limit == 10
+
+    @pytest.mark.asyncio
+    async def test_stream_duration_not_recorded(self) -> None:
+        """A stream's slot time does not count as latency."""
+        limiters = ConcurrencyLimiters()
+        async with limiters.slot("p", stream=True):
+            await asyncio.sleep(0.01)
+        assert limiters.get("p").stats()["avg_latency_ms"] is None
+        async with limiters.slot("p"):
+            pass
+        assert limiters.get("p").stats()["avg_latency_ms"] is not None
+
+    @pytest.mark.asyncio
+    async def test_server_errors_and_timeouts_cut_limit(self) -> None:
+        """5xx responses and timeouts are overload; other 4xx are not."""
+        limiters = ConcurrencyLimiters(initial=16, backoff=0.5)
+        request = httpx.Request("POST", "http://p.test")
+        for status in (503, 400):
+            with pytest.raises(httpx.HTTPStatusError):
+                async with limiters.slot("p"):
+                    httpx.Response(status, request=request).raise_for_status()
+        with pytest.raises(httpx.ReadTimeout):
+            async with limiters.slot("p"):
+                raise httpx.ReadTimeout("timed out", request=request)
+        assert limiters.get("p").limit == 4
+
+
+class TestClientLimiter:
+    """Tests for the limiter in LLMClient."""
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded(self) -> None:
+        """No more than the limit reach the provider at once."""
+        active = 0
+        peak = 0
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return httpx.Response(
+                200,
+                json={
+                    "content": [{"text": "ok"}],
+                    "usage": {"input_tokens": 1, "output_tokens": 1},
+                },
+            )
+
+        client = LLMClient(
+            transport=httpx.MockTransport(handler),
+            limiters=ConcurrencyLimiters(initial=3, max_limit=3),
+        )
+        await asyncio.gather(
+            *(client.generate(f"prompt {i}") for i in range(12))
+        )
+        stats = client.stats()["concurrency"]["anthropic"]
+        await client.close()
+        assert peak == 3
+        assert stats["in_flight"] == 0
+        assert stats["queued"] == 0
+
+    @pytest.mark.asyncio
+    async def test_429_shrinks_limit(self) -> None:
+        """Provider throttling lowers the provider's limit."""
+        client = LLMClient(
+            transport=httpx.MockTransport(
+                lambda request: httpx.Response(429, json={"error": "slow"})
+            ),
+            retry_policy=RetryPolicy(max_attempts=1),
+            limiters=ConcurrencyLimiters(initial=10, backoff=0.5),
+        )
+        with pytest.raises(httpx.HTTPStatusError):
+            await client.generate("hi")
+        await client.close()
+        assert client.limiters.get("anthropic").limit == 5
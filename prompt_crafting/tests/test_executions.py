@@ -1,14 +1,23 @@
 """Tests for prompt execution endpoints.
 
 Covers template rendering, scope rejection, audit log creation,
-and error handling for execution flows.
+required-variable checks, pre-flight estimates and limits, streaming,
+multi-model comparison, and error handling for execution flows.
 """
 
+import json
+from collections.abc import AsyncIterator
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import httpx
 import pytest
 from httpx import AsyncClient
 
+from prompt_crafting.api.services.llm_client import (
+    LLMResponse,
+    LLMStreamChunk,
+)
+
 
 @pytest.mark.asyncio
 async def test_execute_prompt_not_found(client: AsyncClient) -> None:
@@ -74,6 +83,8 @@ async def test_execute_prompt_success(
             cost_usd=0.001,
             provider="anthropic",
             model="claude-sonnet-4-20250514",
+            cache_read_tokens=0,
+            cache_write_tokens=0,
         )
     )
 
@@ -120,6 +131,8 @@ async def test_execute_security_prompt_creates_audit_log(
             cost_usd=0.003,
             provider="anthropic",
             model="claude-sonnet-4-20250514",
+            cache_read_tokens=0,
+            cache_write_tokens=0,
         )
     )
 
@@ -147,3 +160,325 @@ async def test_execute_security_prompt_creates_audit_log(
             },
         )
     assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+@patch("prompt_crafting.api.routes.executions.create_execution_log_dir")
+@patch("prompt_crafting.api.routes.executions._llm_client")
+async def test_execute_rejects_missing_variables(
+    mock_client: MagicMock,
+    mock_log_dir: MagicMock,
+    client: AsyncClient,
+) -> None:
+    """Missing template variables are rejected before any LLM spend."""
+    mock_client.generate = AsyncMock()
+    create_resp = await client.post(
+        "/api/v1/prompts",
+        json={
+            "name": "needs-vars",
+            "template": "{{ greeting }} {{ name }}",
+            "parameters": {"greeting": "Hi"},
+        },
+    )
+    prompt_id = create_resp.json()["id"]
+
+    response = await client.post(
+        f"/api/v1/prompts/{prompt_id}/execute",
+        json={"input_data": {}},
+    )
+    assert response.status_code == 422
+    assert response.json()["detail"] == (
+        "Missing required template variables: name"
+    )
+    mock_client.generate.assert_not_called()
+    mock_log_dir.assert_not_called()
+
+
+@pytest.mark.asyncio
+@patch("prompt_crafting.api.routes.executions._llm_client")
+async def test_execute_stream_forwards_tokens(
+    mock_client: MagicMock,
+    client: AsyncClient,
+) -> None:
+    """POST /execute:stream sends deltas, then persists the execution."""
+
+    async def _stream(**_kwargs: object) -> AsyncIterator[LLMStreamChunk]:
+        yield LLMStreamChunk(text="Hello")
+        yield LLMStreamChunk(text=" there")
+        yield LLMStreamChunk(
+            text="",
+            response=LLMResponse(
+                text="Hello there",
+                input_tokens=10,
+                output_tokens=2,
+                total_tokens=12,
+                cost_usd=0.0001,
+                provider="anthropic",
+                model="claude-sonnet-4-20250514",
+            ),
+        )
+
+    mock_client.generate_stream = _stream
+    create_resp = await client.post(
+        "/api/v1/prompts",
+        json={"name": "streamed", "template": "Hi {{ name }}"},
+    )
+    prompt_id = create_resp.json()["id"]
+
+    response = await client.post(
+        f"/api/v1/prompts/{prompt_id}/execute:stream",
+        json={"input_data": {"name": "World"}},
+    )
+    assert response.status_code == 200
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert [e["text"] for e in events if e["type"] == "delta"] == [
+        "Hello",
+        " there",
+    ]
+    done = events[-1]
+    assert done["type"] == "done"
+    assert done["execution"]["output_text"] == "Hello there"
+    assert done["execution"]["tokens_used"] == 12
+
+
+@pytest.mark.asyncio
+async def test_execute_stream_preflight_errors(client: AsyncClient) -> None:
+    """Pre-flight failures are plain HTTP errors, not stream events."""
+    response = await client.post(
+        "/api/v1/prompts/00000000-0000-0000-0000-000000000000"
+        "/execute:stream",
+        json={"input_data": {}},
+    )
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+@patch("prompt_crafting.api.routes.executions._llm_client")
+async def test_execute_compare_fans_out(
+    mock_client: MagicMock,
+    client: AsyncClient,
+) -> None:
+    """POST /execute:compare runs every model and groups the results."""
+    request = httpx.Request("POST", "https://api.openai.com")
+
+    async def _generate(
+        prompt: str, provider: str, model: str, **_kwargs: object
+    ) -> LLMResponse:
+        if model == "gpt-4-turbo":
+            raise httpx.ReadTimeout("timed out", request=request)
+        return LLMResponse(
+            text=f"{model}: {prompt}",
+            input_tokens=10,
+            output_tokens=2,
+            total_tokens=12,
+            cost_usd=0.0001,
+            provider=provider,
+            model=model,
+        )
+
+    mock_client.generate = AsyncMock(side_effect=_generate)
+    create_resp = await client.post(
+        "/api/v1/prompts",
+        json={"name": "compared", "template": "Hi {{ name }}"},
+    )
+    prompt_id = create_resp.json()["id"]
+
+    response = await client.post(
+        f"/api/v1/prompts/{prompt_id}/execute:compare",
+        json={
+            "input_data": {"name": "World"},
+            "targets": [
+                {
+                    "llm_provider": "anthropic",
+                    "model_name": "claude-sonnet-4-20250514",
+                },
+                {"llm_provider": "openai", "model_name": "gpt-4o"},
+                {"llm_provider": "openai", "model_name": "gpt-4-turbo"},
+            ],
+        },
+    )
+    assert response.status_code == 200
+    data = response.json()
+    sonnet, gpt4o, turbo = data["results"]
+    assert sonnet["execution"]["output_text"] == (
+        "claude-sonnet-4-20250514: Hi World"
+    )
+    assert gpt4o["execution"]["model_name"] == "gpt-4o"
+    assert sonnet["execution"]["group_id"] == data["group_id"]
+    assert gpt4o["execution"]["group_id"] == data["group_id"]
+    assert turbo["execution"] is None
+    assert "timed out" in turbo["error"]
+
+
+@pytest.mark.asyncio
+@patch("prompt_crafting.api.routes.executions._llm_client")
+async def test_execute_compare_checks_every_target(
+    mock_client: MagicMock,
+    client: AsyncClient,
+) -> None:
+    """A target that cannot fit its context window fails the request."""
+    mock_client.generate = AsyncMock()
+    create_resp = await client.post(
+        "/api/v1/prompts",
+        json={"name": "compared", "template": "Hi {{ name }}"},
+    )
+    prompt_id = create_resp.json()["id"]
+
+    response = await client.post(
+        f"/api/v1/prompts/{prompt_id}/execute:compare",
+        json={
+            "input_data": {"name": "World"},
+            "max_tokens": 8192,
+            "targets": [
+                {
+                    "llm_provider": "anthropic",
+                    "model_name": "claude-sonnet-4-20250514",
+                },
+                {"llm_provider": "openai", "model_name": "gpt-4"},
+            ],
+        },
+    )
+    assert response.status_code == 413
+    assert "openai/gpt-4" in response.json()["detail"]
+    mock_client.generate.assert_not_called()
+
+
+@pytest.mark.asyncio
+@patch("prompt_crafting.api.routes.executions._llm_client")
+async def test_execute_compare_all_fail(
+    mock_client: MagicMock,
+    client: AsyncClient,
+) -> None:
+    """POST /execute:compare returns 502 if no model answers."""
+    mock_client.generate = AsyncMock(side_effect=RuntimeError("down"))
+    create_resp = await client.post(
+        "/api/v1/prompts",
+        json={"name": "compared", "template": "Hi"},
+    )
+    prompt_id = create_resp.json()["id"]
+
+    response = await client.post(
+        f"/api/v1/prompts/{prompt_id}/execute:compare",
+        json={
+            "input_data": {},
+            "targets": [{"llm_provider": "openai", "model_name": "gpt-4o"}],
+        },
+    )
+    assert response.status_code == 502
+
+
+@pytest.mark.asyncio
+@patch("prompt_crafting.api.routes.executions._llm_client")
+async def test_estimate_prompt(
+    mock_client: MagicMock,
+    client: AsyncClient,
+) -> None:
+    """POST /estimate renders and prices a prompt without an LLM call."""
+    mock_client.generate = AsyncMock()
+    create_resp = await client.post(
+        "/api/v1/prompts",
+        json={"name": "estimated", "template": "Hi {{ name }}"},
+    )
+    prompt_id = create_resp.json()["id"]
+
+    response = await client.post(
+        f"/api/v1/prompts/{prompt_id}/estimate",
+        json={
+            "input_data": {"name": "World"},
+            "model_name": "claude-sonnet-4-20250514",
+            "max_tokens": 1000,
+        },
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["input_tokens"] == 2
+    assert data["max_output_tokens"] == 1000
+    assert data["context_window"] == 200000
+    assert data["fits_context"] is True
+    # 2/1000 * 0.003 + 1000/1000 * 0.015
+    assert data["max_cost_usd"] == pytest.approx(0.015006)
+    mock_client.generate.assert_not_called()
+
+
+@pytest.mark.asyncio
+@patch("prompt_crafting.api.routes.executions._llm_client")
+async def test_execute_rejects_context_overflow(
+    mock_client: MagicMock,
+    client: AsyncClient,
+) -> None:
+    """An execution that cannot fit the context window gets a 413."""
+    mock_client.generate = AsyncMock()
+    create_resp = await client.post(
+        "/api/v1/prompts",
+        json={"name": "too-long", "template": "{{ text }}"},
+    )
+    prompt_id = create_resp.json()["id"]
+
+    response = await client.post(
+        f"/api/v1/prompts/{prompt_id}/execute",
+        json={
+            "input_data": {"text": "word " * 8000},
+            "llm_provider": "openai",
+            "model_name": "gpt-4",
+            "max_tokens": 1000,
+        },
+    )
+    assert response.status_code == 413
+    assert "context window" in response.json()["detail"]
+    mock_client.generate.assert_not_called()
+
+
+@pytest.mark.asyncio
+@patch("prompt_crafting.api.routes.executions._llm_client")
+async def test_execute_rejects_cost_cap(
+    mock_client: MagicMock,
+    client: AsyncClient,
+) -> None:
+    """An execution whose worst-case cost exceeds max_cost_usd fails."""
+    mock_client.generate = AsyncMock()
+    create_resp = await client.post(
+        "/api/v1/prompts",
+        json={"name": "pricey", "template": "Hi {{ name }}"},
+    )
+    prompt_id = create_resp.json()["id"]
+
+    response = await client.post(
+        f"/api/v1/prompts/{prompt_id}/execute",
+        json={
+            "input_data": {"name": "World"},
+            "max_tokens": 1000,
+            "max_cost_usd": 0.01,
+        },
+    )
+    assert response.status_code == 422
+    assert "exceeds the $0.0100 cap" in response.json()["detail"]
+    mock_client.generate.assert_not_called()
+
+
+@pytest.mark.asyncio
+@patch("prompt_crafting.api.routes.executions._llm_client")
+async def test_execute_cost_cap_prices_unlisted_models(
+    mock_client: MagicMock,
+    client: AsyncClient,
+) -> None:
+    """Unpriced models are held to the cap at fallback rates."""
+    mock_client.generate = AsyncMock()
+    create_resp = await client.post(
+        "/api/v1/prompts",
+        json={"name": "unpriced", "template": "Hi {{ name }}"},
+    )
+    prompt_id = create_resp.json()["id"]
+
+    response = await client.post(
+        f"/api/v1/prompts/{prompt_id}/execute",
+        json={
+            "input_data": {"name": "World"},
+            "llm_provider": "openai",
+            "model_name": "my-fine-tune",
+            "max_tokens": 1000,
+            "max_cost_usd": 0.001,
+        },
+    )
+    assert response.status_code == 422
+    assert "exceeds the $0.0010 cap" in response.json()["detail"]
+    mock_client.generate.assert_not_called()
@@ -0,0 +1,188 @@
+"""Tests for prompt-version experiments.
+
+Covers the streaming statistics, the experiment endpoint and the
+stored summaries served by ``/analytics/experiments``.
+"""
+
+import statistics
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from prompt_crafting.api.services.experiment_stats import (
+    RunningStats,
+    VersionStats,
+)
+from prompt_crafting.api.services.llm_client import LLMResponse
+from prompt_crafting.db.models import Execution
+
+
+class TestRunningStats:
+    """Tests for Welford aggregation."""
+
+    def test_matches_batch_statistics(self) -> None:
+        """Streaming mean and stddev equal the two-pass values."""
+        values = [120.0, 80.5, 99.0, 240.25, 101.0, 87.0]
+        stats = RunningStats()
+        for value in values:
+            stats.add(value)
+        assert stats.count == len(values)
+        assert stats.mean == pytest.approx(statistics.mean(values))
+        assert stats.stddev == pytest.approx(statistics.stdev(values))
+        assert (stats.min, stats.max) == (80.5, 240.25)
+
+    def test_empty_and_single(self) -> None:
+        """Too few values give a zero stddev."""
+        stats = RunningStats()
+        assert stats.to_dict()["stddev"] == 0.0
+        stats.add(5)
+        assert stats.to_dict()["stddev"] == 0.0
+
+    def test_version_deltas(self) -> None:
+        """Deltas compare mean values against the baseline."""
+        baseline = VersionStats(1, "a")
+        candidate = VersionStats(2, "b")
+        baseline.add(100, 10, 0.01)
+        candidate.add(150, 5, 0.01)
+        delta = candidate.to_dict(baseline)["delta"]
+        assert delta["latency_ms"] == {"mean": 50, "pct": 50.0}
+        assert delta["tokens"]["pct"] == -50.0
+        assert delta["cost_usd"]["mean"] == 0
+        assert "delta" not in baseline.to_dict()
+
+
+def _response(prompt: str, **_kwargs: object) -> LLMResponse:
+    """Canned response whose usage grows with the prompt length."""
+    return LLMResponse(
+        text="ok",
+        input_tokens=len(prompt),
+        output_tokens=1,
+        total_tokens=len(prompt) + 1,
+        cost_usd=0.0001,
+        provider="anthropic",
+        model="claude-sonnet-4-20250514",
+    )
+
+
+async def _create_versions(client: AsyncClient, *templates: str) -> str:
+    """Create a prompt with one version per template; return the id."""
+    response = await client.post(
+        "/api/v1/prompts", json={"name": "ab", "template": templates[0]}
+    )
+    prompt_id = response.json()["id"]
+    for template in templates[1:]:
+        response = await client.put(
+            f"/api/v1/prompts/{prompt_id}", json={"template": template}
+        )
+    return prompt_id
+
+
+@pytest.mark.asyncio
+@patch("prompt_crafting.api.routes.executions._llm_client")
+async def test_experiment_compares_versions(
+    mock_client: MagicMock,
+    client: AsyncClient,
+    db_session: AsyncSession,
+) -> None:
+    """Every input runs against each version; the summary is stored."""
+    mock_client.generate = AsyncMock(side_effect=_response)
+    prompt_id = await _create_versions(
+        client, "Hi {{ name }}", "Hello there, {{ name }}"
+    )
+
+    response = await client.post(
+        f"/api/v1/prompts/{prompt_id}/experiments",
+        json={"inputs": [{"name": "a"}, {"name": "bb"}, {"name": "c"}]},
+    )
+    assert response.status_code == 201
+    experiment = response.json()
+    assert experiment["versions"] == [1, 2]
+    baseline, candidate = experiment["results"]
+    assert baseline["executions"] == candidate["executions"] == 3
+    assert baseline["tokens"]["mean"] == pytest.approx(5 + 1 / 3)
+    assert candidate["delta"]["tokens"]["mean"] == pytest.approx(10)
+    assert mock_client.generate.await_args.kwargs["use_cache"] is False
+
+    count = await db_session.scalar(
+        select(func.count())
+        .select_from(Execution)
+        .where(Execution.experiment_id == experiment["id"])
+    )
+    assert count == 6
+
+    listed = await client.get(
+        "/api/v1/analytics/experiments", params={"prompt_name": "ab"}
+    )
+    assert [e["id"] for e in listed.json()] == [experiment["id"]]
+    stored = await client.get(
+        f"/api/v1/analytics/experiments/{experiment['id']}"
+    )
+    assert stored.json()["results"] == experiment["results"]
+
+
+@pytest.mark.asyncio
+@patch("prompt_crafting.api.routes.executions._llm_client")
+async def test_experiment_counts_failures(
+    mock_client: MagicMock,
+    client: AsyncClient,
+) -> None:
+    """Failed calls are counted per version, not raised."""
+    mock_client.generate = AsyncMock(side_effect=RuntimeError("down"))
+    prompt_id = await _create_versions(client, "A", "B", "C")
+
+    response = await client.post(
+        f"/api/v1/prompts/{prompt_id}/experiments",
+        json={"inputs": [{}, {}], "versions": [3, 1]},
+    )
+    assert response.status_code == 201
+    results = response.json()["results"]
+    assert [r["version"] for r in results] == [3, 1]
+    assert [r["failures"] for r in results] == [2, 2]
+    assert results[1]["delta"]["latency_ms"]["mean"] is None
+
+
+@pytest.mark.asyncio
+@patch("prompt_crafting.api.routes.executions._llm_client")
+async def test_experiment_checks_cost_cap(
+    mock_client: MagicMock,
+    client: AsyncClient,
+) -> None:
+    """Calls over the cost cap count as failures and are not sent."""
+    mock_client.generate = AsyncMock(side_effect=_response)
+    prompt_id = await _create_versions(client, "A", "B")
+
+    response = await client.post(
+        f"/api/v1/prompts/{prompt_id}/experiments",
+        json={"inputs": [{}], "max_tokens": 1000, "max_cost_usd": 0.001},
+    )
+    assert response.status_code == 201
+    assert [r["failures"] for r in response.json()["results"]] == [1, 1]
+    mock_client.generate.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_experiment_validation(client: AsyncClient) -> None:
+    """Experiments need two known versions and complete inputs."""
+    prompt_id = await _create_versions(client, "Hi {{ name }}")
+    url = f"/api/v1/prompts/{prompt_id}/experiments"
+
+    response = await client.post(url, json={"inputs": [{"name": "a"}]})
+    assert response.status_code == 422
+
+    response = await client.post(
+        url, json={"inputs": [{"name": "a"}], "versions": [1, 7]}
+    )
+    assert response.status_code == 404
+
+    await client.put(
+        f"/api/v1/prompts/{prompt_id}", json={"template": "{{ other }}"}
+    )
+    response = await client.post(url, json={"inputs": [{"name": "a"}]})
+    assert response.status_code == 422
+    assert response.json()["detail"].startswith("Version 2, input 0:")
+
+    response = await client.get("/api/v1/analytics/experiments/missing")
+    assert response.status_code == 404
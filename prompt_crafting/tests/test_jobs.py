@@ -0,0 +1,425 @@
+"""Tests for batch execution jobs.
+
+Covers the job queue's worker pool, task jobs, bulk writes and result
+streaming, and the ``execute:batch`` (including provider batches) and
+``/jobs`` endpoints.
+"""
+
+import asyncio
+import json
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from prompt_crafting.api.services.job_queue import (
+    JobItemResult,
+    JobQueue,
+    job_queue,
+)
+from prompt_crafting.api.services.llm_client import (
+    LLMBatchResult,
+    LLMResponse,
+)
+from prompt_crafting.db.models import AuditLog, Execution
+from prompt_crafting.tests.conftest import (
+    test_session_factory as _session_factory,
+)
+
+
+def _ok(index: int, item: Any) -> tuple[JobItemResult, list]:
+    """Successful outcome persisting the item itself."""
+    return JobItemResult(index=index, status="succeeded"), [item]
+
+
+class TestJobQueue:
+    """Tests for the in-process job queue."""
+
+    @pytest.mark.asyncio
+    async def test_bounded_concurrency(self) -> None:
+        """No more than ``workers`` items run at once."""
+        queue = JobQueue(workers=3)
+        running = peak = 0
+
+        async def process(index: int, item: Any) -> tuple:
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return _ok(index, item)
+
+        job = queue.submit("p", list(range(10)), process, AsyncMock())
+        await queue.join()
+        await queue.shutdown()
+        assert peak == 3
+        assert job.done and job.succeeded == 10
+
+    @pytest.mark.asyncio
+    async def test_rows_written_in_bulk(self) -> None:
+        """Rows are written in batches of ``insert_batch``."""
+        queue = JobQueue(workers=1, insert_batch=4, flush_interval_s=60)
+        write = AsyncMock()
+
+        async def process(index: int, item: Any) -> tuple:
+            return _ok(index, item)
+
+        queue.submit("p", list(range(10)), process, write)
+        await queue.join()
+        await queue.shutdown()
+        assert [len(c.args[0]) for c in write.await_args_list] == [4, 4, 2]
+
+    @pytest.mark.asyncio
+    async def test_failures_are_reported_per_item(self) -> None:
+        """A failing item or write marks items failed, not the job."""
+        queue = JobQueue(workers=2, insert_batch=1)
+
+        async def process(index: int, item: Any) -> tuple:
+            if item == "bad":
+                raise ValueError("render failed")
+            return _ok(index, item)
+
+        async def write(rows: list) -> None:
+            if rows == ["unsaved"]:
+                raise RuntimeError("db down")
+
+        job = queue.submit("p", ["ok", "bad", "unsaved"], process, write)
+        await queue.join()
+        await queue.shutdown()
+        errors = {r.index: r.error for r in job.results}
+        assert job.done and job.succeeded == 1 and job.failed == 2
+        assert errors[1] == "render failed"
+        assert "db down" in errors[2]
+
+    @pytest.mark.asyncio
+    async def test_stalled_job_flushes_on_timer(self) -> None:
+        """Buffered results are written even while no item completes."""
+        queue = JobQueue(workers=2, insert_batch=100, flush_interval_s=0.01)
+        release = asyncio.Event()
+        write = AsyncMock()
+
+        async def process(index: int, item: Any) -> tuple:
+            if item == "slow":
+                await release.wait()
+            return _ok(index, item)
+
+        job = queue.submit("p", ["fast", "slow"], process, write)
+        await asyncio.sleep(0.05)
+        assert [r.index for r in job.results] == [0]
+        write.assert_awaited_once_with(["fast"])
+        release.set()
+        await queue.join()
+        await queue.shutdown()
+        assert job.done and job.succeeded == 2
+
+    @pytest.mark.asyncio
+    async def test_follow_streams_until_done(self) -> None:
+        """Followers get every result once, then stop."""
+        queue = JobQueue(workers=1, insert_batch=1)
+
+        async def process(index: int, item: Any) -> tuple:
+            await asyncio.sleep(0.001)
+            return _ok(index, item)
+
+        job = queue.submit("p", list(range(5)), process, AsyncMock())
+        seen = [
+            result.index async for batch in job.follow() for result in batch
+        ]
+        await queue.shutdown()
+        assert seen == [0, 1, 2, 3, 4]
+
+    @pytest.mark.asyncio
+    async def test_task_job_writes_in_batches(self) -> None:
+        """A task job's outcomes are written in ``insert_batch`` chunks."""
+        queue = JobQueue(insert_batch=2)
+        write = AsyncMock()
+
+        async def run() -> list:
+            return [_ok(index, index) for index in range(5)]
+
+        job = queue.submit_task("p", 5, run, write)
+        await queue.join()
+        await queue.shutdown()
+        assert job.done and job.succeeded == 5
+        assert [len(c.args[0]) for c in write.await_args_list] == [2, 2, 1]
+
+    @pytest.mark.asyncio
+    async def test_task_job_failure_fails_every_item(self) -> None:
+        """If the task raises, each item is reported failed."""
+        queue = JobQueue()
+
+        async def run() -> list:
+            raise TimeoutError("batch expired")
+
+        job = queue.submit_task("p", 3, run, AsyncMock())
+        await queue.join()
+        await queue.shutdown()
+        assert job.done and job.failed == 3
+        assert {r.error for r in job.results} == {"batch expired"}
+
+    def test_empty_job_rejected(self) -> None:
+        """A job needs at least one item."""
+        with pytest.raises(ValueError):
+            JobQueue().submit("p", [], AsyncMock(), AsyncMock())
+
+
+def _response(text: str) -> LLMResponse:
+    """Canned LLM response."""
+    return LLMResponse(
+        text=text,
+        input_tokens=3,
+        output_tokens=2,
+        total_tokens=5,
+        cost_usd=0.0001,
+        provider="anthropic",
+        model="claude-sonnet-4-20250514",
+    )
+
+
+async def _create_prompt(client: AsyncClient, **fields: Any) -> str:
+    """Create a prompt and return its id."""
+    response = await client.post(
+        "/api/v1/prompts",
+        json={"name": "batch", "template": "Hi {{ name }}", **fields},
+    )
+    return response.json()["id"]
+
+
+@pytest.mark.asyncio
+@patch(
+    "prompt_crafting.api.routes.executions.async_session_factory",
+    _session_factory,
+)
+@patch("prompt_crafting.api.routes.executions._llm_client")
+async def test_batch_execution(
+    mock_client: MagicMock,
+    client: AsyncClient,
+    db_session: AsyncSession,
+) -> None:
+    """A batch job executes every input and bulk-inserts the rows."""
+    mock_client.generate = AsyncMock(
+        side_effect=lambda prompt, **_: _response(prompt.upper())
+    )
+    prompt_id = await _create_prompt(client, category="security")
+
+    response = await client.post(
+        f"/api/v1/prompts/{prompt_id}/execute:batch",
+        json={"inputs": [{"name": "a"}, {"name": "b"}, {"name": "c"}]},
+    )
+    assert response.status_code == 202
+    job = response.json()
+    assert job["total"] == 3
+    await job_queue.join()
+
+    response = await client.get(f"/api/v1/jobs/{job['id']}")
+    data = response.json()
+    assert data["status"] == "completed"
+    assert data["succeeded"] == 3
+    outputs = {r["index"]: r["output_text"] for r in data["results"]}
+    assert outputs == {0: "HI A", 1: "HI B", 2: "HI C"}
+
+    count = await db_session.scalar(
+        select(func.count()).select_from(Execution)
+    )
+    audits = await db_session.scalar(
+        select(func.count()).select_from(AuditLog)
+    )
+    assert count == 3 and audits == 3
+
+
+@pytest.mark.asyncio
+@patch(
+    "prompt_crafting.api.routes.executions.async_session_factory",
+    _session_factory,
+)
+@patch("prompt_crafting.api.routes.executions.write_metrics_log")
+@patch("prompt_crafting.api.routes.executions._llm_client")
+async def test_batch_lookups_chunked_by_insert_batch(
+    mock_client: MagicMock,
+    mock_metrics: MagicMock,
+    client: AsyncClient,
+) -> None:
+    """Totals and outputs cover jobs larger than one insert batch."""
+    mock_client.generate = AsyncMock(
+        side_effect=lambda prompt, **_: _response(prompt.upper())
+    )
+    prompt_id = await _create_prompt(client)
+    names = ["a", "b", "c", "d"]
+
+    with patch.object(job_queue, "_insert_batch", 3):
+        response = await client.post(
+            f"/api/v1/prompts/{prompt_id}/execute:batch",
+            json={"inputs": [{"name": name} for name in names]},
+        )
+        await job_queue.join()
+        data = (
+            await client.get(f"/api/v1/jobs/{response.json()['id']}")
+        ).json()
+
+    outputs = [r["output_text"] for r in data["results"]]
+    assert sorted(outputs) == [f"HI {name.upper()}" for name in names]
+    totals = mock_metrics.call_args.args[1]
+    assert totals["tokens_used"] == 4 * 5
+    assert totals["cost_usd"] == pytest.approx(4 * 0.0001)
+
+
+@pytest.mark.asyncio
+@patch(
+    "prompt_crafting.api.routes.executions.async_session_factory",
+    _session_factory,
+)
+@patch(
+    "prompt_crafting.api.routes.jobs.async_session_factory",
+    _session_factory,
+)
+@patch("prompt_crafting.api.routes.executions._llm_client")
+async def test_batch_stream(
+    mock_client: MagicMock,
+    client: AsyncClient,
+) -> None:
+    """Streaming a job yields each result, then the final progress."""
+    mock_client.generate = AsyncMock(return_value=_response("ok"))
+    prompt_id = await _create_prompt(client)
+    response = await client.post(
+        f"/api/v1/prompts/{prompt_id}/execute:batch",
+        json={"inputs": [{"name": "a"}, {"name": "b"}]},
+    )
+    job_id = response.json()["id"]
+
+    response = await client.get(f"/api/v1/jobs/{job_id}?stream=true")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["type"] for line in lines] == ["result", "result", "done"]
+    assert lines[0]["result"]["output_text"] == "ok"
+    assert lines[-1]["job"]["succeeded"] == 2
+
+
+@pytest.mark.asyncio
+@patch(
+    "prompt_crafting.api.routes.executions.async_session_factory",
+    _session_factory,
+)
+@patch("prompt_crafting.api.routes.executions._llm_client")
+async def test_batch_items_check_cost_cap(
+    mock_client: MagicMock,
+    client: AsyncClient,
+) -> None:
+    """Items over the cost cap fail without calling the LLM."""
+    mock_client.generate = AsyncMock(return_value=_response("ok"))
+    prompt_id = await _create_prompt(client)
+    response = await client.post(
+        f"/api/v1/prompts/{prompt_id}/execute:batch",
+        json={
+            "inputs": [{"name": "a"}],
+            "max_tokens": 1000,
+            "max_cost_usd": 0.001,
+        },
+    )
+    await job_queue.join()
+
+    data = (await client.get(f"/api/v1/jobs/{response.json()['id']}")).json()
+    assert data["failed"] == 1
+    assert "exceeds the $0.0010 cap" in data["results"][0]["error"]
+    mock_client.generate.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_batch_rejects_missing_variables(client: AsyncClient) -> None:
+    """Every input set is checked before the job is queued."""
+    prompt_id = await _create_prompt(client)
+    response = await client.post(
+        f"/api/v1/prompts/{prompt_id}/execute:batch",
+        json={"inputs": [{"name": "a"}, {}]},
+    )
+    assert response.status_code == 422
+    assert response.json()["detail"].startswith("Input 1:")
+
+
+@pytest.mark.asyncio
+async def test_unknown_job(client: AsyncClient) -> None:
+    """An unknown job id is a 404."""
+    response = await client.get("/api/v1/jobs/missing")
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+@patch(
+    "prompt_crafting.api.routes.executions.async_session_factory",
+    _session_factory,
+)
+@patch("prompt_crafting.api.routes.executions._llm_client")
+async def test_provider_batch_execution(
+    mock_client: MagicMock,
+    client: AsyncClient,
+    db_session: AsyncSession,
+) -> None:
+    """A provider batch sends every input at once and maps the results."""
+    mock_client.generate_batch = AsyncMock(
+        return_value=[
+            LLMBatchResult(response=_response("A")),
+            LLMBatchResult(error="request expired"),
+        ]
+    )
+    prompt_id = await _create_prompt(client)
+
+    response = await client.post(
+        f"/api/v1/prompts/{prompt_id}/execute:batch",
+        json={
+            "inputs": [{"name": "a"}, {"name": "b"}],
+            "provider_batch": True,
+        },
+    )
+    assert response.status_code == 202
+    await job_queue.join()
+
+    prompts = mock_client.generate_batch.await_args.args[0]
+    assert prompts == ["Hi a", "Hi b"]
+    mock_client.generate.assert_not_called()
+    data = (await client.get(f"/api/v1/jobs/{response.json()['id']}")).json()
+    assert data["succeeded"] == 1 and data["failed"] == 1
+    errors = {r["index"]: r["error"] for r in data["results"]}
+    assert errors[1] == "request expired"
+    count = await db_session.scalar(
+        select(func.count()).select_from(Execution)
+    )
+    assert count == 1
+
+
+@pytest.mark.asyncio
+async def test_provider_batch_rejects_routing(client: AsyncClient) -> None:
+    """Routing policies cannot be combined with a provider batch."""
+    prompt_id = await _create_prompt(client)
+    response = await client.post(
+        f"/api/v1/prompts/{prompt_id}/execute:batch",
+        json={
+            "inputs": [{"name": "a"}],
+            "provider_batch": True,
+            "routing": {"strategy": "fallback"},
+        },
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+@patch("prompt_crafting.api.routes.executions._llm_client")
+async def test_provider_batch_checks_cost_cap(
+    mock_client: MagicMock,
+    client: AsyncClient,
+) -> None:
+    """A provider batch item over the cost cap rejects the batch."""
+    mock_client.generate_batch = AsyncMock()
+    prompt_id = await _create_prompt(client)
+    response = await client.post(
+        f"/api/v1/prompts/{prompt_id}/execute:batch",
+        json={
+            "inputs": [{"name": "a"}],
+            "provider_batch": True,
+            "max_tokens": 1000,
+            "max_cost_usd": 0.001,
+        },
+    )
+    assert response.status_code == 422
+    assert response.json()["detail"].startswith("Input 0: Worst-case")
+    mock_client.generate_batch.assert_not_called()
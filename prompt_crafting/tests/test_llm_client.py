@@ -1,17 +1,49 @@
 """Tests for the unified LLM client.
 
-Covers cost calculation, provider validation, and response parsing.
-All API calls are mocked — no real LLM requests.
+Covers cost calculation, provider validation, response parsing, SSE
+streaming, the response cache, request coalescing, retries (including
+simulated throttling storms), and hedged requests. All API calls are
+mocked — no real LLM requests.
 """
 
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from typing import Optional
+
+import httpx
 import pytest
 
 from prompt_crafting.api.services.llm_client import (
+    HedgePolicy,
     LLMClient,
+    RetryPolicy,
+    budget_cost,
     calculate_cost,
+    is_retryable,
+    retry_after_seconds,
+)
+from prompt_crafting.api.services.prompt_engine import CACHE_BREAK
+from prompt_crafting.api.services.rate_limiter import RateLimiter
+from prompt_crafting.api.services.response_cache import (
+    MemoryResponseCache,
+    ResponseCache,
+    SQLiteResponseCache,
+    TieredResponseCache,
 )
 
 
+def _sse(events: list[object]) -> bytes:
+    """Encode events as an SSE body (strings are sent verbatim)."""
+    lines = []
+    for event in events:
+        data = event if isinstance(event, str) else json.dumps(event)
+        lines.append(f"data: {data}\n\n")
+    return "".join(lines).encode()
+
+
 class TestCalculateCost:
     """Tests for per-provider token cost calculation."""
 
@@ -65,3 +97,830 @@ class TestLLMClient:
         """Client can be closed without error."""
         client = LLMClient(timeout=5.0)
         await client.close()
+
+
+class TestGenerateStream:
+    """Tests for SSE streaming from both providers."""
+
+    @pytest.mark.asyncio
+    async def test_anthropic_stream(self) -> None:
+        """Anthropic deltas are forwarded and usage is collected."""
+        body = _sse(
+            [
+                {
+                    "type": "message_start",
+                    "message": {"usage": {"input_tokens": 12}},
+                },
+                {"type": "content_block_delta", "delta": {"text": "Hel"}},
+                {"type": "content_block_delta", "delta": {"text": "lo"}},
+                {"type": "message_delta", "usage": {"output_tokens": 3}},
+                {"type": "message_stop"},
+            ]
+        )
+        requests: list[httpx.Request] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return httpx.Response(200, content=body)
+
+        client = LLMClient(transport=httpx.MockTransport(handler))
+        chunks = [
+            chunk
+            async for chunk in client.generate_stream(
+                "hi", model="claude-sonnet-4-20250514"
+            )
+        ]
+        await client.close()
+
+        assert [c.text for c in chunks[:-1]] == ["Hel", "lo"]
+        final = chunks[-1].response
+        assert final is not None
+        assert final.text == "Hello"
+        assert final.input_tokens == 12
+        assert final.output_tokens == 3
+        assert json.loads(requests[0].content)["stream"] is True
+
+    @pytest.mark.asyncio
+    async def test_openai_stream(self) -> None:
+        """OpenAI deltas are forwarded and the usage chunk is read."""
+        body = _sse(
+            [
+                {"choices": [{"delta": {"role": "assistant"}}]},
+                {"choices": [{"delta": {"content": "Hi"}}]},
+                {"choices": [{"delta": {"content": "!"}}]},
+                {
+                    "choices": [],
+                    "usage": {"prompt_tokens": 5, "completion_tokens": 2},
+                },
+                "[DONE]",
+            ]
+        )
+        client = LLMClient(
+            transport=httpx.MockTransport(
+                lambda request: httpx.Response(200, content=body)
+            )
+        )
+        chunks = [
+            chunk
+            async for chunk in client.generate_stream(
+                "hi", provider="openai", model="gpt-4o"
+            )
+        ]
+        await client.close()
+
+        final = chunks[-1].response
+        assert final is not None
+        assert final.text == "Hi!"
+        assert final.total_tokens == 7
+        assert final.cost_usd > 0
+
+    @pytest.mark.asyncio
+    async def test_stream_http_error(self) -> None:
+        """Provider errors surface before any chunk is yielded."""
+        client = LLMClient(
+            transport=httpx.MockTransport(
+                lambda request: httpx.Response(401, json={"error": "no"})
+            )
+        )
+        with pytest.raises(httpx.HTTPStatusError):
+            async for _ in client.generate_stream("hi"):
+                pass
+        await client.close()
+
+
+def _anthropic_handler(calls: list[httpx.Request]):
+    """Return a MockTransport handler answering Anthropic messages."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(
+            200,
+            json={
+                "content": [{"text": f"answer {len(calls)}"}],
+                "usage": {"input_tokens": 10, "output_tokens": 5},
+            },
+        )
+
+    return handler
+
+
+class TestResponseCache:
+    """Tests for the cache tiers and their use in the client."""
+
+    @pytest.mark.asyncio
+    async def test_memory_lru_eviction(self) -> None:
+        """The least recently used entry is evicted when full."""
+        cache = MemoryResponseCache(max_entries=2, ttl_s=60)
+        await cache.set("a", {"v": 1})
+        await cache.set("b", {"v": 2})
+        assert await cache.get("a") == {"v": 1}
+        await cache.set("c", {"v": 3})
+        assert await cache.get("b") is None
+        assert await cache.get("a") == {"v": 1}
+        stats = cache.stats()
+        assert stats["evictions"] == 1
+        assert stats["hits"] == 2
+        assert stats["misses"] == 1
+
+    @pytest.mark.asyncio
+    async def test_memory_ttl_expiry(self) -> None:
+        """Expired entries are treated as misses."""
+        cache = MemoryResponseCache(max_entries=2, ttl_s=-1)
+        await cache.set("a", {"v": 1})
+        assert await cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_interface_is_abstract(self) -> None:
+        """Caches must implement both get and set."""
+
+        class GetOnly(ResponseCache):
+            async def get(self, key: str) -> Optional[dict]:
+                return None
+
+        with pytest.raises(TypeError, match="set"):
+            GetOnly()  # type: ignore[abstract]
+
+    @pytest.mark.asyncio
+    async def test_sqlite_persists_and_evicts(self, tmp_path) -> None:
+        """Disk entries survive reopening and are capped in number."""
+        path = str(tmp_path / "cache.db")
+        cache = SQLiteResponseCache(path, max_entries=2, ttl_s=60)
+        await cache.set("a", {"v": 1})
+        await cache.set("b", {"v": 2})
+        await cache.set("c", {"v": 3})
+        assert cache.stats()["evictions"] == 1
+        cache.close()
+
+        reopened = SQLiteResponseCache(path, max_entries=2, ttl_s=60)
+        assert await reopened.get("a") is None
+        assert await reopened.get("c") == {"v": 3}
+        reopened.close()
+
+    @pytest.mark.asyncio
+    async def test_tiered_promotes_disk_hits(self, tmp_path) -> None:
+        """A disk hit is copied into the memory tier."""
+        disk = SQLiteResponseCache(str(tmp_path / "cache.db"))
+        await disk.set("a", {"v": 1})
+        memory = MemoryResponseCache()
+        cache = TieredResponseCache(memory, disk)
+        assert await cache.get("a") == {"v": 1}
+        assert await memory.get("a") == {"v": 1}
+        assert cache.stats()["hits"] == 1
+        disk.close()
+
+    @pytest.mark.asyncio
+    async def test_deterministic_calls_are_cached(self) -> None:
+        """A temperature 0 repeat is served without an API call."""
+        calls: list[httpx.Request] = []
+        client = LLMClient(
+            transport=httpx.MockTransport(_anthropic_handler(calls)),
+            cache=MemoryResponseCache(),
+        )
+        first = await client.generate("hi", temperature=0)
+        second = await client.generate("hi", temperature=0)
+        await client.close()
+
+        assert len(calls) == 1
+        assert first.cached is False
+        assert second.cached is True
+        assert second.text == first.text
+        assert second.cost_usd == 0.0
+        assert client.stats()["response_cache"]["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_sampled_calls_bypass_cache(self) -> None:
+        """Non-zero temperature skips the cache unless opted in."""
+        calls: list[httpx.Request] = []
+        client = LLMClient(
+            transport=httpx.MockTransport(_anthropic_handler(calls)),
+            cache=MemoryResponseCache(),
+        )
+        await client.generate("hi", temperature=0.7)
+        await client.generate("hi", temperature=0.7)
+        assert len(calls) == 2
+
+        await client.generate("hi", temperature=0.7, use_cache=True)
+        cached = await client.generate(
+            "hi", temperature=0.7, use_cache=True
+        )
+        await client.close()
+        assert len(calls) == 3
+        assert cached.cached is True
+
+    @pytest.mark.asyncio
+    async def test_cache_key_includes_max_tokens(self) -> None:
+        """Requests differing in max_tokens do not share an entry."""
+        calls: list[httpx.Request] = []
+        client = LLMClient(
+            transport=httpx.MockTransport(_anthropic_handler(calls)),
+            cache=MemoryResponseCache(),
+        )
+        await client.generate("hi", temperature=0, max_tokens=10)
+        await client.generate("hi", temperature=0, max_tokens=20)
+        await client.close()
+        assert len(calls) == 2
+
+
+class TestSingleFlight:
+    """Tests for coalescing identical concurrent requests."""
+
+    @staticmethod
+    def _gated_client(
+        calls: list[httpx.Request],
+        gate: asyncio.Event,
+        status: int = 200,
+        cache: Optional[MemoryResponseCache] = None,
+    ) -> LLMClient:
+        """Client whose provider answers only once ``gate`` is set."""
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request)
+            await gate.wait()
+            return httpx.Response(
+                status,
+                json={
+                    "content": [{"text": "shared"}],
+                    "usage": {"input_tokens": 10, "output_tokens": 5},
+                },
+            )
+
+        return LLMClient(transport=httpx.MockTransport(handler), cache=cache)
+
+    @pytest.mark.asyncio
+    async def test_identical_calls_share_one_request(self) -> None:
+        """Concurrent identical calls make a single provider request."""
+        calls: list[httpx.Request] = []
+        gate = asyncio.Event()
+        client = self._gated_client(calls, gate)
+        pending = asyncio.gather(
+            *(client.generate("hi", temperature=0.7) for _ in range(3))
+        )
+        await asyncio.sleep(0.01)
+        assert client.stats()["in_flight"] == 1
+        gate.set()
+        responses = await pending
+        await client.close()
+
+        assert len(calls) == 1
+        assert {r.text for r in responses} == {"shared"}
+        assert sum(r.coalesced for r in responses) == 2
+        assert sum(r.cost_usd > 0 for r in responses) == 1
+        stats = client.stats()
+        assert stats["coalesced"] == 2
+        assert stats["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_different_calls_are_not_coalesced(self) -> None:
+        """Different prompts or models each get their own request."""
+        calls: list[httpx.Request] = []
+        gate = asyncio.Event()
+        gate.set()
+        client = self._gated_client(calls, gate)
+        await asyncio.gather(
+            client.generate("a"),
+            client.generate("b"),
+            client.generate("a", model="claude-opus-4-20250514"),
+        )
+        await client.close()
+        assert len(calls) == 3
+        assert client.stats()["coalesced"] == 0
+
+    @pytest.mark.asyncio
+    async def test_errors_reach_every_caller(self) -> None:
+        """A failed shared request raises in each waiting caller."""
+        calls: list[httpx.Request] = []
+        gate = asyncio.Event()
+        client = self._gated_client(calls, gate, status=400)
+        pending = asyncio.gather(
+            client.generate("hi"),
+            client.generate("hi"),
+            return_exceptions=True,
+        )
+        await asyncio.sleep(0.01)
+        gate.set()
+        results = await pending
+        await client.close()
+        assert all(isinstance(r, httpx.HTTPStatusError) for r in results)
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_others(self) -> None:
+        """Cancelling the first caller leaves the shared request alive."""
+        calls: list[httpx.Request] = []
+        gate = asyncio.Event()
+        client = self._gated_client(calls, gate)
+        first = asyncio.ensure_future(client.generate("hi"))
+        await asyncio.sleep(0.01)
+        second = asyncio.ensure_future(client.generate("hi"))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        gate.set()
+        response = await second
+        await client.close()
+        assert response.text == "shared"
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_coalesced_with_cache(self) -> None:
+        """Coalescing also applies in front of the response cache."""
+        calls: list[httpx.Request] = []
+        gate = asyncio.Event()
+        client = self._gated_client(
+            calls, gate, cache=MemoryResponseCache()
+        )
+        pending = asyncio.gather(
+            client.generate("hi", temperature=0),
+            client.generate("hi", temperature=0),
+        )
+        await asyncio.sleep(0.01)
+        gate.set()
+        await pending
+        cached = await client.generate("hi", temperature=0)
+        await client.close()
+        assert len(calls) == 1
+        assert cached.cached is True
+
+
+_OK_BODY = {
+    "content": [{"text": "ok"}],
+    "usage": {"input_tokens": 1, "output_tokens": 1},
+}
+
+_FAST_RETRIES = RetryPolicy(
+    max_attempts=10, base_delay_s=0.001, max_delay_s=0.01, deadline_s=5
+)
+
+
+class _ThrottlingProvider:
+    """MockTransport handler simulating a throttled provider.
+
+    Admits at most ``capacity`` requests per ``window_s``; the rest are
+    answered with ``status`` and the given headers.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        window_s: float,
+        status: int = 429,
+        headers: Optional[dict[str, str]] = None,
+    ) -> None:
+        self.capacity = capacity
+        self.window_s = window_s
+        self.status = status
+        self.headers = headers or {}
+        self.accepted: list[float] = []
+        self.rejected = 0
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        now = time.monotonic()
+        recent = [t for t in self.accepted if now - t < self.window_s]
+        if len(recent) >= self.capacity:
+            self.rejected += 1
+            return httpx.Response(
+                self.status, headers=self.headers, json={"error": "busy"}
+            )
+        self.accepted.append(now)
+        return httpx.Response(200, json=_OK_BODY)
+
+
+class TestRetryClassification:
+    """Tests for which failures are retried."""
+
+    @pytest.mark.parametrize(
+        ("status", "expected"),
+        [
+            (400, False),
+            (401, False),
+            (404, False),
+            (429, True),
+            (500, True),
+            (503, True),
+            (529, True),
+        ],
+    )
+    def test_status_classification(
+        self, status: int, expected: bool
+    ) -> None:
+        """Only 429 and 5xx statuses are retryable."""
+        request = httpx.Request("POST", "https://api.test")
+        response = httpx.Response(status, request=request)
+        exc = httpx.HTTPStatusError(
+            "error", request=request, response=response
+        )
+        assert is_retryable(exc) is expected
+
+    def test_transport_errors_are_retryable(self) -> None:
+        """Connection failures are retryable."""
+        assert is_retryable(httpx.ConnectError("refused"))
+
+    @pytest.mark.asyncio
+    async def test_client_error_is_not_retried(self) -> None:
+        """A 400 fails on the first attempt without waiting."""
+        provider = _ThrottlingProvider(0, 60, status=400)
+        client = LLMClient(
+            transport=httpx.MockTransport(provider),
+            retry_policy=RetryPolicy(base_delay_s=5),
+        )
+        start = time.monotonic()
+        with pytest.raises(httpx.HTTPStatusError):
+            await client.generate("hi")
+        await client.close()
+        assert provider.rejected == 1
+        assert time.monotonic() - start < 1
+
+
+class TestRetryAfter:
+    """Tests for reading the server's wait hints."""
+
+    def test_retry_after_seconds(self) -> None:
+        """Retry-After in seconds is used as is."""
+        assert retry_after_seconds(httpx.Headers({"retry-after": "7"})) == 7
+
+    def test_retry_after_http_date(self) -> None:
+        """Retry-After as an HTTP date is converted to a delay."""
+        when = datetime.now(timezone.utc) + timedelta(seconds=30)
+        headers = httpx.Headers(
+            {"retry-after": format_datetime(when, usegmt=True)}
+        )
+        delay = retry_after_seconds(headers)
+        assert delay is not None
+        assert 28 <= delay <= 30
+
+    def test_openai_exhausted_limit(self) -> None:
+        """The reset of an exhausted OpenAI limit is used."""
+        headers = httpx.Headers(
+            {
+                "x-ratelimit-remaining-requests": "0",
+                "x-ratelimit-reset-requests": "1m30s",
+                "x-ratelimit-remaining-tokens": "5000",
+                "x-ratelimit-reset-tokens": "6m0s",
+            }
+        )
+        assert retry_after_seconds(headers) == 90
+
+    def test_anthropic_exhausted_limit(self) -> None:
+        """Anthropic reset timestamps are converted to a delay."""
+        reset = datetime.now(timezone.utc) + timedelta(seconds=10)
+        headers = httpx.Headers(
+            {
+                "anthropic-ratelimit-tokens-remaining": "0",
+                "anthropic-ratelimit-tokens-reset": reset.isoformat(),
+            }
+        )
+        delay = retry_after_seconds(headers)
+        assert delay is not None
+        assert 8 <= delay <= 10
+
+    def test_no_hint(self) -> None:
+        """Without hints the policy falls back to jitter."""
+        assert retry_after_seconds(httpx.Headers({})) is None
+
+    def test_decorrelated_jitter_bounds(self) -> None:
+        """Jittered waits stay between the base and the cap."""
+        policy = RetryPolicy(base_delay_s=0.5, max_delay_s=4)
+        delay = policy.base_delay_s
+        for _ in range(50):
+            delay = policy.next_delay(delay)
+            assert 0.5 <= delay <= 4
+
+
+class TestThrottlingStorm:
+    """Retries against a simulated throttled provider."""
+
+    @pytest.mark.asyncio
+    async def test_storm_drains(self) -> None:
+        """A burst beyond capacity eventually succeeds for everyone."""
+        provider = _ThrottlingProvider(capacity=5, window_s=0.02)
+        client = LLMClient(
+            transport=httpx.MockTransport(provider),
+            retry_policy=RetryPolicy(
+                max_attempts=50,
+                base_delay_s=0.005,
+                max_delay_s=0.05,
+                deadline_s=10,
+            ),
+        )
+        responses = await asyncio.gather(
+            *(client.generate(f"prompt {i}") for i in range(30))
+        )
+        await client.close()
+        assert all(r.text == "ok" for r in responses)
+        assert len(provider.accepted) == 30
+        assert provider.rejected > 0
+
+    @pytest.mark.asyncio
+    async def test_retry_after_is_honoured(self) -> None:
+        """The client waits at least the server's reset hint."""
+        provider = _ThrottlingProvider(
+            capacity=1,
+            window_s=0.1,
+            headers={
+                "x-ratelimit-remaining-requests": "0",
+                "x-ratelimit-reset-requests": "100ms",
+            },
+        )
+        client = LLMClient(
+            transport=httpx.MockTransport(provider),
+            retry_policy=_FAST_RETRIES,
+        )
+        await client.generate("first")
+        start = time.monotonic()
+        await client.generate("second")
+        await client.close()
+        assert time.monotonic() - start >= 0.1
+        assert provider.rejected == 1
+
+    @pytest.mark.asyncio
+    async def test_attempts_are_bounded(self) -> None:
+        """A provider that never recovers is tried max_attempts times."""
+        provider = _ThrottlingProvider(0, 60, status=503)
+        client = LLMClient(
+            transport=httpx.MockTransport(provider),
+            retry_policy=RetryPolicy(
+                max_attempts=4, base_delay_s=0.001, max_delay_s=0.01
+            ),
+        )
+        with pytest.raises(httpx.HTTPStatusError):
+            await client.generate("hi")
+        await client.close()
+        assert provider.rejected == 4
+
+    @pytest.mark.asyncio
+    async def test_deadline_spans_attempts(self) -> None:
+        """The deadline bounds the total time across all attempts."""
+        provider = _ThrottlingProvider(0, 60, status=503)
+        client = LLMClient(
+            transport=httpx.MockTransport(provider),
+            retry_policy=RetryPolicy(
+                max_attempts=1000,
+                base_delay_s=0.01,
+                max_delay_s=0.05,
+                deadline_s=0.3,
+            ),
+        )
+        start = time.monotonic()
+        with pytest.raises(httpx.HTTPStatusError):
+            await client.generate("hi")
+        await client.close()
+        assert time.monotonic() - start < 0.5
+        assert 1 < provider.rejected < 1000
+
+    @pytest.mark.asyncio
+    async def test_hint_beyond_deadline_fails_fast(self) -> None:
+        """A reset hint past the deadline is not waited for."""
+        provider = _ThrottlingProvider(
+            0, 60, headers={"retry-after": "120"}
+        )
+        client = LLMClient(
+            transport=httpx.MockTransport(provider),
+            retry_policy=RetryPolicy(deadline_s=5),
+        )
+        start = time.monotonic()
+        with pytest.raises(httpx.HTTPStatusError):
+            await client.generate("hi")
+        await client.close()
+        assert provider.rejected == 1
+        assert time.monotonic() - start < 1
+
+    @pytest.mark.asyncio
+    async def test_transport_errors_are_retried(self) -> None:
+        """Connection failures are retried until the provider answers."""
+        attempts = 0
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal attempts
+            attempts += 1
+            if attempts < 3:
+                raise httpx.ConnectError("refused", request=request)
+            return httpx.Response(200, json=_OK_BODY)
+
+        client = LLMClient(
+            transport=httpx.MockTransport(handler),
+            retry_policy=_FAST_RETRIES,
+        )
+        response = await client.generate("hi")
+        await client.close()
+        assert response.text == "ok"
+        assert attempts == 3
+
+
+class TestHedging:
+    """Tests for hedged requests."""
+
+    @staticmethod
+    def _client(
+        delays: dict[str, float],
+        budget_ratio: float = 1.0,
+        rate_limiter: Optional[RateLimiter] = None,
+    ) -> tuple[LLMClient, list[str]]:
+        """Client whose provider hosts answer after fixed delays."""
+        hosts: list[str] = []
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            hosts.append(request.url.host)
+            await asyncio.sleep(delays[request.url.host])
+            if request.url.host == "api.openai.com":
+                return httpx.Response(
+                    200,
+                    json={
+                        "choices": [{"message": {"content": "openai"}}],
+                        "usage": {"prompt_tokens": 1, "completion_tokens": 1},
+                    },
+                )
+            return httpx.Response(200, json=_OK_BODY)
+
+        client = LLMClient(
+            transport=httpx.MockTransport(handler),
+            hedge_policy=HedgePolicy(
+                budget_ratio=budget_ratio, max_burst=5, min_samples=5
+            ),
+            rate_limiter=rate_limiter,
+        )
+        for _ in range(5):
+            client.health.record(
+                "anthropic", "claude-sonnet-4-20250514", 20, ok=True
+            )
+        return client, hosts
+
+    @pytest.mark.asyncio
+    async def test_slow_call_is_hedged(self) -> None:
+        """A call past p95 is hedged and the faster response wins."""
+        client, hosts = self._client(
+            {"api.anthropic.com": 1.0, "api.openai.com": 0.01}
+        )
+        start = time.monotonic()
+        response = await client.generate(
+            "hi", hedge=True, hedge_target=("openai", "gpt-4o")
+        )
+        elapsed = time.monotonic() - start
+        await client.close()
+
+        assert response.text == "openai"
+        assert response.hedged is True
+        assert elapsed < 0.5
+        assert hosts == ["api.anthropic.com", "api.openai.com"]
+        hedging = client.stats()["hedging"]
+        assert hedging["fired"] == 1
+        assert hedging["won"] == 1
+
+    @pytest.mark.asyncio
+    async def test_fast_call_is_not_hedged(self) -> None:
+        """A call finishing before p95 sends no hedge."""
+        client, hosts = self._client(
+            {"api.anthropic.com": 0.0, "api.openai.com": 0.0}
+        )
+        response = await client.generate("hi", hedge=True)
+        await client.close()
+        assert response.hedged is False
+        assert hosts == ["api.anthropic.com"]
+        assert client.stats()["hedging"]["fired"] == 0
+
+    @pytest.mark.asyncio
+    async def test_budget_caps_hedges(self) -> None:
+        """Without hedge credits the slow call is simply awaited."""
+        client, hosts = self._client(
+            {"api.anthropic.com": 0.1, "api.openai.com": 0.0},
+            budget_ratio=0.0,
+        )
+        response = await client.generate("hi", hedge=True)
+        await client.close()
+        assert response.hedged is False
+        assert len(hosts) == 1
+        hedging = client.stats()["hedging"]
+        assert hedging["fired"] == 0
+        assert hedging["skipped_budget"] == 1
+
+    @pytest.mark.asyncio
+    async def test_original_can_still_win(self) -> None:
+        """If the original finishes first the hedge is cancelled."""
+        client, hosts = self._client(
+            {"api.anthropic.com": 0.05, "api.openai.com": 1.0}
+        )
+        start = time.monotonic()
+        response = await client.generate(
+            "hi", hedge=True, hedge_target=("openai", "gpt-4o")
+        )
+        elapsed = time.monotonic() - start
+        await client.close()
+        assert response.text == "ok"
+        assert response.hedged is False
+        assert elapsed < 0.5
+        hedging = client.stats()["hedging"]
+        assert hedging["fired"] == 1
+        assert hedging["won"] == 0
+
+    @pytest.mark.asyncio
+    async def test_losing_request_is_charged(self) -> None:
+        """The cancelled loser's worst case is reported and kept."""
+        limiter = RateLimiter(
+            {"anthropic": {"tpm": 100000}}, clock=lambda: 0.0
+        )
+        client, _ = self._client(
+            {"api.anthropic.com": 1.0, "api.openai.com": 0.01},
+            rate_limiter=limiter,
+        )
+        response = await client.generate(
+            "hi",
+            max_tokens=1000,
+            hedge=True,
+            hedge_target=("openai", "gpt-4o"),
+        )
+        await client.close()
+
+        assert response.hedged is True
+        input_tokens = response.hedge_tokens - 1000
+        assert input_tokens > 0
+        assert response.hedge_cost_usd == pytest.approx(
+            budget_cost(
+                "anthropic", "claude-sonnet-4-20250514", input_tokens, 1000
+            )
+        )
+        available = limiter.stats()["buckets"]["anthropic"]["tpm"]
+        assert available["available"] == 100000 - response.hedge_tokens
+
+
+class TestPromptCaching:
+    """Tests for provider prompt-cache requests and usage accounting."""
+
+    def test_cache_tokens_priced_by_multiplier(self) -> None:
+        """Anthropic cache reads cost 0.1x and writes 1.25x input."""
+        cost = calculate_cost(
+            "anthropic", "claude-sonnet-4-20250514", 0, 0, 1000, 1000
+        )
+        # 1000/1000 * 0.003 * 0.1 + 1000/1000 * 0.003 * 1.25
+        assert abs(cost - 0.00405) < 1e-9
+
+    @pytest.mark.asyncio
+    async def test_anthropic_prefix_sent_with_cache_control(self) -> None:
+        """A marked prefix becomes a cache_control content block."""
+        bodies: list[dict] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            bodies.append(json.loads(request.content))
+            return httpx.Response(
+                200,
+                json={
+                    "content": [{"text": "ok"}],
+                    "usage": {
+                        "input_tokens": 10,
+                        "output_tokens": 5,
+                        "cache_read_input_tokens": 2000,
+                        "cache_creation_input_tokens": 0,
+                    },
+                },
+            )
+
+        client = LLMClient(transport=httpx.MockTransport(handler))
+        response = await client.generate(
+            f"System rules{CACHE_BREAK} question", temperature=0.5
+        )
+        await client.close()
+
+        assert bodies[0]["messages"][0]["content"] == [
+            {
+                "type": "text",
+                "text": "System rules",
+                "cache_control": {"type": "ephemeral"},
+            },
+            {"type": "text", "text": " question"},
+        ]
+        assert response.cache_read_tokens == 2000
+        assert response.total_tokens == 2015
+        assert response.cost_usd == pytest.approx(
+            calculate_cost(
+                "anthropic", "claude-sonnet-4-20250514", 10, 5, 2000
+            )
+        )
+
+    @pytest.mark.asyncio
+    async def test_openai_cached_tokens_split_out(self) -> None:
+        """OpenAI cached prompt tokens are counted as cache reads."""
+        bodies: list[dict] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            bodies.append(json.loads(request.content))
+            return httpx.Response(
+                200,
+                json={
+                    "choices": [{"message": {"content": "ok"}}],
+                    "usage": {
+                        "prompt_tokens": 1500,
+                        "completion_tokens": 5,
+                        "prompt_tokens_details": {"cached_tokens": 1024},
+                    },
+                },
+            )
+
+        client = LLMClient(transport=httpx.MockTransport(handler))
+        response = await client.generate(
+            f"prefix{CACHE_BREAK}rest",
+            provider="openai",
+            model="gpt-4o",
+            temperature=0.5,
+        )
+        await client.close()
+
+        assert bodies[0]["messages"][0]["content"] == "prefixrest"
+        assert response.input_tokens == 476
+        assert response.cache_read_tokens == 1024
+        assert response.total_tokens == 1505
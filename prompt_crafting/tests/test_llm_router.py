@@ -0,0 +1,187 @@
+"""Tests for latency-aware provider routing.
+
+Covers candidate ordering, failover between providers through
+``httpx.MockTransport``, and the routing record on executions.
+"""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+from httpx import AsyncClient
+
+from prompt_crafting.api.services.llm_client import (
+    LLMClient,
+    LLMResponse,
+    RetryPolicy,
+)
+from prompt_crafting.api.services.llm_router import (
+    equivalent_models,
+    generate_routed,
+    order_candidates,
+)
+from prompt_crafting.api.services.provider_health import ProviderHealth
+
+_SONNET = ("anthropic", "claude-sonnet-4-20250514")
+_GPT4O = ("openai", "gpt-4o")
+_TURBO = ("openai", "gpt-4-turbo")
+
+
+def _by_host(statuses: dict[str, int]) -> httpx.MockTransport:
+    """Transport answering each provider host with a fixed status."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        status = statuses[request.url.host]
+        if status != 200:
+            return httpx.Response(status, json={"error": "failed"})
+        if request.url.host == "api.openai.com":
+            return httpx.Response(
+                200,
+                json={
+                    "choices": [{"message": {"content": "from openai"}}],
+                    "usage": {"prompt_tokens": 3, "completion_tokens": 2},
+                },
+            )
+        return httpx.Response(
+            200,
+            json={
+                "content": [{"text": "from anthropic"}],
+                "usage": {"input_tokens": 3, "output_tokens": 2},
+            },
+        )
+
+    return httpx.MockTransport(handler)
+
+
+def _client(statuses: dict[str, int]) -> LLMClient:
+    """Client without retries so failover is immediate."""
+    return LLMClient(
+        transport=_by_host(statuses),
+        retry_policy=RetryPolicy(max_attempts=1),
+    )
+
+
+class TestOrderCandidates:
+    """Tests for candidate ordering."""
+
+    def test_fallback_keeps_order(self) -> None:
+        """Fallback tries the requested model, then the list."""
+        client = LLMClient()
+        order = order_candidates(
+            client, _SONNET, [_TURBO, _GPT4O, _SONNET], "fallback"
+        )
+        assert order == [_SONNET, _TURBO, _GPT4O]
+
+    def test_fastest_uses_latency(self) -> None:
+        """Fastest orders measured models by p95 latency."""
+        health = ProviderHealth()
+        for _ in range(5):
+            health.record(*_SONNET, 900, ok=True)
+            health.record(*_GPT4O, 200, ok=True)
+        client = LLMClient(health=health)
+        assert order_candidates(client, _SONNET, [], "fastest") == [
+            _GPT4O,
+            _SONNET,
+        ]
+
+    def test_fastest_skips_open_circuits(self) -> None:
+        """Models with open circuits are tried last."""
+        health = ProviderHealth(min_calls=1, error_rate=0.5)
+        health.record(*_GPT4O, 100, ok=False)
+        health.record(*_SONNET, 900, ok=True)
+        client = LLMClient(health=health)
+        order = order_candidates(client, _SONNET, [_GPT4O], "fastest")
+        assert order == [_SONNET, _GPT4O]
+
+    def test_equivalent_models(self) -> None:
+        """Model groups map a model to its equivalents."""
+        assert equivalent_models(_SONNET) == [_GPT4O]
+        assert equivalent_models(("openai", "unknown")) == []
+
+    def test_unknown_strategy(self) -> None:
+        """An unknown strategy is rejected."""
+        with pytest.raises(ValueError, match="strategy"):
+            order_candidates(LLMClient(), _SONNET, [], "random")
+
+
+class TestGenerateRouted:
+    """Tests for failover between candidates."""
+
+    @pytest.mark.asyncio
+    async def test_fails_over_on_server_error(self) -> None:
+        """A 5xx from the first provider moves on to the next."""
+        client = _client({"api.anthropic.com": 503, "api.openai.com": 200})
+        response, decision = await generate_routed(
+            client, "hi", _SONNET, [_GPT4O], "fallback"
+        )
+        await client.close()
+        assert response.text == "from openai"
+        assert decision.served_by == "openai/gpt-4o"
+        assert decision.attempts[0]["target"] == (
+            "anthropic/claude-sonnet-4-20250514"
+        )
+
+    @pytest.mark.asyncio
+    async def test_client_error_is_not_failed_over(self) -> None:
+        """A 400 is raised without trying other providers."""
+        client = _client({"api.anthropic.com": 400, "api.openai.com": 200})
+        with pytest.raises(httpx.HTTPStatusError):
+            await generate_routed(client, "hi", _SONNET, [_GPT4O], "fallback")
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_all_candidates_fail(self) -> None:
+        """The last error is raised when every candidate fails."""
+        client = _client({"api.anthropic.com": 502, "api.openai.com": 500})
+        with pytest.raises(httpx.HTTPStatusError) as excinfo:
+            await generate_routed(client, "hi", _SONNET, [_GPT4O], "fallback")
+        await client.close()
+        assert excinfo.value.response.status_code == 500
+
+
+@pytest.mark.asyncio
+@patch("prompt_crafting.api.routes.executions._llm_client")
+async def test_execute_records_routing(
+    mock_client: MagicMock,
+    client: AsyncClient,
+) -> None:
+    """A routed execution records the decision and serving model."""
+    request = httpx.Request("POST", "https://api.anthropic.com")
+    mock_client.generate = AsyncMock(
+        side_effect=[
+            httpx.ReadTimeout("timed out", request=request),
+            LLMResponse(
+                text="ok",
+                input_tokens=3,
+                output_tokens=2,
+                total_tokens=5,
+                cost_usd=0.0001,
+                provider="openai",
+                model="gpt-4o",
+            ),
+        ]
+    )
+    create_resp = await client.post(
+        "/api/v1/prompts",
+        json={"name": "routed", "template": "Hello"},
+    )
+    prompt_id = create_resp.json()["id"]
+
+    response = await client.post(
+        f"/api/v1/prompts/{prompt_id}/execute",
+        json={
+            "input_data": {},
+            "routing": {
+                "strategy": "fallback",
+                "fallbacks": [
+                    {"llm_provider": "openai", "model_name": "gpt-4o"}
+                ],
+            },
+        },
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["llm_provider"] == "openai"
+    assert data["model_name"] == "gpt-4o"
+    assert data["routing"]["served_by"] == "openai/gpt-4o"
+    assert data["routing"]["attempts"][0]["error"] == "timed out"
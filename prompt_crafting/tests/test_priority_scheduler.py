@@ -0,0 +1,138 @@
+"""Tests for priority scheduling of LLM calls.
+
+Covers weighted fair dispatch, aging, slot hand-off on cancellation,
+API key priorities, and the class resolution used by /execute.
+"""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from prompt_crafting.api.models.execution import ExecutionRequest
+from prompt_crafting.api.routes.executions import _priority
+from prompt_crafting.api.services.priority_scheduler import (
+    PriorityScheduler,
+)
+from prompt_crafting.utils.security import get_api_key_priority
+
+
+class _Clock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+async def _dispatch_order(
+    scheduler: PriorityScheduler, priorities: list[str]
+) -> list[str]:
+    """Queue calls behind a held slot and return their dispatch order."""
+    order: list[str] = []
+    await scheduler.acquire("interactive")
+
+    async def call(priority: str) -> None:
+        async with scheduler.slot(priority):
+            order.append(priority)
+
+    tasks = [asyncio.create_task(call(p)) for p in priorities]
+    await asyncio.sleep(0)
+    scheduler.release()
+    await asyncio.gather(*tasks)
+    return order
+
+
+class TestPriorityScheduler:
+    """Tests for dispatch order and accounting."""
+
+    @pytest.mark.asyncio
+    async def test_interactive_jumps_the_queue(self) -> None:
+        """Interactive calls queued after batch calls overtake them."""
+        scheduler = PriorityScheduler(max_concurrent=1, aging_s=1e9)
+        order = await _dispatch_order(
+            scheduler, ["batch"] * 3 + ["interactive"] * 3
+        )
+        assert order[:4].count("interactive") == 3
+        assert order[-2:] == ["batch", "batch"]
+
+    @pytest.mark.asyncio
+    async def test_weighted_share_under_load(self) -> None:
+        """Batch still gets its weighted share while interactive waits."""
+        scheduler = PriorityScheduler(
+            max_concurrent=1,
+            weights={"interactive": 4, "batch": 1, "background": 1},
+            aging_s=1e9,
+        )
+        order = await _dispatch_order(
+            scheduler, ["interactive"] * 8 + ["batch"] * 8
+        )
+        assert order[:10].count("batch") == 2
+
+    @pytest.mark.asyncio
+    async def test_aging_prevents_starvation(self) -> None:
+        """A long-waiting background call overtakes fresh interactive."""
+        clock = _Clock()
+        scheduler = PriorityScheduler(max_concurrent=1, aging_s=1, clock=clock)
+        await scheduler.acquire("interactive")
+        order: list[str] = []
+
+        async def call(priority: str) -> None:
+            async with scheduler.slot(priority):
+                order.append(priority)
+
+        old = asyncio.create_task(call("background"))
+        await asyncio.sleep(0)
+        clock.now = 60
+        fresh = [asyncio.create_task(call("interactive")) for _ in range(5)]
+        await asyncio.sleep(0)
+        scheduler.release()
+        await asyncio.gather(old, *fresh)
+        assert order[0] == "background"
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_leaves_queue(self) -> None:
+        """A cancelled waiter does not hold or leak a slot."""
+        scheduler = PriorityScheduler(max_concurrent=1)
+        await scheduler.acquire("interactive")
+        waiter = asyncio.create_task(scheduler.acquire("batch"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        scheduler.release()
+        stats = scheduler.stats()
+        assert stats["running"] == 0
+        assert stats["classes"]["batch"]["queued"] == 0
+
+    @pytest.mark.asyncio
+    async def test_unknown_priority(self) -> None:
+        """Unknown classes are rejected."""
+        with pytest.raises(ValueError, match="priority"):
+            await PriorityScheduler().acquire("urgent")
+
+
+class TestPriorityResolution:
+    """Tests for choosing a request's class."""
+
+    @patch.dict(
+        "os.environ", {"API_KEY_PRIORITIES": "etl:batch, cron:background"}
+    )
+    def test_api_key_priority(self) -> None:
+        """Keys map to their configured class."""
+        assert get_api_key_priority("etl") == "batch"
+        assert get_api_key_priority("cron") == "background"
+        assert get_api_key_priority("other") is None
+
+    @patch.dict("os.environ", {"API_KEY_PRIORITIES": "etl:batch"})
+    def test_request_cannot_exceed_key_class(self) -> None:
+        """The key's class caps, and defaults, the request's class."""
+        body = ExecutionRequest(input_data={}, priority="interactive")
+        assert _priority(body, "etl") == "batch"
+        assert _priority(body, "other") == "interactive"
+        default = ExecutionRequest(input_data={})
+        assert _priority(default, "etl") == "batch"
+        low = ExecutionRequest(input_data={}, priority="background")
+        assert _priority(low, "etl") == "background"
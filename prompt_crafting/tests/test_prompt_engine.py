@@ -0,0 +1,309 @@
+"""Tests for the prompt engine's scanner and compiled-template cache.
+
+Covers single-pass and AST forbidden-pattern scanning, cache hits,
+misses, LRU eviction, that invalid templates are never cached, batch
+rendering and prompt-cache prefix marking.
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+from prompt_crafting.api.services import prompt_engine
+from prompt_crafting.api.services.prompt_engine import (
+    CACHE_BREAK,
+    RenderBudgetExceeded,
+    TemplateCache,
+    compile_template,
+    find_forbidden_patterns,
+    missing_variables,
+    render_compiled,
+    render_many,
+    render_template,
+    split_cache_prefix,
+    template_hash,
+    validate_template,
+)
+
+
+class TestForbiddenPatternScanner:
+    """Tests for the single-pass and AST forbidden-pattern scanners."""
+
+    def test_reports_every_distinct_pattern(self) -> None:
+        """One pass reports all patterns present, once each."""
+        found = find_forbidden_patterns(
+            "eval x; import y; exec z; __class__ __mro__; eval again"
+        )
+        assert found == [
+            r"\bimport\b",
+            r"\bexec\b",
+            r"\beval\b",
+            r"__\w+__",
+        ]
+
+    @pytest.mark.parametrize(
+        "text",
+        [
+            "__import__('os')",
+            "reimport exec_ evaluate",
+            "{{ x.__dict__ }} eval",
+            "import\nexec\teval",
+            "_x_ __ ____",
+        ],
+    )
+    def test_matches_individual_patterns(self, text: str) -> None:
+        """Combined scanner agrees with each pattern run separately."""
+        expected = [
+            p.pattern
+            for p in prompt_engine._FORBIDDEN_PATTERNS
+            if p.search(text)
+        ]
+        assert find_forbidden_patterns(text) == expected
+
+    def test_clean_text(self) -> None:
+        """Text without forbidden patterns yields nothing."""
+        assert find_forbidden_patterns("Hello {{ name }}!") == []
+
+    def test_ast_mode_ignores_literal_text(self) -> None:
+        """AST mode does not flag prose outside expressions."""
+        template = "Please import the {{ dataset }} and evaluate it."
+        assert validate_template(template, mode="text") != []
+        assert validate_template(template, mode="ast") == []
+
+    @pytest.mark.parametrize(
+        "template",
+        [
+            "{{ eval(code) }}",
+            "{{ ''.__class__ }}",
+            "{{ x['__globals__'] }}",
+            "{{ x|attr('__class__') }}",
+            "{% set exec = 1 %}",
+            "{% include 'other.txt' %}",
+        ],
+    )
+    def test_ast_mode_flags_expressions(self, template: str) -> None:
+        """AST mode flags forbidden names, attributes and includes."""
+        errors = validate_template(template, mode="ast")
+        assert any("Forbidden pattern" in e for e in errors)
+
+    @pytest.mark.parametrize(
+        "template",
+        [
+            "{{ eval(code) }}",
+            "{{ x.__class__ }}",
+            "{{ x['__globals__'] }}",
+            "{{ x|eval }}",
+            "{{ x|__class__ }}",
+            "{% if x is eval %}{% endif %}",
+            "{% filter exec %}a{% endfilter %}",
+            "{% block eval %}{% endblock %}",
+            "{% macro exec() %}{% endmacro %}",
+            "{% set ns = namespace() %}{% set ns.__class__ = 1 %}",
+            "{{ f(exec=1) }}",
+            "{% import 'x.txt' as y %}",
+            "Hello {{ name|upper }} {% if x is defined %}!{% endif %}",
+        ],
+    )
+    def test_ast_mode_matches_text_mode(self, template: str) -> None:
+        """Both modes reject the same expressions and tags."""
+        text_errors = validate_template(template, mode="text")
+        assert validate_template(template, mode="ast") == text_errors
+
+    def test_unknown_mode_raises(self) -> None:
+        """An unknown scan mode is rejected."""
+        with pytest.raises(ValueError, match="scan mode"):
+            validate_template("x", mode="regex")
+
+
+class TestTemplateCache:
+    """Tests for the bounded LRU template cache."""
+
+    def test_repeat_lookup_hits_cache(self) -> None:
+        """Second lookup of the same source skips compilation."""
+        cache = TemplateCache(max_size=4)
+        first = cache.get("Hello {{ name }}!")
+        with patch.object(prompt_engine, "_check_template") as mock_check:
+            second = cache.get("Hello {{ name }}!")
+            mock_check.assert_not_called()
+        assert first is second
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_key_is_content_hash(self) -> None:
+        """Entries are keyed by the SHA-256 of the source."""
+        cache = TemplateCache(max_size=4)
+        entry = cache.get("T1")
+        assert entry.source_hash == template_hash("T1")
+
+    def test_lookup_by_hash(self) -> None:
+        """Cached entries can be fetched by hash without the source."""
+        cache = TemplateCache(max_size=1)
+        entry = cache.get("A")
+        assert cache.lookup(template_hash("A")) is entry
+        cache.get("B")
+        assert cache.lookup(template_hash("A")) is None
+
+    def test_lru_eviction(self) -> None:
+        """Least recently used entry is evicted when full."""
+        cache = TemplateCache(max_size=2)
+        cache.get("A")
+        cache.get("B")
+        cache.get("A")
+        cache.get("C")
+        stats = cache.stats()
+        assert stats["size"] == 2
+        assert stats["evictions"] == 1
+        cache.get("A")
+        assert cache.stats()["hits"] == 2
+
+    def test_invalid_template_not_cached(self) -> None:
+        """Templates failing validation raise and are not stored."""
+        cache = TemplateCache(max_size=2)
+        with pytest.raises(ValueError, match="validation failed"):
+            cache.get("{{ eval('x') }}")
+        assert len(cache) == 0
+
+    def test_clear_resets_counters(self) -> None:
+        """clear() drops entries and zeroes the counters."""
+        cache = TemplateCache(max_size=2)
+        cache.get("A")
+        cache.get("A")
+        cache.clear()
+        assert cache.stats() == {
+            "size": 0,
+            "max_size": 2,
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+        }
+
+
+class TestRenderMany:
+    """Tests for batch rendering of one template."""
+
+    def test_renders_in_order_with_defaults(self) -> None:
+        """Each variable set is rendered, defaults fill gaps."""
+        results = list(
+            render_many(
+                "{{ greeting }} {{ name }}",
+                [{"name": "a"}, {"name": "b", "greeting": "Bye"}],
+                defaults={"greeting": "Hi"},
+            )
+        )
+        assert results == ["Hi a", "Bye b"]
+
+    def test_compiles_once(self) -> None:
+        """The template is validated once for the whole batch."""
+        prompt_engine._template_cache.clear()
+        with patch.object(
+            prompt_engine,
+            "_check_template",
+            wraps=prompt_engine._check_template,
+        ) as mock_check:
+            list(render_many("batch {{ i }}", [{"i": i} for i in range(5)]))
+        assert mock_check.call_count == 1
+
+    def test_return_exceptions(self) -> None:
+        """Failing rows yield their exception instead of aborting."""
+        results = list(
+            render_many(
+                "{{ 1 / n }}",
+                [{"n": 1}, {"n": 0}, {"n": 2}],
+                return_exceptions=True,
+            )
+        )
+        assert results[0] == "1.0"
+        assert isinstance(results[1], ZeroDivisionError)
+        assert results[2] == "0.5"
+
+    def test_budget_applies_per_row(self) -> None:
+        """A row over the output budget fails without stopping others."""
+        results = list(
+            render_many(
+                "{{ 'x' * n }}",
+                [{"n": 1}, {"n": 1000}],
+                return_exceptions=True,
+                max_output_chars=100,
+            )
+        )
+        assert results[0] == "x"
+        assert isinstance(results[1], RenderBudgetExceeded)
+
+    def test_invalid_template_raises(self) -> None:
+        """An invalid template fails before any row is rendered."""
+        with pytest.raises(ValueError, match="validation failed"):
+            next(render_many("{{ eval(x) }}", [{}]))
+
+    def test_large_batch_in_order(self) -> None:
+        """Rows are rendered lazily and in input order."""
+        inputs = ({"i": i} for i in range(200))
+        results = list(render_many("row {{ i }}", inputs))
+        assert results == [f"row {i}" for i in range(200)]
+
+
+class TestMissingVariables:
+    """Tests for the pre-render required-variable check."""
+
+    def test_reports_missing_after_defaults(self) -> None:
+        """Defaults count as provided; the rest are reported."""
+        compiled = compile_template("{{ a }} {{ b }} {{ c }}")
+        assert missing_variables(compiled, {"a": 1}, {"b": 2}) == ["c"]
+
+    def test_required_set_cached_with_template(self) -> None:
+        """The required set is computed once at compile time."""
+        compiled = compile_template("{{ x }}{{ y|default(1) }}")
+        assert compiled.required_variables == {"x"}
+
+
+class TestCacheBreak:
+    """Tests for marking cacheable prompt prefixes."""
+
+    def test_explicit_break_splits_prefix(self) -> None:
+        """Text before ``{% cache_break %}`` is the cacheable prefix."""
+        compiled = compile_template(
+            "Instructions.{% cache_break %} Task: {{ task }}"
+        )
+        rendered = render_compiled(compiled, {"task": "sum"})
+        assert split_cache_prefix(rendered) == (
+            "Instructions.",
+            " Task: sum",
+        )
+
+    def test_variables_cannot_move_break(self) -> None:
+        """A marker inside a variable value is dropped from the output."""
+        compiled = compile_template(
+            "Instructions.{% cache_break %} Task: {{ task }}"
+            "{% for t in tags %} {{ t|upper }}{% endfor %}"
+        )
+        rendered = render_compiled(
+            compiled,
+            {"task": f"a{CACHE_BREAK}b", "tags": [f"x{CACHE_BREAK}"]},
+        )
+        assert split_cache_prefix(rendered) == (
+            "Instructions.",
+            " Task: ab X",
+        )
+
+    def test_render_template_strips_marker(self) -> None:
+        """Plain rendering never exposes the marker."""
+        output = render_template("A{% cache_break %}B", {})
+        assert output == "AB"
+        assert CACHE_BREAK not in output
+
+    def test_unmarked_text_has_no_prefix(self) -> None:
+        """Without a marker the whole text is uncached."""
+        assert split_cache_prefix("plain") == ("", "plain")
+
+    def test_long_static_prefix_marked(self) -> None:
+        """A long literal prefix is marked when no break is given."""
+        compiled = compile_template("x" * 20 + "{{ y }}")
+        with patch.object(prompt_engine, "_PROMPT_CACHE_MIN_CHARS", 10):
+            rendered = render_compiled(compiled, {"y": "!"})
+        assert split_cache_prefix(rendered) == ("x" * 20, "!")
+
+    def test_short_static_prefix_not_marked(self) -> None:
+        """A prefix under the minimum length is left unmarked."""
+        compiled = compile_template("short {{ y }}")
+        with patch.object(prompt_engine, "_PROMPT_CACHE_MIN_CHARS", 10):
+            rendered = render_compiled(compiled, {"y": "!"})
+        assert rendered == "short !"
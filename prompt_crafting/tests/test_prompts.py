@@ -1,11 +1,24 @@
 """Tests for prompt CRUD operations.
 
 Covers creation, listing, retrieval, version auto-increment on update,
-category filtering, and deletion.
+category filtering, deletion, template precompilation, and batch
+rendering.
 """
 
+import json
+
 import pytest
 from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from prompt_crafting.api.services import prompt_engine
+from prompt_crafting.api.services.prompt_engine import TemplateCache
+from prompt_crafting.api.services.template_registry import (
+    TemplateRegistry,
+    template_registry,
+    warm_template_registry,
+)
+from prompt_crafting.db.models import Prompt
 
 
 @pytest.mark.asyncio
@@ -151,3 +164,182 @@ async def test_delete_prompt_not_found(client: AsyncClient) -> None:
         "/api/v1/prompts/00000000-0000-0000-0000-000000000000"
     )
     assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_create_prompt_rejects_invalid_template(
+    client: AsyncClient,
+) -> None:
+    """POST /api/v1/prompts returns 400 for a forbidden template."""
+    response = await client.post(
+        "/api/v1/prompts",
+        json={"name": "bad", "template": "{{ eval('x') }}"},
+    )
+    assert response.status_code == 400
+    assert "validation failed" in response.json()["detail"]
+
+
+@pytest.mark.asyncio
+async def test_create_prompt_stores_complexity(client: AsyncClient) -> None:
+    """POST /api/v1/prompts stores the static complexity estimate."""
+    response = await client.post(
+        "/api/v1/prompts",
+        json={
+            "name": "loops",
+            "template": "{% for i in range(3) %}{{ x }}{% endfor %}",
+        },
+    )
+    assert response.status_code == 201
+    complexity = response.json()["complexity"]
+    assert complexity["max_loop_depth"] == 1
+    assert complexity["estimated_iterations"] == 3
+    assert complexity["variables"] == ["x"]
+
+
+@pytest.mark.asyncio
+async def test_create_prompt_rejects_complex_template(
+    client: AsyncClient,
+) -> None:
+    """POST /api/v1/prompts returns 400 for runaway templates."""
+    response = await client.post(
+        "/api/v1/prompts",
+        json={
+            "name": "runaway",
+            "template": "{% macro m() %}{{ m() }}{% endmacro %}{{ m() }}",
+        },
+    )
+    assert response.status_code == 400
+    assert "too complex" in response.json()["detail"]
+
+
+@pytest.mark.asyncio
+async def test_update_prompt_rejects_invalid_template(
+    client: AsyncClient,
+) -> None:
+    """PUT /api/v1/prompts/{id} returns 400 for a syntax error."""
+    create_resp = await client.post(
+        "/api/v1/prompts",
+        json={"name": "ok", "template": "Hello"},
+    )
+    prompt_id = create_resp.json()["id"]
+
+    response = await client.put(
+        f"/api/v1/prompts/{prompt_id}",
+        json={"template": "{% if %}"},
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_written_versions_are_precompiled(
+    client: AsyncClient,
+) -> None:
+    """Created and updated versions are registered eagerly."""
+    create_resp = await client.post(
+        "/api/v1/prompts",
+        json={"name": "eager", "template": "V1 {{ x }}"},
+    )
+    v1_id = create_resp.json()["id"]
+    update_resp = await client.put(
+        f"/api/v1/prompts/{v1_id}",
+        json={"template": "V2 {{ x }}"},
+    )
+    v2_id = update_resp.json()["id"]
+
+    assert v1_id in template_registry
+    assert v2_id in template_registry
+
+    await client.delete(f"/api/v1/prompts/{v2_id}")
+    assert v2_id not in template_registry
+
+
+@pytest.mark.asyncio
+async def test_warm_up_compiles_latest_versions(
+    db_session: AsyncSession,
+) -> None:
+    """Startup warm-up registers only the latest version per name."""
+    old = Prompt(name="warm", template="old", version=1)
+    new = Prompt(name="warm", template="new {{ x }}", version=2)
+    broken = Prompt(name="broken", template="{% if %}", version=1)
+    db_session.add_all([old, new, broken])
+    await db_session.flush()
+    template_registry.clear()
+
+    count = await warm_template_registry(db_session)
+
+    assert count == 1
+    assert new.id in template_registry
+    assert old.id not in template_registry
+    assert broken.id not in template_registry
+
+
+def test_registry_bounded_by_template_cache(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Registered prompts keep no compiled template beyond the cache."""
+    monkeypatch.setattr(prompt_engine, "_template_cache", TemplateCache(1))
+    registry = TemplateRegistry()
+    first = registry.register("p1", "one {{ x }}")
+    registry.register("p2", "two {{ x }}")
+
+    assert "p1" in registry
+    assert prompt_engine.template_cache_stats()["size"] == 1
+    again = registry.get("p1", "one {{ x }}")
+    assert again is not first
+    assert again.source == "one {{ x }}"
+    assert registry.get("p1", "one {{ x }}") is again
+
+
+@pytest.mark.asyncio
+async def test_render_batch_streams_ndjson(client: AsyncClient) -> None:
+    """POST /render:batch streams one NDJSON line per input."""
+    create_resp = await client.post(
+        "/api/v1/prompts",
+        json={
+            "name": "batch",
+            "template": "{{ greeting }} {{ 10 // n }}",
+            "parameters": {"greeting": "Hi"},
+        },
+    )
+    prompt_id = create_resp.json()["id"]
+
+    response = await client.post(
+        f"/api/v1/prompts/{prompt_id}/render:batch",
+        json={"inputs": [{"n": 2}, {"n": 0}, {"n": 5}]},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0] == {"index": 0, "rendered": "Hi 5"}
+    assert lines[1]["index"] == 1 and "error" in lines[1]
+    assert lines[2] == {"index": 2, "rendered": "Hi 2"}
+
+
+@pytest.mark.asyncio
+async def test_render_batch_enforces_render_budget(
+    client: AsyncClient,
+) -> None:
+    """Batch rows are held to the render executor's output budget."""
+    create_resp = await client.post(
+        "/api/v1/prompts",
+        json={"name": "batch", "template": "{{ 'x' * n }}"},
+    )
+    prompt_id = create_resp.json()["id"]
+
+    response = await client.post(
+        f"/api/v1/prompts/{prompt_id}/render:batch",
+        json={"inputs": [{"n": 3}, {"n": 10**8}]},
+    )
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0] == {"index": 0, "rendered": "xxx"}
+    assert "exceeds" in lines[1]["error"]
+
+
+@pytest.mark.asyncio
+async def test_render_batch_not_found(client: AsyncClient) -> None:
+    """POST /render:batch returns 404 for a missing prompt."""
+    response = await client.post(
+        "/api/v1/prompts/00000000-0000-0000-0000-000000000000" "/render:batch",
+        json={"inputs": [{}]},
+    )
+    assert response.status_code == 404
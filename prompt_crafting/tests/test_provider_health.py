@@ -0,0 +1,244 @@
+"""Tests for per-provider health tracking and circuit breaking.
+
+Covers rolling statistics, breaker state transitions, fail-fast calls
+in the LLM client, the 503 mapping on /execute, and /health.
+"""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+from httpx import AsyncClient
+
+from prompt_crafting.api.services.llm_client import LLMClient, RetryPolicy
+from prompt_crafting.api.services.provider_health import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    ProviderHealth,
+    ProviderStats,
+)
+
+
+class _Clock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _breaker(clock: _Clock, **options: float) -> CircuitBreaker:
+    """Breaker that opens after 4 calls at a 50% error rate."""
+    return CircuitBreaker(
+        ProviderStats(window=10),
+        min_calls=4,
+        error_rate=0.5,
+        open_s=30,
+        clock=clock,
+        **options,
+    )
+
+
+class TestProviderStats:
+    """Tests for the rolling statistics window."""
+
+    def test_error_rate_and_percentiles(self) -> None:
+        """Error rate covers all calls; latency only successes."""
+        stats = ProviderStats(window=10)
+        for ms in range(1, 11):
+            stats.record(ms * 10.0, ok=True)
+        stats.record(5000.0, ok=False)
+        assert stats.count == 10
+        assert stats.error_rate == 0.1
+        assert stats.latency_percentile(0.5) == 60.0
+        assert stats.latency_percentile(0.95) == 100.0
+        assert stats.total_calls == 11
+
+    def test_empty_window(self) -> None:
+        """An empty window has no latency and no errors."""
+        stats = ProviderStats()
+        assert stats.error_rate == 0.0
+        assert stats.latency_percentile(0.95) is None
+
+
+class TestCircuitBreaker:
+    """Tests for breaker state transitions."""
+
+    def test_opens_on_error_rate(self) -> None:
+        """The circuit opens once the window is bad enough."""
+        clock = _Clock()
+        breaker = _breaker(clock)
+        breaker.record(100, ok=True)
+        breaker.record(100, ok=False)
+        breaker.record(100, ok=True)
+        assert breaker.state == CLOSED
+        breaker.record(100, ok=False)
+        assert breaker.state == OPEN
+        assert not breaker.allow()
+        assert breaker.retry_after() == 30
+
+    def test_half_open_probe_closes(self) -> None:
+        """After the cool-down one probe is admitted; success closes."""
+        clock = _Clock()
+        breaker = _breaker(clock)
+        for _ in range(4):
+            breaker.record(100, ok=False)
+        clock.now = 30
+        assert breaker.state == HALF_OPEN
+        assert breaker.allow()
+        assert not breaker.allow()
+        breaker.record(100, ok=True)
+        assert breaker.state == CLOSED
+        assert breaker.allow()
+
+    def test_failed_probe_reopens(self) -> None:
+        """A failed probe opens the circuit for another cool-down."""
+        clock = _Clock()
+        breaker = _breaker(clock)
+        for _ in range(4):
+            breaker.record(100, ok=False)
+        clock.now = 30
+        assert breaker.allow()
+        breaker.record(100, ok=False)
+        assert breaker.state == OPEN
+        assert breaker.times_opened == 2
+        clock.now = 59
+        assert not breaker.allow()
+
+    def test_released_probe_frees_slot(self) -> None:
+        """An abandoned probe lets another probe through."""
+        clock = _Clock()
+        breaker = _breaker(clock)
+        for _ in range(4):
+            breaker.record(100, ok=False)
+        clock.now = 30
+        assert breaker.allow()
+        breaker.release()
+        assert breaker.allow()
+
+    def test_opens_on_p95_latency(self) -> None:
+        """A slow window opens the circuit; a slow probe reopens it."""
+        clock = _Clock()
+        breaker = _breaker(clock, p95_ms=1000)
+        for _ in range(3):
+            breaker.record(100, ok=True)
+        breaker.record(1500, ok=True)
+        assert breaker.state == OPEN
+        clock.now = 30
+        assert breaker.allow()
+        breaker.record(1200, ok=True)
+        assert breaker.state == OPEN
+        clock.now = 60
+        assert breaker.allow()
+        breaker.record(100, ok=True)
+        assert breaker.state == CLOSED
+
+
+class TestProviderHealth:
+    """Tests for the per-model registry."""
+
+    def test_least_recently_used_model_evicted(self) -> None:
+        """Only the most recently used models are tracked."""
+        health = ProviderHealth(max_entries=2)
+        health.record("anthropic", "a", 10, ok=True)
+        health.record("anthropic", "b", 10, ok=True)
+        health.acquire("anthropic", "a")
+        health.record("anthropic", "c", 10, ok=True)
+        assert set(health.snapshot()) == {"anthropic/a", "anthropic/c"}
+        assert health.evictions == 1
+
+
+class TestClientCircuit:
+    """Tests for the breaker inside LLMClient."""
+
+    @pytest.mark.asyncio
+    async def test_fails_fast_when_open(self) -> None:
+        """Once open, calls are rejected without reaching the provider."""
+        calls = 0
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal calls
+            calls += 1
+            return httpx.Response(503, json={"error": "down"})
+
+        clock = _Clock()
+        client = LLMClient(
+            transport=httpx.MockTransport(handler),
+            retry_policy=RetryPolicy(max_attempts=1),
+            health=ProviderHealth(
+                clock=clock, min_calls=3, error_rate=0.5, open_s=10
+            ),
+        )
+        for _ in range(3):
+            with pytest.raises(httpx.HTTPStatusError):
+                await client.generate("hi")
+        with pytest.raises(CircuitOpenError) as excinfo:
+            await client.generate("hi")
+        assert calls == 3
+        assert excinfo.value.retry_after_s == 10
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_client_errors_do_not_trip(self) -> None:
+        """4xx answers other than 429 count as a healthy provider."""
+        client = LLMClient(
+            transport=httpx.MockTransport(
+                lambda request: httpx.Response(400, json={"error": "bad"})
+            ),
+            health=ProviderHealth(min_calls=2, error_rate=0.5),
+        )
+        for _ in range(3):
+            with pytest.raises(httpx.HTTPStatusError):
+                await client.generate("hi")
+        snapshot = client.health.snapshot()
+        entry = snapshot["anthropic/claude-sonnet-4-20250514"]
+        assert entry["state"] == CLOSED
+        assert entry["error_rate"] == 0.0
+        await client.close()
+
+
+@pytest.mark.asyncio
+@patch("prompt_crafting.api.routes.executions._llm_client")
+async def test_execute_returns_503_when_open(
+    mock_client: MagicMock,
+    client: AsyncClient,
+) -> None:
+    """An open circuit maps to 503 with a Retry-After header."""
+    mock_client.generate = AsyncMock(
+        side_effect=CircuitOpenError("anthropic", "m", 12.3)
+    )
+    create_resp = await client.post(
+        "/api/v1/prompts",
+        json={"name": "breaker", "template": "Hello"},
+    )
+    prompt_id = create_resp.json()["id"]
+
+    response = await client.post(
+        f"/api/v1/prompts/{prompt_id}/execute",
+        json={"input_data": {}},
+    )
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "13"
+
+
+@pytest.mark.asyncio
+@patch("prompt_crafting.api.routes.executions._llm_client")
+async def test_health_reports_breakers(
+    mock_client: MagicMock,
+    client: AsyncClient,
+) -> None:
+    """GET /health is degraded while any circuit is open."""
+    health = ProviderHealth(min_calls=1, error_rate=0.5)
+    health.record("openai", "gpt-4o", 100, ok=False)
+    mock_client.health = health
+
+    response = await client.get("/health")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "degraded"
+    assert data["providers"]["openai/gpt-4o"]["state"] == OPEN
@@ -0,0 +1,419 @@
+"""Tests for the provider adapter registry.
+
+Covers registry lookup, request building for the bundled adapters,
+end-to-end calls through the client against the in-process mock
+provider and a custom registered adapter, and batch API submission and
+polling against local stand-in servers. No real LLM requests.
+"""
+
+import json
+import time
+from collections.abc import Mapping
+from typing import Any
+
+import httpx
+import pytest
+
+from prompt_crafting.api.services import providers
+from prompt_crafting.api.services.llm_client import (
+    LLMClient,
+    calculate_cost,
+)
+from prompt_crafting.api.services.prompt_engine import CACHE_BREAK
+from prompt_crafting.api.services.providers import (
+    BATCHING,
+    CACHING,
+    STREAMING,
+    AnthropicAdapter,
+    MockAdapter,
+    OpenAIAdapter,
+    ProviderAdapter,
+    UnsupportedOperation,
+    Usage,
+    get_provider,
+    register_provider,
+    registered_providers,
+)
+
+
+class EchoAdapter(ProviderAdapter):
+    """Buffered-only adapter echoing the prompt back."""
+
+    name = "echo"
+    path = "/echo"
+
+    def __init__(self) -> None:
+        super().__init__("http://echo.local", {"x-echo": "1"})
+
+    def payload(
+        self,
+        prompt: str,
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        stream: bool = False,
+    ) -> dict[str, Any]:
+        return {"input": prompt}
+
+    def parse(self, data: Mapping[str, Any]) -> tuple[str, Usage]:
+        return data["output"], {"input_tokens": 1, "output_tokens": 1}
+
+    def parse_event(self, event: Mapping[str, Any], usage: Usage) -> str:
+        raise UnsupportedOperation("echo cannot stream")
+
+
+@pytest.fixture
+def mock_provider():
+    """Register the mock adapter for one test."""
+    register_provider(MockAdapter())
+    yield
+    providers._providers.pop("mock", None)
+
+
+@pytest.fixture
+def echo_provider():
+    """Register the echo adapter for one test."""
+    register_provider(EchoAdapter())
+    yield
+    providers._providers.pop("echo", None)
+
+
+class TestRegistry:
+    """Tests for adapter registration and lookup."""
+
+    def test_bundled_providers_registered(self) -> None:
+        """Anthropic and OpenAI are registered by default."""
+        assert {"anthropic", "openai"} <= set(registered_providers())
+        assert isinstance(get_provider("anthropic"), AnthropicAdapter)
+
+    def test_mock_disabled_by_default(self) -> None:
+        """The mock is only registered when LLM_ENABLE_MOCK is set."""
+        assert "mock" not in registered_providers()
+
+    def test_unknown_provider_raises(self) -> None:
+        """Looking up an unregistered provider raises ValueError."""
+        with pytest.raises(ValueError, match="Unsupported LLM provider"):
+            get_provider("unknown")
+
+    def test_capabilities_declared(self) -> None:
+        """Adapters declare their supported features."""
+        assert {STREAMING, CACHING} <= get_provider("anthropic").capabilities
+        assert BATCHING in get_provider("openai").capabilities
+        assert CACHING not in MockAdapter().capabilities
+
+    def test_adapter_hooks_are_abstract(self) -> None:
+        """Adapters must implement the hooks; batching is optional."""
+
+        class Incomplete(ProviderAdapter):
+            def payload(self, *args: Any, **kwargs: Any) -> dict[str, Any]:
+                return {}
+
+        with pytest.raises(TypeError, match="parse"):
+            Incomplete("http://x.local", {})  # type: ignore[abstract]
+
+    @pytest.mark.asyncio
+    async def test_batch_unsupported(self) -> None:
+        """Adapters without a batch API raise UnsupportedOperation."""
+        async with httpx.AsyncClient() as client:
+            with pytest.raises(UnsupportedOperation, match="no batch API"):
+                await EchoAdapter().submit_batch(client, [])
+            with pytest.raises(UnsupportedOperation, match="no batch API"):
+                await EchoAdapter().fetch_batch(client, "b")
+
+
+class TestAdapters:
+    """Tests for request building in the bundled adapters."""
+
+    def test_headers_and_url_prebuilt(self) -> None:
+        """The endpoint URL and auth headers are built once."""
+        adapter = AnthropicAdapter(api_key="k", base_url="http://a.test/")
+        assert adapter.url == "http://a.test/v1/messages"
+        assert adapter.headers["x-api-key"] == "k"
+        openai = OpenAIAdapter(api_key="k", base_url="http://o.test")
+        assert openai.headers["Authorization"] == "Bearer k"
+
+    def test_openai_strips_cache_break(self) -> None:
+        """OpenAI payloads carry the prompt without the marker."""
+        payload = OpenAIAdapter(api_key="k").payload(
+            f"static{CACHE_BREAK}dynamic", "gpt-4", 10, 0.0, stream=True
+        )
+        assert payload["messages"][0]["content"] == "staticdynamic"
+        assert payload["stream_options"] == {"include_usage": True}
+
+
+class TestClientDispatch:
+    """Tests for the client calling providers through the registry."""
+
+    @pytest.mark.asyncio
+    async def test_mock_provider_generate(self, mock_provider) -> None:
+        """The mock provider answers without network access."""
+        client = LLMClient()
+        try:
+            response = await client.generate(
+                "Hello world", provider="mock", model="m", max_tokens=3
+            )
+        finally:
+            await client.close()
+        assert response.text == "token0 token1 token2"
+        assert response.provider == "mock"
+        assert response.output_tokens == 3
+        assert response.input_tokens == 3
+        assert response.cost_usd == 0
+
+    @pytest.mark.asyncio
+    async def test_mock_provider_stream(self, mock_provider) -> None:
+        """The mock provider streams words and a final usage event."""
+        client = LLMClient()
+        try:
+            chunks = [
+                chunk
+                async for chunk in client.generate_stream(
+                    "Hi", provider="mock", model="m", max_tokens=2
+                )
+            ]
+        finally:
+            await client.close()
+        assert "".join(c.text for c in chunks) == "token0 token1 "
+        assert chunks[-1].response is not None
+        assert chunks[-1].response.output_tokens == 2
+
+    @pytest.mark.asyncio
+    async def test_mock_latency(self) -> None:
+        """The mock waits its configured latency before answering."""
+        register_provider(MockAdapter(latency_ms=30))
+        client = LLMClient()
+        start = time.monotonic()
+        try:
+            await client.generate(
+                "Hi", provider="mock", model="m", max_tokens=1
+            )
+        finally:
+            await client.close()
+            providers._providers.pop("mock", None)
+        assert time.monotonic() - start >= 0.025
+
+    @pytest.mark.asyncio
+    async def test_custom_adapter(self, echo_provider) -> None:
+        """A newly registered adapter is used without client changes."""
+        seen: list[httpx.Request] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen.append(request)
+            return httpx.Response(200, json={"output": "echoed"})
+
+        client = LLMClient(transport=httpx.MockTransport(handler))
+        try:
+            response = await client.generate(
+                "ping", provider="echo", model="e"
+            )
+        finally:
+            await client.close()
+        assert response.text == "echoed"
+        assert str(seen[0].url) == "http://echo.local/echo"
+        assert seen[0].headers["x-echo"] == "1"
+
+    @pytest.mark.asyncio
+    async def test_streaming_requires_capability(self, echo_provider) -> None:
+        """Streaming from an adapter without the capability fails."""
+        client = LLMClient()
+        try:
+            with pytest.raises(UnsupportedOperation, match="cannot stream"):
+                async for _ in client.generate_stream(
+                    "ping", provider="echo", model="e"
+                ):
+                    pass
+        finally:
+            await client.close()
+
+
+def _anthropic_batch_server(polls_until_ended: int) -> httpx.MockTransport:
+    """Stand-in for the Anthropic Message Batches API."""
+    state = {"polls": 0, "requests": []}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if request.method == "POST":
+            state["requests"] = json.loads(request.content)["requests"]
+            return httpx.Response(200, json={"id": "msgbatch_1"})
+        if path == "/v1/messages/batches/msgbatch_1":
+            state["polls"] += 1
+            ended = state["polls"] >= polls_until_ended
+            return httpx.Response(
+                200,
+                json={
+                    "processing_status": "ended" if ended else "in_progress",
+                    "results_url": "http://a.test/results/msgbatch_1",
+                },
+            )
+        lines = [
+            {
+                "custom_id": "0",
+                "result": {
+                    "type": "succeeded",
+                    "message": {
+                        "content": [{"text": "first"}],
+                        "usage": {"input_tokens": 1000, "output_tokens": 0},
+                    },
+                },
+            },
+            {
+                "custom_id": "1",
+                "result": {
+                    "type": "errored",
+                    "error": {"error": {"message": "prompt too long"}},
+                },
+            },
+        ]
+        return httpx.Response(
+            200, text="\n".join(json.dumps(line) for line in lines)
+        )
+
+    return httpx.MockTransport(handler)
+
+
+class TestBatchAPI:
+    """Tests for provider batch submission and polling."""
+
+    @pytest.fixture(autouse=True)
+    def stand_in_providers(self):
+        """Point the Anthropic and OpenAI adapters at local servers."""
+        register_provider(AnthropicAdapter("k", "http://a.test"))
+        register_provider(OpenAIAdapter("k", "http://o.test"))
+        yield
+        register_provider(AnthropicAdapter())
+        register_provider(OpenAIAdapter())
+
+    def test_batch_discount(self) -> None:
+        """Batch usage costs half the interactive price."""
+        full = calculate_cost("openai", "gpt-4", 1000, 1000)
+        assert calculate_cost(
+            "openai", "gpt-4", 1000, 1000, batch=True
+        ) == pytest.approx(full / 2)
+
+    @pytest.mark.asyncio
+    async def test_anthropic_batch(self) -> None:
+        """Results are polled for and mapped back in prompt order."""
+        client = LLMClient(transport=_anthropic_batch_server(2))
+        try:
+            results = await client.generate_batch(
+                ["a", "b", "c"],
+                provider="anthropic",
+                max_tokens=5,
+                poll_interval_s=0,
+            )
+        finally:
+            await client.close()
+        first = results[0].response
+        assert first is not None and first.text == "first"
+        assert first.batched
+        # 1000 input tokens at $0.003/1K, halved.
+        assert first.cost_usd == pytest.approx(0.0015)
+        assert results[1].error == "prompt too long"
+        assert results[2].error == "No result in batch msgbatch_1"
+        assert client.stats()["batches"] == {"pending": 0, "ended": 1}
+
+    @pytest.mark.asyncio
+    async def test_openai_batch(self) -> None:
+        """Requests are uploaded as JSONL and results read from files."""
+        uploads: list[bytes] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            path = request.url.path
+            if path == "/v1/files":
+                uploads.append(request.content)
+                return httpx.Response(200, json={"id": "file-in"})
+            if path == "/v1/batches":
+                body = json.loads(request.content)
+                assert body["input_file_id"] == "file-in"
+                return httpx.Response(200, json={"id": "batch_1"})
+            if path == "/v1/batches/batch_1":
+                return httpx.Response(
+                    200,
+                    json={"status": "completed", "output_file_id": "out"},
+                )
+            line = {
+                "custom_id": "0",
+                "response": {
+                    "status_code": 200,
+                    "body": {
+                        "choices": [{"message": {"content": "done"}}],
+                        "usage": {
+                            "prompt_tokens": 3,
+                            "completion_tokens": 2,
+                        },
+                    },
+                },
+            }
+            return httpx.Response(200, text=json.dumps(line))
+
+        client = LLMClient(transport=httpx.MockTransport(handler))
+        try:
+            results = await client.generate_batch(
+                ["hello"], provider="openai", model="gpt-4", max_tokens=5
+            )
+        finally:
+            await client.close()
+        assert b'"custom_id": "0"' in uploads[0]
+        response = results[0].response
+        assert response is not None
+        assert response.text == "done" and response.total_tokens == 5
+
+    @pytest.mark.asyncio
+    async def test_transient_poll_errors_retried(self) -> None:
+        """A 5xx while polling does not abandon the batch."""
+        server = _anthropic_batch_server(1)
+        failures = [httpx.Response(503)]
+
+        async def flaky(request: httpx.Request) -> httpx.Response:
+            if request.method == "GET" and failures:
+                return failures.pop()
+            return await server.handle_async_request(request)
+
+        client = LLMClient(transport=httpx.MockTransport(flaky))
+        try:
+            results = await client.generate_batch(
+                ["a"], provider="anthropic", poll_interval_s=0
+            )
+        finally:
+            await client.close()
+        assert results[0].response is not None
+
+    @pytest.mark.asyncio
+    async def test_batch_timeout(self) -> None:
+        """Waiting past ``max_wait_s`` raises TimeoutError."""
+        client = LLMClient(transport=_anthropic_batch_server(100))
+        try:
+            with pytest.raises(TimeoutError, match="msgbatch_1"):
+                await client.generate_batch(
+                    ["a"],
+                    provider="anthropic",
+                    poll_interval_s=0.01,
+                    max_wait_s=0.03,
+                )
+        finally:
+            await client.close()
+
+    @pytest.mark.asyncio
+    async def test_mock_provider_batch(self, mock_provider) -> None:
+        """The local mock runs batches with no network."""
+        client = LLMClient()
+        try:
+            results = await client.generate_batch(
+                ["one", "two"], provider="mock", model="m", max_tokens=2
+            )
+        finally:
+            await client.close()
+        assert [r.response.text for r in results if r.response] == [
+            "token0 token1",
+            "token0 token1",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_batching_requires_capability(self, echo_provider) -> None:
+        """Batching through an adapter without the capability fails."""
+        client = LLMClient()
+        try:
+            with pytest.raises(ValueError, match="no batch API"):
+                await client.generate_batch(["x"], provider="echo")
+        finally:
+            await client.close()
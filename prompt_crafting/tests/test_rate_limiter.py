@@ -0,0 +1,179 @@
+"""Tests for client-side RPM/TPM quota enforcement.
+
+Covers token buckets, reservation waits and rejections, usage
+reconciliation, the limiter inside the LLM client, and the 429 mapping
+on /execute.
+"""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+from httpx import AsyncClient
+
+from prompt_crafting.api.services.llm_client import LLMClient
+from prompt_crafting.api.services.rate_limiter import (
+    QuotaExceeded,
+    RateLimiter,
+    TokenBucket,
+)
+
+
+class _Clock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTokenBucket:
+    """Tests for bucket refill and wait computation."""
+
+    def test_refills_over_time(self) -> None:
+        """A drained bucket refills at per_minute / 60 per second."""
+        clock = _Clock()
+        bucket = TokenBucket(60, clock)
+        bucket.take(60)
+        assert bucket.wait_time(1) == 1.0
+        clock.now = 30
+        assert bucket.available == 30
+
+    def test_oversized_request_is_capped(self) -> None:
+        """A request bigger than the bucket waits for a full bucket."""
+        clock = _Clock()
+        bucket = TokenBucket(100, clock)
+        assert bucket.wait_time(1000) == 0.0
+
+
+class TestRateLimiter:
+    """Tests for reservations against quotas."""
+
+    @pytest.mark.asyncio
+    async def test_unconfigured_is_unlimited(self) -> None:
+        """Calls without a matching quota are never delayed."""
+        limiter = RateLimiter(quotas={})
+        for _ in range(100):
+            await limiter.reserve("anthropic", "m", 10_000)
+        assert limiter.waits == 0
+
+    @pytest.mark.asyncio
+    async def test_rpm_rejects_beyond_max_wait(self) -> None:
+        """Exhausted RPM with a long refill raises QuotaExceeded."""
+        limiter = RateLimiter(quotas={"anthropic": {"rpm": 2}}, max_wait_s=1)
+        await limiter.reserve("anthropic", "m", 1)
+        await limiter.reserve("anthropic", "m", 1)
+        with pytest.raises(QuotaExceeded) as excinfo:
+            await limiter.reserve("anthropic", "m", 1)
+        assert excinfo.value.retry_after_s == pytest.approx(30, abs=0.1)
+        assert limiter.rejected == 1
+
+    @pytest.mark.asyncio
+    async def test_short_waits_are_absorbed(self) -> None:
+        """A caller waits when capacity returns within max_wait_s."""
+        limiter = RateLimiter(
+            quotas={"anthropic/m": {"rpm": 1200}}, max_wait_s=1
+        )
+        for _ in range(1201):
+            await limiter.reserve("anthropic", "m", 1)
+        assert limiter.waits >= 1
+        assert limiter.rejected == 0
+
+    @pytest.mark.asyncio
+    async def test_model_and_provider_quotas_both_apply(self) -> None:
+        """Provider-wide and per-model buckets are both charged."""
+        limiter = RateLimiter(
+            quotas={
+                "openai": {"tpm": 1000},
+                "openai/gpt-4o": {"tpm": 500},
+            },
+            max_wait_s=0,
+        )
+        await limiter.reserve("openai", "gpt-4o", 400)
+        with pytest.raises(QuotaExceeded):
+            await limiter.reserve("openai", "gpt-4o", 400)
+        await limiter.reserve("openai", "gpt-4", 600)
+        with pytest.raises(QuotaExceeded):
+            await limiter.reserve("openai", "gpt-4", 100)
+
+    @pytest.mark.asyncio
+    async def test_reconcile_refunds_overestimate(self) -> None:
+        """Unused reserved tokens are returned after the call."""
+        limiter = RateLimiter(
+            quotas={"anthropic": {"tpm": 1000}}, max_wait_s=0
+        )
+        reservation = await limiter.reserve("anthropic", "m", 900)
+        limiter.reconcile(reservation, 100)
+        await limiter.reserve("anthropic", "m", 800)
+
+    @pytest.mark.asyncio
+    async def test_reconcile_refunds_only_the_debit(self) -> None:
+        """An oversized reservation refunds what take actually debited."""
+        clock = _Clock()
+        limiter = RateLimiter(
+            quotas={"anthropic": {"tpm": 1000}}, max_wait_s=0, clock=clock
+        )
+        reservation = await limiter.reserve("anthropic", "m", 5000)
+        limiter.reconcile(reservation, 400)
+        buckets = limiter.stats()["buckets"]["anthropic"]
+        assert buckets["tpm"]["available"] == 600
+
+
+class TestClientQuotas:
+    """Tests for quotas inside LLMClient."""
+
+    @pytest.mark.asyncio
+    async def test_quota_stops_calls_before_sending(self) -> None:
+        """Over-quota calls never reach the provider."""
+        calls = 0
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal calls
+            calls += 1
+            return httpx.Response(
+                200,
+                json={
+                    "content": [{"text": "ok"}],
+                    "usage": {"input_tokens": 5, "output_tokens": 5},
+                },
+            )
+
+        client = LLMClient(
+            transport=httpx.MockTransport(handler),
+            rate_limiter=RateLimiter(
+                quotas={"anthropic": {"tpm": 200}}, max_wait_s=0
+            ),
+        )
+        await client.generate("hi", max_tokens=150)
+        # Usage reconciled to 10 tokens, so a second call fits.
+        await client.generate("hello", max_tokens=150)
+        with pytest.raises(QuotaExceeded):
+            await client.generate("again", max_tokens=195)
+        await client.close()
+        assert calls == 2
+
+
+@pytest.mark.asyncio
+@patch("prompt_crafting.api.routes.executions._llm_client")
+async def test_execute_returns_429_on_quota(
+    mock_client: MagicMock,
+    client: AsyncClient,
+) -> None:
+    """An exhausted quota maps to 429 with Retry-After."""
+    mock_client.generate = AsyncMock(
+        side_effect=QuotaExceeded("anthropic", "m", 4.2)
+    )
+    create_resp = await client.post(
+        "/api/v1/prompts",
+        json={"name": "quota", "template": "Hello"},
+    )
+    prompt_id = create_resp.json()["id"]
+
+    response = await client.post(
+        f"/api/v1/prompts/{prompt_id}/execute",
+        json={"input_data": {}},
+    )
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "5"
@@ -0,0 +1,202 @@
+"""Tests for off-loop template rendering and render budgets.
+
+Covers thread and process pool rendering, CPU time and output size
+budgets (including the budgeted sandbox), executor metrics, and the
+/metrics endpoint.
+"""
+
+import asyncio
+import time
+
+import pytest
+from httpx import AsyncClient
+
+from prompt_crafting.api.services.prompt_engine import (
+    RenderBudgetExceeded,
+    compile_template,
+    render_compiled,
+)
+from prompt_crafting.api.services.render_executor import RenderExecutor
+
+_RUNAWAY = (
+    "{% for i in range(100000) %}{% for j in range(1000) %}"
+    "{{ j }}{% endfor %}{% endfor %}"
+)
+
+
+class TestRenderBudget:
+    """Tests for budgeted rendering of compiled templates."""
+
+    def test_output_cap(self) -> None:
+        """Output beyond the cap raises RenderBudgetExceeded."""
+        compiled = compile_template(_RUNAWAY)
+        with pytest.raises(RenderBudgetExceeded, match="characters"):
+            render_compiled(compiled, {}, max_output_chars=1000)
+
+    def test_cpu_budget(self) -> None:
+        """A long-running render is stopped at its CPU budget."""
+        compiled = compile_template(_RUNAWAY)
+        with pytest.raises(RenderBudgetExceeded, match="CPU budget"):
+            render_compiled(compiled, {}, cpu_budget_s=0.05)
+
+    def test_cpu_budget_without_output(self) -> None:
+        """Loops that emit nothing are still stopped by the sandbox."""
+        compiled = compile_template(
+            "{% for i in range(100000) %}{% for j in range(100000) %}"
+            "{% endfor %}{% endfor %}"
+        )
+        with pytest.raises(RenderBudgetExceeded, match="CPU budget"):
+            render_compiled(compiled, {}, cpu_budget_s=0.05)
+
+    def test_cpu_budget_in_loops_over_context(self) -> None:
+        """Output-free loops over a context list stop near the budget."""
+        compiled = compile_template(
+            "{% for a in x %}{% for b in x %}{% for d in x %}"
+            "{% set c = a %}{% endfor %}{% endfor %}{% endfor %}done"
+        )
+        start = time.thread_time()
+        with pytest.raises(RenderBudgetExceeded, match="CPU budget"):
+            render_compiled(
+                compiled, {"x": list(range(300))}, cpu_budget_s=0.2
+            )
+        assert time.thread_time() - start < 0.4
+
+    def test_loops_keep_loop_semantics(self) -> None:
+        """Budgeted loops still support ``loop`` and ``else``."""
+        compiled = compile_template(
+            "{% for i in x %}{{ loop.index }}/{{ loop.length }} "
+            "{% endfor %}{% for i in [] %}{% else %}empty{% endfor %}"
+        )
+        result = render_compiled(compiled, {"x": "ab"}, cpu_budget_s=1.0)
+        assert result == "1/2 2/2 empty"
+
+    def test_sequence_multiplication_capped(self) -> None:
+        """Repeating a string past the output cap fails up front."""
+        compiled = compile_template("{{ 'x' * n }}")
+        with pytest.raises(RenderBudgetExceeded, match="Repeated"):
+            render_compiled(compiled, {"n": 10**9}, max_output_chars=1000)
+
+    def test_budgeted_range_behaves_like_range(self) -> None:
+        """range() keeps len/list semantics under a budget."""
+        compiled = compile_template(
+            "{{ range(5)|length }} {{ range(3)|list }} "
+            "{{ range(4)|reverse|join(',') }}"
+        )
+        result = render_compiled(compiled, {}, cpu_budget_s=1.0)
+        assert result == "5 [0, 1, 2] 3,2,1,0"
+
+    def test_within_budget(self) -> None:
+        """Renders under budget return the full output."""
+        compiled = compile_template("Hello {{ name }}!")
+        result = render_compiled(
+            compiled,
+            {"name": "World"},
+            cpu_budget_s=1.0,
+            max_output_chars=100,
+        )
+        assert result == "Hello World!"
+
+
+class TestRenderExecutor:
+    """Tests for the thread/process render executor."""
+
+    @pytest.mark.asyncio
+    async def test_thread_render(self) -> None:
+        """Regular templates render in the thread pool."""
+        executor = RenderExecutor(max_threads=2)
+        compiled = compile_template("Hi {{ name }}")
+        try:
+            result = await executor.render(compiled, {"name": "a"})
+        finally:
+            executor.shutdown()
+        assert result == "Hi a"
+        assert executor.stats()["completed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_heavy_render_uses_process_pool(self) -> None:
+        """Heavy templates render in the process pool."""
+        executor = RenderExecutor(max_processes=1)
+        compiled = compile_template("{{ x * 2 }}")
+        try:
+            result = await executor.render(compiled, {"x": 21}, heavy=True)
+        finally:
+            executor.shutdown()
+        assert result == "42"
+
+    @pytest.mark.asyncio
+    async def test_budget_failure_counted(self) -> None:
+        """Budget violations propagate and are counted as failures."""
+        executor = RenderExecutor(max_output_chars=100)
+        compiled = compile_template(_RUNAWAY)
+        try:
+            with pytest.raises(RenderBudgetExceeded):
+                await executor.render(compiled, {})
+        finally:
+            executor.shutdown()
+        assert executor.stats()["failed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_queue_depth(self) -> None:
+        """Renders beyond the pool size wait in the queue."""
+        executor = RenderExecutor(max_threads=1)
+        compiled = compile_template(_RUNAWAY)
+        executor.cpu_budget_s = 0.2
+        try:
+            tasks = [
+                asyncio.create_task(executor.render(compiled, {}))
+                for _ in range(3)
+            ]
+            await asyncio.sleep(0.05)
+            stats = executor.stats()
+            assert stats["in_flight"] == 1
+            assert stats["queue_depth"] == 2
+            await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            executor.shutdown()
+        assert executor.stats()["queue_depth"] == 0
+        assert executor.stats()["max_render_ms"] > 0
+
+    @pytest.mark.asyncio
+    async def test_render_many_in_order(self) -> None:
+        """Batch renders keep input order and yield failures in place."""
+        executor = RenderExecutor(max_threads=2)
+        compiled = compile_template("{{ 10 // n }}")
+        try:
+            results = [
+                item
+                async for item in executor.render_many(
+                    compiled, [{"n": n} for n in (1, 0, 5)]
+                )
+            ]
+        finally:
+            executor.shutdown()
+        assert results[0] == "10" and results[2] == "2"
+        assert isinstance(results[1], ZeroDivisionError)
+
+    @pytest.mark.asyncio
+    async def test_render_many_cancels_on_close(self) -> None:
+        """Stopping a batch early cancels its queued renders."""
+        executor = RenderExecutor(max_threads=1)
+        executor.cpu_budget_s = 0.1
+        compiled = compile_template(_RUNAWAY)
+        batch = executor.render_many(compiled, [{}] * 100)
+        try:
+            first = await batch.__anext__()
+            await batch.aclose()
+            await asyncio.sleep(0)
+            assert executor.stats()["queue_depth"] == 0
+            await asyncio.sleep(0.2)
+        finally:
+            executor.shutdown()
+        assert isinstance(first, RenderBudgetExceeded)
+        assert executor.stats()["failed"] <= 2
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint(client: AsyncClient) -> None:
+    """GET /metrics reports template cache and executor stats."""
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    data = response.json()
+    assert "hits" in data["template_cache"]
+    assert "queue_depth" in data["render_executor"]
@@ -0,0 +1,180 @@
+"""Tests for static template complexity analysis.
+
+Covers loop depth and iteration estimates, output size estimates,
+recursive macro detection, referenced and required variables, and
+limit checks.
+"""
+
+from jinja2.sandbox import SandboxedEnvironment
+
+from prompt_crafting.api.services.template_analysis import (
+    TemplateComplexity,
+    analyze_template,
+    check_complexity,
+    find_required_variables,
+)
+
+_env = SandboxedEnvironment()
+
+
+def _analyze(source: str) -> TemplateComplexity:
+    return analyze_template(_env.parse(source), _env.globals)
+
+
+class TestAnalyzeTemplate:
+    """Tests for AST-based complexity estimates."""
+
+    def test_plain_template(self) -> None:
+        """Template without loops has depth 0 and exact output."""
+        result = _analyze("Hello world")
+        assert result.max_loop_depth == 0
+        assert result.estimated_iterations == 0
+        assert result.estimated_output_chars == len("Hello world")
+        assert result.heavy is False
+
+    def test_constant_range_loops(self) -> None:
+        """Nested constant ranges multiply iterations and output."""
+        result = _analyze(
+            "{% for i in range(10) %}{% for j in range(1, 5) %}"
+            "ab{% endfor %}{% endfor %}"
+        )
+        assert result.max_loop_depth == 2
+        assert result.estimated_iterations == 10 + 10 * 4
+        assert result.estimated_output_chars == 10 * 4 * 2
+
+    def test_literal_list_loop(self) -> None:
+        """Loops over literal lists use the literal length."""
+        result = _analyze("{% for x in [1, 2, 3] %}x{% endfor %}")
+        assert result.estimated_iterations == 3
+
+    def test_unknown_iterable_uses_default(self) -> None:
+        """Loops over variables assume a default size."""
+        result = _analyze("{% for x in items %}{{ x }}{% endfor %}")
+        assert result.estimated_iterations == 10
+
+    def test_heavy_flag(self) -> None:
+        """Large iteration counts mark the template heavy."""
+        result = _analyze(
+            "{% for i in range(1000) %}{% for j in range(1000) %}"
+            "{% endfor %}{% endfor %}"
+        )
+        assert result.heavy is True
+
+    def test_nested_unknown_iterables_are_heavy(self) -> None:
+        """Nested loops over context values are heavy at any estimate."""
+        result = _analyze(
+            "{% for a in x %}{% for b in x %}{% for c in x %}"
+            "{% endfor %}{% endfor %}{% endfor %}"
+        )
+        assert result.estimated_iterations == 10 + 100 + 1000
+        assert result.unbounded_loop_depth == 3
+        assert result.heavy is True
+
+    def test_single_unknown_iterable_is_not_heavy(self) -> None:
+        """Constant loops do not count towards unbounded nesting."""
+        result = _analyze(
+            "{% for a in x %}{% for b in range(3) %}{{ b }}"
+            "{% endfor %}{% endfor %}"
+        )
+        assert result.unbounded_loop_depth == 1
+        assert result.heavy is False
+
+    def test_macro_body_counted_at_call_site(self) -> None:
+        """Macro output is multiplied by the calling loop."""
+        result = _analyze(
+            "{% macro m() %}abcd{% endmacro %}"
+            "{% for i in range(5) %}{{ m() }}{% endfor %}"
+        )
+        assert result.estimated_output_chars >= 5 * 4
+
+    def test_recursive_macros(self) -> None:
+        """Direct and mutual macro recursion is detected."""
+        result = _analyze(
+            "{% macro a(n) %}{{ b(n) }}{% endmacro %}"
+            "{% macro b(n) %}{{ a(n) }}{% endmacro %}"
+            "{% macro c() %}{{ c() }}{% endmacro %}"
+            "{% macro d() %}ok{% endmacro %}"
+            "{{ a(1) }}"
+        )
+        assert result.recursive_macros == ["a", "b", "c"]
+
+    def test_variables_exclude_globals_and_locals(self) -> None:
+        """Referenced variables exclude globals and loop targets."""
+        result = _analyze(
+            "{{ name }}{% for i in range(n) %}{{ i }}{% endfor %}"
+            "{% set local = 1 %}{{ local }}"
+        )
+        assert result.variables == ["n", "name"]
+
+
+class TestCheckComplexity:
+    """Tests for complexity limit enforcement."""
+
+    def test_acceptable(self) -> None:
+        """Simple templates pass the limits."""
+        assert check_complexity(_analyze("Hi {{ name }}")) == []
+
+    def test_loop_depth_limit(self) -> None:
+        """Loop nesting beyond the limit is rejected."""
+        source = "{% for a in x %}" * 5 + "{% endfor %}" * 5
+        errors = check_complexity(_analyze(source))
+        assert any("nesting depth" in e for e in errors)
+
+    def test_output_limit(self) -> None:
+        """Estimated output beyond the limit is rejected."""
+        errors = check_complexity(
+            _analyze(
+                "{% for i in range(100000) %}{% for j in range(100) %}"
+                "{{ j }}{% endfor %}{% endfor %}"
+            )
+        )
+        assert any("Estimated output" in e for e in errors)
+
+    def test_recursion_rejected(self) -> None:
+        """Recursive macros are rejected."""
+        errors = check_complexity(
+            _analyze("{% macro c() %}{{ c() }}{% endmacro %}")
+        )
+        assert any("Recursive" in e for e in errors)
+
+
+class TestFindRequiredVariables:
+    """Tests for required-variable extraction."""
+
+    def test_undeclared_variables_required(self) -> None:
+        """Plain references are required; globals are not."""
+        ast = _env.parse("{{ a }} {% for i in range(n) %}{% endfor %}")
+        assert find_required_variables(ast, _env.globals) == {"a", "n"}
+
+    def test_guarded_variables_optional(self) -> None:
+        """|default and 'is defined' mark a variable optional."""
+        ast = _env.parse(
+            "{{ a|default('x') }}{% if b is defined %}{{ b }}{% endif %}"
+            "{{ c }}"
+        )
+        assert find_required_variables(ast, _env.globals) == {"c"}
+
+    def test_if_conditions_optional(self) -> None:
+        """A variable only tested for truth in an if is optional."""
+        ast = _env.parse(
+            "{% if a %}A{% elif not b or c %}B{% endif %}"
+            "{{ 'D' if d }}{% if e > 1 %}E{% endif %}"
+        )
+        assert find_required_variables(ast, _env.globals) == {"e"}
+        assert _env.from_string("{% if a %}A{% endif %}").render() == ""
+
+    def test_guard_covers_only_its_branch(self) -> None:
+        """Uses outside the branch an if guards keep a variable required."""
+        ast = _env.parse("{% if x %}hi{% endif %}{{ x.name }}")
+        assert find_required_variables(ast, _env.globals) == {"x"}
+        ast = _env.parse(
+            "{% if x %}{{ x.name }}{% else %}none{% endif %}"
+            "{{ y.name if y and y.ok }}{{ z|default('') }}{{ z.name }}"
+        )
+        assert find_required_variables(ast, _env.globals) == {"z"}
+        assert (
+            _env.from_string(
+                "{% if x %}{{ x.name }}{% endif %}{{ y.name if y }}"
+            ).render()
+            == ""
+        )
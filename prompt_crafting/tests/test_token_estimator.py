@@ -0,0 +1,92 @@
+"""Tests for offline token estimation and pre-flight estimates.
+
+Covers the heuristic tokenizer, per-provider tokenizer registration,
+context windows, and worst-case cost estimates.
+"""
+
+import pytest
+
+from prompt_crafting.api.services import token_estimator
+from prompt_crafting.api.services.llm_client import (
+    calculate_cost,
+    estimate_call,
+)
+from prompt_crafting.api.services.prompt_engine import CACHE_BREAK
+from prompt_crafting.api.services.token_estimator import (
+    context_window,
+    count_tokens,
+    heuristic_tokens,
+    register_tokenizer,
+)
+
+
+class TestHeuristicTokens:
+    """Tests for the default characters-per-token heuristic."""
+
+    def test_four_chars_per_token(self) -> None:
+        """Text counts one token per four characters, rounded up."""
+        assert heuristic_tokens("a cat, a dog.") == 4
+        assert heuristic_tokens("x" * 10) == 3
+
+    def test_english_prose(self) -> None:
+        """English prose is not overestimated."""
+        text = (
+            "The quick brown fox jumps over the lazy dog, "
+            "then rests in the shade of an old oak tree."
+        )
+        # 18 common words and 2 punctuation marks: about 20 BPE tokens.
+        assert heuristic_tokens(text) == 22
+
+    def test_whitespace_is_free(self) -> None:
+        """Whitespace alone counts no tokens."""
+        assert heuristic_tokens("  \n\t ") == 0
+
+
+class TestTokenizerRegistry:
+    """Tests for per-provider tokenizers."""
+
+    @pytest.fixture(autouse=True)
+    def _restore(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(token_estimator, "_tokenizers", {})
+
+    def test_registered_tokenizer_used(self) -> None:
+        """A provider's registered tokenizer overrides the default."""
+        register_tokenizer("openai", len)
+        assert count_tokens("hello", "openai") == 5
+        assert count_tokens("hello", "anthropic") == 2
+
+    def test_default_without_provider(self) -> None:
+        """No provider falls back to the default tokenizer."""
+        assert count_tokens("hello world") == 3
+
+
+class TestEstimateCall:
+    """Tests for pre-flight call estimates."""
+
+    def test_worst_case_cost(self) -> None:
+        """Cost assumes the response uses all of max_tokens."""
+        estimate = estimate_call(
+            "word " * 100, "anthropic", "claude-sonnet-4-20250514", 500
+        )
+        assert estimate.input_tokens == 125
+        assert estimate.max_cost_usd == pytest.approx(
+            calculate_cost("anthropic", "claude-sonnet-4-20250514", 125, 500)
+        )
+        assert estimate.context_window == 200000
+        assert estimate.fits_context
+
+    def test_context_overflow(self) -> None:
+        """Prompt plus max_tokens beyond the window does not fit."""
+        estimate = estimate_call("word " * 8000, "openai", "gpt-4", 500)
+        assert not estimate.fits_context
+
+    def test_unknown_model_always_fits(self) -> None:
+        """Models without a known window are not rejected."""
+        assert context_window("anthropic", "unknown") is None
+        assert estimate_call("hi", "anthropic", "unknown", 10).fits_context
+
+    def test_cache_break_not_counted(self) -> None:
+        """The prompt-cache marker adds no tokens."""
+        plain = estimate_call("a b", "anthropic", "x", 1)
+        marked = estimate_call(f"a{CACHE_BREAK} b", "anthropic", "x", 1)
+        assert marked.input_tokens == plain.input_tokens
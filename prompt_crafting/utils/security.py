@@ -33,6 +33,27 @@ def get_api_keys() -> list[str]:
     return [k.strip() for k in raw.split(",") if k.strip()]
 
 
+def get_api_key_priority(api_key: str) -> Optional[str]:
+    """Look up the scheduling priority configured for an API key.
+
+    Priorities come from the API_KEY_PRIORITIES env var as
+    comma-separated ``key:priority`` pairs, e.g.
+    ``etl-key:batch,nightly-key:background``.
+
+    Args:
+        api_key: The validated API key.
+
+    Returns:
+        The configured priority, or None if the key has none.
+    """
+    raw = os.getenv("API_KEY_PRIORITIES", "")
+    for entry in raw.split(","):
+        key, _, priority = entry.strip().partition(":")
+        if key and key == api_key and priority.strip():
+            return priority.strip()
+    return None
+
+
 async def verify_api_key(
     api_key: Optional[str] = Security(_api_key_header),
 ) -> str:
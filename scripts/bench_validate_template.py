@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Template Validation Microbenchmark
+
+Compares the original four-pass ``validate_template`` (one ``re.search``
+per forbidden pattern followed by a full parse) against the single-pass
+text scanner and the AST scanner on 1 KB, 100 KB and 1 MB templates.
+Also compares the original validate-then-``from_string`` compile path
+(two parses) against the current single-parse compile.
+
+Usage:
+    python scripts/bench_validate_template.py
+    python scripts/bench_validate_template.py --repeat 10
+"""
+
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from jinja2 import TemplateSyntaxError  # noqa: E402
+
+from prompt_crafting.api.services.prompt_engine import (  # noqa: E402
+    _FORBIDDEN_PATTERNS,
+    _FORBIDDEN_SCANNER,
+    _compile,
+    _sandbox_env,
+    validate_template,
+)
+
+SIZES = {"1KB": 1024, "100KB": 100 * 1024, "1MB": 1024 * 1024}
+
+# A clean block of realistic prompt text with a few expressions, so the
+# scanners have to walk the whole template without an early exit.
+BLOCK = (
+    "You are reviewing {{ language }} code for {{ team }}.\n"
+    "{% for item in findings %}- {{ item.title }}: {{ item.detail }}\n"
+    "{% endfor %}Summarize the issues in {{ tone }} tone.\n"
+)
+
+
+def legacy_validate_template(template: str) -> list[str]:
+    """Original implementation: one regex pass per pattern plus a parse."""
+    errors: list[str] = []
+    for pattern in _FORBIDDEN_PATTERNS:
+        if pattern.search(template):
+            errors.append(f"Forbidden pattern detected: '{pattern.pattern}'")
+    try:
+        _sandbox_env.parse(template)
+    except TemplateSyntaxError as exc:
+        errors.append(f"Template syntax error: {exc}")
+    return errors
+
+
+def make_template(size: int) -> str:
+    """Build a clean, syntactically valid template of ~``size`` bytes."""
+    return BLOCK * max(1, round(size / len(BLOCK)))
+
+
+def legacy_scan_only(template: str) -> bool:
+    """Original forbidden-pattern check without the parse."""
+    return any(p.search(template) for p in _FORBIDDEN_PATTERNS)
+
+
+def legacy_compile(template: str) -> object:
+    """Original compile path: validate (parse) then parse again."""
+    if legacy_validate_template(template):
+        raise ValueError("invalid template")
+    return _sandbox_env.from_string(template)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'size':>6} {'variant':<24} {'best ms':>10}")
+    for label, size in SIZES.items():
+        template = make_template(size)
+        number = max(1, 200_000 // size)
+        variants = {
+            "legacy (4x re + parse)": lambda: legacy_validate_template(
+                template
+            ),
+            "single-pass text": lambda: validate_template(
+                template, mode="text"
+            ),
+            "ast": lambda: validate_template(template, mode="ast"),
+            "legacy scan only": lambda: legacy_scan_only(template),
+            "single-pass scan only": lambda: list(
+                _FORBIDDEN_SCANNER.finditer(template)
+            ),
+            "legacy compile": lambda: legacy_compile(template),
+            "single-parse compile": lambda: _compile(template, ""),
+        }
+        for name, func in variants.items():
+            best = min(timeit.repeat(func, number=number, repeat=args.repeat))
+            print(f"{label:>6} {name:<24} {best / number * 1000:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()